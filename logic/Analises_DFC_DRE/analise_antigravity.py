@@ -6,15 +6,15 @@ import streamlit as st
 from datetime import datetime
 from dotenv import load_dotenv
 
+from logic.engine.formatacao import formatar_brl as _formatar_moeda
+
 load_dotenv()
 
 # Cliente OpenAI
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 def formatar_brl(valor):
-    if pd.isna(valor):
-        return "R$ 0,00"
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return _formatar_moeda(valor, vazio="R$ 0,00")
 
 def calcular_tendencia(serie_temporal, meses=None):
     """
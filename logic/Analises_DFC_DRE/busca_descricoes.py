@@ -0,0 +1,97 @@
+"""
+Busca de descrições por índice invertido de trigramas
+Usado na caixa "Procurar descrições por palavra" da categorização em lote:
+o índice é montado uma vez por conjunto de dados e cada consulta é respondida
+pela interseção das listas de ocorrência, sem varrer todas as descrições.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import List
+
+import numpy as np
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_texto(texto) -> str:
+    """Minúsculas, sem acentos e com espaços simples"""
+    texto = unicodedata.normalize("NFKD", str(texto).lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _ESPACOS.sub(" ", texto).strip()
+
+
+def _trigramas(texto: str):
+    """Trigramas distintos de um texto já normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceTrigramas:
+    """Índice invertido trigrama -> posições das descrições que o contêm"""
+
+    def __init__(self, textos: List[str]):
+        self.textos = list(textos)
+        self._normalizados = [normalizar_texto(t) for t in self.textos]
+
+        ocorrencias = defaultdict(list)
+        for posicao, texto in enumerate(self._normalizados):
+            for trigrama in _trigramas(texto):
+                ocorrencias[trigrama].append(posicao)
+        # Posições em ordem crescente (inseridas em ordem), prontas para interseção
+        self._postings = {t: np.asarray(p, dtype=np.int32) for t, p in ocorrencias.items()}
+        self._todas = np.arange(len(self.textos), dtype=np.int32)
+
+    def _buscar_termo(self, termo: str, candidatos: np.ndarray) -> np.ndarray:
+        """
+        Filtra os candidatos que contêm o termo (ou começam com ele, se iniciado por '^')
+
+        Args:
+            termo: Termo normalizado
+            candidatos: Posições ainda válidas
+
+        Returns:
+            Posições que atendem ao termo
+        """
+        prefixo = termo.startswith("^")
+        termo = termo.lstrip("^")
+        if not termo:
+            return candidatos
+
+        # Interseção das listas de ocorrência, da menor para a maior
+        trigramas = _trigramas(termo)
+        if trigramas:
+            listas = sorted((self._postings.get(t) for t in trigramas), key=lambda p: 0 if p is None else len(p))
+            if listas[0] is None:
+                return candidatos[:0]
+            for lista in listas:
+                candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+                if not len(candidatos):
+                    return candidatos
+
+        # Termo de exatamente 3 caracteres já está confirmado pelo próprio trigrama
+        if len(termo) == 3 and not prefixo:
+            return candidatos
+
+        # Confirmar (trigramas não garantem a ordem) e tratar termos com menos de 3 caracteres
+        if prefixo:
+            return np.array([p for p in candidatos if self._normalizados[p].startswith(termo)], dtype=np.int32)
+        return np.array([p for p in candidatos if termo in self._normalizados[p]], dtype=np.int32)
+
+    def buscar(self, consulta: str) -> List[str]:
+        """
+        Retorna as descrições que atendem a todos os termos da consulta (E lógico)
+
+        Args:
+            consulta: Termos separados por espaço; '^termo' exige que a descrição comece pelo termo
+
+        Returns:
+            Descrições encontradas, na ordem original
+        """
+        termos = normalizar_texto(consulta).split(" ")
+        candidatos = self._todas
+        for termo in termos:
+            candidatos = self._buscar_termo(termo, candidatos)
+            if not len(candidatos):
+                return []
+        return [self.textos[p] for p in candidatos]
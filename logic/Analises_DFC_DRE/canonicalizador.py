@@ -0,0 +1,107 @@
+"""
+Canonicalização de descrições bancárias
+Remove datas, horários, números, NSU/documentos e chaves PIX das descrições para que
+variações do mesmo lançamento (ex.: 'MOV TIT COB DISP  03/01S') caiam no
+mesmo grupo de categorização. A descrição original é mantida nas transações.
+"""
+
+import re
+from typing import Dict
+
+import pandas as pd
+
+# Incrementar sempre que as regras abaixo mudarem (invalida categorizações memoizadas)
+VERSAO_CANONICALIZACAO = 1
+
+# Máscaras pré-compiladas, aplicadas nesta ordem
+_PADROES = [
+    # Chaves PIX: e-mail, chave aleatória (UUID), CPF/CNPJ formatados ou mascarados e telefone
+    (re.compile(r"[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}"), "[PIX]"),
+    (re.compile(r"\b[0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12}\b"), "[PIX]"),
+    (re.compile(r"(?<!\d)\d{2}\.\d{3}\.\d{3}/\d{4}-\d{2}(?!\d)"), "[PIX]"),
+    (re.compile(r"(?<!\d)\d{3}\.\d{3}\.\d{3}-\d{2}(?!\d)"), "[PIX]"),
+    (re.compile(r"\+55\s?\(?\d{2}\)?\s?9?\d{4}-?\d{4}(?!\d)"), "[PIX]"),
+    (re.compile(r"\*{3}\.\d{3}\.\d{3}-\*{2}"), "[PIX]"),
+    # Datas: 03/01, 03/01/2024, 03.01.2024, 2024-01-03
+    (re.compile(r"(?<!\d)\d{4}-\d{2}-\d{2}(?!\d)"), "[DATA]"),
+    (re.compile(r"(?<!\d)\d{2}\.\d{2}\.\d{4}(?!\d)"), "[DATA]"),
+    (re.compile(r"(?<!\d)\d{1,2}/\d{1,2}(?:/\d{2,4})?(?!\d)"), "[DATA]"),
+    (re.compile(r"(?<!\d)\d{1,2}:\d{2}(?::\d{2})?(?!\d)"), "[HORA]"),
+    # NSU, documentos, autorizações e parcelas
+    (re.compile(r"\b(NSU|DOCTO|DOC|NR|NUM|N[º°O]|AUT|CV|ID|PARC|P)\s*[:.]?\s*\d+(?:[./-]\d+)*"), r"\1 [DOC]"),
+    # Demais números (códigos de banco/agência, sequências)
+    (re.compile(r"\d+(?:[.,/-]\d+)*"), "[NUM]"),
+]
+_ESPACOS = re.compile(r"\s+")
+
+
+def canonizar_descricao(descricao) -> str:
+    """
+    Converte uma descrição bancária em sua chave canônica
+
+    Args:
+        descricao: Descrição original do extrato
+
+    Returns:
+        Descrição em maiúsculas sem datas, números, documentos e chaves PIX
+    """
+    if descricao is None or (isinstance(descricao, float) and pd.isna(descricao)):
+        return ""
+
+    texto = str(descricao).upper()
+    for padrao, substituto in _PADROES:
+        texto = padrao.sub(substituto, texto)
+    return _ESPACOS.sub(" ", texto).strip()
+
+
+def canonizar_serie(descricoes: pd.Series) -> pd.Series:
+    """
+    Canonicaliza uma série de descrições processando cada valor distinto uma única vez
+
+    Args:
+        descricoes: Série com as descrições originais
+
+    Returns:
+        Série (mesmo índice) com as chaves canônicas
+    """
+    codigos, unicos = pd.factorize(descricoes, use_na_sentinel=False)
+    canonicos = pd.Index([canonizar_descricao(d) for d in unicos], dtype=object)
+    return pd.Series(canonicos.take(codigos), index=descricoes.index, name=descricoes.name)
+
+
+def mapa_canonico(descricoes: pd.Series) -> Dict[str, str]:
+    """
+    Monta o dicionário descrição original -> chave canônica
+
+    Args:
+        descricoes: Série com as descrições originais
+
+    Returns:
+        Dicionário com uma entrada por descrição distinta
+    """
+    unicos = pd.unique(descricoes.dropna())
+    return {d: canonizar_descricao(d) for d in unicos}
+
+
+def resolver_mapa_canonico(mapa: Dict[str, str], canonicos: Dict[str, str]) -> Dict[str, str]:
+    """
+    Converte um mapa descrição -> categoria (salvo com descrições originais ou
+    canônicas) para chaves canônicas
+
+    Entradas já canônicas prevalecem; para as demais vale a primeira descrição
+    original do grupo encontrada no mapa.
+
+    Args:
+        mapa: Dicionário descrição -> categoria (CSV ou JSON da licença)
+        canonicos: Dicionário descrição original -> chave canônica
+
+    Returns:
+        Dicionário chave canônica -> categoria
+    """
+    resolvido = {}
+    for descricao, categoria in mapa.items():
+        canonico = canonicos.get(descricao)
+        if canonico and canonico not in mapa:
+            resolvido.setdefault(canonico, categoria)
+    resolvido.update(mapa)
+    return resolvido
@@ -1,31 +1,139 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
-import os
 
-def categorizar_transacoes(
-    df_transacoes,
-    plano_path="./logic/CSVs/plano_de_contas.csv",
-    categorias_salvas_path="./logic/CSVs/categorias_salvas.csv",
-    prefixo_key="cat",
-    tipo_lancamento=""
-):
-    # Verificar se o arquivo de categorias salvas existe
-    if os.path.exists(categorias_salvas_path):
-        df_categorias = pd.read_csv(categorias_salvas_path)
+from logic.Analises_DFC_DRE.busca_descricoes import IndiceTrigramas
+from logic.Analises_DFC_DRE.canonicalizador import (
+    VERSAO_CANONICALIZACAO,
+    mapa_canonico,
+    resolver_mapa_canonico,
+)
+from logic.Analises_DFC_DRE.esquema_transacoes import converter_valores
+from logic.Analises_DFC_DRE.memo_categorizacao import (
+    IndicePalavrasChave,
+    cache_categorizacao,
+    calcular_mapa_considerar,
+    carregar_plano_contas,
+    diferenca_mapa,
+    extrair_regras_palavras,
+    fingerprint_transacoes,
+)
+from logic.categoria_store import categoria_store
+from logic.engine.formatacao import formatar_moeda
+
+
+def _mapa_categorias_salvas(df_categorias, tipo_lancamento, canonicos=None):
+    """Categorias salvas do tipo informado (primeira ocorrência no CSV prevalece)"""
+    salvas = df_categorias[df_categorias["Tipo"] == tipo_lancamento].drop_duplicates(subset=["Descricao"], keep="first")
+    mapa = dict(zip(salvas["Descricao"], salvas["Categoria"]))
+    return resolver_mapa_canonico(mapa, canonicos) if canonicos else mapa
+
+
+def _combinar_sugestoes(descricoes, mapa_salvas, indice_palavras):
+    """Categorias salvas têm prioridade sobre as palavras-chave"""
+    sugestoes = {}
+    for desc in descricoes:
+        if desc in mapa_salvas:
+            sugestoes[desc] = mapa_salvas[desc]
+        elif desc in indice_palavras.sugestoes:
+            sugestoes[desc] = indice_palavras.sugestoes[desc]
+    return sugestoes
+
+
+def _preparar_descricoes(df_transacoes, df_categorias, df_palavras, tipo_lancamento, canonizar=True):
+    """
+    Agrupa as descrições e calcula as sugestões (categorias salvas e palavras-chave)
+
+    Args:
+        df_transacoes: DataFrame de transações
+        df_categorias: Categorias salvas (Descricao, Tipo, Categoria)
+        df_palavras: Palavras-chave (PalavraChave, Tipo, Categoria)
+        tipo_lancamento: Tipo de lançamento filtrado
+        canonizar: Agrupar pela descrição canônica (sem datas, números e documentos)
+
+    Returns:
+        Dicionário com df_desc base, sugestões por descrição, texto dos valores,
+        o mapa descrição original -> chave de agrupamento e o índice reverso
+        usado nas atualizações incrementais
+    """
+    if canonizar:
+        canonicos = mapa_canonico(df_transacoes["Descrição"])
+        chaves = df_transacoes["Descrição"].map(canonicos)
     else:
-        df_categorias = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
+        canonicos = {}
+        chaves = df_transacoes["Descrição"]
 
-    # Agrupar descrições únicas
+    # A descrição original continua nas transações para drill-down
     df_desc = (
         df_transacoes
+        .assign(**{"Descrição": chaves, "Descrição Original": df_transacoes["Descrição"]})
         .groupby("Descrição", as_index=False)
-        .agg(Quantidade=("Valor (R$)", "count"), Total=("Valor (R$)", "sum"))
+        .agg(
+            Quantidade=("Valor (R$)", "count"),
+            Total=("Valor (R$)", "sum"),
+            Variacoes=("Descrição Original", "nunique"),
+        )
     )
     df_desc["Categoria"] = ""
 
-    # Verificar se o plano de contas existe
+    descricoes = df_desc["Descrição"].tolist()
+    mapa_salvas = _mapa_categorias_salvas(df_categorias, tipo_lancamento, canonicos)
+    indice_palavras = IndicePalavrasChave(descricoes, extrair_regras_palavras(df_palavras, tipo_lancamento),
+                                          originais=canonicos)
+
+    # Rótulo com os valores de cada descrição: a coluna inteira é formatada uma vez
+    valores_rotulo = formatar_moeda(np.abs(converter_valores(df_transacoes["Valor (R$)"])), prefixo="R\\$ ")
+    valores_texto = valores_rotulo.groupby(chaves.to_numpy(), sort=False).agg(" - ".join).to_dict()
+
+    return {
+        "df_desc": df_desc,
+        "sugestoes": _combinar_sugestoes(descricoes, mapa_salvas, indice_palavras),
+        "valores_texto": valores_texto,
+        "canonicos": canonicos,
+        "mapa_salvas": mapa_salvas,
+        "indice_palavras": indice_palavras,
+    }
+
+
+def _atualizar_descricoes(anterior, df_categorias, df_palavras, tipo_lancamento):
+    """
+    Reaproveita o resultado anterior (mesmas transações) reavaliando apenas as
+    descrições afetadas pelas palavras-chave ou categorias salvas que mudaram
+    """
+    mapa_salvas = _mapa_categorias_salvas(df_categorias, tipo_lancamento, anterior["canonicos"])
+    indice_palavras, afetadas = anterior["indice_palavras"].atualizar(extrair_regras_palavras(df_palavras, tipo_lancamento))
+    afetadas = afetadas | diferenca_mapa(anterior["mapa_salvas"], mapa_salvas)
+    afetadas &= set(indice_palavras.descricoes)
+
+    sugestoes = {d: c for d, c in anterior["sugestoes"].items() if d not in afetadas}
+    sugestoes.update(_combinar_sugestoes(afetadas, mapa_salvas, indice_palavras))
+
+    return {
+        **anterior,
+        "sugestoes": sugestoes,
+        "mapa_salvas": mapa_salvas,
+        "indice_palavras": indice_palavras,
+    }
+
+
+def categorizar_transacoes(
+    df_transacoes,
+    plano_path="./logic/CSVs/plano_de_contas.csv",
+    categorias_salvas_path="./logic/CSVs/categorias_salvas.csv",
+    prefixo_key="cat",
+    tipo_lancamento="",
+    canonizar_descricoes=True
+):
+    # Categorias salvas (banco SQLite; o caminho do CSV identifica o escopo)
+    try:
+        df_categorias = categoria_store.carregar_categorias(categorias_salvas_path)
+    except Exception as e:
+        st.warning(f"Erro ao carregar categorias salvas: {e}")
+        df_categorias = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
+
+    # Verificar se o plano de contas existe (lido uma vez por versão do arquivo)
     try:
-        df_plano = pd.read_csv(plano_path)
+        df_plano = carregar_plano_contas(plano_path)
         # Verificar se o plano está vazio
         if df_plano.empty:
             st.error("⚠️ Arquivo plano_de_contas.csv está vazio.")
@@ -55,11 +163,6 @@ def categorizar_transacoes(
     else:
         df_plano_filtrado = df_plano.copy()
 
-    # Verificar se há categorias após a filtragem
-    if df_plano_filtrado.empty:
-        st.error("⚠️ Plano de contas vazio após filtragem.")
-        return df_transacoes, df_desc
-
     # Criar opções de categorias
     df_plano_filtrado["Opcao"] = df_plano_filtrado["Grupo"] + " :: " + df_plano_filtrado["Categoria"]
     opcoes_categorias = df_plano_filtrado["Opcao"].tolist()
@@ -67,10 +170,38 @@ def categorizar_transacoes(
 
     # Carregar palavras-chave
     try:
-        df_palavras = pd.read_csv("./logic/CSVs/palavras_chave.csv")
+        df_palavras = categoria_store.carregar_palavras_chave()
     except:
         df_palavras = pd.DataFrame(columns=["PalavraChave", "Tipo", "Categoria"])
 
+    # Agrupamento e sugestões memoizados: só recalcula se transações ou regras mudarem.
+    # Quando apenas as regras mudam, reavalia só as descrições afetadas.
+    familia_memo = (
+        "categorizador",
+        fingerprint_transacoes(df_transacoes, ["Descrição", "Valor (R$)"]),
+        tipo_lancamento,
+        VERSAO_CANONICALIZACAO if canonizar_descricoes else None,
+    )
+    chave_memo = familia_memo + (
+        categoria_store.versao(categorias_salvas_path),
+        categoria_store.versao_palavras_chave(),
+    )
+    preparado = cache_categorizacao.obter_ou_calcular(
+        chave_memo,
+        lambda: _preparar_descricoes(df_transacoes, df_categorias, df_palavras, tipo_lancamento, canonizar_descricoes),
+        familia=familia_memo,
+        atualizador=lambda anterior: _atualizar_descricoes(anterior, df_categorias, df_palavras, tipo_lancamento)
+    )
+    df_desc = preparado["df_desc"].copy()
+    sugestoes = preparado["sugestoes"]
+    valores_texto_por_desc = preparado["valores_texto"]
+    canonicos = preparado["canonicos"]
+
+    # Verificar se há categorias após a filtragem (descrições agrupadas voltam sem alteração)
+    if df_plano_filtrado.empty:
+        st.error("⚠️ Plano de contas vazio após filtragem.")
+        return df_transacoes, df_desc
+
     st.markdown("### 🧠 Categorize as Descrições")
     st.info("Para cada descrição, selecione uma categoria do plano de contas.")
 
@@ -81,10 +212,20 @@ def categorizar_transacoes(
     st.markdown("### 🧩 Categorização em Lote")
     coluna1, coluna2 = st.columns([3, 2])
     with coluna1:
-        palavras_chave = st.text_input("🔍 Procurar descrições por palavra:", key=f"busca_palavra_{prefixo_key}")
+        palavras_chave = st.text_input(
+            "🔍 Procurar descrições por palavra:",
+            key=f"busca_palavra_{prefixo_key}",
+            help="Vários termos: todos precisam aparecer. Use ^termo para buscar pelo início."
+        )
         descricoes_disponiveis = df_desc[df_desc["Categoria"].isnull() | (df_desc["Categoria"] == "")]["Descrição"].tolist()
         if palavras_chave:
-            descricoes_filtradas = [d for d in descricoes_disponiveis if palavras_chave.lower() in d.lower()]
+            # Índice de trigramas montado uma vez por conjunto de dados
+            indice_busca = cache_categorizacao.obter_ou_calcular(
+                ("indice_busca",) + familia_memo,
+                lambda: IndiceTrigramas(preparado["df_desc"]["Descrição"].tolist())
+            )
+            encontradas = set(indice_busca.buscar(palavras_chave))
+            descricoes_filtradas = [d for d in descricoes_disponiveis if d in encontradas]
         else:
             descricoes_filtradas = descricoes_disponiveis
 
@@ -103,24 +244,10 @@ def categorizar_transacoes(
     registros_nao_categorizados = []
 
     for idx, row in df_desc.iterrows():
-        desc = row["Descrição"]
         if pd.notnull(row["Categoria"]) and row["Categoria"] != "":
             continue
 
-        categoria_salva = df_categorias[
-            (df_categorias["Descricao"] == desc) &
-            (df_categorias["Tipo"] == tipo_lancamento)
-        ]["Categoria"].values
-
-        if len(categoria_salva) > 0:
-            categoria_padrao = categoria_salva[0]
-        else:
-            categoria_padrao = ""
-            for _, row_palavra in df_palavras.iterrows():
-                if row_palavra["Tipo"] == tipo_lancamento and row_palavra["PalavraChave"].lower() in desc.lower():
-                    categoria_padrao = row_palavra["Categoria"]
-                    break
-
+        categoria_padrao = sugestoes.get(row["Descrição"], "")
         if categoria_padrao:
             registros_categorizados.append((row, categoria_padrao))
         else:
@@ -128,30 +255,15 @@ def categorizar_transacoes(
 
     # Categorização manual individual
     st.markdown("### 📝 Categorização Manual Individual")
+    escolhas_manuais = {}
     for row in registros_nao_categorizados:
         desc = row["Descrição"]
-        valores = df_transacoes[df_transacoes["Descrição"] == desc]["Valor (R$)"].tolist()
-        
-        # Formatar valores para exibição
-        valores_formatados = []
-        for v in valores:
-            try:
-                # Converter para float primeiro, independente do formato atual
-                if isinstance(v, str):
-                    # Remover formatação existente e converter
-                    v_clean = float(str(v).replace("R$", "").replace("R\\$", "").replace(".", "").replace(",", ".").strip())
-                elif isinstance(v, (int, float)):
-                    v_clean = float(v)
-                else:
-                    v_clean = 0.0
-                valores_formatados.append(f"R\\$ {abs(v_clean):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-            except:
-                valores_formatados.append(str(v))
-        
-        valores_texto = " - ".join(valores_formatados)
+        valores_texto = valores_texto_por_desc.get(desc, "")
         # Escapar asteriscos para evitar formatação markdown não desejada
         desc_escaped = desc.replace("*", "\\*")
         label = f"📌 {desc_escaped} — {row['Quantidade']}x — Total: {valores_texto}"
+        if row["Variacoes"] > 1:
+            label += f" — {row['Variacoes']} variações da descrição"
 
         categoria_escolhida = st.selectbox(
             label,
@@ -159,37 +271,24 @@ def categorizar_transacoes(
             key=f"{prefixo_key}_{desc}"
         )
 
-        categoria_limpa = mapa_opcao_categoria.get(categoria_escolhida, "")
-        df_desc.loc[df_desc["Descrição"] == desc, "Categoria"] = categoria_limpa
+        escolhas_manuais[desc] = mapa_opcao_categoria.get(categoria_escolhida, "")
 
     # Exibir descrições já categorizadas
     with st.expander("✅ Descrições já categorizadas automaticamente"):
         for row, categoria in registros_categorizados:
             desc = row["Descrição"]
-            valores = df_transacoes[df_transacoes["Descrição"] == desc]["Valor (R$)"].tolist()
-            
-            # Formatar valores para exibição
-            valores_formatados = []
-            for v in valores:
-                try:
-                    # Converter para float primeiro, independente do formato atual
-                    if isinstance(v, str):
-                        # Remover formatação existente e converter
-                        v_clean = float(str(v).replace("R$", "").replace("R\\$", "").replace(".", "").replace(",", ".").strip())
-                    elif isinstance(v, (int, float)):
-                        v_clean = float(v)
-                    else:
-                        v_clean = 0.0
-                    valores_formatados.append(f"R\\$ {abs(v_clean):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-                except:
-                    valores_formatados.append(str(v))
-            
-            valores_texto = " - ".join(valores_formatados)
+            valores_texto = valores_texto_por_desc.get(desc, "")
             # Escapar asteriscos para evitar formatação markdown não desejada
             desc_escaped = desc.replace("*", "\\*")
             st.markdown(f"**📌 {desc_escaped}** — {row['Quantidade']}x — Total: {valores_texto}")
             st.markdown(f"✔️ Categoria aplicada: {categoria}")
-            df_desc.loc[df_desc["Descrição"] == desc, "Categoria"] = categoria
+
+    # Aplicar escolhas manuais e automáticas de uma só vez
+    escolhas_automaticas = {row["Descrição"]: categoria for row, categoria in registros_categorizados}
+    escolhas = {**escolhas_manuais, **escolhas_automaticas}
+    if escolhas:
+        novas_categorias = df_desc["Descrição"].map(escolhas)
+        df_desc["Categoria"] = novas_categorias.where(novas_categorias.notna(), df_desc["Categoria"])
 
     # Corrigir itens sem categoria automaticamente
     faltantes = df_desc[df_desc["Categoria"].isnull() | (df_desc["Categoria"].str.strip() == "")]
@@ -199,31 +298,29 @@ def categorizar_transacoes(
 
     # Aplicar categorias ao DataFrame original
     mapa = dict(zip(df_desc["Descrição"], df_desc["Categoria"]))
-    df_transacoes["Categoria"] = df_transacoes["Descrição"].map(mapa)
+    chaves = df_transacoes["Descrição"].map(canonicos) if canonicos else df_transacoes["Descrição"]
+    df_transacoes["Categoria"] = chaves.map(mapa)
 
     # Botão para salvar categorias
-    if st.button("💾 Salvar Categorias no CSV", key=f"btn_salvar_{prefixo_key}"):
+    if st.button("💾 Salvar Categorias", key=f"btn_salvar_{prefixo_key}"):
         novas = pd.DataFrame({
             "Descricao": df_desc["Descrição"],
             "Tipo": tipo_lancamento,
             "Categoria": df_desc["Categoria"]
         })
-        novas = novas[novas["Categoria"].notna() & (novas["Categoria"].str.strip() != "")]
-        df_categorias = (
-            pd.concat([df_categorias, novas])
-            .drop_duplicates(subset=["Descricao", "Tipo"], keep="last")
-            .reset_index(drop=True)
-        )
-        df_categorias.to_csv(categorias_salvas_path, index=False)
-        st.success("✅ Categorias salvas com sucesso!")
+        # Categorias vazias removem a chave do banco (limpas pelo usuário)
+        try:
+            categoria_store.salvar_categorias(categorias_salvas_path, novas)
+            st.success("✅ Categorias salvas com sucesso!")
+        except Exception as e:
+            st.error(f"Erro ao salvar categorias: {e}")
 
     # Aplicar flag "Considerar"
     try:
-        plano = pd.read_csv(plano_path)
-        mapa_considerar = dict(zip(plano["Categoria"], plano["Considerar"]))
+        mapa_considerar = calcular_mapa_considerar(df_plano)
         df_transacoes["Considerar"] = df_transacoes["Categoria"].map(mapa_considerar).fillna("Sim")
     except Exception as e:
         st.warning(f"Erro ao carregar plano de contas: {e}")
         df_transacoes["Considerar"] = "Sim"
 
-    return df_transacoes, df_desc
\ No newline at end of file
+    return df_transacoes, df_desc
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Esquema canônico das transações
+A coluna Data é convertida uma única vez na entrada (extratos, banco Vyco ou
+cache) para datetime64[ns], junto com a chave inteira do mês em Mes_Chave, e
+Valor (R$) para float64. Fluxo de caixa, DRE, detalhamentos e relatórios leem
+essas colunas em vez de converter datas e valores novamente; textos no formato
+'R$ 1.234,56' só existem na exibição.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+COLUNA_DATA = "Data"
+COLUNA_MES = "Mes_Chave"
+COLUNA_VALOR = "Valor (R$)"
+
+# Chave usada para transações sem data válida
+MES_INVALIDO = -1
+
+# Formatos tentados (nesta ordem) quando a coluna Data ainda é texto
+FORMATOS_DATA = ["%d/%m/%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y", "%m/%d/%Y"]
+
+
+def converter_datas(datas: pd.Series) -> pd.Series:
+    """
+    Converte uma série de datas para datetime64[ns]
+
+    Args:
+        datas: Série com datas (texto, datetime ou Timestamp)
+
+    Returns:
+        Série datetime64[ns] sem fuso (datas inválidas viram NaT)
+    """
+    if not pd.api.types.is_datetime64_any_dtype(datas):
+        # Cada formato preenche apenas o que os anteriores não reconheceram
+        convertidas = pd.Series(pd.NaT, index=datas.index, dtype="datetime64[ns]")
+        for formato in FORMATOS_DATA:
+            pendentes = convertidas.isna() & datas.notna()
+            if not pendentes.any():
+                break
+            convertidas[pendentes] = pd.to_datetime(datas[pendentes], format=formato, errors="coerce")
+        pendentes = convertidas.isna() & datas.notna()
+        if pendentes.any():
+            convertidas[pendentes] = pd.to_datetime(datas[pendentes], errors="coerce", format="mixed")
+        datas = convertidas
+
+    if isinstance(datas.dtype, pd.DatetimeTZDtype):
+        datas = datas.dt.tz_localize(None)
+    return datas.astype("datetime64[ns]")
+
+
+def chave_mes(datas: pd.Series) -> np.ndarray:
+    """Chave inteira do mês (ano * 12 + mês - 1); MES_INVALIDO para NaT"""
+    anos = datas.dt.year.to_numpy(dtype=np.float64, na_value=np.nan)
+    meses = datas.dt.month.to_numpy(dtype=np.float64, na_value=np.nan)
+    chaves = anos * 12 + meses - 1
+    return np.where(np.isnan(chaves), MES_INVALIDO, chaves).astype(np.int32)
+
+
+def rotulo_mes(chaves) -> List[str]:
+    """Converte chaves inteiras de mês no rótulo 'AAAA-MM' (mesmo formato de to_period('M'))"""
+    return [f"{c // 12:04d}-{c % 12 + 1:02d}" for c in np.asarray(chaves).tolist()]
+
+
+def chave_de_rotulo(mes: str) -> int:
+    """Converte o rótulo 'AAAA-MM' na chave inteira do mês"""
+    ano, numero = str(mes)[:7].split("-")
+    return int(ano) * 12 + int(numero) - 1
+
+
+def possui_esquema(df: pd.DataFrame) -> bool:
+    """Indica se o DataFrame já tem Data em datetime64[ns] e Mes_Chave em int32"""
+    return (
+        COLUNA_DATA in df.columns
+        and COLUNA_MES in df.columns
+        and df[COLUNA_DATA].dtype == "datetime64[ns]"
+        and df[COLUNA_MES].dtype == np.int32
+    )
+
+
+def converter_valores(valores: pd.Series) -> np.ndarray:
+    """
+    Converte a coluna de valores para float (aceita números e texto no formato BR)
+
+    Args:
+        valores: Série com valores numéricos ou strings como 'R$ 1.234,56'
+
+    Returns:
+        Array float64 (valores inválidos viram 0.0)
+    """
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores.fillna(0).to_numpy(dtype=np.float64)
+
+    # Números passam direto; textos são lidos no formato BR ('.' milhar, ',' decimal)
+    eh_texto = valores.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    numericos = pd.to_numeric(valores.where(~eh_texto), errors="coerce")
+    if eh_texto.any():
+        texto = (
+            valores[eh_texto]
+            .str.replace("R$", "", regex=False)
+            .str.replace(".", "", regex=False)
+            .str.replace(",", ".", regex=False)
+            .str.strip()
+        )
+        numericos[eh_texto] = pd.to_numeric(texto, errors="coerce")
+    return numericos.fillna(0).to_numpy(dtype=np.float64)
+
+
+def normalizar_transacoes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica o esquema canônico (usar na entrada dos dados)
+
+    Args:
+        df: Transações com coluna Data em qualquer formato aceito
+
+    Returns:
+        DataFrame com Data em datetime64[ns], Mes_Chave (int32) e Valor (R$)
+        numérico; o mesmo objeto é devolvido se o esquema já estiver aplicado
+    """
+    if df is None or COLUNA_DATA not in df.columns:
+        return df
+    valores_em_texto = COLUNA_VALOR in df.columns and not pd.api.types.is_numeric_dtype(df[COLUNA_VALOR])
+    if possui_esquema(df) and not valores_em_texto:
+        return df
+
+    df = df.copy()
+    if not possui_esquema(df):
+        df[COLUNA_DATA] = converter_datas(df[COLUNA_DATA])
+        df[COLUNA_MES] = chave_mes(df[COLUNA_DATA])
+    if valores_em_texto:
+        df[COLUNA_VALOR] = converter_valores(df[COLUNA_VALOR])
+    return df
+
+
+def validar_esquema_transacoes(df: pd.DataFrame) -> None:
+    """
+    Rejeita DataFrames que não passaram por normalizar_transacoes
+
+    Args:
+        df: Transações a validar
+
+    Raises:
+        ValueError: Se Data ou Mes_Chave estiverem ausentes ou com tipo incorreto
+    """
+    problemas = []
+    if COLUNA_DATA not in df.columns:
+        problemas.append(f"coluna '{COLUNA_DATA}' ausente")
+    elif df[COLUNA_DATA].dtype != "datetime64[ns]":
+        problemas.append(f"'{COLUNA_DATA}' com tipo {df[COLUNA_DATA].dtype} (esperado datetime64[ns])")
+    if COLUNA_MES not in df.columns:
+        problemas.append(f"coluna '{COLUNA_MES}' ausente")
+    elif df[COLUNA_MES].dtype != np.int32:
+        problemas.append(f"'{COLUNA_MES}' com tipo {df[COLUNA_MES].dtype} (esperado int32)")
+
+    if problemas:
+        raise ValueError(
+            "Transações fora do esquema canônico: " + "; ".join(problemas)
+            + ". Use normalizar_transacoes na entrada dos dados."
+        )
+
+
+def mascara_mes(df: pd.DataFrame, mes: str) -> np.ndarray:
+    """Máscara booleana das transações do mês 'AAAA-MM'"""
+    return df[COLUNA_MES].to_numpy() == chave_de_rotulo(mes)
+
+
+def meses_disponiveis(df: pd.DataFrame) -> List[str]:
+    """Meses ('AAAA-MM') com transações, em ordem crescente"""
+    chaves = np.unique(df[COLUNA_MES].to_numpy())
+    return rotulo_mes(chaves[chaves != MES_INVALIDO])
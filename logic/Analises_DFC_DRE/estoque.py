@@ -3,6 +3,9 @@ import pandas as pd
 import re
 import os
 
+from logic.Analises_DFC_DRE.esquema_transacoes import meses_disponiveis, validar_esquema_transacoes
+from logic.engine.formatacao import formatar_brl
+
 def parse_brl(valor):
     valor = str(valor)
     if valor:
@@ -13,20 +16,13 @@ def parse_brl(valor):
             return 0.0
     return 0.0
 
-def format_brl(valor):
-    try:
-        return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except:
-        return "0,00"
-
 def coletar_estoques(df_transacoes, path_csv="./logic/CSVs/estoques.csv"):
     st.markdown("## 📦 Cadastro de Estoque Final por Mês")
     st.markdown("#### 🧾 Informe o valor do estoque no fim de cada mês:")
 
-    # Garante que datas estejam OK
-    df_transacoes["Data"] = pd.to_datetime(df_transacoes["Data"], format="%d/%m/%Y", errors="coerce")
-    df_transacoes = df_transacoes.dropna(subset=["Data"])
-    meses = sorted(df_transacoes["Data"].dt.to_period("M").astype(str).unique())
+    # Meses a partir da chave de mês calculada na entrada dos dados
+    validar_esquema_transacoes(df_transacoes)
+    meses = meses_disponiveis(df_transacoes)
 
     # Carregar dados existentes do CSV se existir
     try:
@@ -49,7 +45,7 @@ def coletar_estoques(df_transacoes, path_csv="./logic/CSVs/estoques.csv"):
     for mes in meses:
         valor_antigo = df_estoques[df_estoques["Mes"] == mes]["Estoque"]
         valor_float = float(valor_antigo.values[0]) if not valor_antigo.empty else 0.0
-        valor_formatado = format_brl(valor_float)
+        valor_formatado = formatar_brl(valor_float, prefixo="", vazio="0,00")
 
         col1, col2 = st.columns([1.5, 3])
         with col1:
@@ -84,4 +80,4 @@ def coletar_estoques(df_transacoes, path_csv="./logic/CSVs/estoques.csv"):
             del st.session_state['resultado_dre']
 
         st.success("✅ Valores de estoque salvos com sucesso!")
-        st.dataframe(df_salvo)
\ No newline at end of file
+        st.dataframe(df_salvo)
\ No newline at end of file
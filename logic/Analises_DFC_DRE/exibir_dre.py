@@ -4,8 +4,11 @@ import os
 import plotly.graph_objects as go
 from typing import Dict, List, Tuple, Optional
 
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.formatacao import formatar_brl, formatar_tabela
+from logic.engine.dre import calcular_dre, calcular_dre_de_arquivos
+
 # Constantes
-GRUPOS_DESPESAS = ["Despesas", "Investimentos", "Retiradas", "Extra Operacional"]
 ESTILO_LINHAS = {
     "FATURAMENTO": ("#5d65c8", "white"),
     "RECEITA": ("#152357", "white"),
@@ -16,10 +19,6 @@ ESTILO_LINHAS = {
     "RESULTADO GERENCIAL": ("#216a5a", "white"),
 }
 
-def formatar_brl(valor: float) -> str:
-    """Formata um valor para o formato de moeda brasileira."""
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
 def carregar_dados(path_fluxo: str, path_plano: str) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
     """Carrega os dados dos arquivos e retorna os DataFrames."""
     if not os.path.exists(path_fluxo) or not os.path.exists(path_plano):
@@ -34,33 +33,6 @@ def carregar_dados(path_fluxo: str, path_plano: str) -> Tuple[Optional[pd.DataFr
         st.error(f"Erro ao carregar dados: {e}")
         return None, None
 
-def soma_por_grupo(df_fluxo: pd.DataFrame, plano: pd.DataFrame, grupo: str) -> pd.Series:
-    """Soma valores por grupo de categorias."""
-    cats = plano[plano["Grupo"] == grupo]["Categoria"].tolist()
-    valores = df_fluxo.loc[df_fluxo.index.isin(cats)].sum()
-    
-    # Se for despesa, inverter o sinal para positivo
-    if any(desp in grupo for desp in GRUPOS_DESPESAS):
-        valores = valores.abs()
-    return valores
-
-def soma_por_categoria(df_fluxo: pd.DataFrame, *categorias) -> pd.Series:
-    """Soma valores por categorias específicas."""
-    # Debug: verificar quais categorias existem no fluxo
-    categorias_encontradas = [cat for cat in categorias if cat in df_fluxo.index]
-    if not categorias_encontradas:
-        # Se não encontrou nenhuma categoria exata, tentar busca parcial
-        for categoria in categorias:
-            linhas_parciais = df_fluxo.index[df_fluxo.index.str.contains(categoria, case=False, na=False)]
-            if len(linhas_parciais) > 0:
-                categorias_encontradas.extend(linhas_parciais.tolist())
-    
-    if categorias_encontradas:
-        return df_fluxo.loc[df_fluxo.index.isin(categorias_encontradas)].sum()
-    else:
-        # Retornar série zerada com as colunas do df_fluxo
-        return pd.Series(0, index=df_fluxo.columns)
-
 def debug_linhas_fluxo_caixa(df_fluxo: pd.DataFrame):
     """Debug: mostra as linhas disponíveis no fluxo de caixa"""
     import streamlit as st
@@ -91,91 +63,19 @@ def debug_linhas_fluxo_caixa(df_fluxo: pd.DataFrame):
                 st.write(f"**{termo.title()}:** {linhas_encontradas}")
 
 def criar_dre(df_fluxo: pd.DataFrame, plano: pd.DataFrame) -> pd.DataFrame:
-    """Cria o DataFrame do DRE com todos os cálculos."""
-    meses = df_fluxo.columns.tolist()
-    
-    # Função auxiliar para criar linhas
-    def linha(nome, serie):
-        return pd.DataFrame([serie], index=[nome])
-
-    # Construção do DRE por etapas
-    dre = pd.DataFrame()
-    
-    # Verificar se Faturamento Bruto existe no fluxo
-    if "💰 Faturamento Bruto" in df_fluxo.index:
-        linha_faturamento = df_fluxo.loc["💰 Faturamento Bruto"]
-    else:
-        st.warning("⚠️ Linha 'Faturamento Bruto' não encontrada no fluxo de caixa. Verifique se os dados foram salvos.")
-        linha_faturamento = pd.Series(0, index=meses)
-    
-    # Bloco 1: Faturamento e Margem de Contribuição
-    dre = pd.concat([
-        linha("FATURAMENTO", linha_faturamento),
-        linha("RECEITA", soma_por_categoria(df_fluxo, "Receita de Vendas", "Receita de Serviços")),
-        linha("IMPOSTOS", soma_por_grupo(df_fluxo, plano, "Despesas Impostos")),
-        linha("DESPESA OPERACIONAL", soma_por_grupo(df_fluxo, plano, "Despesas Operacionais")),
-    ])
-    
-    dre.loc["MARGEM CONTRIBUIÇÃO"] = dre.loc["RECEITA"] - dre.loc["IMPOSTOS"] - dre.loc["DESPESA OPERACIONAL"]
-    
-    # Bloco 2: Lucro Operacional
-    dre = pd.concat([
-        dre,
-        linha("DESPESAS COM PESSOAL", soma_por_grupo(df_fluxo, plano, "Despesas RH")),
-        linha("DESPESA ADMINISTRATIVA", soma_por_grupo(df_fluxo, plano, "Despesas Administrativas")),
-    ])
-    
-    dre.loc["LUCRO OPERACIONAL"] = dre.loc["MARGEM CONTRIBUIÇÃO"] - dre.loc["DESPESAS COM PESSOAL"] - dre.loc["DESPESA ADMINISTRATIVA"]
-    
-    # Bloco 3: Lucro Líquido
-    dre = pd.concat([
-        dre,
-        linha("INVESTIMENTOS", soma_por_grupo(df_fluxo, plano, "Investimentos / Aplicações")),
-        linha("DESPESA EXTRA OPERACIONAL", soma_por_grupo(df_fluxo, plano, "Extra Operacional")),
-    ])
-    
-    dre.loc["LUCRO LIQUIDO"] = dre.loc["LUCRO OPERACIONAL"] - dre.loc["INVESTIMENTOS"] - dre.loc["DESPESA EXTRA OPERACIONAL"]
-    
-    # Bloco 4: Resultado Final
-    dre = pd.concat([
-        dre,
-        linha("RETIRADAS SÓCIOS", soma_por_grupo(df_fluxo, plano, "Retiradas")),
-        linha("RECEITA EXTRA OPERACIONAL", soma_por_categoria(df_fluxo, "Receita Extra Operacional", "Juros Recebidos", "Outros Recebimentos")),
-    ])
-    
-    dre.loc["RESULTADO"] = dre.loc["LUCRO LIQUIDO"] - dre.loc["RETIRADAS SÓCIOS"] + dre.loc["RECEITA EXTRA OPERACIONAL"]
-    
-    # Bloco 5: Resultado Gerencial
-    if "📦 Estoque Final" in df_fluxo.index:
-        dre.loc["ESTOQUE"] = df_fluxo.loc["📦 Estoque Final"]
-    else:
-        st.warning("⚠️ Linha 'Estoque Final' não encontrada no fluxo de caixa. Verifique se os dados foram salvos.")
-        dre.loc["ESTOQUE"] = 0
-        
-    dre.loc["SALDO"] = 0  # TODO: puxar saldo dos relatórios
-    dre.loc["RESULTADO GERENCIAL"] = dre.loc["RESULTADO"] + dre.loc["ESTOQUE"] + dre.loc["SALDO"]
-    
-    # Cálculos finais
-    dre["TOTAL"] = dre[meses].sum(axis=1)
-    total_receita = dre.loc["RECEITA", "TOTAL"]
-    dre["%"] = dre["TOTAL"] / total_receita * 100 if total_receita != 0 else 0
-    
+    """Cria o DataFrame do DRE com todos os cálculos (avisos exibidos no Streamlit)."""
+    diagnosticos = Diagnosticos()
+    dre = calcular_dre(df_fluxo, plano, diagnosticos)
+    diagnosticos.exibir()
     return dre
 
 def formatar_dre(dre: pd.DataFrame, meses: List[str]) -> pd.DataFrame:
     """Formata o DRE para exibição."""
-    dre_formatado = dre.copy()
-    
     # Identificar colunas de totais
-    colunas_totais = [col for col in dre_formatado.columns if isinstance(col, str) and "TOTAL" in col.upper()]
+    colunas_totais = [col for col in dre.columns if isinstance(col, str) and "TOTAL" in col.upper()]
     
     # Formata valores monetários e percentuais
-    for col in meses + colunas_totais:
-        if col in dre_formatado.columns:
-            dre_formatado[col] = dre_formatado[col].apply(formatar_brl)
-            
-    if "%" in dre_formatado.columns:
-        dre_formatado["%"] = dre["%"].apply(lambda x: f"{x:.1f}%")
+    dre_formatado = formatar_tabela(dre, moeda=meses + colunas_totais, percentual=["%"])
     
     # Resetando índice para que a primeira coluna seja exibida normalmente
     dre_formatado = dre_formatado.reset_index()
@@ -249,28 +149,9 @@ def exibir_dre(df_fluxo=None, path_fluxo="./logic/CSVs/transacoes_numericas.xlsx
         if df_fluxo is None:
             return
 
-    # Garantir que Faturamento e Estoque estejam no DataFrame do fluxo
-    if "💰 Faturamento Bruto" not in df_fluxo.index and os.path.exists(path_faturamento):
-        try:
-            df_fat = pd.read_csv(path_faturamento)
-            meses = df_fluxo.columns.tolist()
-            linha_fat = df_fat.set_index("Mes").T.reindex(columns=meses).fillna(0)
-            linha_fat.index = ["💰 Faturamento Bruto"]
-            df_fluxo = pd.concat([linha_fat, df_fluxo])
-        except Exception as e:
-            st.warning(f"⚠️ Erro ao carregar dados de faturamento: {e}")
-    
-    if "📦 Estoque Final" not in df_fluxo.index and os.path.exists(path_estoque):
-        try:
-            df_estoque = pd.read_csv(path_estoque)
-            meses = df_fluxo.columns.tolist()
-            linha_estoque = df_estoque.set_index("Mes").T.reindex(columns=meses).fillna(0)
-            linha_estoque.index = ["📦 Estoque Final"]
-            df_fluxo = pd.concat([df_fluxo, linha_estoque])
-        except Exception as e:
-            st.warning(f"⚠️ Erro ao carregar dados de estoque: {e}")
-
-    plano = pd.read_csv(path_plano)
+    # Completar o fluxo com Faturamento/Estoque e calcular o DRE uma única vez
+    dre, df_fluxo, diagnosticos = calcular_dre_de_arquivos(df_fluxo, path_plano, path_faturamento, path_estoque)
+    diagnosticos.exibir()
     meses = df_fluxo.columns.tolist()
 
     # Criar abas para diferentes visualizações
@@ -280,8 +161,7 @@ def exibir_dre(df_fluxo=None, path_fluxo="./logic/CSVs/transacoes_numericas.xlsx
         # Debug do fluxo de caixa
         debug_linhas_fluxo_caixa(df_fluxo)
         
-        # Criar e formatar o DRE
-        dre = criar_dre(df_fluxo, plano)
+        # Formatar o DRE
         dre_formatado = formatar_dre(dre, meses)
         
         # Exibir o DRE formatado
@@ -301,7 +181,6 @@ def exibir_dre(df_fluxo=None, path_fluxo="./logic/CSVs/transacoes_numericas.xlsx
     
     with tab2:
         # Criar e exibir o gráfico
-        dre = criar_dre(df_fluxo, plano)
         fig = criar_grafico_dre(dre)
         st.plotly_chart(fig, use_container_width=True)
         
@@ -326,4 +205,4 @@ def exibir_dre(df_fluxo=None, path_fluxo="./logic/CSVs/transacoes_numericas.xlsx
                 f"{dre.loc['RESULTADO', '%']:.1f}%"
             )
     
-    return dre
\ No newline at end of file
+    return dre
\ No newline at end of file
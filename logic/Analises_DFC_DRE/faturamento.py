@@ -3,6 +3,9 @@ import pandas as pd
 import re
 import os
 
+from logic.Analises_DFC_DRE.esquema_transacoes import meses_disponiveis, validar_esquema_transacoes
+from logic.engine.formatacao import formatar_brl
+
 def parse_brl(valor):
     """Converte string BRL ex: '1.234,56' -> 1234.56 (float)"""
     valor = str(valor)
@@ -14,22 +17,13 @@ def parse_brl(valor):
             return 0.0
     return 0.0
 
-def format_brl(valor):
-    """Converte float -> BRL formatado como 150.000,00"""
-    try:
-        return f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except:
-        return "0,00"
-
 def coletar_faturamentos(df_transacoes, path_csv="./logic/CSVs/faturamentos.csv"):
     st.markdown("## 🧾 Cadastro de Faturamento por Mês")
     st.markdown("#### 💵 Preencha o faturamento bruto mensal:")
 
-    # Garante que a data está em datetime
-    df_transacoes["Data"] = pd.to_datetime(df_transacoes["Data"], format="%d/%m/%Y", errors="coerce")
-    df_transacoes = df_transacoes.dropna(subset=["Data"])
-
-    meses = sorted(df_transacoes["Data"].dt.to_period("M").astype(str).unique())
+    # Meses a partir da chave de mês calculada na entrada dos dados
+    validar_esquema_transacoes(df_transacoes)
+    meses = meses_disponiveis(df_transacoes)
 
     # Carregar dados existentes do CSV se existir
     try:
@@ -52,7 +46,7 @@ def coletar_faturamentos(df_transacoes, path_csv="./logic/CSVs/faturamentos.csv"
     for mes in meses:
         valor_antigo = df_faturamentos[df_faturamentos["Mes"] == mes]["Faturamento"]
         valor_float = float(valor_antigo.values[0]) if not valor_antigo.empty else 0.0
-        valor_formatado = format_brl(valor_float)
+        valor_formatado = formatar_brl(valor_float, prefixo="", vazio="0,00")
 
         col1, col2 = st.columns([1.5, 3])
         with col1:
@@ -90,4 +84,4 @@ def coletar_faturamentos(df_transacoes, path_csv="./logic/CSVs/faturamentos.csv"
         st.success("✅ Faturamentos salvos com sucesso!")
         st.dataframe(df_salvo)
 
-    return None
\ No newline at end of file
+    return None
\ No newline at end of file
@@ -2,215 +2,41 @@ import pandas as pd
 import streamlit as st
 from datetime import datetime
 import io
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 
-def formatar_brl(valor):
-    """Formata um valor numérico para o formato brasileiro (R$)"""
-    if pd.isna(valor) or valor is None:
-        return ""
-    try:
-        return f"R$ {float(valor):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except:
-        return str(valor)
-
-def calcular_variacao_percentual(valor_atual, valor_anterior):
-    """Calcula a variação percentual entre dois valores"""
-    if valor_anterior == 0:
-        return float('inf') if valor_atual > 0 else float('-inf') if valor_atual < 0 else 0
-    return ((valor_atual - valor_anterior) / abs(valor_anterior)) * 100
+from logic.engine.fluxo import calcular_fluxo_caixa
+from logic.engine.formatacao import formatar_brl, formatar_tabela
 
 def exibir_fluxo_caixa(df_transacoes, path_faturamento="./logic/CSVs/faturamentos.csv", path_estoque="./logic/CSVs/estoques.csv"):
     """
     Gera e exibe o fluxo de caixa por categoria e mês a partir das transações categorizadas.
+    O cálculo fica em logic.engine.fluxo; aqui apenas formatamos e exibimos.
     """
     st.markdown("## 📊 Fluxo de Caixa (por Categoria e Mês)")
 
-
-
-    # Verificar se o DataFrame está vazio
-    if df_transacoes.empty:
-        st.warning("⚠️ Não há transações para gerar o fluxo de caixa.")
-        return pd.DataFrame()
-
-    # Verificar se as colunas necessárias existem
-    colunas_necessarias = ["Considerar", "Valor (R$)", "Data", "Categoria"]
-    colunas_faltantes = [col for col in colunas_necessarias if col not in df_transacoes.columns]
-
-    if colunas_faltantes:
-        st.error(f"❌ Colunas necessárias ausentes: {', '.join(colunas_faltantes)}")
-        return pd.DataFrame()
-
-    # Criar cópia para não modificar o original
-    df_filtrado = df_transacoes.copy()
-
-    # Filtrar apenas transações a considerar
-    if "Considerar" in df_filtrado.columns:
-        antes_filtro = len(df_filtrado)
-        df_filtrado = df_filtrado[df_filtrado["Considerar"].astype(str).str.lower() == "sim"].copy()
-
-    else:
-        st.warning("⚠️ Coluna 'Considerar' não encontrada!")
-
-
-
-    # Converter valores para numérico usando a mesma função da categorização
-    def converter_para_float_local(valor_str):
-        """Converte uma string de valor BR para float"""
-        if isinstance(valor_str, (int, float)):
-            return float(valor_str)
-        try:
-            return float(str(valor_str).replace("R$", "").replace("R\\$", "").replace(".", "").replace(",", ".").strip())
-        except (ValueError, AttributeError, TypeError):
-            return 0.0
-
-    with st.spinner("Processando valores..."):
-        try:
-            # Usar a função local de conversão
-            df_filtrado["Valor (R$)"] = df_filtrado["Valor (R$)"].apply(converter_para_float_local)
-            
-            # DEBUG: Verificar valores após conversão
-            valores_convertidos = df_filtrado["Valor (R$)"].head(5).tolist()
-            #st.write(f"🔍 Debug: Valores convertidos: {valores_convertidos}")
-            
-        except Exception as e:
-            st.error(f"❌ Erro ao converter valores: {e}")
-            st.dataframe(df_filtrado.head())
-            return pd.DataFrame()
-
-    # Converter datas
-    with st.spinner("Processando datas..."):
-        try:
-            for formato in ["%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%m/%d/%Y"]:
-                try:
-                    df_filtrado["Data"] = pd.to_datetime(df_filtrado["Data"], format=formato, errors="raise")
-                    break
-                except:
-                    continue
-            if not pd.api.types.is_datetime64_any_dtype(df_filtrado["Data"]):
-                df_filtrado["Data"] = pd.to_datetime(df_filtrado["Data"], errors="coerce")
-            df_filtrado = df_filtrado.dropna(subset=["Data"])
-            df_filtrado["Mes"] = df_filtrado["Data"].dt.to_period("M").astype(str)
-        except Exception as e:
-            st.error(f"❌ Erro ao processar datas: {e}")
-            st.dataframe(df_filtrado.head())
-            return pd.DataFrame()
-
-    # Criar tabela pivô
     with st.spinner("Gerando tabela de fluxo de caixa..."):
-        try:
-            df_pivot = pd.pivot_table(
-                df_filtrado,
-                values="Valor (R$)",
-                index="Categoria",
-                columns="Mes",
-                aggfunc="sum",
-                fill_value=0
-            )
-        except Exception as e:
-            st.error(f"❌ Erro ao criar tabela pivô: {e}")
-            return pd.DataFrame()
-
-    # Carregar plano de contas para ordenação
-    try:
-        plano = pd.read_csv("./logic/CSVs/plano_de_contas.csv")
-        ordem_map = plano.set_index("Categoria")["Ordem"].to_dict()
-        tipo_map = plano.set_index("Categoria")["Tipo"].to_dict()
-        grupo_map = plano.set_index("Categoria")["Grupo"].to_dict()
-    except Exception as e:
-        st.warning(f"⚠️ Plano de contas não encontrado ou inválido: {e}")
-        ordem_map = {}
-        tipo_map = {}
-        grupo_map = {}
+        calculo = calcular_fluxo_caixa(df_transacoes, path_faturamento, path_estoque)
 
-    # Adicionar colunas de ordenação
-    df_pivot["__ordem__"] = df_pivot.index.map(ordem_map).fillna(999)
-    df_pivot["__tipo__"] = df_pivot.index.map(tipo_map).fillna("")
-    df_pivot["__grupo__"] = df_pivot.index.map(grupo_map).fillna("Outros")
-    df_pivot = df_pivot.sort_values("__ordem__")
-
-    # Obter lista de meses
-    meses = [col for col in df_pivot.columns if col not in ["__ordem__", "__tipo__", "__grupo__"]]
-
-    if not meses:
-        st.warning("⚠️ Não há dados suficientes para gerar o fluxo de caixa.")
+    calculo.diagnosticos.exibir()
+    if calculo.vazio:
+        if calculo.diagnosticos.tem_erros and not df_transacoes.empty:
+            st.dataframe(df_transacoes.head())
         return pd.DataFrame()
 
-    # Calcular totais
-    receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"][meses].sum()
-    despesas = df_pivot[df_pivot["__tipo__"] == "Débito"][meses].sum()
-    resultado = receitas + despesas  # Despesas já são negativas
-
-    # Carregar dados de faturamento
-    if os.path.exists(path_faturamento):
-        try:
-            df_fat = pd.read_csv(path_faturamento)
-            linha_fat = df_fat.set_index("Mes").T.reindex(columns=meses).fillna(0)
-            linha_fat.index = ["💰 Faturamento Bruto"]
-        except Exception as e:
-            st.warning(f"⚠️ Erro ao carregar dados de faturamento: {e}")
-            linha_fat = pd.DataFrame(0, index=["💰 Faturamento Bruto"], columns=meses)
-    else:
-        linha_fat = pd.DataFrame(0, index=["💰 Faturamento Bruto"], columns=meses)
-
-    # Carregar dados de estoque
-    if os.path.exists(path_estoque):
-        try:
-            df_estoque = pd.read_csv(path_estoque)
-            linha_estoque = df_estoque.set_index("Mes").T.reindex(columns=meses).fillna(0)
-            linha_estoque.index = ["📦 Estoque Final"]
-        except Exception as e:
-            st.warning(f"⚠️ Erro ao carregar dados de estoque: {e}")
-            linha_estoque = pd.DataFrame(0, index=["📦 Estoque Final"], columns=meses)
-    else:
-        linha_estoque = pd.DataFrame(0, index=["📦 Estoque Final"], columns=meses)
-
-    # Separar receitas e despesas
-    df_receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"].drop(columns=["__ordem__", "__tipo__", "__grupo__"])
-    df_despesas = df_pivot[df_pivot["__tipo__"] == "Débito"].drop(columns=["__ordem__", "__tipo__", "__grupo__"])
-
-    # Criar linhas de divisão
-    linha_div_receitas = pd.DataFrame([[None]*len(meses)], index=["🟦 Receitas"], columns=meses)
-    linha_div_despesas = pd.DataFrame([[None]*len(meses)], index=["🟥 Despesas"], columns=meses)
-
-    # Criar linhas de totais
-    linha_total_receitas = pd.DataFrame([receitas], index=["🔷 Total de Receitas"])
-    linha_total_despesas = pd.DataFrame([despesas], index=["🔻 Total de Despesas"])
-    linha_resultado = pd.DataFrame([resultado], index=["🏦 Resultado do Período"])
-
-    # Concatenar tudo na ordem
-    df_final = pd.concat([
-        linha_fat,
-        linha_div_receitas,
-        df_receitas,
-        linha_div_despesas,
-        df_despesas,
-        linha_total_receitas,
-        linha_total_despesas,
-        linha_resultado,
-        linha_estoque
-    ])
-
-    # Calcular variações percentuais mês a mês
-    if len(meses) > 1:
-        df_variacoes = pd.DataFrame(index=df_final.index, columns=[f"Var. {meses[-1]}" if len(meses) == 2 
-                                                                  else f"Var. {meses[-2]}/{meses[-1]}"])
-        for idx in df_final.index:
-            if idx in ["🟦 Receitas", "🟥 Despesas"] or pd.isna(df_final.loc[idx, meses[-1]]) or pd.isna(df_final.loc[idx, meses[-2]]):
-                df_variacoes.loc[idx] = None
-            else:
-                variacao = calcular_variacao_percentual(df_final.loc[idx, meses[-1]], df_final.loc[idx, meses[-2]])
-                df_variacoes.loc[idx] = variacao
-        df_variacoes_fmt = df_variacoes.map(lambda x: f"{x:+.1f}%" if pd.notnull(x) else "")
-        df_final_com_var = pd.concat([df_final, df_variacoes_fmt], axis=1)
-    else:
-        df_final_com_var = df_final
+    matriz = calculo.matriz
+    df_pivot = calculo.df_pivot
+    df_receitas = calculo.df_receitas
+    df_despesas = calculo.df_despesas
+    meses = calculo.meses
+    receitas = calculo.receitas
+    despesas = calculo.despesas
+    resultado = calculo.resultado
+    df_final = calculo.df_final
+    df_final_com_var = calculo.df_exibicao
 
     # Formatar valores para exibição
-    df_formatado = df_final_com_var.copy()
-    for col in meses:
-        df_formatado[col] = df_formatado[col].apply(lambda x: formatar_brl(x) if pd.notnull(x) else "")
+    df_formatado = formatar_tabela(df_final_com_var, moeda=meses)
 
     # Exibir tabela formatada
     st.markdown("### 📋 Tabela de Fluxo de Caixa")
@@ -353,7 +179,7 @@ def exibir_fluxo_caixa(df_transacoes, path_faturamento="./logic/CSVs/faturamento
     with pd.ExcelWriter(output, engine="openpyxl") as writer:
         df_formatado.to_excel(writer, sheet_name="Fluxo de Caixa")
         df_final.to_excel(writer, sheet_name="Dados Numéricos")
-        df_filtrado.to_excel(writer, sheet_name="Transações Detalhadas", index=False)
+        matriz.transacoes_detalhadas(df_transacoes).to_excel(writer, sheet_name="Transações Detalhadas", index=False)
     output.seek(0)
 
     col1.download_button(
@@ -371,4 +197,4 @@ def exibir_fluxo_caixa(df_transacoes, path_faturamento="./logic/CSVs/faturamento
         except Exception as e:
             col2.error(f"❌ Erro ao salvar arquivos: {e}")
 
-    return df_final
\ No newline at end of file
+    return df_final
\ No newline at end of file
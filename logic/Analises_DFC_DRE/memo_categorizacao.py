@@ -0,0 +1,329 @@
+"""
+Memoização dos resultados de categorização
+Evita recalcular agrupamento, mapa JSON da licença, palavras-chave e flag
+"Considerar" a cada rerun do Streamlit quando nada mudou
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+
+def versao_arquivo(caminho: str) -> Optional[Tuple[str, int, int]]:
+    """
+    Retorna a versão de um arquivo de regras (caminho, mtime em ns, tamanho)
+
+    Args:
+        caminho: Caminho do arquivo (plano de contas, palavras-chave, JSON da licença)
+
+    Returns:
+        Tupla identificando a versão ou None se o arquivo não existir
+    """
+    try:
+        info = os.stat(caminho)
+        return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+    except OSError:
+        return None
+
+
+def fingerprint_transacoes(df: pd.DataFrame, colunas: List[str] = None) -> str:
+    """
+    Calcula uma impressão digital do conteúdo das transações
+
+    Args:
+        df: DataFrame de transações
+        colunas: Colunas consideradas (padrão: todas)
+
+    Returns:
+        String hexadecimal que muda sempre que o conteúdo muda
+    """
+    if df is None or df.empty:
+        return "vazio"
+
+    colunas = [c for c in (colunas or df.columns) if c in df.columns]
+    try:
+        hashes = pd.util.hash_pandas_object(df[colunas], index=False)
+    except TypeError:
+        # Colunas com objetos não hasheáveis (listas, dicionários)
+        hashes = pd.util.hash_pandas_object(df[colunas].astype(str), index=False)
+    # Combinar os hashes por linha de forma dependente da ordem
+    return hashlib.blake2b(hashes.values.tobytes(), digest_size=16).hexdigest()
+
+
+def obter_id_sessao() -> str:
+    """Retorna o identificador da sessão Streamlit atual (ou 'global' fora do Streamlit)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            return ctx.session_id
+    except Exception:
+        pass
+    return "global"
+
+
+class CacheCategorizacao:
+    """Cache LRU de resultados de categorização, limitado por sessão e globalmente"""
+
+    def __init__(self, max_entradas: int = 64, max_por_sessao: int = 8):
+        self.max_entradas = max_entradas
+        self.max_por_sessao = max_por_sessao
+        self._entradas: "OrderedDict[Hashable, Tuple[str, Any]]" = OrderedDict()
+        self._ultima_por_familia: Dict[Hashable, Hashable] = {}
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        """
+        Busca um resultado memoizado
+
+        Args:
+            chave: Chave composta (fingerprint das transações + versões das regras)
+
+        Returns:
+            Valor armazenado ou None se não houver
+        """
+        with self._lock:
+            if chave not in self._entradas:
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return self._entradas[chave][1]
+
+    def guardar(self, chave: Hashable, valor: Any, sessao: str = "global", familia: Hashable = None) -> None:
+        """
+        Armazena um resultado, descartando os mais antigos da sessão e do cache global
+
+        Args:
+            chave: Chave composta
+            valor: Resultado a armazenar
+            sessao: Identificador da sessão dona da entrada
+            familia: Chave sem as versões das regras (mesmos dados), usada para
+                     localizar o resultado anterior numa atualização incremental
+        """
+        with self._lock:
+            self._entradas[chave] = (sessao, valor)
+            self._entradas.move_to_end(chave)
+            if familia is not None:
+                self._ultima_por_familia[familia] = chave
+
+            # Limite por sessão: remover as entradas mais antigas desta sessão
+            chaves_sessao = [k for k, (s, _) in self._entradas.items() if s == sessao]
+            for k in chaves_sessao[:max(0, len(chaves_sessao) - self.max_por_sessao)]:
+                del self._entradas[k]
+
+            # Limite global: remover as menos usadas recentemente
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+            # Descartar famílias cuja última entrada já saiu do cache
+            for f in [f for f, k in self._ultima_por_familia.items() if k not in self._entradas]:
+                del self._ultima_por_familia[f]
+
+    def obter_anterior(self, familia: Hashable) -> Optional[Any]:
+        """Retorna o último resultado armazenado para a família (ou None)"""
+        with self._lock:
+            chave = self._ultima_por_familia.get(familia)
+            if chave is None or chave not in self._entradas:
+                return None
+            return self._entradas[chave][1]
+
+    def obter_ou_calcular(self, chave: Hashable, construtor, sessao: str = None,
+                          familia: Hashable = None, atualizador=None) -> Any:
+        """
+        Retorna o resultado memoizado ou o calcula (de forma incremental quando possível)
+
+        Args:
+            chave: Chave composta
+            construtor: Função sem argumentos que calcula o resultado do zero
+            sessao: Identificador da sessão (padrão: sessão Streamlit atual)
+            familia: Chave dos mesmos dados sem as versões das regras
+            atualizador: Função que recebe o resultado anterior da família e devolve
+                         um novo resultado reavaliando apenas o que as regras afetaram
+
+        Returns:
+            Resultado memoizado ou recém-calculado
+        """
+        valor = self.obter(chave)
+        if valor is None:
+            anterior = self.obter_anterior(familia) if familia is not None and atualizador else None
+            valor = atualizador(anterior) if anterior is not None else construtor()
+            self.guardar(chave, valor, sessao or obter_id_sessao(), familia)
+        return valor
+
+    def limpar(self, sessao: str = None) -> None:
+        """Remove todas as entradas (ou apenas as de uma sessão)"""
+        with self._lock:
+            if sessao is None:
+                self._entradas.clear()
+                self._ultima_por_familia.clear()
+            else:
+                for k in [k for k, (s, _) in self._entradas.items() if s == sessao]:
+                    del self._entradas[k]
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna contadores de uso do cache"""
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+            }
+
+
+def carregar_plano_contas(plano_path: str) -> pd.DataFrame:
+    """
+    Lê o plano de contas uma única vez por versão do arquivo
+
+    Args:
+        plano_path: Caminho do plano_de_contas.csv
+
+    Returns:
+        Cópia do DataFrame do plano (levanta FileNotFoundError se não existir)
+    """
+    versao = versao_arquivo(plano_path)
+    if versao is None:
+        raise FileNotFoundError(plano_path)
+
+    chave = ("plano_contas", versao)
+    df_plano = cache_categorizacao.obter(chave)
+    if df_plano is None:
+        df_plano = pd.read_csv(plano_path)
+        cache_categorizacao.guardar(chave, df_plano)
+    return df_plano.copy()
+
+
+def calcular_mapa_considerar(df_plano: pd.DataFrame) -> Dict[str, str]:
+    """Monta o mapa Categoria -> Considerar a partir do plano de contas"""
+    if df_plano is None or df_plano.empty or "Considerar" not in df_plano.columns:
+        return {}
+    return dict(zip(df_plano["Categoria"], df_plano["Considerar"]))
+
+
+def extrair_regras_palavras(df_palavras: pd.DataFrame, tipo_lancamento: str) -> List[Tuple[str, str]]:
+    """
+    Extrai as regras de palavras-chave do tipo informado, na ordem do CSV
+
+    Args:
+        df_palavras: DataFrame com PalavraChave, Tipo e Categoria
+        tipo_lancamento: Tipo usado para filtrar as palavras-chave
+
+    Returns:
+        Lista de tuplas (palavra em minúsculas, categoria)
+    """
+    if df_palavras is None or df_palavras.empty:
+        return []
+    return [
+        (str(p).lower(), c)
+        for p, t, c in zip(df_palavras["PalavraChave"], df_palavras["Tipo"], df_palavras["Categoria"])
+        if t == tipo_lancamento and pd.notna(p)
+    ]
+
+
+class IndicePalavrasChave:
+    """
+    Índice reverso palavra-chave -> descrições que a contêm
+
+    Permite reavaliar apenas as descrições afetadas quando uma palavra-chave
+    é incluída, removida ou tem a categoria alterada. As palavras são buscadas
+    nas descrições originais do extrato; a chave (canônica) só agrupa o resultado.
+    """
+
+    def __init__(self, descricoes: List[str], regras: List[Tuple[str, str]],
+                 indice: Dict[str, frozenset] = None, sugestoes: Dict[str, str] = None,
+                 originais: Dict[str, str] = None):
+        self.descricoes = list(descricoes)
+        self.originais = originais or {}
+        self._descricoes_lower = self._textos_busca(self.descricoes, self.originais)
+        self.regras = list(regras)
+        self.indice = dict(indice or {})
+        for palavra, _ in self.regras:
+            self._indexar(palavra)
+        self.sugestoes = dict(sugestoes) if sugestoes is not None else self._avaliar(self.descricoes)
+
+    @staticmethod
+    def _textos_busca(descricoes: List[str], originais: Dict[str, str]) -> Dict[str, str]:
+        """
+        Texto pesquisado de cada chave: as descrições originais do grupo, em minúsculas
+
+        Args:
+            descricoes: Chaves de agrupamento
+            originais: Dicionário descrição original -> chave (vazio se as chaves já
+                       forem as descrições originais)
+        """
+        variacoes: Dict[str, List[str]] = {}
+        for original, chave in originais.items():
+            variacoes.setdefault(chave, []).append(str(original).lower())
+        # Quebra de linha entre as variações: uma palavra não casa entre duas delas
+        return {d: "\n".join(variacoes.get(d) or [str(d).lower()]) for d in descricoes}
+
+    def _indexar(self, palavra: str) -> None:
+        """Inclui a palavra no índice varrendo as descrições uma única vez"""
+        if palavra not in self.indice:
+            self.indice[palavra] = frozenset(d for d, d_lower in self._descricoes_lower.items() if palavra in d_lower)
+
+    def _avaliar(self, descricoes) -> Dict[str, str]:
+        """Aplica a primeira regra que casar (ordem do CSV) usando o índice"""
+        sugestoes = {}
+        for desc in descricoes:
+            for palavra, categoria in self.regras:
+                if desc in self.indice[palavra]:
+                    sugestoes[desc] = categoria
+                    break
+        return sugestoes
+
+    def atualizar(self, novas_regras: List[Tuple[str, str]]) -> Tuple["IndicePalavrasChave", set]:
+        """
+        Cria um novo índice para as regras atualizadas, reavaliando só o necessário
+
+        Args:
+            novas_regras: Regras atuais (palavra em minúsculas, categoria)
+
+        Returns:
+            Tupla (novo índice, conjunto de descrições cuja sugestão pode ter mudado)
+        """
+        novo = IndicePalavrasChave(self.descricoes, novas_regras, self.indice, self.sugestoes, self.originais)
+
+        antigas = {}
+        for palavra, categoria in self.regras:
+            antigas.setdefault(palavra, categoria)
+        novas = {}
+        for palavra, categoria in novo.regras:
+            novas.setdefault(palavra, categoria)
+
+        # Se a ordem relativa das palavras mantidas mudou, a precedência muda: reavaliar tudo
+        ordem_antiga = [p for p in antigas if p in novas]
+        ordem_nova = [p for p in novas if p in antigas]
+        if ordem_antiga != ordem_nova:
+            afetadas = set(self.descricoes)
+        else:
+            alteradas = set(antigas) ^ set(novas)
+            alteradas |= {p for p in ordem_nova if antigas[p] != novas[p]}
+            afetadas = set()
+            for palavra in alteradas:
+                afetadas |= novo.indice.get(palavra, frozenset())
+
+        for desc in afetadas:
+            novo.sugestoes.pop(desc, None)
+        novo.sugestoes.update(novo._avaliar(afetadas))
+
+        # Manter no índice apenas as palavras ainda em uso
+        novo.indice = {p: novo.indice[p] for p in novas}
+        return novo, afetadas
+
+
+def diferenca_mapa(antigo: Dict[str, str], novo: Dict[str, str]) -> set:
+    """Retorna as chaves incluídas, removidas ou alteradas entre dois mapas chave -> categoria"""
+    antigo = antigo or {}
+    novo = novo or {}
+    return {k for k in set(antigo) | set(novo) if antigo.get(k) != novo.get(k)}
+
+
+# Instância global do cache
+cache_categorizacao = CacheCategorizacao()
@@ -0,0 +1,168 @@
+"""
+Motor de agregação do fluxo de caixa
+Codifica categoria e mês como inteiros e soma os valores em uma matriz densa
+categoria x mês com um único np.bincount. O resultado é memoizado e pode ser
+reaproveitado pelo fluxo de caixa, DRE, projeções e relatórios.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_DATA,
+    COLUNA_MES,
+    MES_INVALIDO,
+    converter_valores,
+    rotulo_mes,
+    validar_esquema_transacoes,
+)
+from logic.Analises_DFC_DRE.memo_categorizacao import (
+    CacheCategorizacao,
+    fingerprint_transacoes,
+    obter_id_sessao,
+    versao_arquivo,
+)
+
+PLANO_CONTAS_PATH = "./logic/CSVs/plano_de_contas.csv"
+
+COLUNAS_FLUXO = ["Categoria", "Valor (R$)", COLUNA_DATA, COLUNA_MES, "Considerar"]
+
+
+def _ler_metadados_plano(plano_path: str) -> pd.DataFrame:
+    """Lê Ordem, Tipo e Grupo por categoria do plano de contas"""
+    plano = pd.read_csv(plano_path)
+    return (
+        plano.drop_duplicates(subset=["Categoria"], keep="last")
+        .set_index("Categoria")[["Ordem", "Tipo", "Grupo"]]
+    )
+
+
+def obter_metadados_plano(plano_path: str = PLANO_CONTAS_PATH) -> pd.DataFrame:
+    """
+    Índice Categoria -> (Ordem, Tipo, Grupo), lido uma vez por versão do plano
+
+    Args:
+        plano_path: Caminho do plano_de_contas.csv
+
+    Returns:
+        DataFrame indexado por Categoria (vazio se o plano não puder ser lido)
+    """
+    versao = versao_arquivo(plano_path)
+    if versao is None:
+        return pd.DataFrame(columns=["Ordem", "Tipo", "Grupo"])
+    try:
+        return cache_motor_fluxo.obter_ou_calcular(
+            ("metadados_plano", versao), lambda: _ler_metadados_plano(plano_path)
+        )
+    except Exception:
+        return pd.DataFrame(columns=["Ordem", "Tipo", "Grupo"])
+
+
+class MatrizFluxo:
+    """Matriz densa categoria x mês com os metadados do plano de contas"""
+
+    def __init__(self, categorias: List[str], chaves_meses: np.ndarray, valores: np.ndarray,
+                 metadados: pd.DataFrame, linhas: np.ndarray, valores_linha: np.ndarray):
+        self.categorias = categorias
+        self.chaves_meses = chaves_meses
+        self.meses = rotulo_mes(chaves_meses)
+        self.valores = valores
+        self.metadados = metadados
+        self.linhas = linhas
+        self.valores_linha = valores_linha
+
+    @property
+    def vazia(self) -> bool:
+        return self.valores.size == 0
+
+    def para_dataframe(self) -> pd.DataFrame:
+        """Tabela Categoria x Mês (equivalente ao pivot_table com soma e fill_value=0)"""
+        return pd.DataFrame(
+            self.valores,
+            index=pd.Index(self.categorias, name="Categoria"),
+            columns=pd.Index(self.meses, name="Mes"),
+        )
+
+    def tipo_por_sinal(self) -> np.ndarray:
+        """Tipo de cada categoria pelo sinal do total (Crédito se positivo, senão Débito)"""
+        return np.where(self.valores.sum(axis=1) > 0, "Crédito", "Débito")
+
+    def transacoes_detalhadas(self, df_transacoes: pd.DataFrame) -> pd.DataFrame:
+        """Transações consideradas, com valores convertidos e coluna Mes"""
+        df = df_transacoes.iloc[self.linhas].copy()
+        df["Valor (R$)"] = self.valores_linha
+        df["Mes"] = rotulo_mes(df[COLUNA_MES].to_numpy())
+        return df
+
+
+def _calcular_matriz(df_transacoes: pd.DataFrame, plano_path: str, apenas_considerar: bool) -> MatrizFluxo:
+    """Executa a agregação (ver calcular_matriz_fluxo)"""
+    mascara = df_transacoes["Categoria"].notna().to_numpy().copy()
+    if apenas_considerar and "Considerar" in df_transacoes.columns:
+        mascara &= (df_transacoes["Considerar"].astype(str).str.lower() == "sim").to_numpy()
+
+    chaves_linha = df_transacoes[COLUNA_MES].to_numpy()
+    mascara &= chaves_linha != MES_INVALIDO
+
+    linhas = np.flatnonzero(mascara)
+    valores_linha = converter_valores(df_transacoes["Valor (R$)"].iloc[linhas])
+
+    # Codificação inteira de categoria e mês
+    codigos_categoria, categorias = pd.factorize(df_transacoes["Categoria"].iloc[linhas], sort=True)
+    chaves_meses, codigos_mes = np.unique(chaves_linha[linhas], return_inverse=True)
+
+    n_categorias, n_meses = len(categorias), len(chaves_meses)
+    valores = np.bincount(
+        codigos_categoria * n_meses + codigos_mes,
+        weights=valores_linha,
+        minlength=n_categorias * n_meses,
+    ).reshape(n_categorias, n_meses)
+
+    # Metadados do plano de contas (padrões: ordem 999, tipo vazio, grupo Outros)
+    metadados = obter_metadados_plano(plano_path).reindex(categorias)
+    metadados = pd.DataFrame({
+        "Ordem": metadados["Ordem"].fillna(999).to_numpy(),
+        "Tipo": metadados["Tipo"].fillna("").to_numpy(),
+        "Grupo": metadados["Grupo"].fillna("Outros").to_numpy(),
+    }, index=pd.Index(categorias, name="Categoria"))
+
+    return MatrizFluxo(list(categorias), chaves_meses, valores, metadados, linhas, valores_linha)
+
+
+def calcular_matriz_fluxo(df_transacoes: pd.DataFrame, plano_path: str = PLANO_CONTAS_PATH,
+                          apenas_considerar: bool = True) -> MatrizFluxo:
+    """
+    Agrega as transações categorizadas em uma matriz categoria x mês
+
+    Args:
+        df_transacoes: Transações no esquema canônico com Categoria, Valor (R$) e Considerar
+        plano_path: Caminho do plano de contas (ordem, tipo e grupo das categorias)
+        apenas_considerar: Mantém apenas transações com Considerar == 'Sim'
+
+    Returns:
+        MatrizFluxo memoizada para o mesmo conteúdo e versão do plano
+
+    Raises:
+        ValueError: Se as transações não tiverem Data/Mes_Chave canônicos
+    """
+    validar_esquema_transacoes(df_transacoes)
+
+    colunas = [c for c in COLUNAS_FLUXO if c in df_transacoes.columns]
+    chave = (
+        "matriz_fluxo",
+        fingerprint_transacoes(df_transacoes, colunas),
+        len(df_transacoes),
+        versao_arquivo(plano_path),
+        apenas_considerar,
+    )
+    return cache_motor_fluxo.obter_ou_calcular(
+        chave,
+        lambda: _calcular_matriz(df_transacoes, plano_path, apenas_considerar),
+        sessao=obter_id_sessao(),
+    )
+
+
+# Instância global do cache do motor (matrizes e metadados do plano)
+cache_motor_fluxo = CacheCategorizacao(max_entradas=32, max_por_sessao=6)
@@ -0,0 +1,142 @@
+"""
+Assinaturas por mês para atualização incremental do cache
+Cada empresa guarda a assinatura das transações de cada mês, o hash das regras
+usadas (plano de contas, linhas do DRE) e a versão do artefato gravado com elas.
+Ao salvar o cache, apenas os meses cuja assinatura mudou são recalculados; os
+agregados dos demais são lidos do próprio artefato (ex.: índice do detalhamento
+do DRE), sem uma segunda cópia em disco.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import COLUNA_MES, MES_INVALIDO, rotulo_mes
+from logic.armazenamento import NAMESPACE_CACHE, Armazenamento, obter_armazenamento
+
+# Incrementar sempre que o cálculo dos agregados mudar (invalida todos os meses)
+VERSAO_AGREGADOS = 2
+
+# Colunas que compõem a assinatura de um mês
+COLUNAS_ASSINATURA = ["Data", "Descrição", "Valor (R$)", "Tipo", "Categoria", "Categoria_Vyco", "Considerar"]
+
+
+def agrupar_por_mes(df_transacoes: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Posições das transações de cada mês (uma única ordenação pela chave do mês)
+
+    Args:
+        df_transacoes: Transações no esquema canônico
+
+    Returns:
+        Dicionário 'AAAA-MM' -> posições (iloc) das transações do mês
+    """
+    chaves = df_transacoes[COLUNA_MES].to_numpy()
+    ordem = np.argsort(chaves, kind="stable")
+    unicas, inicios = np.unique(chaves[ordem], return_index=True)
+    grupos = np.split(ordem, inicios[1:])
+    return {
+        rotulo: posicoes
+        for rotulo, chave, posicoes in zip(rotulo_mes(unicas), unicas, grupos)
+        if chave != MES_INVALIDO
+    }
+
+
+def assinaturas_mensais(df_transacoes: pd.DataFrame, grupos: Dict[str, np.ndarray]) -> Dict[str, str]:
+    """
+    Assinatura do conteúdo de cada mês (independe da ordem das transações)
+
+    Args:
+        df_transacoes: Transações no esquema canônico
+        grupos: Resultado de agrupar_por_mes
+
+    Returns:
+        Dicionário 'AAAA-MM' -> assinatura
+    """
+    colunas = [c for c in COLUNAS_ASSINATURA if c in df_transacoes.columns]
+    hashes = pd.util.hash_pandas_object(df_transacoes[colunas].astype(str), index=False).to_numpy()
+    return {
+        mes: f"{int(hashes[posicoes].sum(dtype=np.uint64)):016x}-{len(posicoes)}"
+        for mes, posicoes in grupos.items()
+    }
+
+
+class AgregadosMensais:
+    """Assinaturas mensais das transações usadas no último artefato de cada empresa"""
+
+    def __init__(self, armazenamento: Optional[Armazenamento] = None, pasta: str = "agregados"):
+        self.armazenamento = armazenamento or obter_armazenamento(NAMESPACE_CACHE)
+        self.pasta = pasta
+
+    def _chave(self, empresa_nome: str) -> str:
+        import re
+        nome = re.sub(r'[<>:"/\\|?*]', '_', empresa_nome).strip()
+        return f"{self.pasta}/{nome}_agregados.json"
+
+    def carregar(self, empresa_nome: str) -> Dict:
+        """Assinaturas salvas da empresa (estrutura vazia se inexistentes ou de outra versão)"""
+        try:
+            dados = self.armazenamento.ler_json(self._chave(empresa_nome))
+            if dados is not None and dados.get("versao") == VERSAO_AGREGADOS:
+                return dados
+        except (OSError, ValueError):
+            pass
+        return {"versao": VERSAO_AGREGADOS, "artefato": None, "regras": "", "meses": {}}
+
+    def salvar(self, empresa_nome: str, dados: Dict) -> str:
+        """Grava as assinaturas da empresa (devolve a chave)"""
+        chave = self._chave(empresa_nome)
+        self.armazenamento.gravar_json(chave, dados, indent=None)
+        return chave
+
+    def comparar(
+        self,
+        empresa_nome: str,
+        df_transacoes: pd.DataFrame,
+        versao_regras: str = "",
+        artefato: Optional[str] = None,
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, str], List[str]]:
+        """
+        Assinatura de cada mês e meses alterados desde o artefato atual
+
+        Args:
+            empresa_nome: Nome da empresa
+            df_transacoes: Transações no esquema canônico
+            versao_regras: Hash das entradas fora das transações que afetam o cálculo
+                           (ex.: plano de contas); se mudar, todos os meses são alterados
+            artefato: Versão do artefato atual (ex.: hash do DRE); assinaturas registradas
+                      com outra versão (ou sem artefato) não valem e todos os meses são alterados
+
+        Returns:
+            Tupla (posições das transações por mês, assinatura por mês, meses alterados)
+        """
+        grupos = agrupar_por_mes(df_transacoes)
+        assinaturas = assinaturas_mensais(df_transacoes, grupos)
+
+        dados = self.carregar(empresa_nome)
+        validas = artefato is not None and dados.get("artefato") == artefato and dados.get("regras") == versao_regras
+        salvas = dados["meses"] if validas else {}
+
+        alterados = [mes for mes, assinatura in assinaturas.items() if salvas.get(mes) != assinatura]
+        return grupos, assinaturas, alterados
+
+    def registrar(self, empresa_nome: str, assinaturas: Dict[str, str], versao_regras: str, artefato: str) -> str:
+        """
+        Registra as assinaturas dos meses presentes no artefato recém-gravado
+
+        Args:
+            empresa_nome: Nome da empresa
+            assinaturas: Mês -> assinatura (só os meses cujos agregados estão no artefato)
+            versao_regras: Hash das regras usadas no cálculo
+            artefato: Versão do artefato gravado
+
+        Returns:
+            Chave do arquivo de assinaturas
+        """
+        return self.salvar(empresa_nome, {
+            "versao": VERSAO_AGREGADOS,
+            "artefato": artefato,
+            "regras": versao_regras,
+            "meses": assinaturas,
+        })
@@ -0,0 +1,729 @@
+"""
+Armazenamento dos arquivos de cache: pasta local, SQLite ou S3
+Os gerenciadores leem e gravam objetos (bytes) por chave relativa
+('dre/Empresa_dre.json'), não por caminho: com ARMAZENAMENTO_BACKEND=sqlite ou
+s3, réplicas do app atrás de um balanceador enxergam os mesmos dados. Cada
+objeto tem uma versão opaca; gravações condicionais (versao_esperada) recusam
+substituir um objeto alterado por outra sessão ou réplica depois da leitura.
+Backends remotos ficam atrás de uma cópia local (read-through) dos objetos
+lidos, que é o arquivo que os leitores abrem. Ao trocar de backend, os dados
+já gravados nas pastas locais são copiados uma vez com migrar_armazenamento.py.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from logic.escrita_atomica import ConflitoVersao, arquivo_temporario, trava_empresa
+
+# Versão de um objeto inexistente (como versao_esperada: grava só se o objeto ainda não existir)
+VERSAO_AUSENTE = "ausente"
+
+NAMESPACE_CACHE = "data_cache"
+NAMESPACE_LICENCAS = "licencas"
+
+# Pasta de cada namespace no backend de arquivos
+RAIZES_LOCAIS = {NAMESPACE_CACHE: "./data_cache", NAMESPACE_LICENCAS: "./logic/CSVs/licencas"}
+
+BACKEND_ARQUIVOS = "arquivos"
+BACKEND_SQLITE = "sqlite"
+BACKEND_S3 = "s3"
+
+# Banco do backend sqlite (ARMAZENAMENTO_SQLITE_PATH)
+SQLITE_PATH_PADRAO = "./data_cache/armazenamento.sqlite3"
+
+# Variáveis de ambiente lidas por obter_armazenamento
+VARIAVEIS_AMBIENTE = (
+    "ARMAZENAMENTO_BACKEND",
+    "ARMAZENAMENTO_SQLITE_PATH",
+    "ARMAZENAMENTO_S3_BUCKET",
+    "ARMAZENAMENTO_S3_ENDPOINT",
+    "ARMAZENAMENTO_CACHE_LOCAL",
+    "ARMAZENAMENTO_VALIDADE_CACHE",
+)
+
+
+def para_json(conteudo, **opcoes_json) -> bytes:
+    """JSON em UTF-8 (padrão de salvar_json_atomico: legível, indentado, datas como texto)"""
+    opcoes = {"ensure_ascii": False, "indent": 2, "default": str, **opcoes_json}
+    return json.dumps(conteudo, **opcoes).encode("utf-8")
+
+
+def _conflito(chave: str) -> ConflitoVersao:
+    return ConflitoVersao(
+        f"{chave.rpartition('/')[2]} foi alterado por outra sessão depois de carregado; recarregue antes de salvar"
+    )
+
+
+class Armazenamento:
+    """
+    Objetos (bytes) por chave, com uma versão por objeto
+
+    Backends implementam ler_com_versao, versao, gravar, remover, listar e
+    localizacao; leituras em lote e os formatos JSON e texto vêm daqui.
+    """
+
+    # Backend com caminho_local (arquivo no disco que os leitores podem abrir)
+    local = False
+
+    def ler_com_versao(self, chave: str) -> Tuple[Optional[bytes], str]:
+        """Conteúdo e versão do objeto ((None, VERSAO_AUSENTE) se não existir)"""
+        raise NotImplementedError
+
+    def versao(self, chave: str) -> str:
+        """Versão atual do objeto (VERSAO_AUSENTE se não existir)"""
+        raise NotImplementedError
+
+    def gravar(self, chave: str, dados: bytes, versao_esperada: Optional[str] = None) -> str:
+        """
+        Substitui o objeto de uma vez só (leitores veem a versão anterior inteira ou a nova)
+
+        Args:
+            chave: Chave do objeto
+            dados: Conteúdo
+            versao_esperada: Versão lida antes da edição (None = sem verificação;
+                VERSAO_AUSENTE = o objeto não pode ter sido criado nesse meio tempo)
+
+        Returns:
+            Versão gravada
+
+        Raises:
+            ConflitoVersao: Se o objeto mudou desde a leitura
+        """
+        raise NotImplementedError
+
+    def remover(self, chave: str) -> bool:
+        """Remove o objeto (False se ele não existia)"""
+        raise NotImplementedError
+
+    def listar(self, prefixo: str = "") -> List[str]:
+        """Chaves que começam com o prefixo, em ordem"""
+        raise NotImplementedError
+
+    def localizacao(self, chave: str) -> str:
+        """Onde o objeto fica, para exibição (caminho, URL do bucket...)"""
+        raise NotImplementedError
+
+    def caminho_local(self, chave: str) -> Optional[str]:
+        """Arquivo local com o conteúdo atual do objeto (None se ele não existir)"""
+        raise NotImplementedError(f"{type(self).__name__} não tem cópia local; use ArmazenamentoComCache")
+
+    def ler_varios_com_versao(self, chaves: Iterable[str]) -> Dict[str, Tuple[Optional[bytes], str]]:
+        """Conteúdo e versão de vários objetos (backends remotos buscam em lote)"""
+        return {chave: self.ler_com_versao(chave) for chave in chaves}
+
+    def versoes(self, chaves: Iterable[str]) -> Dict[str, str]:
+        """Versão de vários objetos (backends remotos consultam em lote)"""
+        return {chave: self.versao(chave) for chave in chaves}
+
+    def ler(self, chave: str) -> Optional[bytes]:
+        """Conteúdo do objeto (None se não existir)"""
+        return self.ler_com_versao(chave)[0]
+
+    def ler_varios(self, chaves: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Conteúdo de vários objetos (None para os inexistentes)"""
+        return {chave: dados for chave, (dados, _) in self.ler_varios_com_versao(list(chaves)).items()}
+
+    def existe(self, chave: str) -> bool:
+        return self.versao(chave) != VERSAO_AUSENTE
+
+    def verificar_versao(self, chave: str, versao_esperada: Optional[str]):
+        """
+        Confere se o objeto ainda está na versão lida pelo chamador
+
+        Raises:
+            ConflitoVersao: Se o objeto mudou desde a leitura (None = sem verificação)
+        """
+        if versao_esperada is not None and self.versao(chave) != versao_esperada:
+            raise _conflito(chave)
+
+    def ler_json(self, chave: str, padrao=None):
+        """Conteúdo JSON do objeto (padrao se não existir)"""
+        dados = self.ler(chave)
+        return padrao if dados is None else json.loads(dados.decode("utf-8"))
+
+    def gravar_json(self, chave: str, conteudo, versao_esperada: Optional[str] = None, **opcoes_json) -> str:
+        """Grava JSON (opções como em salvar_json_atomico); devolve a versão gravada"""
+        return self.gravar(chave, para_json(conteudo, **opcoes_json), versao_esperada)
+
+    def ler_texto(self, chave: str) -> Optional[str]:
+        dados = self.ler(chave)
+        return None if dados is None else dados.decode("utf-8")
+
+    def gravar_texto(self, chave: str, texto: str, versao_esperada: Optional[str] = None) -> str:
+        return self.gravar(chave, texto.encode("utf-8"), versao_esperada)
+
+
+class ArmazenamentoArquivos(Armazenamento):
+    """Objetos como arquivos sob uma pasta (chave 'pasta/arquivo' -> <raiz>/pasta/arquivo)"""
+
+    local = True
+
+    def __init__(self, raiz: str, travas_path: Optional[str] = None):
+        """
+        Args:
+            raiz: Pasta dos arquivos
+            travas_path: Travas das gravações condicionais (padrão: <raiz>/.travas)
+        """
+        self.raiz = raiz
+        self.travas_path = travas_path or os.path.join(raiz, ".travas")
+
+    def _caminho(self, chave: str) -> str:
+        partes = chave.split("/")
+        if not chave or chave.startswith("/") or ".." in partes:
+            raise ValueError(f"Chave inválida: {chave!r}")
+        return os.path.join(self.raiz, *partes)
+
+    @staticmethod
+    def _versao_arquivo(info: os.stat_result) -> str:
+        return f"{info.st_mtime_ns}-{info.st_size}"
+
+    def ler_com_versao(self, chave: str) -> Tuple[Optional[bytes], str]:
+        try:
+            with open(self._caminho(chave), "rb") as f:
+                # Versão do arquivo aberto: gravações trocam o arquivo (os.replace), não o alteram
+                versao = self._versao_arquivo(os.fstat(f.fileno()))
+                return f.read(), versao
+        except FileNotFoundError:
+            return None, VERSAO_AUSENTE
+
+    def versao(self, chave: str) -> str:
+        try:
+            return self._versao_arquivo(os.stat(self._caminho(chave)))
+        except FileNotFoundError:
+            return VERSAO_AUSENTE
+
+    def gravar(self, chave: str, dados: bytes, versao_esperada: Optional[str] = None) -> str:
+        caminho = self._caminho(chave)
+        if versao_esperada is None:
+            self._substituir(caminho, dados)
+            return self.versao(chave)
+
+        # Conferência e troca sob a trava do objeto: outra gravação condicional não entra no meio
+        nome_trava = "objeto_" + hashlib.sha1(os.path.abspath(caminho).encode("utf-8")).hexdigest()[:16]
+        with trava_empresa(nome_trava, self.travas_path):
+            self.verificar_versao(chave, versao_esperada)
+            self._substituir(caminho, dados)
+            return self.versao(chave)
+
+    @staticmethod
+    def _substituir(caminho: str, dados: bytes):
+        with arquivo_temporario(caminho) as temporario:
+            with open(temporario, "wb") as f:
+                f.write(dados)
+
+    def remover(self, chave: str) -> bool:
+        try:
+            os.remove(self._caminho(chave))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def listar(self, prefixo: str = "") -> List[str]:
+        pasta = prefixo.rpartition("/")[0]
+        inicio = self._caminho(pasta) if pasta else self.raiz
+        chaves = []
+        for diretorio, subpastas, arquivos in os.walk(inicio):
+            # Ocultos: travas e temporários das gravações atômicas
+            subpastas[:] = [s for s in subpastas if not s.startswith(".")]
+            relativo = os.path.relpath(diretorio, self.raiz).replace(os.sep, "/")
+            for nome in arquivos:
+                chave = nome if relativo == "." else f"{relativo}/{nome}"
+                if not nome.startswith(".") and chave.startswith(prefixo):
+                    chaves.append(chave)
+        return sorted(chaves)
+
+    def localizacao(self, chave: str) -> str:
+        return self._caminho(chave)
+
+    def caminho_local(self, chave: str) -> Optional[str]:
+        caminho = self._caminho(chave)
+        return caminho if os.path.exists(caminho) else None
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    """
+    Objetos numa tabela SQLite
+
+    Para réplicas no mesmo host (processos ou contêineres com o banco num volume
+    compartilhado); entre hosts, usar o S3.
+    """
+
+    # Chaves por consulta nas leituras em lote (limite de parâmetros do SQLite)
+    TAMANHO_LOTE = 500
+
+    def __init__(self, db_path: str, prefixo: str = ""):
+        """
+        Args:
+            db_path: Arquivo do banco
+            prefixo: Acrescentado a todas as chaves (separa os namespaces no mesmo banco)
+        """
+        self.db_path = db_path
+        self.prefixo = prefixo
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._criar_estrutura()
+
+    @contextmanager
+    def _conectar(self):
+        """Abre uma conexão em transação (commit ao final, rollback em caso de erro)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _criar_estrutura(self):
+        """Cria a tabela se não existir"""
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS objetos (
+                    chave TEXT PRIMARY KEY,
+                    dados BLOB NOT NULL,
+                    versao TEXT NOT NULL,
+                    atualizado_em TEXT
+                )
+            """)
+
+    def _consultar_lotes(self, colunas: str, chaves: List[str]) -> Dict[str, tuple]:
+        """Registros (chave sem prefixo -> colunas) das chaves pedidas, em lotes"""
+        registros = {}
+        with self._conectar() as conn:
+            for inicio in range(0, len(chaves), self.TAMANHO_LOTE):
+                lote = [self.prefixo + chave for chave in chaves[inicio:inicio + self.TAMANHO_LOTE]]
+                marcadores = ",".join("?" * len(lote))
+                consulta = f"SELECT chave, {colunas} FROM objetos WHERE chave IN ({marcadores})"
+                for chave, *valores in conn.execute(consulta, lote):
+                    registros[chave[len(self.prefixo):]] = tuple(valores)
+        return registros
+
+    def ler_com_versao(self, chave: str) -> Tuple[Optional[bytes], str]:
+        return self.ler_varios_com_versao([chave])[chave]
+
+    def ler_varios_com_versao(self, chaves: Iterable[str]) -> Dict[str, Tuple[Optional[bytes], str]]:
+        chaves = list(chaves)
+        registros = self._consultar_lotes("dados, versao", chaves)
+        return {
+            chave: (bytes(registros[chave][0]), registros[chave][1]) if chave in registros else (None, VERSAO_AUSENTE)
+            for chave in chaves
+        }
+
+    def versao(self, chave: str) -> str:
+        return self.versoes([chave])[chave]
+
+    def versoes(self, chaves: Iterable[str]) -> Dict[str, str]:
+        chaves = list(chaves)
+        registros = self._consultar_lotes("versao", chaves)
+        return {chave: registros[chave][0] if chave in registros else VERSAO_AUSENTE for chave in chaves}
+
+    def gravar(self, chave: str, dados: bytes, versao_esperada: Optional[str] = None) -> str:
+        # Versão aleatória: um objeto removido e recriado nunca volta a uma versão já lida
+        nova = uuid.uuid4().hex
+        valores = (self.prefixo + chave, dados, nova, datetime.now().isoformat())
+        with self._conectar() as conn:
+            if versao_esperada is None:
+                conn.execute("""
+                    INSERT INTO objetos (chave, dados, versao, atualizado_em) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(chave) DO UPDATE SET
+                        dados = excluded.dados, versao = excluded.versao, atualizado_em = excluded.atualizado_em
+                """, valores)
+            elif versao_esperada == VERSAO_AUSENTE:
+                cursor = conn.execute("""
+                    INSERT INTO objetos (chave, dados, versao, atualizado_em) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(chave) DO NOTHING
+                """, valores)
+                if cursor.rowcount == 0:
+                    raise _conflito(chave)
+            else:
+                # Comparação e troca no mesmo comando
+                cursor = conn.execute("""
+                    UPDATE objetos SET dados = ?, versao = ?, atualizado_em = ? WHERE chave = ? AND versao = ?
+                """, (dados, nova, valores[3], valores[0], versao_esperada))
+                if cursor.rowcount == 0:
+                    raise _conflito(chave)
+        return nova
+
+    def remover(self, chave: str) -> bool:
+        with self._conectar() as conn:
+            return conn.execute("DELETE FROM objetos WHERE chave = ?", (self.prefixo + chave,)).rowcount > 0
+
+    def listar(self, prefixo: str = "") -> List[str]:
+        inicio = self.prefixo + prefixo
+        with self._conectar() as conn:
+            registros = conn.execute(
+                "SELECT chave FROM objetos WHERE substr(chave, 1, ?) = ? ORDER BY chave", (len(inicio), inicio)
+            ).fetchall()
+        return [chave[len(self.prefixo):] for (chave,) in registros]
+
+    def localizacao(self, chave: str) -> str:
+        return f"{self.db_path}:{self.prefixo}{chave}"
+
+
+class ArmazenamentoS3(Armazenamento):
+    """
+    Objetos num bucket S3 ou compatível (MinIO local: endpoint_url='http://localhost:9000')
+
+    A versão é o ETag; gravações condicionais usam If-Match / If-None-Match do
+    PutObject (S3 desde 2024, MinIO).
+    """
+
+    CODIGOS_AUSENTE = {"NoSuchKey", "NotFound", "404"}
+    CODIGOS_CONFLITO = {"PreconditionFailed", "412", "ConditionalRequestConflict", "409"}
+
+    def __init__(self, bucket: str, prefixo: str = "", endpoint_url: Optional[str] = None,
+                 cliente=None, max_paralelo: int = 8):
+        """
+        Args:
+            bucket: Nome do bucket
+            prefixo: Acrescentado a todas as chaves
+            endpoint_url: Endpoint S3 compatível (None = AWS)
+            cliente: Cliente boto3 já criado (padrão: boto3.client('s3'), credenciais do ambiente)
+            max_paralelo: Requisições simultâneas nas leituras em lote
+        """
+        if cliente is None:
+            # Dependência opcional: importada só quando este backend é usado
+            import boto3
+            cliente = boto3.client("s3", endpoint_url=endpoint_url)
+        self.cliente = cliente
+        self.bucket = bucket
+        self.prefixo = prefixo
+        self.max_paralelo = max_paralelo
+
+    @staticmethod
+    def _codigo_erro(erro: Exception) -> Optional[str]:
+        try:
+            return str(erro.response["Error"]["Code"])
+        except (AttributeError, KeyError, TypeError):
+            return None
+
+    def ler_com_versao(self, chave: str) -> Tuple[Optional[bytes], str]:
+        try:
+            resposta = self.cliente.get_object(Bucket=self.bucket, Key=self.prefixo + chave)
+        except Exception as e:
+            if self._codigo_erro(e) in self.CODIGOS_AUSENTE:
+                return None, VERSAO_AUSENTE
+            raise
+        return resposta["Body"].read(), resposta["ETag"]
+
+    def versao(self, chave: str) -> str:
+        try:
+            return self.cliente.head_object(Bucket=self.bucket, Key=self.prefixo + chave)["ETag"]
+        except Exception as e:
+            if self._codigo_erro(e) in self.CODIGOS_AUSENTE:
+                return VERSAO_AUSENTE
+            raise
+
+    def _em_paralelo(self, funcao, chaves: List[str]) -> Dict:
+        if len(chaves) <= 1:
+            return {chave: funcao(chave) for chave in chaves}
+        with ThreadPoolExecutor(max_workers=min(self.max_paralelo, len(chaves))) as executor:
+            return dict(zip(chaves, executor.map(funcao, chaves)))
+
+    def ler_varios_com_versao(self, chaves: Iterable[str]) -> Dict[str, Tuple[Optional[bytes], str]]:
+        return self._em_paralelo(self.ler_com_versao, list(chaves))
+
+    def versoes(self, chaves: Iterable[str]) -> Dict[str, str]:
+        return self._em_paralelo(self.versao, list(chaves))
+
+    def gravar(self, chave: str, dados: bytes, versao_esperada: Optional[str] = None) -> str:
+        condicoes = {}
+        if versao_esperada == VERSAO_AUSENTE:
+            condicoes["IfNoneMatch"] = "*"
+        elif versao_esperada is not None:
+            condicoes["IfMatch"] = versao_esperada
+        try:
+            resposta = self.cliente.put_object(Bucket=self.bucket, Key=self.prefixo + chave, Body=dados, **condicoes)
+        except Exception as e:
+            if self._codigo_erro(e) in self.CODIGOS_CONFLITO:
+                raise _conflito(chave) from e
+            raise
+        return resposta["ETag"]
+
+    def remover(self, chave: str) -> bool:
+        existia = self.existe(chave)
+        self.cliente.delete_object(Bucket=self.bucket, Key=self.prefixo + chave)
+        return existia
+
+    def listar(self, prefixo: str = "") -> List[str]:
+        chaves = []
+        paginador = self.cliente.get_paginator("list_objects_v2")
+        for pagina in paginador.paginate(Bucket=self.bucket, Prefix=self.prefixo + prefixo):
+            chaves.extend(objeto["Key"][len(self.prefixo):] for objeto in pagina.get("Contents", []))
+        return sorted(chaves)
+
+    def localizacao(self, chave: str) -> str:
+        return f"s3://{self.bucket}/{self.prefixo}{chave}"
+
+
+class ArmazenamentoComCache(Armazenamento):
+    """
+    Backend remoto com cópia local dos objetos lidos (read-through)
+
+    A cópia de um objeto é usada sem consultar o remoto por `validade` segundos
+    depois de conferida; passado esse tempo, a leitura confere a versão (uma
+    consulta leve, em lote quando há várias chaves) e só baixa o objeto se ele
+    mudou. Gravações desta réplica atualizam a cópia na hora. As versões
+    conferidas ficam em memória: um processo novo baixa cada objeto uma vez.
+    """
+
+    local = True
+
+    def __init__(self, remoto: Armazenamento, diretorio: str, validade: float = 2.0):
+        """
+        Args:
+            remoto: Backend compartilhado entre as réplicas
+            diretorio: Pasta das cópias locais
+            validade: Segundos em que uma cópia conferida é usada sem nova consulta
+        """
+        self.remoto = remoto
+        self.copias = ArmazenamentoArquivos(diretorio)
+        self.validade = validade
+        # chave -> (versão da cópia local, momento da última conferência)
+        self._conferidas: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _versao_copia(self, chave: str, so_recente: bool) -> Optional[str]:
+        with self._lock:
+            conferida = self._conferidas.get(chave)
+        if conferida is None or (so_recente and time.monotonic() - conferida[1] >= self.validade):
+            return None
+        return conferida[0]
+
+    def _guardar(self, chave: str, dados: Optional[bytes], versao: str):
+        if dados is None:
+            self.copias.remover(chave)
+        else:
+            self.copias.gravar(chave, dados)
+        with self._lock:
+            self._conferidas[chave] = (versao, time.monotonic())
+
+    def versoes(self, chaves: Iterable[str]) -> Dict[str, str]:
+        versoes, pendentes = {}, []
+        for chave in chaves:
+            versao = self._versao_copia(chave, so_recente=True)
+            if versao is None:
+                pendentes.append(chave)
+            else:
+                versoes[chave] = versao
+        agora = time.monotonic()
+        for chave, versao in self.remoto.versoes(pendentes).items():
+            with self._lock:
+                # Cópia ainda na versão do remoto: vale por mais `validade` segundos
+                if self._conferidas.get(chave, (None,))[0] == versao:
+                    self._conferidas[chave] = (versao, agora)
+            versoes[chave] = versao
+        return versoes
+
+    def versao(self, chave: str) -> str:
+        return self.versoes([chave])[chave]
+
+    def _sincronizar(self, chaves: List[str]) -> Dict[str, str]:
+        """Atualiza as cópias locais que mudaram no remoto e devolve a versão de cada chave"""
+        # Chaves nunca copiadas vão direto para o download; as demais conferem a versão antes
+        conhecidas = [c for c in chaves if self._versao_copia(c, so_recente=False) is not None]
+        versoes = self.versoes(conhecidas)
+        baixar = [c for c in chaves if c not in versoes or versoes[c] != self._versao_copia(c, so_recente=False)]
+        for chave in list(baixar):
+            if versoes.get(chave) == VERSAO_AUSENTE:
+                self._guardar(chave, None, VERSAO_AUSENTE)
+                baixar.remove(chave)
+        for chave, (dados, versao) in self.remoto.ler_varios_com_versao(baixar).items():
+            self._guardar(chave, dados, versao)
+            versoes[chave] = versao
+        return versoes
+
+    def ler_varios_com_versao(self, chaves: Iterable[str]) -> Dict[str, Tuple[Optional[bytes], str]]:
+        chaves = list(chaves)
+        versoes = self._sincronizar(chaves)
+        return {
+            chave: (None if versoes[chave] == VERSAO_AUSENTE else self.copias.ler(chave), versoes[chave])
+            for chave in chaves
+        }
+
+    def ler_com_versao(self, chave: str) -> Tuple[Optional[bytes], str]:
+        return self.ler_varios_com_versao([chave])[chave]
+
+    def caminho_local(self, chave: str) -> Optional[str]:
+        if self._sincronizar([chave])[chave] == VERSAO_AUSENTE:
+            return None
+        return self.copias.caminho_local(chave)
+
+    def gravar(self, chave: str, dados: bytes, versao_esperada: Optional[str] = None) -> str:
+        try:
+            versao = self.remoto.gravar(chave, dados, versao_esperada)
+        except ConflitoVersao:
+            # A cópia local pode ser a desatualizada: a próxima leitura vai ao remoto
+            with self._lock:
+                self._conferidas.pop(chave, None)
+            raise
+        self._guardar(chave, dados, versao)
+        return versao
+
+    def remover(self, chave: str) -> bool:
+        removido = self.remoto.remover(chave)
+        self._guardar(chave, None, VERSAO_AUSENTE)
+        return removido
+
+    def listar(self, prefixo: str = "") -> List[str]:
+        return self.remoto.listar(prefixo)
+
+    def localizacao(self, chave: str) -> str:
+        return self.remoto.localizacao(chave)
+
+
+# Uma instância por configuração: gerenciadores do mesmo namespace compartilham a cópia local
+_instancias: Dict[tuple, Armazenamento] = {}
+_instancias_lock = threading.Lock()
+
+
+def _backend_configurado() -> str:
+    return (os.getenv("ARMAZENAMENTO_BACKEND") or BACKEND_ARQUIVOS).strip().lower()
+
+
+def _caminho_sqlite() -> str:
+    return os.getenv("ARMAZENAMENTO_SQLITE_PATH") or SQLITE_PATH_PADRAO
+
+
+def banco_sqlite_compartilhado(caminho_local: str) -> str:
+    """
+    Banco SQLite de dados relacionais (ex.: categorias e palavras-chave) que todas as réplicas enxergam
+
+    Com o backend de arquivos é o próprio caminho local; com o sqlite, o banco do
+    backend (as tabelas ficam ao lado da tabela de objetos). O S3 não tem banco
+    compartilhado: manter esses dados em um SQLite local faria cada réplica
+    divergir sem aviso, então a configuração é recusada.
+
+    Args:
+        caminho_local: Banco usado com o backend de arquivos
+
+    Returns:
+        Caminho do banco
+
+    Raises:
+        ValueError: Com ARMAZENAMENTO_BACKEND=s3 (ou desconhecido)
+    """
+    backend = _backend_configurado()
+    if backend == BACKEND_ARQUIVOS:
+        return caminho_local
+    if backend == BACKEND_SQLITE:
+        return _caminho_sqlite()
+    raise ValueError(
+        f"ARMAZENAMENTO_BACKEND={backend!r} não tem banco compartilhado para {os.path.basename(caminho_local)}: "
+        f"use '{BACKEND_SQLITE}' (banco num volume compartilhado) ou '{BACKEND_ARQUIVOS}'"
+    )
+
+
+def obter_armazenamento(namespace: str, raiz_local: Optional[str] = None) -> Armazenamento:
+    """
+    Armazenamento de um namespace, conforme as variáveis de ambiente
+
+    ARMAZENAMENTO_BACKEND: 'arquivos' (padrão: pastas locais), 'sqlite' ou 's3'
+        (com 's3' as categorias não têm onde ficar; ver banco_sqlite_compartilhado)
+    ARMAZENAMENTO_SQLITE_PATH: Banco do backend sqlite (padrão: ./data_cache/armazenamento.sqlite3;
+        guarda também as categorias e palavras-chave)
+    ARMAZENAMENTO_S3_BUCKET, ARMAZENAMENTO_S3_ENDPOINT: Bucket e endpoint do backend s3
+        (MinIO local: http://localhost:9000; credenciais nas variáveis AWS_* do boto3)
+    ARMAZENAMENTO_CACHE_LOCAL: Pasta das cópias locais dos backends remotos (padrão: ./.cache_armazenamento)
+    ARMAZENAMENTO_VALIDADE_CACHE: Segundos em que uma cópia local é usada sem conferir a versão (padrão: 2)
+
+    Args:
+        namespace: NAMESPACE_CACHE ou NAMESPACE_LICENCAS (prefixo das chaves nos backends remotos)
+        raiz_local: Pasta do backend de arquivos (padrão: RAIZES_LOCAIS[namespace])
+
+    Returns:
+        Armazenamento com caminho_local (backends remotos vêm com cópia local)
+    """
+    backend = _backend_configurado()
+    raiz_local = raiz_local or RAIZES_LOCAIS[namespace]
+    configuracao = (
+        namespace,
+        os.path.abspath(raiz_local) if backend == BACKEND_ARQUIVOS else None,
+        tuple(os.getenv(variavel) for variavel in VARIAVEIS_AMBIENTE),
+    )
+
+    with _instancias_lock:
+        if configuracao not in _instancias:
+            if backend == BACKEND_ARQUIVOS:
+                armazenamento = ArmazenamentoArquivos(raiz_local)
+            else:
+                if backend == BACKEND_SQLITE:
+                    remoto = ArmazenamentoSQLite(_caminho_sqlite(), prefixo=f"{namespace}/")
+                elif backend == BACKEND_S3:
+                    bucket = os.getenv("ARMAZENAMENTO_S3_BUCKET")
+                    if not bucket:
+                        raise ValueError("ARMAZENAMENTO_S3_BUCKET não configurado")
+                    remoto = ArmazenamentoS3(bucket, prefixo=f"{namespace}/",
+                                             endpoint_url=os.getenv("ARMAZENAMENTO_S3_ENDPOINT") or None)
+                else:
+                    raise ValueError(f"ARMAZENAMENTO_BACKEND desconhecido: {backend!r}")
+                diretorio = os.path.join(os.getenv("ARMAZENAMENTO_CACHE_LOCAL") or "./.cache_armazenamento", namespace)
+                validade = float(os.getenv("ARMAZENAMENTO_VALIDADE_CACHE") or 2)
+                armazenamento = ArmazenamentoComCache(remoto, diretorio, validade)
+            _instancias[configuracao] = armazenamento
+        return _instancias[configuracao]
+
+
+def _arquivo_interno(chave: str) -> bool:
+    """Bancos SQLite guardados na pasta local (índices locais e o próprio backend sqlite): não são objetos"""
+    nome = chave.rpartition("/")[2]
+    return ".sqlite3" in nome or nome.endswith((".db", ".db-wal", ".db-shm", ".db-journal"))
+
+
+def migrar_armazenamento(namespace: str, destino: Optional[Armazenamento] = None,
+                         raiz_local: Optional[str] = None, substituir: bool = False) -> Dict[str, int]:
+    """
+    Copia os objetos da pasta local de um namespace para outro backend (uso único ao trocar de backend)
+
+    Ao passar para ARMAZENAMENTO_BACKEND=sqlite ou s3 o backend começa vazio: esta
+    cópia leva o cache e as licenças já gravados em disco. Pode ser repetida;
+    objetos já existentes no destino são mantidos (a menos que 'substituir').
+
+    Args:
+        namespace: NAMESPACE_CACHE ou NAMESPACE_LICENCAS
+        destino: Backend de destino (padrão: o configurado nas variáveis de ambiente)
+        raiz_local: Pasta de origem (padrão: RAIZES_LOCAIS[namespace])
+        substituir: Regravar objetos que já existem no destino
+
+    Returns:
+        Dicionário com as quantidades 'copiados' e 'existentes'
+
+    Raises:
+        ValueError: Se o destino for a própria pasta de origem
+    """
+    raiz_local = raiz_local or RAIZES_LOCAIS[namespace]
+    origem = ArmazenamentoArquivos(raiz_local)
+    destino = destino or obter_armazenamento(namespace)
+    if isinstance(destino, ArmazenamentoArquivos) and os.path.abspath(destino.raiz) == os.path.abspath(origem.raiz):
+        raise ValueError(f"Destino é a própria pasta {raiz_local}: configure ARMAZENAMENTO_BACKEND=sqlite ou s3")
+
+    chaves = [chave for chave in origem.listar() if not _arquivo_interno(chave)]
+    versoes_destino = destino.versoes(chaves)
+    resultado = {"copiados": 0, "existentes": 0}
+    for chave in chaves:
+        versao_destino = versoes_destino[chave]
+        if versao_destino != VERSAO_AUSENTE and not substituir:
+            resultado["existentes"] += 1
+            continue
+        dados = origem.ler(chave)
+        if dados is None:
+            continue
+        try:
+            # Condicional: não sobrescreve o que outra réplica gravou durante a cópia
+            destino.gravar(chave, dados, versao_esperada=versao_destino)
+            resultado["copiados"] += 1
+        except ConflitoVersao:
+            resultado["existentes"] += 1
+    return resultado
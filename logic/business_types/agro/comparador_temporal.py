@@ -7,26 +7,26 @@ Salva e compara análises de consultoria ao longo do tempo
 import streamlit as st
 import pandas as pd
 import json
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, date
 from typing import Dict, List, Optional, Tuple
 import uuid
 
+from logic.armazenamento import NAMESPACE_CACHE, Armazenamento, obter_armazenamento
+
 class ComparadorTemporalAgro:
     """
     Sistema para salvar e comparar análises de consultoria ao longo do tempo
     """
     
-    def __init__(self):
-        self.pasta_historico = "data_cache/historico_consultoria"
-        self.garantir_pasta_existe()
+    def __init__(self, armazenamento: Optional[Armazenamento] = None):
+        # Análises em 'historico_consultoria/' no mesmo armazenamento do cache
+        self.armazenamento = armazenamento or obter_armazenamento(NAMESPACE_CACHE)
+        self.pasta_historico = "historico_consultoria"
     
-    def garantir_pasta_existe(self):
-        """Garante que a pasta de histórico existe"""
-        if not os.path.exists(self.pasta_historico):
-            os.makedirs(self.pasta_historico, exist_ok=True)
+    def _chave(self, arquivo: str) -> str:
+        return f"{self.pasta_historico}/{arquivo}"
     
     def salvar_analise_consultoria(self, empresa: str, dados_dre: Dict, dados_plantio: Dict, 
                                  questionario: Dict, metricas_calculadas: Dict) -> str:
@@ -90,9 +90,7 @@ class ComparadorTemporalAgro:
         }
         
         # Salvar arquivo
-        caminho_arquivo = os.path.join(self.pasta_historico, arquivo_id)
-        with open(caminho_arquivo, 'w', encoding='utf-8') as f:
-            json.dump(analise_completa, f, ensure_ascii=False, indent=2)
+        self.armazenamento.gravar_json(self._chave(arquivo_id), analise_completa)
         
         return arquivo_id
     
@@ -132,15 +130,15 @@ class ComparadorTemporalAgro:
         """
         analises = []
         
-        if not os.path.exists(self.pasta_historico):
-            return analises
+        # Todas as análises lidas de uma vez (um lote só em backends remotos)
+        chaves = [chave for chave in self.armazenamento.listar(f"{self.pasta_historico}/") if chave.endswith('.json')]
+        conteudos = self.armazenamento.ler_varios(chaves)
         
-        for arquivo in os.listdir(self.pasta_historico):
-            if arquivo.endswith('.json'):
+        for chave in chaves:
+            if conteudos.get(chave) is not None:
+                arquivo = chave[len(self.pasta_historico) + 1:]
                 try:
-                    caminho = os.path.join(self.pasta_historico, arquivo)
-                    with open(caminho, 'r', encoding='utf-8') as f:
-                        dados = json.load(f)
+                    dados = json.loads(conteudos[chave].decode('utf-8'))
                     
                     if empresa is None or dados['metadata']['empresa'] == empresa:
                         analises.append({
@@ -161,9 +159,10 @@ class ComparadorTemporalAgro:
         """
         Carrega uma análise específica
         """
-        caminho = os.path.join(self.pasta_historico, arquivo)
-        with open(caminho, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        dados = self.armazenamento.ler_json(self._chave(arquivo))
+        if dados is None:
+            raise FileNotFoundError(self._chave(arquivo))
+        return dados
     
     def comparar_analises(self, analise1: Dict, analise2: Dict) -> Dict:
         """
@@ -328,10 +327,8 @@ class ComparadorTemporalAgro:
         Remove todos os arquivos de análise salvos
         """
         try:
-            import shutil
-            if os.path.exists(self.pasta_historico):
-                shutil.rmtree(self.pasta_historico)
-                self.garantir_pasta_existe()
+            for chave in self.armazenamento.listar(f"{self.pasta_historico}/"):
+                self.armazenamento.remover(chave)
             return True
         except Exception as e:
             print(f"Erro ao limpar histórico: {e}")
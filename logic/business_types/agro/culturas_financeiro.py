@@ -9,6 +9,11 @@ import time
 import uuid
 from .utils import formatar_valor_br, formatar_valor_simples_br
 from logic.data_cache_manager import DataCacheManager
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_DATA,
+    normalizar_transacoes,
+    validar_esquema_transacoes,
+)
 
 # Funções auxiliares para formatação
 def formatar_hectares_br(valor):
@@ -261,35 +266,20 @@ def separar_transacoes_realizadas_projetadas(df_transacoes: pd.DataFrame) -> Tup
     # Obter data atual
     data_atual = date.today()
     
-    # Converter coluna de data se existir
-    df_work = df_transacoes.copy()
-    
-    # Buscar coluna de data (pode ter nomes diferentes)
-    colunas_data = ['Data', 'data', 'Data Movimento', 'data_movimento', 'DataMovimento', 'date', 'Date']
-    coluna_data_encontrada = None
+    if COLUNA_DATA not in df_transacoes.columns:
+        # Se não tem coluna de data, considerar tudo como realizado
+        return df_transacoes, pd.DataFrame()
     
-    for col in colunas_data:
-        if col in df_work.columns:
-            coluna_data_encontrada = col
-            break
+    # Data já convertida para datetime64 na entrada dos dados
+    validar_esquema_transacoes(df_transacoes)
+    datas = df_transacoes[COLUNA_DATA].to_numpy()
+    inicio_amanha = np.datetime64(data_atual, "D") + np.timedelta64(1, "D")
     
-    if coluna_data_encontrada is None:
-        # Se não tem coluna de data, considerar tudo como realizado
-        return df_work, pd.DataFrame()
+    # Separar realizados (até hoje) e projetados (futuro); datas inválidas ficam de fora
+    realizados = df_transacoes[datas < inicio_amanha]
+    projetados = df_transacoes[datas >= inicio_amanha]
     
-    try:
-        # Converter para datetime
-        df_work[coluna_data_encontrada] = pd.to_datetime(df_work[coluna_data_encontrada], errors='coerce')
-        
-        # Separar realizados (até hoje) e projetados (futuro)
-        realizados = df_work[df_work[coluna_data_encontrada].dt.date <= data_atual]
-        projetados = df_work[df_work[coluna_data_encontrada].dt.date > data_atual]
-        
-        return realizados, projetados
-        
-    except Exception as e:
-        # Em caso de erro, considerar tudo como realizado
-        return df_work, pd.DataFrame()
+    return realizados, projetados
 
 def calcular_receita_por_cultura(dados_plantio: Dict, df_transacoes: pd.DataFrame, apenas_realizados: bool = False) -> Dict:
     """
@@ -1063,6 +1053,9 @@ def interface_analise_por_cultura():
         st.warning("⚠️ Nenhum dado financeiro encontrado no cache da empresa selecionada.")
         return
     
+    # Data em datetime64[ns] e chave do mês calculadas uma única vez
+    df_transacoes = normalizar_transacoes(df_transacoes)
+    
     # Obter dados de plantio do session_state
     dados_plantio = st.session_state.get('plantios_agro', {})
     
@@ -1494,4 +1487,4 @@ def exportar_analise_cultura(indicadores: Dict, receitas_cultura: Dict, custos_c
             'Status': get_status_cultura(ind['margem_percentual'])
         })
     
-    return pd.DataFrame(dados_export)
\ No newline at end of file
+    return pd.DataFrame(dados_export)
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Cache em memória dos arquivos de cache já lidos (DRE, fluxo, transações, pareceres)
+Um único LRU por processo, compartilhado por todas as sessões do Streamlit e
+limitado em entradas e em bytes. A chave é a versão do arquivo (caminho, mtime,
+tamanho e inode): qualquer regravação, inclusive por outro processo, muda a
+chave e a próxima leitura volta ao disco. Os valores são devolvidos como visões
+somente leitura, para que uma sessão não altere o que as outras recebem.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+PANDAS_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+
+class DicionarioSomenteLeitura(dict):
+    """dict que recusa alterações (cópias com dict(), .copy() ou copy.deepcopy são mutáveis)"""
+
+    def _somente_leitura(self, *args, **kwargs):
+        raise TypeError("Dados do cache são somente leitura; use copy.deepcopy() para editar")
+
+    __setitem__ = __delitem__ = _somente_leitura
+    update = pop = popitem = clear = setdefault = _somente_leitura
+    __ior__ = _somente_leitura
+
+    def com_campos(self, **campos) -> "DicionarioSomenteLeitura":
+        """Cópia somente leitura com campos acrescentados (o restante é compartilhado)"""
+        return DicionarioSomenteLeitura(self, **congelar(campos))
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copia_mutavel(self)
+
+    def __reduce__(self):
+        return (dict, (copia_mutavel(self),))
+
+
+class ListaSomenteLeitura(list):
+    """list que recusa alterações (cópias com list(), .copy() ou copy.deepcopy são mutáveis)"""
+
+    def _somente_leitura(self, *args, **kwargs):
+        raise TypeError("Dados do cache são somente leitura; use copy.deepcopy() para editar")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _somente_leitura
+    append = extend = insert = pop = remove = clear = sort = reverse = _somente_leitura
+
+    def copy(self):
+        return list(self)
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return copia_mutavel(self)
+
+    def __reduce__(self):
+        return (list, (copia_mutavel(self),))
+
+
+def congelar(valor):
+    """Converte dicts e listas (recursivamente) para as versões somente leitura"""
+    if isinstance(valor, (DicionarioSomenteLeitura, ListaSomenteLeitura)):
+        return valor
+    if isinstance(valor, dict):
+        return DicionarioSomenteLeitura((chave, congelar(item)) for chave, item in valor.items())
+    if isinstance(valor, list):
+        return ListaSomenteLeitura(congelar(item) for item in valor)
+    return valor
+
+
+def copia_mutavel(valor):
+    """Cópia profunda comum (dict/list) de um valor congelado"""
+    if isinstance(valor, dict):
+        return {chave: copia_mutavel(item) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [copia_mutavel(item) for item in valor]
+    return valor
+
+
+def visao_somente_leitura(valor):
+    """
+    Visão do valor guardado entregue a cada leitura
+
+    DataFrames saem como cópia rasa: com Copy-on-Write (pandas 3) alterações na
+    cópia não chegam ao cache; sem ele, a cópia precisa ser completa.
+    """
+    if isinstance(valor, pd.DataFrame):
+        copy_on_write = PANDAS_COPY_ON_WRITE or pd.get_option("mode.copy_on_write") is True
+        return valor.copy(deep=not copy_on_write)
+    return valor
+
+
+def tamanho_estimado(valor) -> int:
+    """Bytes ocupados por um valor guardado (DataFrame, texto ou estrutura JSON)"""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+
+    total, vistos, pendentes = 0, set(), [valor]
+    while pendentes:
+        item = pendentes.pop()
+        if id(item) in vistos:
+            continue
+        vistos.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            # Métodos de dict: visões montadas sob demanda (ex.: DreNormalizado) não são montadas aqui
+            pendentes.extend(dict.keys(item))
+            pendentes.extend(dict.values(item))
+        elif isinstance(item, (list, tuple)):
+            pendentes.extend(item)
+    return total
+
+
+def versao_leitura(caminho: str) -> Optional[tuple]:
+    """Versão do arquivo para o cache (caminho, mtime em ns, tamanho, inode) ou None se não existir"""
+    try:
+        info = os.stat(caminho)
+    except OSError:
+        return None
+    # O inode muda a cada os.replace: distingue regravações no mesmo instante com o mesmo tamanho
+    return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+class CacheLeituras:
+    """LRU de arquivos lidos e já convertidos, limitado em entradas e em bytes"""
+
+    def __init__(self, max_entradas: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        # chave -> (valor, bytes); chave = (caminho, leitor, variante) + versão
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # (caminho, leitor, variante) -> chave da versão guardada (versões antigas saem na hora)
+        self._atuais: Dict[Hashable, Hashable] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.descartes = 0
+
+    def _remover(self, chave: Hashable) -> None:
+        _, tamanho = self._entradas.pop(chave)
+        self.bytes -= tamanho
+        if self._atuais.get(chave[:3]) == chave:
+            del self._atuais[chave[:3]]
+
+    def obter_ou_carregar(self, caminho: str, leitor: str, carregar: Callable[[], Any],
+                          variante: Hashable = None) -> Optional[Any]:
+        """
+        Valor lido do arquivo, do cache enquanto o arquivo não mudar
+
+        Args:
+            caminho: Arquivo lido
+            leitor: Tipo de leitura (ex.: 'dre'); arquivos iguais lidos de jeitos diferentes não colidem
+            carregar: Função sem argumentos que lê e converte o arquivo (dicts e listas são congelados)
+            variante: Parâmetros da leitura (ex.: colunas e meses das transações)
+
+        Returns:
+            Visão somente leitura do valor, ou None se o arquivo não existir
+        """
+        versao = versao_leitura(caminho)
+        if versao is None:
+            return None
+        chave = (versao[0], leitor, variante) + versao[1:]
+
+        with self._lock:
+            if chave in self._entradas:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return visao_somente_leitura(self._entradas[chave][0])
+            self.faltas += 1
+
+        valor = congelar(carregar())
+        if valor is None or versao_leitura(caminho) != versao:
+            # Arquivo trocado durante a leitura: o valor vale só para esta chamada
+            return visao_somente_leitura(valor)
+
+        tamanho = tamanho_estimado(valor)
+        if tamanho <= self.max_bytes:
+            with self._lock:
+                anterior = self._atuais.get(chave[:3])
+                if anterior is not None and anterior in self._entradas:
+                    self._remover(anterior)
+                if chave not in self._entradas:
+                    self._entradas[chave] = (valor, tamanho)
+                    self._atuais[chave[:3]] = chave
+                    self.bytes += tamanho
+                while len(self._entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                    self._remover(next(iter(self._entradas)))
+                    self.descartes += 1
+        return visao_somente_leitura(valor)
+
+    def invalidar(self, caminho: str = None) -> None:
+        """Remove as entradas de um arquivo (ou todas)"""
+        with self._lock:
+            if caminho is None:
+                self._entradas.clear()
+                self._atuais.clear()
+                self.bytes = 0
+                return
+            caminho = os.path.abspath(caminho)
+            for chave in [c for c in self._entradas if c[0] == caminho]:
+                self._remover(chave)
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Contadores de uso e memória do cache"""
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "descartes": self.descartes,
+            }
+
+
+# Instância única do processo (compartilhada entre sessões e gerenciadores)
+cache_leituras = CacheLeituras()
@@ -0,0 +1,610 @@
+"""
+Armazenamento de categorizações e palavras-chave em SQLite
+Substitui a leitura/regravação completa de categorias_salvas.csv, dos CSVs por
+empresa e dos JSONs de categorias por licença. Os caminhos antigos continuam
+sendo usados como identificadores: cada arquivo vira um escopo no banco e é
+importado automaticamente uma única vez, no primeiro acesso. Depois disso o banco
+é a única fonte: mudanças nos arquivos legados (git pull, checkout) não são
+reimportadas sozinhas; migrar_categorias_sqlite.py mescla o que houver de novo.
+Com ARMAZENAMENTO_BACKEND=sqlite as tabelas ficam no banco do armazenamento,
+compartilhado pelas réplicas; o backend s3 é recusado (ver banco_sqlite_compartilhado).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import pandas as pd
+
+from logic.armazenamento import banco_sqlite_compartilhado
+
+# Banco usado com o backend de arquivos (com ARMAZENAMENTO_BACKEND=sqlite, o banco do backend)
+CAMINHO_BANCO_LOCAL = "./logic/CSVs/categorias.sqlite3"
+
+
+class CategoriaStore:
+    """Repositório SQLite de categorias (por escopo/tipo/chave) e palavras-chave"""
+
+    ESCOPO_PALAVRAS_CHAVE = "palavras_chave"
+
+    # Versão registrada para um arquivo legado que não existia na importação (só informativa)
+    ORIGEM_AUSENTE = "ausente"
+
+    def __init__(self, db_path: Optional[str] = None,
+                 palavras_chave_path: str = "./logic/CSVs/palavras_chave.csv"):
+        """
+        Args:
+            db_path: Banco SQLite (padrão: o compartilhado pelas réplicas, conforme
+                ARMAZENAMENTO_BACKEND; recusa o backend s3)
+            palavras_chave_path: CSV legado de palavras-chave
+        """
+        # O banco só é criado no primeiro uso (importar o módulo não grava nada)
+        self.db_path = db_path or banco_sqlite_compartilhado(CAMINHO_BANCO_LOCAL)
+        self.palavras_chave_path = palavras_chave_path
+        self._estrutura_criada = False
+        self._trava_estrutura = threading.Lock()
+
+    @contextmanager
+    def _conectar(self, imediato: bool = False):
+        """
+        Abre uma conexão em transação (commit ao final, rollback em caso de erro)
+
+        Args:
+            imediato: Começa com BEGIN IMMEDIATE (reserva a escrita antes das leituras
+                da transação: conferência e gravação sem outra sessão no meio)
+        """
+        self._garantir_estrutura()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            if imediato:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _garantir_estrutura(self):
+        """Cria o banco, as tabelas e os índices no primeiro uso"""
+        if self._estrutura_criada:
+            return
+        with self._trava_estrutura:
+            if self._estrutura_criada:
+                return
+            pasta = os.path.dirname(self.db_path)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                self._criar_estrutura(conn)
+                conn.commit()
+            finally:
+                conn.close()
+            self._estrutura_criada = True
+
+    @staticmethod
+    def _criar_estrutura(conn):
+        """Cria tabelas e índices se não existirem"""
+        conn.executescript("""
+                CREATE TABLE IF NOT EXISTS escopos (
+                    escopo TEXT PRIMARY KEY,
+                    versao INTEGER NOT NULL DEFAULT 0,
+                    origem TEXT,
+                    atualizado_em TEXT,
+                    versao_origem TEXT
+                );
+                CREATE TABLE IF NOT EXISTS categorias (
+                    escopo TEXT NOT NULL,
+                    tipo TEXT NOT NULL DEFAULT '',
+                    chave TEXT NOT NULL,
+                    categoria TEXT NOT NULL,
+                    atualizado_em TEXT,
+                    PRIMARY KEY (escopo, tipo, chave)
+                );
+                CREATE INDEX IF NOT EXISTS idx_categorias_escopo_tipo_categoria
+                    ON categorias (escopo, tipo, categoria);
+                CREATE TABLE IF NOT EXISTS palavras_chave (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    palavra TEXT NOT NULL,
+                    tipo TEXT NOT NULL,
+                    categoria TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_palavras_chave_tipo
+                    ON palavras_chave (tipo, palavra);
+            """)
+        # Bancos criados antes do controle de versão dos arquivos legados
+        colunas = {linha[1] for linha in conn.execute("PRAGMA table_info(escopos)")}
+        if "versao_origem" not in colunas:
+            conn.execute("ALTER TABLE escopos ADD COLUMN versao_origem TEXT")
+
+    # ------------------------------------------------------------------
+    # Escopos e versões
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def escopo_do_arquivo(caminho: str) -> str:
+        """
+        Converte o caminho de um arquivo legado no escopo usado no banco
+
+        Args:
+            caminho: Caminho do CSV/JSON de categorias
+
+        Returns:
+            'licenca:<nome>', 'empresa:<nome>', 'global' ou 'arquivo:<caminho>'
+        """
+        caminho_norm = os.path.normpath(caminho).replace("\\", "/")
+        nome_arquivo = os.path.basename(caminho_norm)
+
+        licenca = re.match(r"categorias_(.+)\.json$", nome_arquivo)
+        if licenca:
+            return f"licenca:{licenca.group(1)}"
+
+        empresa = re.search(r"empresas/([^/]+)/categorias_salvas\.csv$", caminho_norm)
+        if empresa:
+            return f"empresa:{empresa.group(1)}"
+
+        if nome_arquivo == "categorias_salvas.csv":
+            return "global"
+
+        return f"arquivo:{caminho_norm}"
+
+    def _incrementar_versao(self, conn, escopo: str, origem: str = None):
+        """Incrementa a versão do escopo dentro da transação corrente"""
+        conn.execute("""
+            INSERT INTO escopos (escopo, versao, origem, atualizado_em) VALUES (?, 1, ?, ?)
+            ON CONFLICT(escopo) DO UPDATE SET versao = versao + 1, atualizado_em = excluded.atualizado_em
+        """, (escopo, origem, datetime.now().isoformat()))
+
+    @classmethod
+    def _versao_origem(cls, caminho: Optional[str]) -> str:
+        """Versão (mtime e tamanho) do arquivo legado ou ORIGEM_AUSENTE"""
+        try:
+            info = os.stat(caminho) if caminho else None
+        except OSError:
+            info = None
+        return f"{info.st_mtime_ns}-{info.st_size}" if info else cls.ORIGEM_AUSENTE
+
+    def _garantir_migrado(self, escopo: str, caminho: Optional[str]):
+        """
+        Importa o arquivo legado uma única vez, no primeiro acesso ao escopo
+
+        Conferência e importação acontecem na mesma transação (BEGIN IMMEDIATE),
+        com a linha do escopo em 'escopos' como marcador: duas sessões acessando
+        o escopo pela primeira vez não importam duas vezes. Com o escopo já
+        registrado o banco nunca é sobrescrito a partir do arquivo.
+        """
+        if escopo == self.ESCOPO_PALAVRAS_CHAVE:
+            caminho = caminho or self.palavras_chave_path
+
+        # Caminho rápido (só leitura): escopo já importado
+        with self._conectar() as conn:
+            if conn.execute("SELECT 1 FROM escopos WHERE escopo = ?", (escopo,)).fetchone() is not None:
+                return
+
+        with self._conectar(imediato=True) as conn:
+            novo = conn.execute(
+                "INSERT OR IGNORE INTO escopos (escopo, versao, origem, atualizado_em) VALUES (?, 0, ?, ?)",
+                (escopo, caminho, datetime.now().isoformat())
+            ).rowcount == 1
+            if not novo:
+                return
+
+            versao_origem = self._versao_origem(caminho)
+            if versao_origem != self.ORIGEM_AUSENTE:
+                if escopo == self.ESCOPO_PALAVRAS_CHAVE:
+                    self._mesclar_palavras_chave(conn, caminho, self._ler_palavras_chave(caminho))
+                else:
+                    self._mesclar_escopo(conn, escopo, caminho, self._ler_arquivo_categorias(caminho))
+            self._registrar_origem(conn, escopo, versao_origem)
+
+    @staticmethod
+    def _registrar_origem(conn, escopo: str, versao_origem: str):
+        conn.execute("UPDATE escopos SET versao_origem = ? WHERE escopo = ?", (versao_origem, escopo))
+
+    def versao(self, caminho: str) -> Tuple[str, int]:
+        """
+        Retorna a versão atual das categorias de um arquivo (muda a cada gravação)
+
+        Args:
+            caminho: Caminho legado do arquivo de categorias
+
+        Returns:
+            Tupla (escopo, versão)
+        """
+        escopo = self.escopo_do_arquivo(caminho)
+        self._garantir_migrado(escopo, caminho)
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT versao FROM escopos WHERE escopo = ?", (escopo,)).fetchone()
+        return (escopo, linha[0] if linha else 0)
+
+    # ------------------------------------------------------------------
+    # Categorias
+    # ------------------------------------------------------------------
+
+    def carregar_categorias(self, caminho: str, tipo: str = None) -> pd.DataFrame:
+        """
+        Carrega as categorias salvas no formato do antigo CSV
+
+        Args:
+            caminho: Caminho legado do arquivo de categorias
+            tipo: Filtra pelo tipo de lançamento (opcional)
+
+        Returns:
+            DataFrame com colunas Descricao, Tipo e Categoria (ordem de gravação)
+        """
+        escopo = self.escopo_do_arquivo(caminho)
+        self._garantir_migrado(escopo, caminho)
+
+        sql = "SELECT chave AS Descricao, tipo AS Tipo, categoria AS Categoria FROM categorias WHERE escopo = ?"
+        parametros = [escopo]
+        if tipo is not None:
+            sql += " AND tipo = ?"
+            parametros.append(tipo)
+        sql += " ORDER BY rowid"
+
+        with self._conectar() as conn:
+            return pd.read_sql_query(sql, conn, params=parametros)
+
+    def carregar_mapa(self, caminho: str, tipo: str = None) -> Dict[str, str]:
+        """
+        Carrega as categorias como dicionário chave -> categoria
+
+        Args:
+            caminho: Caminho legado do arquivo de categorias
+            tipo: Filtra pelo tipo de lançamento (opcional)
+
+        Returns:
+            Dicionário chave -> categoria
+        """
+        df = self.carregar_categorias(caminho, tipo)
+        return dict(zip(df["Descricao"], df["Categoria"]))
+
+    def salvar_categorias(self, caminho: str, categorias: Union[pd.DataFrame, Dict[str, str]], tipo: str = "") -> int:
+        """
+        Grava (insere ou atualiza) categorias em uma única transação
+
+        Chaves com categoria vazia (ou ausente) são removidas do escopo: é assim
+        que uma categoria limpa pelo usuário deixa de valer.
+
+        Args:
+            caminho: Caminho legado do arquivo de categorias
+            categorias: DataFrame (Descricao, Tipo, Categoria) ou dicionário chave -> categoria
+            tipo: Tipo usado quando categorias é um dicionário
+
+        Returns:
+            Quantidade de registros gravados ou removidos
+        """
+        if isinstance(categorias, dict):
+            registros = [(tipo, chave, categoria) for chave, categoria in categorias.items()]
+        else:
+            registros = list(zip(categorias["Tipo"].fillna(""), categorias["Descricao"], categorias["Categoria"]))
+
+        gravar, remover = [], []
+        for t, chave, categoria in registros:
+            if pd.isna(chave) or not str(chave).strip():
+                continue
+            if pd.isna(categoria) or not str(categoria).strip():
+                remover.append((str(t), str(chave).strip()))
+            else:
+                gravar.append((str(t), str(chave).strip(), str(categoria).strip()))
+        if not gravar and not remover:
+            return 0
+
+        escopo = self.escopo_do_arquivo(caminho)
+        self._garantir_migrado(escopo, caminho)
+        agora = datetime.now().isoformat()
+        with self._conectar() as conn:
+            alterados = 0
+            if remover:
+                alterados += conn.executemany(
+                    "DELETE FROM categorias WHERE escopo = ? AND tipo = ? AND chave = ?",
+                    [(escopo, t, chave) for t, chave in remover]
+                ).rowcount
+            if gravar:
+                conn.executemany("""
+                    INSERT INTO categorias (escopo, tipo, chave, categoria, atualizado_em) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(escopo, tipo, chave) DO UPDATE SET
+                        categoria = excluded.categoria, atualizado_em = excluded.atualizado_em
+                """, [(escopo, t, chave, categoria, agora) for t, chave, categoria in gravar])
+                alterados += len(gravar)
+            if alterados:
+                self._incrementar_versao(conn, escopo, caminho)
+        return alterados
+
+    def remover_categorias(self, caminho: str, tipo: str = None, descricao: str = None, categoria: str = None) -> int:
+        """
+        Remove categorias do escopo conforme os filtros informados
+
+        Args:
+            caminho: Caminho legado do arquivo de categorias
+            tipo: Tipo de lançamento (opcional)
+            descricao: Chave/descrição específica (opcional)
+            categoria: Remove todas as chaves desta categoria (opcional)
+
+        Returns:
+            Quantidade de registros removidos
+        """
+        escopo = self.escopo_do_arquivo(caminho)
+        self._garantir_migrado(escopo, caminho)
+
+        sql = "DELETE FROM categorias WHERE escopo = ?"
+        parametros = [escopo]
+        for coluna, valor in (("tipo", tipo), ("chave", descricao), ("categoria", categoria)):
+            if valor is not None:
+                sql += f" AND {coluna} = ?"
+                parametros.append(valor)
+
+        with self._conectar() as conn:
+            removidos = conn.execute(sql, parametros).rowcount
+            if removidos:
+                self._incrementar_versao(conn, escopo, caminho)
+        return removidos
+
+    # ------------------------------------------------------------------
+    # Palavras-chave
+    # ------------------------------------------------------------------
+
+    def versao_palavras_chave(self) -> Tuple[str, int]:
+        """Retorna a versão atual das palavras-chave"""
+        return self.versao_escopo(self.ESCOPO_PALAVRAS_CHAVE)
+
+    def versao_escopo(self, escopo: str) -> Tuple[str, int]:
+        """Retorna a versão de um escopo já conhecido (sem caminho legado)"""
+        self._garantir_migrado(escopo, None)
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT versao FROM escopos WHERE escopo = ?", (escopo,)).fetchone()
+        return (escopo, linha[0] if linha else 0)
+
+    def carregar_palavras_chave(self) -> pd.DataFrame:
+        """
+        Carrega as palavras-chave no formato do antigo CSV
+
+        Returns:
+            DataFrame com colunas PalavraChave, Tipo e Categoria (ordem de cadastro)
+        """
+        self._garantir_migrado(self.ESCOPO_PALAVRAS_CHAVE, None)
+        with self._conectar() as conn:
+            return pd.read_sql_query(
+                "SELECT palavra AS PalavraChave, tipo AS Tipo, categoria AS Categoria FROM palavras_chave ORDER BY id",
+                conn
+            )
+
+    def adicionar_palavra_chave(self, palavra: str, tipo: str, categoria: str) -> bool:
+        """Cadastra uma nova palavra-chave ao final da lista"""
+        if not palavra or not categoria:
+            return False
+        self._garantir_migrado(self.ESCOPO_PALAVRAS_CHAVE, None)
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO palavras_chave (palavra, tipo, categoria) VALUES (?, ?, ?)",
+                (palavra, tipo, categoria)
+            )
+            self._incrementar_versao(conn, self.ESCOPO_PALAVRAS_CHAVE)
+        return True
+
+    def remover_palavra_chave(self, palavra: str) -> int:
+        """Remove todas as ocorrências de uma palavra-chave"""
+        self._garantir_migrado(self.ESCOPO_PALAVRAS_CHAVE, None)
+        with self._conectar() as conn:
+            removidos = conn.execute("DELETE FROM palavras_chave WHERE palavra = ?", (palavra,)).rowcount
+            if removidos:
+                self._incrementar_versao(conn, self.ESCOPO_PALAVRAS_CHAVE)
+        return removidos
+
+    # ------------------------------------------------------------------
+    # Migração dos arquivos legados
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _ler_csv_categorias(caminho: str) -> list:
+        """Registros (tipo, chave, categoria) de um CSV de categorias; na duplicidade prevalece a primeira linha"""
+        df = pd.read_csv(caminho)
+        if df.empty or not {"Descricao", "Tipo", "Categoria"}.issubset(df.columns):
+            df = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
+        df = df.dropna(subset=["Descricao", "Categoria"]).drop_duplicates(subset=["Descricao", "Tipo"], keep="first")
+        return list(zip(df["Tipo"].fillna(""), df["Descricao"], df["Categoria"]))
+
+    @staticmethod
+    def _ler_json_licenca(caminho: str) -> list:
+        """Registros (tipo, chave, categoria) de um JSON de categorias de licença"""
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f) or {}
+        return [("", chave, categoria) for chave, categoria in dados.items()]
+
+    def _ler_arquivo_categorias(self, caminho: str) -> list:
+        if caminho.endswith(".json"):
+            return self._ler_json_licenca(caminho)
+        return self._ler_csv_categorias(caminho)
+
+    @staticmethod
+    def _ler_palavras_chave(caminho: str) -> pd.DataFrame:
+        if os.path.exists(caminho):
+            return pd.read_csv(caminho).dropna(subset=["PalavraChave", "Categoria"])
+        return pd.DataFrame(columns=["PalavraChave", "Tipo", "Categoria"])
+
+    def importar_csv_categorias(self, caminho: str, substituir: bool = False) -> int:
+        """
+        Importa um CSV de categorias (Descricao, Tipo, Categoria) para o seu escopo
+
+        Na duplicidade de (Descricao, Tipo) prevalece a primeira linha, como na leitura antiga.
+
+        Args:
+            caminho: Caminho do CSV
+            substituir: Apagar o escopo antes (padrão: mesclar, mantendo o que já está no banco)
+
+        Returns:
+            Quantidade de registros importados
+        """
+        return self._importar_arquivo(caminho, self._ler_csv_categorias(caminho), substituir)
+
+    def importar_json_licenca(self, caminho: str, substituir: bool = False) -> int:
+        """
+        Importa um JSON de categorias de licença (dicionário chave -> categoria)
+
+        Args:
+            caminho: Caminho do JSON
+            substituir: Apagar o escopo antes (padrão: mesclar, mantendo o que já está no banco)
+
+        Returns:
+            Quantidade de registros importados
+        """
+        return self._importar_arquivo(caminho, self._ler_json_licenca(caminho), substituir)
+
+    def importar_palavras_chave(self, caminho: str, substituir: bool = False) -> int:
+        """
+        Importa o CSV de palavras-chave
+
+        Args:
+            caminho: Caminho do CSV
+            substituir: Apagar as palavras-chave antes (padrão: incluir só as de
+                (palavra, tipo) ainda não cadastradas)
+
+        Returns:
+            Quantidade de palavras-chave importadas
+        """
+        df = self._ler_palavras_chave(caminho)
+        with self._conectar(imediato=True) as conn:
+            self._marcar_escopo(conn, self.ESCOPO_PALAVRAS_CHAVE, caminho)
+            if substituir:
+                conn.execute("DELETE FROM palavras_chave")
+            return self._mesclar_palavras_chave(conn, caminho, df)
+
+    def _importar_arquivo(self, caminho: str, registros: list, substituir: bool) -> int:
+        escopo = self.escopo_do_arquivo(caminho)
+        with self._conectar(imediato=True) as conn:
+            self._marcar_escopo(conn, escopo, caminho)
+            if substituir:
+                conn.execute("DELETE FROM categorias WHERE escopo = ?", (escopo,))
+            return self._mesclar_escopo(conn, escopo, caminho, registros)
+
+    def _marcar_escopo(self, conn, escopo: str, caminho: str):
+        """Registra o escopo como importado (a importação automática não volta a acontecer)"""
+        conn.execute(
+            "INSERT OR IGNORE INTO escopos (escopo, versao, origem, atualizado_em) VALUES (?, 0, ?, ?)",
+            (escopo, caminho, datetime.now().isoformat())
+        )
+        self._registrar_origem(conn, escopo, self._versao_origem(caminho))
+
+    def _mesclar_palavras_chave(self, conn, origem: str, df: pd.DataFrame) -> int:
+        """Inclui as palavras-chave cujo (palavra, tipo) ainda não existe (dentro da transação corrente)"""
+        incluidas = 0
+        for palavra, tipo, categoria in zip(df["PalavraChave"], df["Tipo"].fillna(""), df["Categoria"]):
+            incluidas += conn.execute("""
+                INSERT INTO palavras_chave (palavra, tipo, categoria)
+                SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM palavras_chave WHERE palavra = ? AND tipo = ?)
+            """, (str(palavra), str(tipo), str(categoria), str(palavra), str(tipo))).rowcount
+        self._incrementar_versao(conn, self.ESCOPO_PALAVRAS_CHAVE, origem)
+        return incluidas
+
+    def _mesclar_escopo(self, conn, escopo: str, origem: str, registros: Iterable) -> int:
+        """Inclui os registros cuja chave ainda não existe no escopo (dentro da transação corrente)"""
+        agora = datetime.now().isoformat()
+        linhas = [
+            (escopo, str(t), str(chave).strip(), str(categoria).strip(), agora)
+            for t, chave, categoria in registros
+            if str(chave).strip() and str(categoria).strip()
+        ]
+        antes = conn.total_changes
+        conn.executemany("""
+            INSERT INTO categorias (escopo, tipo, chave, categoria, atualizado_em) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(escopo, tipo, chave) DO NOTHING
+        """, linhas)
+        incluidas = conn.total_changes - antes
+        self._incrementar_versao(conn, escopo, origem)
+        return incluidas
+
+    def mesclar_banco(self, db_path_origem: str) -> Dict[str, int]:
+        """
+        Mescla outro banco de categorias neste (ex.: o banco local ao passar para o backend sqlite)
+
+        Escopos, chaves e palavras-chave que já existem aqui são mantidos.
+
+        Args:
+            db_path_origem: Banco de origem
+
+        Returns:
+            Dicionário com as quantidades 'escopos', 'categorias' e 'palavras_chave' incluídas
+        """
+        if os.path.abspath(db_path_origem) == os.path.abspath(self.db_path):
+            return {"escopos": 0, "categorias": 0, "palavras_chave": 0}
+        origem = sqlite3.connect(db_path_origem)
+        try:
+            escopos = origem.execute("SELECT escopo, versao, origem, atualizado_em, versao_origem FROM escopos").fetchall()
+            categorias = origem.execute(
+                "SELECT escopo, tipo, chave, categoria, atualizado_em FROM categorias ORDER BY rowid"
+            ).fetchall()
+            palavras = origem.execute("SELECT palavra, tipo, categoria FROM palavras_chave ORDER BY id").fetchall()
+        finally:
+            origem.close()
+
+        with self._conectar(imediato=True) as conn:
+            antes = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO escopos VALUES (?, ?, ?, ?, ?)", escopos)
+            resultado = {"escopos": conn.total_changes - antes}
+
+            antes = conn.total_changes
+            conn.executemany("""
+                INSERT INTO categorias (escopo, tipo, chave, categoria, atualizado_em) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(escopo, tipo, chave) DO NOTHING
+            """, categorias)
+            resultado["categorias"] = conn.total_changes - antes
+
+            df_palavras = pd.DataFrame(palavras, columns=["PalavraChave", "Tipo", "Categoria"])
+            resultado["palavras_chave"] = self._mesclar_palavras_chave(conn, db_path_origem, df_palavras)
+
+            for escopo in {linha[0] for linha in categorias} - {self.ESCOPO_PALAVRAS_CHAVE}:
+                self._incrementar_versao(conn, escopo, db_path_origem)
+        return resultado
+
+    def migrar_arquivos_legados(self, base_dir: str = "./logic/CSVs", substituir: bool = False) -> Dict[str, int]:
+        """
+        Importa todos os arquivos legados (CSV global, CSVs por empresa, JSONs
+        por licença e palavras-chave)
+
+        Por padrão mescla: só entram chaves e palavras-chave que ainda não existem
+        no banco, e nada gravado pelo app é apagado.
+
+        Args:
+            base_dir: Diretório base dos CSVs
+            substituir: Substituir o conteúdo dos escopos pelo dos arquivos
+
+        Returns:
+            Dicionário escopo -> quantidade de registros importados
+        """
+        resultado = {}
+
+        caminho_global = os.path.join(base_dir, "categorias_salvas.csv")
+        if os.path.exists(caminho_global):
+            resultado[self.escopo_do_arquivo(caminho_global)] = self.importar_csv_categorias(caminho_global, substituir)
+
+        dir_empresas = os.path.join(base_dir, "empresas")
+        if os.path.isdir(dir_empresas):
+            for empresa in sorted(os.listdir(dir_empresas)):
+                caminho = os.path.join(dir_empresas, empresa, "categorias_salvas.csv")
+                if os.path.exists(caminho):
+                    resultado[self.escopo_do_arquivo(caminho)] = self.importar_csv_categorias(caminho, substituir)
+
+        dir_licencas = os.path.join(base_dir, "licencas")
+        if os.path.isdir(dir_licencas):
+            for arquivo in sorted(os.listdir(dir_licencas)):
+                if arquivo.startswith("categorias_") and arquivo.endswith(".json"):
+                    caminho = os.path.join(dir_licencas, arquivo)
+                    resultado[self.escopo_do_arquivo(caminho)] = self.importar_json_licenca(caminho, substituir)
+
+        caminho_palavras = os.path.join(base_dir, "palavras_chave.csv")
+        if os.path.exists(caminho_palavras):
+            resultado[self.ESCOPO_PALAVRAS_CHAVE] = self.importar_palavras_chave(caminho_palavras, substituir)
+        return resultado
+
+
+# Instância global do repositório
+categoria_store = CategoriaStore()
@@ -0,0 +1,312 @@
+"""
+Cubo de agregados das transações de uma licença (estilo OLAP)
+Dimensões codificadas por dicionário (mês, categoria, Categoria_Vyco, tipo,
+descrição, Considerar e sinal do valor) e medidas soma, contagem, mínimo e
+máximo por célula. Qualquer agregação ou recorte é calculado sobre as células,
+sem voltar às transações. O cubo é salvo no armazenamento e, quando as transações
+mudam, apenas os meses cuja assinatura mudou são reagrupados.
+"""
+
+import io
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_MES,
+    COLUNA_VALOR,
+    chave_de_rotulo,
+    rotulo_mes,
+    validar_esquema_transacoes,
+)
+from logic.Analises_DFC_DRE.memo_categorizacao import (
+    CacheCategorizacao,
+    fingerprint_transacoes,
+    obter_id_sessao,
+)
+from logic.agregados_mensais import agrupar_por_mes, assinaturas_mensais
+from logic.armazenamento import NAMESPACE_CACHE, Armazenamento, obter_armazenamento
+
+# Incrementar sempre que as dimensões ou medidas mudarem (invalida os cubos salvos)
+VERSAO_CUBO = 1
+
+DIMENSAO_MES = "Mes"
+DIMENSAO_SINAL = "Sinal"
+# Dimensões lidas diretamente das colunas das transações
+DIMENSOES_COLUNAS = ["Categoria", "Categoria_Vyco", "Tipo", "Descrição", "Considerar"]
+DIMENSOES = [DIMENSAO_MES] + DIMENSOES_COLUNAS + [DIMENSAO_SINAL]
+MEDIDAS = ["soma", "contagem", "minimo", "maximo"]
+
+SINAL_ENTRADA = "Entrada"
+SINAL_SAIDA = "Saída"
+SINAL_ZERO = "Zero"
+
+
+def _codificar(valores: np.ndarray, dicionario: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Códigos dos valores no dicionário, acrescentando os valores novos ao final
+
+    Valores ausentes recebem o código -1; os códigos existentes não mudam.
+
+    Returns:
+        Tupla (códigos, dicionário estendido)
+    """
+    ausentes = pd.isna(valores)
+    textos = np.where(ausentes, "", valores.astype(str))
+    codigos = pd.Index(dicionario).get_indexer(textos)
+    novos = pd.unique(textos[(codigos < 0) & ~ausentes])
+    if len(novos):
+        dicionario = np.concatenate([dicionario, np.asarray(novos, dtype=object)])
+        codigos = pd.Index(dicionario).get_indexer(textos)
+    return np.where(ausentes, -1, codigos).astype(np.int32), dicionario
+
+
+def _sinais(valores: np.ndarray) -> np.ndarray:
+    return np.where(valores > 0, SINAL_ENTRADA, np.where(valores < 0, SINAL_SAIDA, SINAL_ZERO))
+
+
+class CuboAgregados:
+    """Células (combinação de dimensões) com soma, contagem, mínimo e máximo dos valores"""
+
+    def __init__(self, dicionarios: Dict[str, np.ndarray], codigos: Dict[str, np.ndarray],
+                 medidas: Dict[str, np.ndarray], assinaturas: Dict[str, str]):
+        """
+        Args:
+            dicionarios: Valores distintos de cada dimensão (exceto Mes, codificado pela chave do mês)
+            codigos: Código de cada célula por dimensão (-1 = valor ausente)
+            medidas: Arrays soma, contagem, minimo e maximo por célula
+            assinaturas: Assinatura das transações de cada mês ('AAAA-MM' -> assinatura)
+        """
+        self.dicionarios = dicionarios
+        self.codigos = codigos
+        self.medidas = medidas
+        self.assinaturas = assinaturas
+
+    @property
+    def vazio(self) -> bool:
+        return self.medidas["contagem"].size == 0
+
+    @property
+    def meses(self) -> List[str]:
+        return rotulo_mes(np.unique(self.codigos[DIMENSAO_MES]))
+
+    def valores_dimensao(self, dimensao: str) -> List:
+        """Valores presentes em uma dimensão (meses como 'AAAA-MM')"""
+        if dimensao == DIMENSAO_MES:
+            return self.meses
+        presentes = np.unique(self.codigos[dimensao])
+        return self.dicionarios[dimensao][presentes[presentes >= 0]].tolist()
+
+    def _mascara(self, filtros: Optional[Dict]) -> np.ndarray:
+        """Células que atendem aos filtros (dimensão -> valor ou lista de valores)"""
+        mascara = np.ones(len(self.medidas["contagem"]), dtype=bool)
+        for dimensao, aceitos in (filtros or {}).items():
+            if dimensao not in DIMENSOES:
+                raise KeyError(f"Dimensão desconhecida: {dimensao}")
+            aceitos = [aceitos] if isinstance(aceitos, str) or not isinstance(aceitos, Iterable) else list(aceitos)
+            if dimensao == DIMENSAO_MES:
+                codigos = np.array([chave_de_rotulo(mes) for mes in aceitos], dtype=np.int64)
+            else:
+                codigos = pd.Index(self.dicionarios[dimensao]).get_indexer([str(v) for v in aceitos])
+                codigos = codigos[codigos >= 0]
+            mascara &= np.isin(self.codigos[dimensao], codigos)
+        return mascara
+
+    def agregar(self, por: Iterable[str] = (), filtros: Optional[Dict] = None,
+                medidas: Iterable[str] = MEDIDAS) -> pd.DataFrame:
+        """
+        Agregação (roll-up) das células pelas dimensões pedidas, após os filtros
+
+        Args:
+            por: Dimensões mantidas (as demais são somadas)
+            filtros: Recorte por dimensão (ex.: {'Sinal': 'Entrada', 'Mes': ['2025-01', '2025-02']})
+            medidas: Medidas devolvidas
+
+        Returns:
+            DataFrame indexado pelas dimensões (uma linha, sem índice nomeado, se 'por' for vazio)
+        """
+        por, medidas = list(por), list(medidas)
+        mascara = self._mascara(filtros)
+        celulas = pd.DataFrame({f"__{d}": self.codigos[d][mascara] for d in por})
+        for medida in MEDIDAS:
+            celulas[medida] = self.medidas[medida][mascara]
+
+        regras = {"soma": "sum", "contagem": "sum", "minimo": "min", "maximo": "max"}
+        if not por:
+            return pd.DataFrame({medida: [celulas[medida].agg(regras[medida])] for medida in medidas})
+
+        agregado = celulas.groupby([f"__{d}" for d in por], sort=True).agg(regras)[medidas]
+        niveis = []
+        for posicao, dimensao in enumerate(por):
+            codigos = agregado.index.get_level_values(posicao).to_numpy()
+            if dimensao == DIMENSAO_MES:
+                niveis.append(rotulo_mes(codigos))
+            else:
+                rotulos = self.dicionarios[dimensao][np.maximum(codigos, 0)].astype(object)
+                niveis.append(np.where(codigos >= 0, rotulos, None))
+        agregado.index = pd.MultiIndex.from_arrays(niveis, names=por) if len(por) > 1 else pd.Index(niveis[0], name=por[0])
+        # Códigos seguem a ordem de chegada dos valores: ordenar pelos rótulos
+        return agregado.sort_index()
+
+    def tabela(self, linhas: str, colunas: str = DIMENSAO_MES, medida: str = "soma",
+               filtros: Optional[Dict] = None) -> pd.DataFrame:
+        """Tabela cruzada de uma medida (ex.: Categoria x Mes), com zero nas combinações vazias"""
+        agregado = self.agregar([linhas, colunas], filtros, [medida])[medida]
+        return agregado.unstack(colunas, fill_value=0)
+
+
+def _agrupar_celulas(df_transacoes: pd.DataFrame, posicoes: np.ndarray,
+                     dicionarios: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """Agrupa as transações indicadas em células, estendendo os dicionários"""
+    valores = df_transacoes[COLUNA_VALOR].to_numpy(dtype=np.float64)[posicoes]
+    colunas = {DIMENSAO_MES: df_transacoes[COLUNA_MES].to_numpy()[posicoes].astype(np.int32)}
+    dicionarios = dict(dicionarios)
+    brutos = {
+        dimensao: (df_transacoes[dimensao].to_numpy(dtype=object)[posicoes]
+                   if dimensao in df_transacoes.columns else np.full(len(posicoes), None, dtype=object))
+        for dimensao in DIMENSOES_COLUNAS
+    }
+    brutos[DIMENSAO_SINAL] = _sinais(valores).astype(object)
+    for dimensao, valores_dimensao in brutos.items():
+        colunas[dimensao], dicionarios[dimensao] = _codificar(valores_dimensao, dicionarios[dimensao])
+
+    transacoes = pd.DataFrame(colunas)
+    transacoes["valor"] = valores
+    agregado = transacoes.groupby(DIMENSOES, sort=True)["valor"].agg(["sum", "size", "min", "max"])
+    codigos = {
+        dimensao: agregado.index.get_level_values(dimensao).to_numpy(np.int32) for dimensao in DIMENSOES
+    }
+    medidas = {
+        "soma": agregado["sum"].to_numpy(np.float64),
+        "contagem": agregado["size"].to_numpy(np.int64),
+        "minimo": agregado["min"].to_numpy(np.float64),
+        "maximo": agregado["max"].to_numpy(np.float64),
+    }
+    return dicionarios, codigos, medidas
+
+
+def atualizar_cubo(anterior: Optional[CuboAgregados], df_transacoes: pd.DataFrame) -> Tuple[CuboAgregados, List[str]]:
+    """
+    Cubo das transações, reaproveitando as células dos meses que não mudaram
+
+    Args:
+        anterior: Cubo anterior (None = construir do zero)
+        df_transacoes: Transações no esquema canônico
+
+    Returns:
+        Tupla (cubo atualizado, meses reagrupados)
+    """
+    validar_esquema_transacoes(df_transacoes)
+    grupos = agrupar_por_mes(df_transacoes)
+    assinaturas = assinaturas_mensais(df_transacoes, grupos)
+
+    if anterior is None:
+        dicionarios = {d: np.array([], dtype=object) for d in DIMENSOES_COLUNAS + [DIMENSAO_SINAL]}
+        anterior = CuboAgregados(dicionarios, {d: np.array([], dtype=np.int32) for d in DIMENSOES},
+                                 {m: np.array([], dtype=np.int64 if m == "contagem" else np.float64) for m in MEDIDAS},
+                                 {})
+
+    recalculados = [mes for mes, assinatura in assinaturas.items() if anterior.assinaturas.get(mes) != assinatura]
+    mantidos = [chave_de_rotulo(mes) for mes in assinaturas if mes not in recalculados]
+    if not recalculados and len(mantidos) == len(anterior.assinaturas):
+        return anterior, []
+
+    manter = np.isin(anterior.codigos[DIMENSAO_MES], mantidos)
+    posicoes = np.concatenate([grupos[mes] for mes in recalculados] or [np.array([], dtype=np.int64)])
+    dicionarios, codigos, medidas = _agrupar_celulas(df_transacoes, posicoes, anterior.dicionarios)
+
+    codigos = {d: np.concatenate([anterior.codigos[d][manter], codigos[d]]) for d in DIMENSOES}
+    medidas = {m: np.concatenate([anterior.medidas[m][manter], medidas[m]]) for m in MEDIDAS}
+    ordem = np.argsort(codigos[DIMENSAO_MES], kind="stable")
+    cubo = CuboAgregados(
+        dicionarios,
+        {d: c[ordem] for d, c in codigos.items()},
+        {m: v[ordem] for m, v in medidas.items()},
+        assinaturas,
+    )
+    return cubo, recalculados
+
+
+def construir_cubo(df_transacoes: pd.DataFrame) -> CuboAgregados:
+    """Cubo das transações (do zero)"""
+    return atualizar_cubo(None, df_transacoes)[0]
+
+
+class CubosPersistidos:
+    """Cubos de agregados salvos por empresa (.npz, sem objetos Python)"""
+
+    def __init__(self, armazenamento: Optional[Armazenamento] = None, pasta: str = "cubos"):
+        self.armazenamento = armazenamento or obter_armazenamento(NAMESPACE_CACHE)
+        self.pasta = pasta
+
+    def _chave(self, empresa_nome: str) -> str:
+        nome = re.sub(r'[<>:"/\\|?*]', '_', empresa_nome).strip()
+        return f"{self.pasta}/{nome}_cubo.npz"
+
+    def carregar(self, empresa_nome: str) -> Optional[CuboAgregados]:
+        """Cubo salvo da empresa (None se inexistente, ilegível ou de outra versão)"""
+        try:
+            caminho = self.armazenamento.caminho_local(self._chave(empresa_nome))
+            if caminho is None:
+                return None
+            with np.load(caminho, allow_pickle=False) as dados:
+                if int(dados["versao"]) != VERSAO_CUBO:
+                    return None
+                return CuboAgregados(
+                    {d: dados[f"dicionario_{d}"].astype(object) for d in DIMENSOES_COLUNAS + [DIMENSAO_SINAL]},
+                    {d: dados[f"codigo_{d}"] for d in DIMENSOES},
+                    {m: dados[f"medida_{m}"] for m in MEDIDAS},
+                    dict(zip(dados["assinatura_meses"].tolist(), dados["assinatura_valores"].tolist())),
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def salvar(self, empresa_nome: str, cubo: CuboAgregados) -> str:
+        """Grava o cubo da empresa (devolve a chave)"""
+        chave = self._chave(empresa_nome)
+        arrays = {"versao": np.array(VERSAO_CUBO)}
+        arrays.update({f"dicionario_{d}": v.astype(str) for d, v in cubo.dicionarios.items()})
+        arrays.update({f"codigo_{d}": v for d, v in cubo.codigos.items()})
+        arrays.update({f"medida_{m}": v for m, v in cubo.medidas.items()})
+        arrays["assinatura_meses"] = np.array(list(cubo.assinaturas), dtype=str)
+        arrays["assinatura_valores"] = np.array(list(cubo.assinaturas.values()), dtype=str)
+        conteudo = io.BytesIO()
+        np.savez_compressed(conteudo, **arrays)
+        self.armazenamento.gravar(chave, conteudo.getvalue())
+        return chave
+
+    def atualizar(self, empresa_nome: str, df_transacoes: pd.DataFrame) -> Tuple[CuboAgregados, List[str]]:
+        """
+        Atualiza o cubo salvo com as transações atuais (só os meses alterados)
+
+        Returns:
+            Tupla (cubo atualizado, meses reagrupados)
+        """
+        cubo, recalculados = atualizar_cubo(self.carregar(empresa_nome), df_transacoes)
+        if recalculados or not self.armazenamento.existe(self._chave(empresa_nome)):
+            self.salvar(empresa_nome, cubo)
+        return cubo, recalculados
+
+
+def obter_cubo_transacoes(df_transacoes: pd.DataFrame) -> CuboAgregados:
+    """
+    Cubo memoizado das transações em memória
+
+    Na mesma sessão, transações alteradas reaproveitam o cubo anterior e
+    reagrupam apenas os meses que mudaram.
+    """
+    sessao = obter_id_sessao()
+    chave = ("cubo_agregados", fingerprint_transacoes(df_transacoes), len(df_transacoes))
+    return cache_cubos.obter_ou_calcular(
+        chave,
+        lambda: construir_cubo(df_transacoes),
+        sessao=sessao,
+        familia=("cubo_agregados", sessao),
+        atualizador=lambda anterior: atualizar_cubo(anterior, df_transacoes)[0],
+    )
+
+
+# Instância global dos cubos em memória
+cache_cubos = CacheCategorizacao(max_entradas=16, max_por_sessao=4)
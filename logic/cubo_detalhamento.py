@@ -0,0 +1,246 @@
+"""
+Cubo de detalhamento das linhas do DRE
+Um único agrupamento por (linha do DRE, mês, descrição) guarda soma, quantidade
+e tipo predominante (no mês e no período inteiro) em arrays codificados. Qualquer detalhamento (linha e mês)
+é uma fatia do cubo, sem voltar a filtrar e agrupar as transações.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_MES,
+    COLUNA_VALOR,
+    MES_INVALIDO,
+    chave_de_rotulo,
+    rotulo_mes,
+    validar_esquema_transacoes,
+)
+from logic.Analises_DFC_DRE.memo_categorizacao import fingerprint_transacoes, obter_id_sessao
+from logic.Analises_DFC_DRE.motor_fluxo import cache_motor_fluxo
+
+# Linhas do DRE -> categorias do plano de contas que as compõem (demais linhas: a própria categoria)
+MAPEAMENTO_LINHAS_DRE = {
+    'DESPESA OPERACIONAL': ['Despesas com Fornecedores', 'Outras Desp. Operacionais', 'Pagto de Profissionais'],
+    'IMPOSTOS': ['Impostos'],
+    'DESPESAS COM PESSOAL': ['Encargos Trabalhistas', 'Salários', 'Outros Custos Pessoal'],
+    'DESPESA ADMINISTRATIVA': ['Despesas Administrativas', 'Desp. Administrativas'],
+    'INVESTIMENTOS': ['Investimentos / Aplicações'],
+    'DESPESA EXTRA OPERACIONAL': ['Extra Operacional']
+}
+
+# Coluna de descrição (pode ter encoding diferente)
+COLUNAS_DESCRICAO = ['Descrição', 'DescriÃ§Ã£o', 'Descricao', 'descrição']
+
+TAMANHO_DESCRICAO = 80
+VALOR_MINIMO = 0.01
+
+
+def coluna_descricao(df_transacoes: pd.DataFrame) -> str:
+    """Coluna usada como subcategoria (descrição ou, na falta dela, a categoria)"""
+    for coluna in COLUNAS_DESCRICAO:
+        if coluna in df_transacoes.columns:
+            return coluna
+    return 'Categoria_Vyco' if 'Categoria_Vyco' in df_transacoes.columns else 'Categoria'
+
+
+def _posicoes_por_linha(df_transacoes: pd.DataFrame, linhas_dre: List[str]):
+    """Pares (posição da transação, código da linha do DRE) de todas as linhas de uma vez"""
+    if 'Categoria' not in df_transacoes.columns:
+        # Sem categoria do plano: busca pelo nome da linha na categoria do Vyco
+        posicoes, codigos = [], []
+        for codigo, linha in enumerate(linhas_dre):
+            mascara = df_transacoes['Categoria_Vyco'].str.contains(linha, case=False, na=False).to_numpy()
+            encontradas = np.flatnonzero(mascara)
+            posicoes.append(encontradas)
+            codigos.append(np.full(len(encontradas), codigo))
+        return np.concatenate(posicoes or [[]]).astype(np.int64), np.concatenate(codigos or [[]]).astype(np.int64)
+
+    codigos_categoria, categorias = pd.factorize(df_transacoes['Categoria'])
+    pares = pd.DataFrame(
+        [(categoria, codigo) for codigo, linha in enumerate(linhas_dre)
+         for categoria in MAPEAMENTO_LINHAS_DRE.get(linha, [linha])],
+        columns=['categoria', 'linha'],
+    )
+    pares['categoria'] = categorias.get_indexer(pares['categoria']) if len(pares) else []
+    pares = pares[pares['categoria'] >= 0]
+
+    transacoes = pd.DataFrame({'categoria': codigos_categoria, 'posicao': np.arange(len(df_transacoes))})
+    unidas = transacoes.merge(pares, on='categoria')
+    return unidas['posicao'].to_numpy(np.int64), unidas['linha'].to_numpy(np.int64)
+
+
+class CuboDetalhamento:
+    """
+    Soma, quantidade e tipo predominante por (linha do DRE, mês, descrição)
+
+    As células ficam ordenadas por (linha, mês, descrição): o detalhamento de uma
+    linha em um mês é um intervalo contíguo dos arrays.
+    """
+
+    def __init__(self, linhas: List[str], chaves_meses: np.ndarray, descricoes: np.ndarray,
+                 codigo_linha: np.ndarray, codigo_mes: np.ndarray, codigo_descricao: np.ndarray,
+                 valores: np.ndarray, quantidades: np.ndarray, tipos: np.ndarray,
+                 tipos_periodo: Optional[np.ndarray] = None):
+        self.linhas = linhas
+        self.chaves_meses = chaves_meses
+        self.meses = rotulo_mes(chaves_meses)
+        self.descricoes = descricoes
+        self.codigo_linha = codigo_linha
+        self.codigo_mes = codigo_mes
+        self.codigo_descricao = codigo_descricao
+        self.valores = valores
+        self.quantidades = quantidades
+        self.tipos = tipos
+        # Tipo predominante da descrição somando todos os meses da linha (repetido em cada célula)
+        self.tipos_periodo = tipos if tipos_periodo is None else tipos_periodo
+
+        # Início de cada (linha, mês) nos arrays e descrições já truncadas para exibição
+        self._blocos = codigo_linha.astype(np.int64) * max(len(chaves_meses), 1) + codigo_mes
+        textos = pd.Series(descricoes, dtype=object).astype(str)
+        longas = textos.str.len() > TAMANHO_DESCRICAO
+        self._rotulos = textos.where(~longas, textos.str[:TAMANHO_DESCRICAO] + "...").to_numpy(dtype=object)
+
+    @property
+    def vazio(self) -> bool:
+        return self.valores.size == 0
+
+    def _celulas(self, linha: str, mes: Optional[str]) -> np.ndarray:
+        """Posições das células de uma linha (em um mês ou em todos)"""
+        if linha not in self.linhas:
+            return np.array([], dtype=np.int64)
+        codigo = self.linhas.index(linha)
+        if mes is None:
+            return np.flatnonzero(self.codigo_linha == codigo)
+
+        chave = chave_de_rotulo(mes)
+        posicao_mes = np.searchsorted(self.chaves_meses, chave)
+        if posicao_mes == len(self.chaves_meses) or self.chaves_meses[posicao_mes] != chave:
+            return np.array([], dtype=np.int64)
+        bloco = codigo * len(self.chaves_meses) + posicao_mes
+        return np.arange(np.searchsorted(self._blocos, bloco), np.searchsorted(self._blocos, bloco, side="right"))
+
+    def _detalhar(self, linha: str, mes: Optional[str]):
+        """Descrições, tipos, quantidades e valores da fatia, ordenados pelo valor absoluto"""
+        celulas = self._celulas(linha, mes)
+        codigos, valores = self.codigo_descricao[celulas], self.valores[celulas]
+        quantidades, tipos = self.quantidades[celulas], self.tipos[celulas]
+
+        if mes is None and len(celulas):
+            # Período inteiro: soma dos meses por descrição, com o tipo predominante em todos os meses
+            ordem = np.argsort(codigos, kind="stable")
+            codigos, valores, quantidades = codigos[ordem], valores[ordem], quantidades[ordem]
+            tipos = self.tipos_periodo[celulas][ordem]
+            unicos, inicios = np.unique(codigos, return_index=True)
+            codigos, tipos = unicos, tipos[inicios]
+            valores = np.add.reduceat(valores, inicios)
+            quantidades = np.add.reduceat(quantidades, inicios)
+
+        relevantes = np.abs(valores) > VALOR_MINIMO
+        codigos, valores = codigos[relevantes], valores[relevantes]
+        quantidades, tipos = quantidades[relevantes], tipos[relevantes]
+        ordem = np.argsort(-np.abs(np.round(valores, 2)), kind="stable")
+        return self._rotulos[codigos[ordem]], tipos[ordem], quantidades[ordem], valores[ordem]
+
+    def fatia(self, linha: str, mes: Optional[str] = None) -> pd.DataFrame:
+        """
+        Detalhamento de uma linha do DRE (em um mês ou no período inteiro)
+
+        Args:
+            linha: Linha do DRE (ex.: 'DESPESA OPERACIONAL')
+            mes: Mês 'AAAA-MM' (None = todos os meses somados)
+
+        Returns:
+            DataFrame Subcategoria | Tipo | Qtd | Valor, ordenado pelo valor absoluto
+        """
+        subcategorias, tipos, quantidades, valores = self._detalhar(linha, mes)
+        return pd.DataFrame({'Subcategoria': subcategorias, 'Tipo': tipos, 'Qtd': quantidades, 'Valor': valores})
+
+    def para_lista(self, linha: str, mes: Optional[str] = None) -> List[Dict]:
+        """Fatia no formato salvo no cache do DRE (subcategoria, tipo, quantidade, valor)"""
+        subcategorias, tipos, quantidades, valores = self._detalhar(linha, mes)
+        return [
+            {'subcategoria': subcategoria, 'tipo': tipo, 'quantidade': quantidade, 'valor': round(valor, 2)}
+            for subcategoria, tipo, quantidade, valor in zip(
+                subcategorias.tolist(), tipos.tolist(), quantidades.tolist(), valores.tolist()
+            )
+        ]
+
+
+def _moda_tipo(celulas: pd.DataFrame, chaves: List[str]) -> pd.Series:
+    """Tipo predominante por grupo (empate fica com o primeiro em ordem alfabética, como Series.mode)"""
+    contagem = celulas.dropna(subset=['tipo']).groupby(chaves + ['tipo'], sort=True).size().reset_index(name='n')
+    contagem = contagem.sort_values(chaves + ['n'], ascending=[True] * len(chaves) + [False], kind='stable')
+    return contagem.drop_duplicates(chaves).set_index(chaves)['tipo']
+
+
+def construir_cubo_detalhamento(df_transacoes: pd.DataFrame, linhas_dre: Iterable[str]) -> CuboDetalhamento:
+    """
+    Agrupa as transações uma única vez por (linha do DRE, mês, descrição)
+
+    Args:
+        df_transacoes: Transações no esquema canônico
+        linhas_dre: Linhas do DRE detalhadas
+
+    Returns:
+        CuboDetalhamento com uma célula por combinação presente nas transações
+    """
+    linhas_dre = list(linhas_dre)
+    validar_esquema_transacoes(df_transacoes)
+
+    posicoes, codigo_linha = _posicoes_por_linha(df_transacoes, linhas_dre)
+    chaves_linha = df_transacoes[COLUNA_MES].to_numpy()[posicoes]
+    descricoes_linha = df_transacoes[coluna_descricao(df_transacoes)].to_numpy()[posicoes]
+
+    # Descrições ausentes ficam fora do detalhamento (como no groupby por descrição)
+    validas = (chaves_linha != MES_INVALIDO) & pd.notna(descricoes_linha)
+    posicoes, codigo_linha = posicoes[validas], codigo_linha[validas]
+    chaves_linha, descricoes_linha = chaves_linha[validas], descricoes_linha[validas]
+
+    codigo_descricao, descricoes = pd.factorize(descricoes_linha, sort=True)
+    chaves_meses, codigo_mes = np.unique(chaves_linha, return_inverse=True)
+    if 'Tipo' in df_transacoes.columns:
+        tipo_linha = df_transacoes['Tipo'].to_numpy()[posicoes]
+    else:
+        tipo_linha = np.full(len(posicoes), None, dtype=object)
+
+    celulas = pd.DataFrame({
+        'linha': codigo_linha, 'mes': codigo_mes, 'descricao': codigo_descricao,
+        'valor': df_transacoes[COLUNA_VALOR].to_numpy(dtype=np.float64)[posicoes], 'tipo': tipo_linha,
+    })
+    chaves = ['linha', 'mes', 'descricao']
+    agregado = celulas.groupby(chaves, sort=True).agg(valor=('valor', 'sum'), quantidade=('valor', 'size'))
+
+    # Tipo predominante no mês e, para o período inteiro, contando as transações de todos os meses
+    indice = agregado.index
+    tipos = _moda_tipo(celulas, chaves).reindex(indice).fillna("Misto").to_numpy(dtype=object)
+    moda_periodo = _moda_tipo(celulas, ['linha', 'descricao'])
+    tipos_periodo = moda_periodo.reindex(
+        pd.MultiIndex.from_arrays([indice.get_level_values('linha'), indice.get_level_values('descricao')])
+    ).fillna("Misto").to_numpy(dtype=object)
+
+    return CuboDetalhamento(
+        linhas_dre,
+        chaves_meses,
+        np.asarray(descricoes, dtype=object),
+        indice.get_level_values('linha').to_numpy(np.int32),
+        indice.get_level_values('mes').to_numpy(np.int32),
+        indice.get_level_values('descricao').to_numpy(np.int32),
+        agregado['valor'].to_numpy(np.float64),
+        agregado['quantidade'].to_numpy(np.int64),
+        tipos,
+        tipos_periodo,
+    )
+
+
+def obter_cubo_detalhamento(df_transacoes: pd.DataFrame, linhas_dre: Iterable[str]) -> CuboDetalhamento:
+    """Cubo memoizado para o mesmo conteúdo das transações e as mesmas linhas do DRE"""
+    linhas_dre = tuple(linhas_dre)
+    chave = ("cubo_detalhamento", fingerprint_transacoes(df_transacoes), len(df_transacoes), linhas_dre)
+    return cache_motor_fluxo.obter_ou_calcular(
+        chave,
+        lambda: construir_cubo_detalhamento(df_transacoes, linhas_dre),
+        sessao=obter_id_sessao(),
+    )
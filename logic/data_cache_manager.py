@@ -1,34 +1,185 @@
 """
 Módulo para gerenciar cache de dados do DRE e Fluxo de Caixa
-Salva os dados em JSON para uso posterior no módulo de Gestão Agro
+Salva os dados em JSON para uso posterior no módulo de Gestão Agro (pelo
+armazenamento configurado: pasta local, SQLite ou S3; ver logic.armazenamento)
 """
 
 import json
 import os
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Optional
-import streamlit as st
+from typing import Dict, Iterable, List, Optional
+
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_DATA,
+    COLUNA_MES,
+    chave_de_rotulo,
+    normalizar_transacoes,
+    validar_esquema_transacoes,
+)
+from logic.agregados_mensais import AgregadosMensais
+from logic.armazenamento import NAMESPACE_CACHE, VERSAO_AUSENTE, Armazenamento, obter_armazenamento, para_json
+from logic.cache_leituras import cache_leituras
+from logic.cubo_agregados import CuboAgregados, CubosPersistidos, construir_cubo
+from logic.cubo_detalhamento import MAPEAMENTO_LINHAS_DRE, construir_cubo_detalhamento
+from logic.detalhamento_indexado import DetalhamentoIndexado
+from logic.dependencias_cache import (
+    DEPENDENCIAS,
+    ENTRADA_PLANO,
+    ENTRADAS,
+    HASH_AUSENTE,
+    PARECER_ANTIGRAVITY,
+    PARECER_DIAGNOSTICO,
+    PARECER_GPT,
+    hash_artefato,
+    hashes_entradas,
+    verificar_artefatos,
+)
+from logic.dre_normalizado import (
+    ESTRUTURA_NORMALIZADA,
+    ESTRUTURA_SECOES,
+    OPCOES_JSON,
+    DreNormalizado,
+    abrir_dre,
+    extrair_detalhamento,
+    migrar_conteudo_dre,
+    normalizar_dre,
+)
+from logic.escrita_atomica import trava_empresa
+from logic.manifesto_cache import (
+    TIPO_DRE,
+    TIPO_FLUXO,
+    TIPO_TRANSACOES,
+    ManifestoCache,
+    hash_conteudo,
+    resumo_dre,
+    resumo_fluxo,
+    resumo_transacoes,
+)
+from logic.transacoes_colunares import (
+    EXTENSAO as EXTENSAO_TRANSACOES,
+    VERSAO_FORMATO as VERSAO_TRANSACOES,
+    carregar_transacoes_colunares,
+    ler_cabecalho,
+    serializar_transacoes_colunares,
+)
+
+PASTA_DRE = "dre"
+PASTA_FLUXO = "fluxo_caixa"
+PASTA_ANALISES = "analises"
+PASTA_PARECERES_GPT = "pareceres_gpt"
+
+
+class DetalhamentoCategoria(list):
+    """Entradas do detalhamento de uma linha do DRE; 'desatualizado' lista os motivos (vazio = atualizado)"""
+
+    def __init__(self, entradas: List[Dict], desatualizado: List[str]):
+        super().__init__(entradas)
+        self.desatualizado = desatualizado
+
+
+def _notificar(nivel: str, mensagem: str):
+    """
+    Exibe erros/avisos no Streamlit quando disponível (importado só no uso)
+
+    Args:
+        nivel: 'error' ou 'warning'
+        mensagem: Texto a exibir
+    """
+    try:
+        import streamlit as st
+    except ImportError:
+        print(f"[{nivel}] {mensagem}")
+        return
+    getattr(st, nivel)(mensagem)
 
 
 class DataCacheManager:
     """Gerenciador de cache para dados de DRE e Fluxo de Caixa"""
     
-    def __init__(self, base_path: str = "./data_cache"):
+    def __init__(self, base_path: str = "./data_cache", armazenamento: Optional[Armazenamento] = None):
+        """
+        Args:
+            base_path: Pasta local (arquivos do backend padrão, travas e índice do detalhamento)
+            armazenamento: Onde ficam os arquivos de cache (padrão: obter_armazenamento, que
+                segue ARMAZENAMENTO_BACKEND; backends remotos precisam de cópia local)
+        """
         self.base_path = base_path
-        self.fluxo_path = os.path.join(base_path, "fluxo_caixa")
-        self.dre_path = os.path.join(base_path, "dre")
         
-        # Criar diretórios se não existirem
-        os.makedirs(self.fluxo_path, exist_ok=True)
-        os.makedirs(self.dre_path, exist_ok=True)
+        # DRE, fluxo, transações, pareceres, manifestos...: compartilhados entre réplicas com backend remoto
+        self.armazenamento = armazenamento or obter_armazenamento(NAMESPACE_CACHE, base_path)
+        
+        # Assinaturas das transações por mês (detalhamento incremental do DRE)
+        self.agregados = AgregadosMensais(self.armazenamento)
+        
+        # Cubo de agregados (dimensões x medidas) das transações de cada empresa
+        self.cubos = CubosPersistidos(self.armazenamento)
+        
+        # Resumo de cada arquivo de cache (status e listagens sem abrir os arquivos)
+        self.manifestos = ManifestoCache(self.armazenamento)
+        
+        # Detalhamento do DRE por (empresa, linha, mês): drill-down sem abrir o DRE
+        # (índice local de cada réplica, refeito a partir do DRE quando a versão muda)
+        self.detalhamentos = DetalhamentoIndexado(os.path.join(base_path, "detalhamento.sqlite3"))
+        
+        # Uma trava por empresa: gravações da mesma empresa em sessões diferentes se serializam
+        # (na mesma réplica; entre réplicas valem as gravações condicionais do armazenamento)
+        self.travas_path = os.path.join(base_path, "travas")
     
     def _sanitize_filename(self, name: str) -> str:
         """Remove caracteres especiais do nome do arquivo"""
         import re
         return re.sub(r'[<>:"/\\|?*]', '_', name).strip()
     
-    def salvar_fluxo_caixa(self, df_fluxo: pd.DataFrame, empresa_nome: str, metadata: Dict = None) -> str:
+    def trava(self, empresa_nome: str, bloquear: bool = True):
+        """Trava de escrita dos arquivos da empresa (ver escrita_atomica.trava_empresa)"""
+        return trava_empresa(empresa_nome, self.travas_path, bloquear)
+    
+    def versao_cache(self, empresa_nome: str, tipo: str) -> str:
+        """
+        Versão atual de um arquivo de cache, para verificação otimista ao salvar
+        
+        Quem lê um arquivo para editá-lo guarda esta versão e a passa como
+        versao_esperada: se outra sessão (ou réplica) gravar antes, o salvamento é recusado.
+        """
+        chave = self.chave_cache(empresa_nome, tipo)
+        return self.armazenamento.versao(chave) if chave else VERSAO_AUSENTE
+    
+    def chave_transacoes(self, empresa_nome: str) -> str:
+        """Chave do arquivo colunar de transações categorizadas da empresa (pode não existir)"""
+        return f"{PASTA_DRE}/{self._sanitize_filename(empresa_nome)}_transacoes{EXTENSAO_TRANSACOES}"
+    
+    def chave_cache(self, empresa_nome: str, tipo: str) -> Optional[str]:
+        """
+        Chave (no armazenamento) do arquivo de cache de um tipo
+        
+        Args:
+            empresa_nome: Nome da empresa
+            tipo: 'dre', 'fluxo', 'transacoes' ou um dos pareceres
+        
+        Returns:
+            Chave (pode não existir); None para o parecer GPT ainda não registrado
+        """
+        nome = self._sanitize_filename(empresa_nome)
+        if tipo == TIPO_TRANSACOES:
+            return self.chave_transacoes(empresa_nome)
+        if tipo == TIPO_FLUXO:
+            return f"{PASTA_FLUXO}/{nome}_fluxo.json"
+        if tipo in (PARECER_DIAGNOSTICO, PARECER_ANTIGRAVITY):
+            return f"{PASTA_ANALISES}/{nome}_{tipo}.md"
+        if tipo == PARECER_GPT:
+            # Pareceres GPT têm um arquivo por geração: vale o último registrado
+            entrada = self.manifestos.entrada_registrada(empresa_nome, tipo)
+            return f"{PASTA_PARECERES_GPT}/{entrada['arquivo']}" if entrada else None
+        return f"{PASTA_DRE}/{nome}_dre.json"
+    
+    def _chave_transacoes_json(self, empresa_nome: str) -> str:
+        """Chave do JSON de transações dos caches antigos (lido enquanto não houver o arquivo colunar)"""
+        return f"{PASTA_DRE}/{self._sanitize_filename(empresa_nome)}_transacoes.json"
+    
+    def salvar_fluxo_caixa(self, df_fluxo: pd.DataFrame, empresa_nome: str, metadata: Dict = None,
+                           versao_esperada: Optional[str] = None, df_transacoes: pd.DataFrame = None) -> str:
         """
         Salva dados do fluxo de caixa em JSON com estrutura organizada (substitui arquivo existente)
         
@@ -36,13 +187,14 @@ class DataCacheManager:
             df_fluxo: DataFrame com dados do fluxo de caixa
             empresa_nome: Nome da empresa
             metadata: Informações adicionais (licença, período, etc.)
+            df_transacoes: Transações de onde o fluxo foi calculado (registradas como dependência)
+            versao_esperada: Versão lida com versao_cache (None = sem verificação)
         
         Returns:
-            Caminho do arquivo salvo
+            Localização do arquivo salvo
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_fluxo.json"
-            filepath = os.path.join(self.fluxo_path, filename)
+            chave = self.chave_cache(empresa_nome, TIPO_FLUXO)
             
             # Estruturar dados do fluxo de caixa por categoria
             fluxo_estruturado = {}
@@ -119,20 +271,26 @@ class DataCacheManager:
                     "totais_por_grupo": grupos_totais
                 }
             
-            # Salvar em JSON (sobrescreve se já existir)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            # Salvar em JSON (substitui o anterior de uma vez só)
+            with self.trava(empresa_nome):
+                self.armazenamento.gravar_json(chave, data, versao_esperada)
+                self.manifestos.registrar(empresa_nome, TIPO_FLUXO, chave, resumo_fluxo(data),
+                                          data["estrutura"], data["timestamp"],
+                                          self.dependencias_atuais(empresa_nome, TIPO_FLUXO, df_transacoes))
             
-            return filepath
+            return self.armazenamento.localizacao(chave)
             
         except Exception as e:
-            st.error(f"Erro ao salvar fluxo de caixa estruturado: {e}")
+            _notificar("error", f"Erro ao salvar fluxo de caixa estruturado: {e}")
             return None
     
     def extrair_detalhamento_transacoes(self, df_transacoes: pd.DataFrame, categoria_principal: str, mes: str = None) -> List[Dict]:
         """
         Extrai detalhamento das transações que compõem uma categoria
         
+        Para várias linhas/meses, construir o cubo uma vez (construir_cubo_detalhamento)
+        e fatiá-lo, como faz salvar_dre.
+        
         Args:
             df_transacoes: DataFrame com transações do Vyco
             categoria_principal: Categoria principal DRE (ex: 'DESPESA OPERACIONAL')
@@ -141,82 +299,16 @@ class DataCacheManager:
         Returns:
             Lista de dicionários com subcategorias e valores
         """
-        detalhamento = []
-        
         try:
             if df_transacoes is None or df_transacoes.empty:
-                return detalhamento
-            
-            # Mapeamento de categorias DRE para categorias Plano de Contas/Vyco
-            mapeamento_categorias = {
-                'DESPESA OPERACIONAL': ['Despesas com Fornecedores', 'Outras Desp. Operacionais', 'Pagto de Profissionais'],
-                'IMPOSTOS': ['Impostos'],
-                'DESPESAS COM PESSOAL': ['Encargos Trabalhistas', 'Salários', 'Outros Custos Pessoal'],
-                'DESPESA ADMINISTRATIVA': ['Despesas Administrativas', 'Desp. Administrativas'],
-                'INVESTIMENTOS': ['Investimentos / Aplicações'],
-                'DESPESA EXTRA OPERACIONAL': ['Extra Operacional']
-            }
-            
-            # Obter categorias correspondentes
-            categorias_filtro = mapeamento_categorias.get(categoria_principal, [categoria_principal])
-            
-            # Filtrar transações pela categoria (usar coluna 'Categoria' do plano de contas, não 'Categoria_Vyco')
-            if 'Categoria' in df_transacoes.columns:
-                df_categoria = df_transacoes[df_transacoes['Categoria'].isin(categorias_filtro)].copy()
-            else:
-                # Fallback: tentar por Categoria_Vyco
-                df_categoria = df_transacoes[
-                    df_transacoes['Categoria_Vyco'].str.contains(categoria_principal, case=False, na=False)
-                ].copy()
-            
-            if df_categoria.empty:
-                return detalhamento
-            
-            # Filtrar por mês se especificado
-            if mes and 'Data' in df_categoria.columns:
-                df_categoria['Data'] = pd.to_datetime(df_categoria['Data'], errors='coerce')
-                df_categoria = df_categoria[df_categoria['Data'].dt.strftime('%Y-%m') == mes]
-            
-            if df_categoria.empty:
-                return detalhamento
-            
-            # Detectar coluna de descrição (pode ter encoding diferente)
-            col_descricao = None
-            for possivel_col in ['Descrição', 'DescriÃ§Ã£o', 'Descricao', 'descrição']:
-                if possivel_col in df_categoria.columns:
-                    col_descricao = possivel_col
-                    break
-            
-            if not col_descricao:
-                # Se não encontrou descrição, agrupar por Categoria_Vyco
-                col_descricao = 'Categoria_Vyco' if 'Categoria_Vyco' in df_categoria.columns else 'Categoria'
-            
-            # Agrupar por descrição/subcategoria
-            for descricao, grupo in df_categoria.groupby(col_descricao):
-                valor_total = grupo['Valor (R$)'].sum()
-                qtd_transacoes = len(grupo)
-                tipo = grupo['Tipo'].mode().iloc[0] if not grupo['Tipo'].empty else "Misto"
-                
-                # Limitar tamanho da descrição
-                descricao_limpa = str(descricao)[:80] + "..." if len(str(descricao)) > 80 else str(descricao)
-                
-                if abs(valor_total) > 0.01:  # Só incluir se houver valor significativo
-                    detalhamento.append({
-                        'subcategoria': descricao_limpa,
-                        'tipo': tipo,
-                        'quantidade': qtd_transacoes,
-                        'valor': round(valor_total, 2)
-                    })
-            
-            # Ordenar por valor absoluto (maior para menor)
-            detalhamento = sorted(detalhamento, key=lambda x: abs(x['valor']), reverse=True)
-            
+                return []
+            return construir_cubo_detalhamento(df_transacoes, [categoria_principal]).para_lista(categoria_principal, mes)
         except Exception as e:
-            st.warning(f"Erro ao extrair detalhamento: {e}")
-        
-        return detalhamento
+            _notificar("warning", f"Erro ao extrair detalhamento: {e}")
+            return []
     
-    def salvar_dre(self, df_dre: pd.DataFrame, empresa_nome: str, metadata: Dict = None, df_transacoes: pd.DataFrame = None) -> str:
+    def salvar_dre(self, df_dre: pd.DataFrame, empresa_nome: str, metadata: Dict = None, df_transacoes: pd.DataFrame = None,
+                   versao_esperada: Optional[str] = None) -> str:
         """
         Salva dados do DRE em JSON com estrutura organizada por seções (substitui arquivo existente)
         
@@ -225,13 +317,13 @@ class DataCacheManager:
             empresa_nome: Nome da empresa
             metadata: Informações adicionais (licença, período, etc.)
             df_transacoes: DataFrame com transações originais do Vyco (opcional, para detalhamento)
+            versao_esperada: Versão lida com versao_cache (None = sem verificação)
         
         Returns:
-            Caminho do arquivo salvo
+            Localização do arquivo salvo
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_dre.json"
-            filepath = os.path.join(self.dre_path, filename)
+            chave = self.chave_cache(empresa_nome, TIPO_DRE)
             
             # Definir estrutura de seções do DRE
             secoes_dre = {
@@ -273,6 +365,18 @@ class DataCacheManager:
                 }
             }
             
+            # Detalhamento por linha e mês: só os meses com transações alteradas passam pelo cubo
+            # (todos, se o plano de contas ou as linhas do DRE mudaram)
+            detalhamento_por_mes, assinaturas, versao_regras = {}, None, None
+            if df_transacoes is not None and not df_transacoes.empty:
+                validar_esquema_transacoes(df_transacoes)
+                linhas_dre = [l for s in secoes_dre.values() for l in s["linhas"] if l in df_dre.index]
+                meses_dre = [c for c in df_dre.columns if isinstance(c, str) and '-' in c and c not in ('TOTAL', '%')]
+                versao_regras = self._versao_regras_dre(empresa_nome, linhas_dre)
+                detalhamento_por_mes, assinaturas = self._detalhamento_incremental(
+                    empresa_nome, df_transacoes, linhas_dre, meses_dre, versao_regras
+                )
+            
             # Converter DataFrame para estrutura organizada
             dre_estruturado = {}
             
@@ -295,14 +399,14 @@ class DataCacheManager:
                         }
                         
                         # Adicionar detalhamento se transações foram fornecidas
-                        if df_transacoes is not None and not df_transacoes.empty:
+                        if detalhamento_por_mes:
                             # Extrair meses disponíveis
                             meses = [k for k in linha_dados.keys() if isinstance(k, str) and '-' in k and k != 'TOTAL' and k != '%']
                             
-                            # Criar detalhamento por mês
+                            # Criar detalhamento por mês (recalculado ou reaproveitado do índice)
                             detalhamento_mensal = {}
                             for mes in meses:
-                                detalhamento = self.extrair_detalhamento_transacoes(df_transacoes, linha, mes)
+                                detalhamento = detalhamento_por_mes.get(mes, {}).get(linha)
                                 if detalhamento:
                                     detalhamento_mensal[mes] = detalhamento
                             
@@ -317,10 +421,9 @@ class DataCacheManager:
                 "timestamp": datetime.now().isoformat(),
                 "tipo": "dre_estruturado",
                 "metadata": metadata or {},
-                "estrutura": "secoes_organizadas",
+                "estrutura": ESTRUTURA_SECOES,
                 "dre_estruturado": dre_estruturado,
-                # Manter dados brutos para compatibilidade (formato antigo)
-                "dados": df_dre.to_dict('records') if not df_dre.empty else [],
+                # Formato antigo: gravado no layout normalizado, montado de novo na leitura (DreNormalizado)
                 "dados_indexados": df_dre.to_dict('index') if not df_dre.empty else {}
             }
             
@@ -366,61 +469,229 @@ class DataCacheManager:
                 }
             
             # Salvar em JSON
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            with self.trava(empresa_nome):
+                # Cada valor gravado uma vez (dre_estruturado, dados e dados_indexados saem da mesma matriz)
+                normalizado = normalizar_dre(data)
+                self.armazenamento.gravar_json(chave, normalizado, versao_esperada, **OPCOES_JSON)
+                entrada = self.manifestos.registrar(empresa_nome, TIPO_DRE, chave, resumo_dre(data),
+                                                    ESTRUTURA_NORMALIZADA, data["timestamp"],
+                                                    self.dependencias_atuais(empresa_nome, TIPO_DRE, df_transacoes))
+                self.detalhamentos.gravar(empresa_nome, hash_artefato(entrada), normalizado["detalhamento"])
+                if assinaturas is not None:
+                    # Assinaturas valem para esta versão do DRE (e do índice gravado acima)
+                    self.agregados.registrar(empresa_nome, assinaturas, versao_regras, hash_artefato(entrada))
             
-            return filepath
+            return self.armazenamento.localizacao(chave)
+            
+        except Exception as e:
+            _notificar("error", f"Erro ao salvar DRE estruturado: {e}")
+            return None
+    
+    def _versao_regras_dre(self, empresa_nome: str, linhas_dre: List[str]) -> str:
+        """Hash das regras do detalhamento: plano de contas e categorias de cada linha do DRE"""
+        plano = hashes_entradas(empresa_nome, entradas=[ENTRADA_PLANO])[ENTRADA_PLANO]
+        return hash_conteudo([plano, [[linha, MAPEAMENTO_LINHAS_DRE.get(linha, [linha])] for linha in linhas_dre]])
+    
+    def _detalhamento_incremental(self, empresa_nome: str, df_transacoes: pd.DataFrame, linhas_dre: List[str],
+                                  meses_dre: List[str], versao_regras: str):
+        """
+        Detalhamento dos meses do DRE, agrupando só as transações dos meses alterados
+        
+        Os meses sem alteração desde o DRE atual são lidos do índice do detalhamento
+        (mesma versão do DRE); sem DRE, índice ou assinaturas dessa versão, todos os
+        meses passam pelo cubo.
+        
+        Returns:
+            Tupla (mês -> linha -> detalhamento, assinatura de cada mês do DRE)
+        """
+        entrada = self.manifestos.entrada(empresa_nome, TIPO_DRE, self.chave_cache(empresa_nome, TIPO_DRE))
+        versao = hash_artefato(entrada) if entrada else None
+        grupos, assinaturas, alterados = self.agregados.comparar(empresa_nome, df_transacoes, versao_regras, versao)
+        
+        meses = [mes for mes in meses_dre if mes in grupos]
+        alterados = set(alterados)
+        mantidos = [mes for mes in meses if mes not in alterados]
+        detalhamento = self.detalhamentos.obter_meses(empresa_nome, versao, mantidos) if mantidos else {}
+        if detalhamento is None:
+            # Índice de outra versão do DRE: nenhum mês é reaproveitado
+            detalhamento, alterados = {}, set(meses)
+        
+        recalcular = [mes for mes in meses if mes in alterados]
+        if recalcular:
+            # Um único agrupamento (linha, mês, descrição) das transações desses meses
+            cubo = construir_cubo_detalhamento(
+                df_transacoes.iloc[np.concatenate([grupos[mes] for mes in recalcular])], linhas_dre
+            )
+            for mes in recalcular:
+                detalhamento[mes] = {linha: cubo.para_lista(linha, mes) for linha in linhas_dre}
+        
+        return detalhamento, {mes: assinaturas[mes] for mes in meses}
+    
+    def _resumo_arquivo(self, tipo: str, chave: str):
+        """Lê um JSON de DRE ou fluxo e devolve (conteúdo como gravado, campos do manifesto)"""
+        data = self.armazenamento.ler_json(chave)
+        if data is None:
+            raise FileNotFoundError(chave)
+        return data, resumo_fluxo(data) if tipo == TIPO_FLUXO else resumo_dre(abrir_dre(data))
+    
+    def _registrar_em_leitura(self, empresa_nome: str, tipo: str, chave: str, resumo: Dict,
+                              versao_esquema=None, timestamp: str = None) -> Dict:
+        """
+        Entrada refeita por um leitor: gravada no manifesto só se a trava estiver livre
+        
+        Leitores não esperam escritores; com a trava ocupada a entrada é apenas devolvida.
+        """
+        with self.trava(empresa_nome, bloquear=False) as travada:
+            if travada and self.armazenamento.existe(chave):
+                return self.manifestos.registrar(empresa_nome, tipo, chave, resumo, versao_esquema, timestamp)
+        if self.armazenamento.existe(chave):
+            return self.manifestos.montar_entrada(chave, resumo, versao_esquema, timestamp)
+        # Transações ainda só no JSON antigo (sem arquivo colunar para registrar)
+        return {'arquivo': chave.rpartition('/')[2], 'timestamp': timestamp, 'dependencias': None, **resumo}
+    
+    def obter_manifesto(self, empresa_nome: str, tipo: str) -> Optional[Dict]:
+        """
+        Resumo de um arquivo de cache da empresa, lido do manifesto
+        
+        Caches gravados antes do manifesto (ou alterados por fora) são lidos uma
+        única vez para refazer a entrada.
+        
+        Entradas refeitas assim ficam sem registro de dependências (origem
+        desconhecida): o estado delas fica desconhecido (não desatualizado) até
+        a próxima geração.
+        
+        Args:
+            empresa_nome: Nome da empresa
+            tipo: 'dre', 'fluxo', 'transacoes' ou um dos pareceres
+        
+        Returns:
+            Entrada do manifesto (timestamp, linhas, período, tamanho...) ou None se o arquivo não existir
+        """
+        chave = self.chave_cache(empresa_nome, tipo)
+        if chave is None:
+            return None
+        entrada = self.manifestos.entrada(empresa_nome, tipo, chave)
+        if entrada is not None:
+            return entrada
+        
+        try:
+            if tipo == TIPO_TRANSACOES:
+                # Lê o arquivo colunar ou o JSON antigo (o hash de conteúdo precisa de todas as colunas)
+                df = self.carregar_transacoes(empresa_nome)
+                if df is None:
+                    return None
+                caminho = self.armazenamento.caminho_local(chave)
+                cabecalho = (ler_cabecalho(caminho) if caminho else None) or {}
+                return self._registrar_em_leitura(empresa_nome, tipo, chave, resumo_transacoes(df),
+                                                  VERSAO_TRANSACOES, cabecalho.get("timestamp"))
             
+            if not self.armazenamento.existe(chave):
+                return None
+            if tipo in (PARECER_DIAGNOSTICO, PARECER_ANTIGRAVITY, PARECER_GPT):
+                return self._registrar_em_leitura(empresa_nome, tipo, chave, {})
+            data, resumo = self._resumo_arquivo(tipo, chave)
+            return self._registrar_em_leitura(empresa_nome, tipo, chave, resumo,
+                                              data.get("estrutura"), data.get("timestamp"))
         except Exception as e:
-            st.error(f"Erro ao salvar DRE estruturado: {e}")
+            _notificar("warning", f"Erro ao ler resumo do cache: {e}")
             return None
     
+    def dependencias_atuais(self, empresa_nome: str, tipo: str, df_transacoes: pd.DataFrame = None) -> Dict[str, str]:
+        """
+        Hash atual de cada dependência de um artefato (registrado quando ele é salvo)
+        
+        Args:
+            empresa_nome: Nome da empresa
+            tipo: Artefato do grafo ('transacoes', 'fluxo', 'dre' ou um dos pareceres)
+            df_transacoes: Transações de onde o artefato foi calculado; com elas, o hash
+                registrado é o delas e não o das transações salvas (que outra sessão
+                pode ter trocado no meio do cálculo)
+        
+        Returns:
+            Dicionário dependência -> hash
+        """
+        dependencias = DEPENDENCIAS[tipo]
+        hashes = hashes_entradas(empresa_nome, entradas=[d for d in dependencias if d in ENTRADAS])
+        if df_transacoes is not None and TIPO_TRANSACOES in dependencias:
+            hashes[TIPO_TRANSACOES] = resumo_transacoes(normalizar_transacoes(df_transacoes))['hash_conteudo']
+        for dependencia in dependencias:
+            if dependencia not in hashes:
+                entrada = self.obter_manifesto(empresa_nome, dependencia)
+                hashes[dependencia] = hash_artefato(entrada) if entrada else HASH_AUSENTE
+        return hashes
+    
+    def registrar_artefato(self, empresa_nome: str, tipo: str, chave: str, resumo: Dict = None) -> Dict:
+        """
+        Registra no manifesto um artefato recém-gravado, com o hash atual das suas dependências
+        
+        Args:
+            empresa_nome: Nome da empresa
+            tipo: Artefato do grafo (ex.: 'parecer_gpt')
+            chave: Chave do arquivo gravado no armazenamento
+            resumo: Campos adicionais da entrada
+        
+        Returns:
+            Entrada gravada no manifesto
+        """
+        with self.trava(empresa_nome):
+            return self.manifestos.registrar(empresa_nome, tipo, chave, resumo or {},
+                                             dependencias=self.dependencias_atuais(empresa_nome, tipo))
+    
+    def verificar_dependencias(self, empresa_nome: str) -> Dict[str, List[str]]:
+        """
+        Estado de cada artefato salvo da empresa no grafo de dependências
+        
+        Returns:
+            Dicionário artefato -> motivos de desatualização (lista vazia = atualizado);
+            artefatos inexistentes não aparecem
+        """
+        hashes = hashes_entradas(empresa_nome)
+        registradas = {}
+        for artefato in DEPENDENCIAS:
+            entrada = self.obter_manifesto(empresa_nome, artefato)
+            if entrada is not None:
+                registradas[artefato] = entrada.get('dependencias')
+                hashes[artefato] = hash_artefato(entrada)
+        return verificar_artefatos(registradas, hashes)
+    
+    def motivos_desatualizacao(self, empresa_nome: str, tipo: str) -> List[str]:
+        """Motivos pelos quais um artefato salvo está desatualizado (vazio = atualizado ou inexistente)"""
+        return self.verificar_dependencias(empresa_nome).get(tipo, [])
+    
+    def artefatos_desatualizados(self, empresa_nome: str) -> List[str]:
+        """Artefatos salvos que precisam ser gerados novamente, em ordem de dependência"""
+        return [artefato for artefato, motivos in self.verificar_dependencias(empresa_nome).items() if motivos]
+    
     def listar_empresas_disponiveis(self) -> List[Dict]:
         """
-        Lista todas as empresas com dados salvos
+        Lista todas as empresas com dados salvos (a partir dos manifestos)
         
         Returns:
             Lista de dicionários com informações das empresas
         """
         empresas = {}
+        pastas = [
+            (TIPO_FLUXO, 'fluxo_caixa', PASTA_FLUXO, '_fluxo.json'),
+            (TIPO_DRE, 'dre', PASTA_DRE, '_dre.json'),
+        ]
         
-        # Verificar arquivos de fluxo de caixa
-        for filename in os.listdir(self.fluxo_path):
-            if filename.endswith('_fluxo.json'):
-                try:
-                    filepath = os.path.join(self.fluxo_path, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    empresa = data.get('empresa', 'Desconhecida')
-                    timestamp = data.get('timestamp', '')
-                    
-                    if empresa not in empresas:
-                        empresas[empresa] = {
-                            'nome': empresa,
-                            'fluxo_caixa': [],
-                            'dre': []
-                        }
-                    
-                    empresas[empresa]['fluxo_caixa'].append({
-                        'arquivo': filename,
-                        'timestamp': timestamp,
-                        'caminho': filepath
-                    })
-                    
-                except Exception:
+        for tipo, lista, pasta, sufixo in pastas:
+            for chave in self.armazenamento.listar(f"{pasta}/"):
+                filename = chave[len(pasta) + 1:]
+                if not filename.endswith(sufixo) or '/' in filename:
                     continue
-        
-        # Verificar arquivos de DRE
-        for filename in os.listdir(self.dre_path):
-            if filename.endswith('_dre.json'):
                 try:
-                    filepath = os.path.join(self.dre_path, filename)
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    empresa = data.get('empresa', 'Desconhecida')
-                    timestamp = data.get('timestamp', '')
+                    nome_arquivo = filename[:-len(sufixo)]
+                    entrada = self.manifestos.entrada(nome_arquivo, tipo, chave)
+                    if entrada is not None:
+                        empresa = self.manifestos.carregar(nome_arquivo)['empresa']
+                    else:
+                        data, resumo = self._resumo_arquivo(tipo, chave)
+                        empresa = data.get('empresa', 'Desconhecida')
+                        entrada = {'timestamp': data.get('timestamp', ''), **resumo}
+                        if self._sanitize_filename(empresa) == nome_arquivo:
+                            self.manifestos.registrar(empresa, tipo, chave, resumo,
+                                                      data.get('estrutura'), data.get('timestamp'))
                     
                     if empresa not in empresas:
                         empresas[empresa] = {
@@ -429,12 +700,14 @@ class DataCacheManager:
                             'dre': []
                         }
                     
-                    empresas[empresa]['dre'].append({
+                    info = {
                         'arquivo': filename,
-                        'timestamp': timestamp,
-                        'caminho': filepath,
-                        'resumo_dre': data.get('resumo_dre', {})
-                    })
+                        'timestamp': entrada.get('timestamp', ''),
+                        'caminho': self.armazenamento.localizacao(chave)
+                    }
+                    if tipo == TIPO_DRE:
+                        info['resumo_dre'] = entrada.get('resumo_dre', {})
+                    empresas[empresa][lista].append(info)
                     
                 except Exception:
                     continue
@@ -450,49 +723,122 @@ class DataCacheManager:
             arquivo: Nome específico do arquivo (opcional, usa o arquivo padrão da empresa)
         
         Returns:
-            Dados do DRE ou None se não encontrado
+            Dados do DRE (somente leitura) ou None se não encontrado; a chave
+            'desatualizado' lista os motivos quando alguma dependência mudou depois da geração
         """
         try:
-            if arquivo:
-                filepath = os.path.join(self.dre_path, arquivo)
-            else:
-                # Usar nome padrão da empresa
-                filename = f"{self._sanitize_filename(empresa_nome)}_dre.json"
-                filepath = os.path.join(self.dre_path, filename)
+            # Arquivo pedido ou nome padrão da empresa
+            chave = f"{PASTA_DRE}/{arquivo}" if arquivo else self.chave_cache(empresa_nome, TIPO_DRE)
             
-            if not os.path.exists(filepath):
+            filepath = self.armazenamento.caminho_local(chave)
+            if filepath is None:
                 return None
                 
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Conteúdo lido uma vez por versão do arquivo (compartilhado entre sessões)
+            data = cache_leituras.obter_ou_carregar(filepath, TIPO_DRE, lambda: self._ler_dre_json(filepath))
+            if data is None:
+                return None
             
-            # Verificar se é formato novo ou antigo
-            if data.get("estrutura") == "secoes_organizadas" and "dre_estruturado" in data:
-                # Formato novo - criar informações adicionais para facilitar uso
-                data["formato"] = "estruturado"
-                
-                # Criar índice rápido de linhas por seção
-                data["indice_linhas"] = {}
-                if "dre_estruturado" in data:
-                    for secao_key, secao_data in data["dre_estruturado"].items():
-                        for linha_key, linha_data in secao_data["itens"].items():
-                            data["indice_linhas"][linha_key] = {
-                                "secao": secao_key,
-                                "nome_secao": secao_data["nome_secao"],
-                                "valores": linha_data["valores"]
-                            }
-                
-            else:
-                # Formato antigo - manter compatibilidade
-                data["formato"] = "antigo"
-                data["indice_linhas"] = {}
-                
-            return data
+            # Motivos de desatualização no grafo de dependências (vazio = atualizado)
+            desatualizado = [] if arquivo else self.motivos_desatualizacao(empresa_nome, TIPO_DRE)
+            return data.com_campos(desatualizado=desatualizado)
                 
         except Exception as e:
-            st.error(f"Erro ao carregar DRE: {e}")
+            _notificar("error", f"Erro ao carregar DRE: {e}")
             return None
     
+    def _ler_dre_json(self, filepath: str) -> Dict:
+        """
+        Lê o JSON do DRE (cópia local da chave) e acrescenta formato e índice de linhas
+        
+        Somente leitura: o layout antigo é servido como está; a reescrita no
+        normalizado fica para migrar_cache_dre.py ou para o próximo salvar_dre.
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        if data.get("estrutura") == ESTRUTURA_NORMALIZADA:
+            # Layout normalizado: formatos antigos e índice montados só quando acessados
+            return DreNormalizado(data, {"formato": "estruturado"})
+        
+        # Verificar se é formato novo ou antigo
+        if data.get("estrutura") == ESTRUTURA_SECOES and "dre_estruturado" in data:
+            # Formato novo - criar informações adicionais para facilitar uso
+            data["formato"] = "estruturado"
+            
+            # Criar índice rápido de linhas por seção
+            data["indice_linhas"] = {}
+            for secao_key, secao_data in data["dre_estruturado"].items():
+                for linha_key, linha_data in secao_data["itens"].items():
+                    data["indice_linhas"][linha_key] = {
+                        "secao": secao_key,
+                        "nome_secao": secao_data["nome_secao"],
+                        "valores": linha_data["valores"]
+                    }
+            
+        else:
+            # Formato antigo - manter compatibilidade
+            data["formato"] = "antigo"
+            data["indice_linhas"] = {}
+        return data
+    
+    def migrar_dre(self, chave: str, empresa_nome: str, bloquear: bool = True) -> Optional[tuple]:
+        """
+        Reescreve no lugar um DRE do layout antigo no normalizado
+        
+        O conteúdo (e o hash registrado no manifesto) não muda: artefatos que
+        dependem do DRE continuam atualizados. A gravação é condicional à versão
+        lida: um DRE novo gravado por outra réplica no meio não é sobrescrito.
+        
+        Args:
+            chave: Chave do JSON do DRE
+            empresa_nome: Empresa dona do arquivo (trava e manifesto)
+            bloquear: Espera a trava; False desiste se outro escritor estiver ativo
+        
+        Returns:
+            (bytes antes, bytes depois) ou None se o arquivo não foi reescrito
+        """
+        with self.trava(empresa_nome, bloquear) as travada:
+            if not travada:
+                return None
+            padrao = chave == self.chave_cache(empresa_nome, TIPO_DRE)
+            entrada = self.manifestos.entrada(empresa_nome, TIPO_DRE, chave) if padrao else None
+            original, versao = self.armazenamento.ler_com_versao(chave)
+            normalizado = migrar_conteudo_dre(json.loads(original.decode('utf-8'))) if original is not None else None
+            if normalizado is None:
+                return None
+            
+            dados = para_json(normalizado, **OPCOES_JSON)
+            self.armazenamento.gravar(chave, dados, versao_esperada=versao)
+            if entrada is not None:
+                # Mesma entrada (timestamp e dependências), agora apontando para o arquivo reescrito
+                _, resumo = self._resumo_arquivo(TIPO_DRE, chave)
+                self.manifestos.registrar(empresa_nome, TIPO_DRE, chave, resumo, ESTRUTURA_NORMALIZADA,
+                                          entrada.get("timestamp"), entrada.get("dependencias"))
+            return len(original), len(dados)
+    
+    def migrar_dres(self) -> Dict[str, tuple]:
+        """
+        Reescreve todos os DREs do cache ainda no layout antigo
+        
+        Returns:
+            Dicionário arquivo -> (bytes antes, bytes depois) dos arquivos reescritos
+        """
+        migrados = {}
+        for chave in self.armazenamento.listar(f"{PASTA_DRE}/"):
+            filename = chave[len(PASTA_DRE) + 1:]
+            if not filename.endswith('_dre.json'):
+                continue
+            try:
+                empresa = (self.armazenamento.ler_json(chave) or {}).get("empresa") or filename[:-len('_dre.json')]
+                tamanhos = self.migrar_dre(chave, empresa)
+            except Exception as e:
+                _notificar("warning", f"Erro ao migrar {filename}: {e}")
+                continue
+            if tamanhos:
+                migrados[filename] = tamanhos
+        return migrados
+    
     def carregar_fluxo_caixa(self, empresa_nome: str, arquivo: str = None) -> Optional[Dict]:
         """
         Carrega dados do fluxo de caixa de uma empresa (compatível com formato antigo e novo)
@@ -502,49 +848,56 @@ class DataCacheManager:
             arquivo: Nome específico do arquivo (opcional, usa o arquivo padrão da empresa)
         
         Returns:
-            Dados do fluxo de caixa ou None se não encontrado
+            Dados do fluxo de caixa (somente leitura) ou None se não encontrado; a chave
+            'desatualizado' lista os motivos quando alguma dependência mudou depois da geração
         """
         try:
-            if arquivo:
-                filepath = os.path.join(self.fluxo_path, arquivo)
-            else:
-                # Usar nome padrão da empresa
-                filename = f"{self._sanitize_filename(empresa_nome)}_fluxo.json"
-                filepath = os.path.join(self.fluxo_path, filename)
+            # Arquivo pedido ou nome padrão da empresa
+            chave = f"{PASTA_FLUXO}/{arquivo}" if arquivo else self.chave_cache(empresa_nome, TIPO_FLUXO)
             
-            if not os.path.exists(filepath):
+            filepath = self.armazenamento.caminho_local(chave)
+            if filepath is None:
                 return None
                 
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Conteúdo lido uma vez por versão do arquivo (compartilhado entre sessões)
+            data = cache_leituras.obter_ou_carregar(filepath, TIPO_FLUXO, lambda: self._ler_fluxo_json(filepath))
+            if data is None:
+                return None
             
-            # Verificar se é formato novo ou antigo
-            if data.get("estrutura") == "grupos_organizados" and "fluxo_estruturado" in data:
-                # Formato novo - criar informações adicionais para facilitar uso
-                data["formato"] = "estruturado"
-                
-                # Criar índice rápido de categorias por grupo
-                data["indice_categorias"] = {}
-                if "fluxo_estruturado" in data:
-                    for grupo_key, grupo_data in data["fluxo_estruturado"].items():
-                        for categoria_key, categoria_data in grupo_data["categorias"].items():
-                            data["indice_categorias"][categoria_key] = {
-                                "grupo": grupo_key,
-                                "nome_grupo": grupo_data["nome_grupo"],
-                                "valores": categoria_data["valores_mensais"]
-                            }
-                
-            else:
-                # Formato antigo - manter compatibilidade
-                data["formato"] = "antigo"
-                data["indice_categorias"] = {}
-                
-            return data
+            # Motivos de desatualização no grafo de dependências (vazio = atualizado)
+            desatualizado = [] if arquivo else self.motivos_desatualizacao(empresa_nome, TIPO_FLUXO)
+            return data.com_campos(desatualizado=desatualizado)
                 
         except Exception as e:
-            st.error(f"Erro ao carregar fluxo de caixa: {e}")
+            _notificar("error", f"Erro ao carregar fluxo de caixa: {e}")
             return None
     
+    def _ler_fluxo_json(self, filepath: str) -> Dict:
+        """Lê o JSON do fluxo de caixa e acrescenta formato e índice de categorias"""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        # Verificar se é formato novo ou antigo
+        if data.get("estrutura") == "grupos_organizados" and "fluxo_estruturado" in data:
+            # Formato novo - criar informações adicionais para facilitar uso
+            data["formato"] = "estruturado"
+            
+            # Criar índice rápido de categorias por grupo
+            data["indice_categorias"] = {}
+            for grupo_key, grupo_data in data["fluxo_estruturado"].items():
+                for categoria_key, categoria_data in grupo_data["categorias"].items():
+                    data["indice_categorias"][categoria_key] = {
+                        "grupo": grupo_key,
+                        "nome_grupo": grupo_data["nome_grupo"],
+                        "valores": categoria_data["valores_mensais"]
+                    }
+            
+        else:
+            # Formato antigo - manter compatibilidade
+            data["formato"] = "antigo"
+            data["indice_categorias"] = {}
+        return data
+    
     def carregar_detalhamento_categoria_mes(self, empresa_nome: str, categoria: str, mes: str) -> Optional[List[Dict]]:
         """
         Carrega detalhamento de uma categoria específica para um mês do cache DRE
@@ -555,31 +908,55 @@ class DataCacheManager:
             mes: Mês no formato 'YYYY-MM'
         
         Returns:
-            Lista de dicionários com detalhamento ou None
+            DetalhamentoCategoria (lista de dicionários) ou None se não houver
+            detalhamento; o atributo 'desatualizado' lista os motivos quando o DRE
+            está desatualizado (o detalhamento faz parte dele)
         """
         try:
-            # Carregar DRE completo
-            dados_dre = self.carregar_dre(empresa_nome)
-            
-            if not dados_dre or "dre_estruturado" not in dados_dre:
+            entrada = self.obter_manifesto(empresa_nome, TIPO_DRE)
+            if entrada is None:
                 return None
             
-            # Buscar categoria no DRE estruturado
-            for secao_key, secao_data in dados_dre["dre_estruturado"].items():
-                if categoria in secao_data.get("itens", {}):
-                    item = secao_data["itens"][categoria]
-                    
-                    # Verificar se tem detalhamento
-                    if "detalhamento" in item and mes in item["detalhamento"]:
-                        return item["detalhamento"][mes]
-            
-            return None
+            # Leitura só da chave (linha, mês) no índice, se ele for da versão atual do DRE
+            indexado, detalhamento = self.detalhamentos.obter(empresa_nome, hash_artefato(entrada), categoria, mes)
+            if not indexado:
+                detalhamento = self._indexar_detalhamento(empresa_nome, categoria, mes)
+            if detalhamento is None:
+                return None
+            return DetalhamentoCategoria(detalhamento, self.motivos_desatualizacao(empresa_nome, TIPO_DRE))
             
         except Exception as e:
-            st.error(f"Erro ao carregar detalhamento: {e}")
+            _notificar("error", f"Erro ao carregar detalhamento: {e}")
             return None
     
-    def salvar_transacoes(self, df_transacoes: pd.DataFrame, empresa_nome: str, metadata: Dict = None) -> str:
+    def _indexar_detalhamento(self, empresa_nome: str, categoria: str, mes: str) -> Optional[List[Dict]]:
+        """
+        Refaz o índice do detalhamento a partir do DRE salvo (índice ausente ou de outra versão)
+        
+        Com um escritor ativo o índice fica para depois e a resposta sai do DRE completo.
+        """
+        with self.trava(empresa_nome, bloquear=False) as travada:
+            # Com a trava, DRE e manifesto lidos aqui são da mesma gravação
+            entrada = self.obter_manifesto(empresa_nome, TIPO_DRE)
+            dados_dre = self.carregar_dre(empresa_nome)
+            if entrada is None or not dados_dre or "dre_estruturado" not in dados_dre:
+                return None
+            
+            if travada:
+                versao = hash_artefato(entrada)
+                self.detalhamentos.gravar(empresa_nome, versao, extrair_detalhamento(dados_dre))
+                return self.detalhamentos.obter(empresa_nome, versao, categoria, mes)[1]
+        
+        if isinstance(dados_dre, DreNormalizado):
+            return dados_dre.detalhamento(categoria, mes)
+        for secao_data in dados_dre["dre_estruturado"].values():
+            item = secao_data.get("itens", {}).get(categoria)
+            if item is not None:
+                return item.get("detalhamento", {}).get(mes)
+        return None
+    
+    def salvar_transacoes(self, df_transacoes: pd.DataFrame, empresa_nome: str, metadata: Dict = None,
+                          versao_esperada: Optional[str] = None) -> str:
         """
         Salva DataFrame de transações categorizadas do Vyco
         
@@ -587,32 +964,45 @@ class DataCacheManager:
             df_transacoes: DataFrame com todas as transações categorizadas
             empresa_nome: Nome da empresa
             metadata: Informações adicionais
+            versao_esperada: Versão lida com versao_cache (None = sem verificação)
         
         Returns:
-            Caminho do arquivo salvo
+            Localização do arquivo salvo
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_transacoes.json"
-            filepath = os.path.join(self.dre_path, filename)
+            df_transacoes = normalizar_transacoes(df_transacoes)
+            resumo = resumo_transacoes(df_transacoes)
+            dependencias = self.dependencias_atuais(empresa_nome, TIPO_TRANSACOES)
+            chave = self.chave_transacoes(empresa_nome)
             
-            # Preparar dados para salvamento
-            data = {
-                "empresa": empresa_nome,
-                "timestamp": datetime.now().isoformat(),
-                "tipo": "transacoes_categorizadas",
-                "metadata": metadata or {},
-                "total_transacoes": len(df_transacoes),
-                "transacoes": df_transacoes.to_dict('records')
-            }
-            
-            # Salvar em JSON
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            with self.trava(empresa_nome):
+                self.armazenamento.verificar_versao(chave, versao_esperada)
+                
+                # Mesmo conteúdo e mesmas dependências: nada a regravar (fluxo e DRE continuam válidos)
+                entrada = self.obter_manifesto(empresa_nome, TIPO_TRANSACOES)
+                if (entrada is not None and entrada.get('hash_conteudo') == resumo['hash_conteudo']
+                        and entrada.get('dependencias') == dependencias):
+                    return self.armazenamento.localizacao(chave)
+                
+                cabecalho = {
+                    "empresa": empresa_nome,
+                    "timestamp": datetime.now().isoformat(),
+                    "tipo": "transacoes_categorizadas",
+                    "metadata": metadata or {},
+                }
+                self.armazenamento.gravar(chave, serializar_transacoes_colunares(df_transacoes, cabecalho),
+                                          versao_esperada)
+                
+                self.manifestos.registrar(empresa_nome, TIPO_TRANSACOES, chave, resumo,
+                                          VERSAO_TRANSACOES, cabecalho["timestamp"], dependencias)
+                
+                # Cubo de agregados: apenas os meses alterados são reagrupados
+                self.cubos.atualizar(empresa_nome, df_transacoes)
             
-            return filepath
+            return self.armazenamento.localizacao(chave)
             
         except Exception as e:
-            st.error(f"Erro ao salvar transações: {e}")
+            _notificar("error", f"Erro ao salvar transações: {e}")
             return None
     
     def salvar_parecer_antigravity(self, empresa_nome: str, texto_analise: str) -> str:
@@ -620,18 +1010,15 @@ class DataCacheManager:
         Salva o texto do Parecer Antigravity em um arquivo MD
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_parecer_antigravity.md"
-            filepath = os.path.join(self.base_path, "analises", filename)
+            chave = self.chave_cache(empresa_nome, PARECER_ANTIGRAVITY)
             
-            # Garantir que diretório existe
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(texto_analise)
+            with self.trava(empresa_nome):
+                self.armazenamento.gravar_texto(chave, texto_analise)
+                self.registrar_artefato(empresa_nome, PARECER_ANTIGRAVITY, chave)
                 
-            return filepath
+            return self.armazenamento.localizacao(chave)
         except Exception as e:
-            st.error(f"Erro ao salvar parecer: {e}")
+            _notificar("error", f"Erro ao salvar parecer: {e}")
             return None
 
     def salvar_parecer_diagnostico(self, empresa_nome: str, texto_analise: str) -> str:
@@ -639,42 +1026,50 @@ class DataCacheManager:
         Salva o texto do Parecer Diagnóstico em um arquivo MD
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_parecer_diagnostico.md"
-            filepath = os.path.join(self.base_path, "analises", filename)
-            
-            # Garantir que diretório existe
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            chave = self.chave_cache(empresa_nome, PARECER_DIAGNOSTICO)
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(texto_analise)
+            with self.trava(empresa_nome):
+                self.armazenamento.gravar_texto(chave, texto_analise)
+                self.registrar_artefato(empresa_nome, PARECER_DIAGNOSTICO, chave)
                 
-            return filepath
+            return self.armazenamento.localizacao(chave)
         except Exception as e:
-            st.error(f"Erro ao salvar parecer diagnóstico: {e}")
+            _notificar("error", f"Erro ao salvar parecer diagnóstico: {e}")
             return None
 
-    def carregar_parecer_diagnostico(self, empresa_nome: str) -> Optional[str]:
+    def carregar_parecer_diagnostico(self, empresa_nome: str, permitir_desatualizado: bool = False) -> Optional[str]:
         """
         Carrega o texto do último Parecer Diagnóstico salvo
+        
+        Args:
+            empresa_nome: Nome da empresa
+            permitir_desatualizado: Devolve o parecer mesmo se fluxo/DRE mudaram depois dele
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_parecer_diagnostico.md"
-            filepath = os.path.join(self.base_path, "analises", filename)
+            if not permitir_desatualizado and self.motivos_desatualizacao(empresa_nome, PARECER_DIAGNOSTICO):
+                return None
             
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return f.read()
-            return None
+            filepath = self.armazenamento.caminho_local(self.chave_cache(empresa_nome, PARECER_DIAGNOSTICO))
+            if filepath is None:
+                return None
+            return cache_leituras.obter_ou_carregar(filepath, "parecer", lambda: self._ler_texto(filepath))
         except Exception as e:
             return None
 
+    @staticmethod
+    def _ler_texto(filepath: str) -> str:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _chave_relatorio_executivo(self, empresa_nome: str) -> str:
+        return f"{PASTA_DRE}/{self._sanitize_filename(empresa_nome)}_relatorio_executivo.json"
+
     def salvar_relatorio_executivo(self, df_relatorio: pd.DataFrame, empresa_nome: str) -> str:
         """
         Salva DataFrame do Relatório Executivo em JSON
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_relatorio_executivo.json"
-            filepath = os.path.join(self.dre_path, filename)
+            chave = self._chave_relatorio_executivo(empresa_nome)
             
             data = {
                 "empresa": empresa_nome,
@@ -683,80 +1078,206 @@ class DataCacheManager:
                 "dados": df_relatorio.to_dict('records')
             }
             
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            with self.trava(empresa_nome):
+                self.armazenamento.gravar_json(chave, data)
             
-            return filepath
+            return self.armazenamento.localizacao(chave)
         except Exception as e:
-            st.error(f"Erro ao salvar relatório executivo: {e}")
+            _notificar("error", f"Erro ao salvar relatório executivo: {e}")
             return None
 
     def carregar_relatorio_executivo(self, empresa_nome: str) -> Optional[pd.DataFrame]:
         """
-        Carrega DataFrame do Relatório Executivo
+        Carrega DataFrame do Relatório Executivo (cópia: alterações não afetam o cache)
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_relatorio_executivo.json"
-            filepath = os.path.join(self.dre_path, filename)
-            
-            if not os.path.exists(filepath):
-                return None
-            
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            dados = data.get('dados', [])
-            if not dados:
+            filepath = self.armazenamento.caminho_local(self._chave_relatorio_executivo(empresa_nome))
+            if filepath is None:
                 return None
-            
-            return pd.DataFrame(dados)
+            return cache_leituras.obter_ou_carregar(
+                filepath, "relatorio_executivo", lambda: self._ler_relatorio_executivo(filepath)
+            )
         except Exception as e:
-            st.error(f"Erro ao carregar relatório executivo: {e}")
+            _notificar("error", f"Erro ao carregar relatório executivo: {e}")
             return None
 
-    def carregar_parecer_antigravity(self, empresa_nome: str) -> Optional[str]:
+    @staticmethod
+    def _ler_relatorio_executivo(filepath: str) -> Optional[pd.DataFrame]:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        dados = data.get('dados', [])
+        return pd.DataFrame(dados) if dados else None
+
+    def carregar_parecer_antigravity(self, empresa_nome: str, permitir_desatualizado: bool = False) -> Optional[str]:
         """
         Carrega o texto do último Parecer Antigravity salvo
+        
+        Args:
+            empresa_nome: Nome da empresa
+            permitir_desatualizado: Devolve o parecer mesmo se fluxo/DRE mudaram depois dele
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_parecer_antigravity.md"
-            filepath = os.path.join(self.base_path, "analises", filename)
+            if not permitir_desatualizado and self.motivos_desatualizacao(empresa_nome, PARECER_ANTIGRAVITY):
+                return None
             
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return f.read()
-            return None
+            filepath = self.armazenamento.caminho_local(self.chave_cache(empresa_nome, PARECER_ANTIGRAVITY))
+            if filepath is None:
+                return None
+            return cache_leituras.obter_ou_carregar(filepath, "parecer", lambda: self._ler_texto(filepath))
         except Exception as e:
             return None
     
-    def carregar_transacoes(self, empresa_nome: str) -> Optional[pd.DataFrame]:
+    def carregar_cubo(self, empresa_nome: str) -> Optional[CuboAgregados]:
         """
-        Carrega DataFrame de transações categorizadas
+        Carrega o cubo de agregados das transações da empresa
+        
+        Caches salvos antes do cubo existir têm o cubo construído (e salvo) na primeira leitura.
         
         Args:
             empresa_nome: Nome da empresa
         
         Returns:
-            DataFrame com transações ou None se não encontrado
+            CuboAgregados ou None se não houver transações salvas
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_transacoes.json"
-            filepath = os.path.join(self.dre_path, filename)
+            cubo = self.cubos.carregar(empresa_nome)
+            if cubo is None:
+                df_transacoes = self.carregar_transacoes(empresa_nome)
+                if df_transacoes is None:
+                    return None
+                with self.trava(empresa_nome, bloquear=False) as travada:
+                    if not travada:
+                        # Um escritor está gravando esta empresa: monta o cubo sem salvar
+                        return construir_cubo(df_transacoes)
+                    cubo, _ = self.cubos.atualizar(empresa_nome, df_transacoes)
+            return cubo
             
-            if not os.path.exists(filepath):
+        except Exception as e:
+            _notificar("error", f"Erro ao carregar cubo de agregados: {e}")
+            return None
+    
+    def _ler_transacoes_json(self, empresa_nome: str):
+        """
+        Lê o JSON de transações de um cache antigo
+        
+        Returns:
+            Tupla (DataFrame ou None se não houver transações, cabeçalho)
+        """
+        data = self.armazenamento.ler_json(self._chave_transacoes_json(empresa_nome))
+        if data is None:
+            raise FileNotFoundError(self._chave_transacoes_json(empresa_nome))
+        
+        cabecalho = {
+            "empresa": data.get("empresa", empresa_nome),
+            "timestamp": data.get("timestamp", datetime.now().isoformat()),
+            "tipo": data.get("tipo", "transacoes_categorizadas"),
+            "metadata": data.get("metadata", {}),
+        }
+        transacoes = data.get('transacoes', [])
+        if not transacoes:
+            return None, cabecalho
+        
+        # Caches antigos guardavam também o valor já formatado (só para exibição)
+        return pd.DataFrame(transacoes).drop(columns=["Valor_Formatado"], errors="ignore"), cabecalho
+    
+    def migrar_transacoes(self, empresa_nome: str) -> Optional[str]:
+        """
+        Converte o JSON de transações de um cache antigo para o formato colunar
+        
+        O JSON é mantido como está (a leitura passa a preferir o arquivo colunar).
+        Um arquivo colunar já existente nunca é sobrescrito.
+        
+        Returns:
+            Chave do arquivo colunar ou None se não havia o que converter
+        """
+        chave = self.chave_transacoes(empresa_nome)
+        with self.trava(empresa_nome):
+            if self.armazenamento.existe(chave):
                 return None
-            
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            transacoes = data.get('transacoes', [])
-            if not transacoes:
+            try:
+                df, cabecalho = self._ler_transacoes_json(empresa_nome)
+            except FileNotFoundError:
                 return None
+            if df is None:
+                return None
+            self.armazenamento.gravar(chave, serializar_transacoes_colunares(df, cabecalho), VERSAO_AUSENTE)
+        return chave
+    
+    def migrar_transacoes_json(self) -> List[str]:
+        """
+        Converte todos os JSONs de transações do cache que ainda não têm arquivo colunar
+        
+        Returns:
+            Arquivos JSON convertidos
+        """
+        migrados = []
+        for chave in self.armazenamento.listar(f"{PASTA_DRE}/"):
+            filename = chave[len(PASTA_DRE) + 1:]
+            if not filename.endswith('_transacoes.json'):
+                continue
+            try:
+                empresa = (self.armazenamento.ler_json(chave) or {}).get("empresa") or filename[:-len('_transacoes.json')]
+                if self.migrar_transacoes(empresa):
+                    migrados.append(filename)
+            except Exception as e:
+                _notificar("warning", f"Erro ao migrar {filename}: {e}")
+        return migrados
+    
+    def _carregar_transacoes_json(self, empresa_nome: str, colunas: Optional[Iterable[str]] = None,
+                                  meses: Optional[Iterable[str]] = None) -> Optional[pd.DataFrame]:
+        """Transações do JSON antigo sem migrar (mesma projeção de carregar_transacoes)"""
+        df, _ = self._ler_transacoes_json(empresa_nome)
+        if df is None:
+            return None
+        df = normalizar_transacoes(df)
+        if meses is not None:
+            df = df[df[COLUNA_MES].isin([chave_de_rotulo(mes) for mes in meses])].reset_index(drop=True)
+        if colunas is not None:
+            df = df[[c for c in df.columns if c in set(colunas) | {COLUNA_DATA, COLUNA_MES}]]
+        return df if not df.empty else None
+    
+    def carregar_transacoes(self, empresa_nome: str, colunas: Optional[Iterable[str]] = None,
+                            meses: Optional[Iterable[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Carrega DataFrame de transações categorizadas
+        
+        Args:
+            empresa_nome: Nome da empresa
+            colunas: Colunas lidas (None = todas; Data e Mes_Chave sempre vêm junto)
+            meses: Meses 'AAAA-MM' lidos (None = todos)
+        
+        Returns:
+            DataFrame com transações ou None se não encontrado (cópia: alterações não afetam o cache)
+        """
+        try:
+            chave = self.chave_transacoes(empresa_nome)
+            
+            # Leitura decodificada uma vez por versão do arquivo e projeção (colunas/meses)
+            colunas = None if colunas is None else list(colunas)
+            meses = None if meses is None else list(meses)
+            variante = tuple(None if filtro is None else tuple(sorted(set(filtro))) for filtro in (colunas, meses))
             
-            return pd.DataFrame(transacoes)
+            filepath = self.armazenamento.caminho_local(chave)
+            if filepath is not None:
+                df = cache_leituras.obter_ou_carregar(
+                    filepath, TIPO_TRANSACOES,
+                    lambda: carregar_transacoes_colunares(filepath, colunas=colunas, meses=meses),
+                    variante,
+                )
+            else:
+                # Cache antigo: lê o JSON sem convertê-lo (conversão só em migrar_cache_dre.py ou salvar_transacoes)
+                filepath = self.armazenamento.caminho_local(self._chave_transacoes_json(empresa_nome))
+                if filepath is None:
+                    return None
+                df = cache_leituras.obter_ou_carregar(
+                    filepath, TIPO_TRANSACOES,
+                    lambda: self._carregar_transacoes_json(empresa_nome, colunas, meses),
+                    variante,
+                )
+            return df if df is not None and not df.empty else None
             
         except Exception as e:
-            st.error(f"Erro ao carregar transações: {e}")
+            _notificar("error", f"Erro ao carregar transações: {e}")
             return None
 
 
@@ -0,0 +1,189 @@
+"""
+Grafo de dependências dos artefatos em cache
+Cada artefato (transações, fluxo, DRE, pareceres) registra no manifesto o hash
+de cada dependência no momento em que foi gerado: arquivos de entrada (plano de
+contas, faturamento e estoque da licença), mapa de categorias e palavras-chave
+e os artefatos anteriores do grafo. Um artefato está desatualizado quando o
+hash atual de alguma dependência difere do registrado ou quando uma
+dependência está, ela mesma, desatualizada.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from logic.Analises_DFC_DRE.memo_categorizacao import versao_arquivo
+from logic.Analises_DFC_DRE.motor_fluxo import PLANO_CONTAS_PATH
+from logic.armazenamento import NAMESPACE_LICENCAS, VERSAO_AUSENTE, Armazenamento, obter_armazenamento
+from logic.manifesto_cache import TIPO_DRE, TIPO_FLUXO, TIPO_TRANSACOES, hash_arquivo, hash_conteudo
+
+DIR_LICENCAS = "./logic/CSVs/licencas"
+
+# Entradas (não geradas pelo sistema)
+ENTRADA_PLANO = "plano"
+ENTRADA_MAPA_CATEGORIAS = "mapa_categorias"
+ENTRADA_PALAVRAS_CHAVE = "palavras_chave"
+ENTRADA_FATURAMENTO = "faturamento"
+ENTRADA_ESTOQUE = "estoque"
+ENTRADAS = [ENTRADA_PLANO, ENTRADA_MAPA_CATEGORIAS, ENTRADA_PALAVRAS_CHAVE, ENTRADA_FATURAMENTO, ENTRADA_ESTOQUE]
+
+# Artefatos gerados a partir das entradas
+PARECER_DIAGNOSTICO = "parecer_diagnostico"
+PARECER_ANTIGRAVITY = "parecer_antigravity"
+PARECER_GPT = "parecer_gpt"
+
+# Artefato -> dependências (em ordem topológica: cada artefato só depende dos anteriores)
+DEPENDENCIAS = {
+    TIPO_TRANSACOES: [ENTRADA_MAPA_CATEGORIAS, ENTRADA_PALAVRAS_CHAVE],
+    TIPO_FLUXO: [TIPO_TRANSACOES, ENTRADA_PLANO, ENTRADA_FATURAMENTO, ENTRADA_ESTOQUE],
+    TIPO_DRE: [TIPO_FLUXO, TIPO_TRANSACOES, ENTRADA_PLANO, ENTRADA_FATURAMENTO, ENTRADA_ESTOQUE],
+    PARECER_DIAGNOSTICO: [TIPO_FLUXO, TIPO_DRE],
+    PARECER_ANTIGRAVITY: [TIPO_FLUXO, TIPO_DRE],
+    PARECER_GPT: [TIPO_FLUXO, TIPO_DRE],
+}
+
+# Hash usado para entradas inexistentes (ex.: licença sem faturamento salvo)
+HASH_AUSENTE = "ausente"
+
+# Hashes já calculados, pela versão do arquivo, do objeto ou do escopo no banco de categorias
+_hashes_conhecidos: Dict[tuple, str] = {}
+
+
+def _nome_limpo_licenca(licenca_nome: str) -> str:
+    nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    return nome_limpo.replace(' ', '_').lower()
+
+
+def chave_json_licenca(licenca_nome: str, tipo: str) -> str:
+    """
+    Chave do JSON de dados mensais da licença no armazenamento das licenças
+
+    Args:
+        licenca_nome: Nome da licença
+        tipo: 'faturamento' ou 'estoque'
+
+    Returns:
+        Chave do objeto (pode não existir)
+    """
+    return f"{_nome_limpo_licenca(licenca_nome)}_{tipo}.json"
+
+
+def caminho_categorias_licenca(licenca_nome: str) -> str:
+    """Caminho legado do mapa de categorias da licença (identifica o escopo no banco)"""
+    return f"{DIR_LICENCAS}/categorias_{_nome_limpo_licenca(licenca_nome)}.json"
+
+
+def hash_arquivo_entrada(caminho: str) -> str:
+    """Hash do arquivo de entrada (recalculado só quando mtime ou tamanho mudam)"""
+    versao = versao_arquivo(caminho)
+    if versao is None:
+        return HASH_AUSENTE
+    if versao not in _hashes_conhecidos:
+        _hashes_conhecidos[versao] = hash_arquivo(caminho)
+    return _hashes_conhecidos[versao]
+
+
+def hashes_objetos_entrada(armazenamento: Armazenamento, chaves: Iterable[str]) -> Dict[str, str]:
+    """
+    Hash de objetos de entrada (versões conferidas em lote; conteúdo lido só quando a versão muda)
+
+    Returns:
+        Dicionário chave -> hash (HASH_AUSENTE para objetos inexistentes)
+    """
+    hashes = {}
+    for chave, versao in armazenamento.versoes(chaves).items():
+        memo = (armazenamento.localizacao(chave), versao)
+        if versao == VERSAO_AUSENTE:
+            hashes[chave] = HASH_AUSENTE
+        elif memo in _hashes_conhecidos:
+            hashes[chave] = _hashes_conhecidos[memo]
+        else:
+            dados, versao_lida = armazenamento.ler_com_versao(chave)
+            if dados is None:
+                hashes[chave] = HASH_AUSENTE
+                continue
+            # Mesmo hash do arquivo inteiro (hash_arquivo): registros antigos continuam valendo
+            hashes[chave] = _hashes_conhecidos[(memo[0], versao_lida)] = hashlib.sha256(dados).hexdigest()
+    return hashes
+
+
+def _hash_escopo(versao: tuple, carregar) -> str:
+    """Hash do conteúdo de um escopo do banco de categorias (recalculado a cada nova versão)"""
+    if versao not in _hashes_conhecidos:
+        _hashes_conhecidos[versao] = hash_conteudo(carregar())
+    return _hashes_conhecidos[versao]
+
+
+def hashes_entradas(licenca_nome: str, plano_path: str = PLANO_CONTAS_PATH,
+                    entradas: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Hash atual de cada entrada de uma licença
+
+    Args:
+        licenca_nome: Nome da licença
+        plano_path: Caminho do plano de contas
+        entradas: Entradas calculadas (None = todas)
+
+    Returns:
+        Dicionário entrada -> hash (HASH_AUSENTE para arquivos inexistentes)
+    """
+    entradas = ENTRADAS if entradas is None else entradas
+    hashes = {}
+    if ENTRADA_PLANO in entradas:
+        hashes[ENTRADA_PLANO] = hash_arquivo_entrada(plano_path)
+    mensais = [entrada for entrada in (ENTRADA_FATURAMENTO, ENTRADA_ESTOQUE) if entrada in entradas]
+    if mensais:
+        chaves = {entrada: chave_json_licenca(licenca_nome, entrada) for entrada in mensais}
+        hashes_mensais = hashes_objetos_entrada(obter_armazenamento(NAMESPACE_LICENCAS), chaves.values())
+        hashes.update({entrada: hashes_mensais[chave] for entrada, chave in chaves.items()})
+
+    if ENTRADA_MAPA_CATEGORIAS in entradas or ENTRADA_PALAVRAS_CHAVE in entradas:
+        # Importado só aqui: abrir o banco de categorias não é necessário para os demais artefatos
+        from logic.categoria_store import categoria_store
+
+        if ENTRADA_MAPA_CATEGORIAS in entradas:
+            caminho = caminho_categorias_licenca(licenca_nome)
+            hashes[ENTRADA_MAPA_CATEGORIAS] = _hash_escopo(
+                categoria_store.versao(caminho), lambda: categoria_store.carregar_mapa(caminho)
+            )
+        if ENTRADA_PALAVRAS_CHAVE in entradas:
+            hashes[ENTRADA_PALAVRAS_CHAVE] = _hash_escopo(
+                categoria_store.versao_palavras_chave(),
+                lambda: categoria_store.carregar_palavras_chave().to_dict('records'),
+            )
+    return hashes
+
+
+def hash_artefato(entrada: Dict) -> str:
+    """Hash que identifica um artefato registrado (conteúdo, quando disponível, ou o arquivo)"""
+    return entrada.get('hash_conteudo') or entrada['hash']
+
+
+def verificar_artefatos(registradas: Dict[str, Optional[Dict[str, str]]], hashes_atuais: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Motivos de desatualização de cada artefato existente
+
+    Args:
+        registradas: Artefato -> dependências registradas na geração (None = sem registro)
+        hashes_atuais: Hash atual de cada entrada e de cada artefato existente
+
+    Returns:
+        Dicionário artefato -> lista de motivos (vazia = atualizado); artefatos
+        sem registro (caches anteriores ao grafo) têm estado desconhecido e não
+        são dados como desatualizados
+    """
+    motivos: Dict[str, List[str]] = {}
+    for artefato, dependencias in DEPENDENCIAS.items():
+        if artefato not in registradas:
+            continue
+        registro = registradas[artefato]
+        if registro is None:
+            motivos[artefato] = []
+            continue
+
+        motivos[artefato] = []
+        for dependencia in dependencias:
+            if motivos.get(dependencia):
+                motivos[artefato].append(f"{dependencia} desatualizado")
+            elif registro.get(dependencia) != hashes_atuais.get(dependencia, HASH_AUSENTE):
+                motivos[artefato].append(f"{dependencia} alterado")
+    return motivos
@@ -0,0 +1,148 @@
+"""
+Índice do detalhamento do DRE por (empresa, linha, mês) em SQLite
+O detalhamento de cada linha e mês é gravado numa linha própria de uma tabela
+agrupada pela chave (WITHOUT ROWID): a consulta de uma categoria num mês lê só
+as páginas daquela chave, sem abrir o JSON do DRE, e o custo não cresce com o
+histórico. Cada empresa guarda a versão (hash do conteúdo) do DRE de onde o
+índice saiu; com outra versão, o índice é refeito a partir do DRE.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from logic.dre_normalizado import CAMPOS_DETALHAMENTO
+
+
+class DetalhamentoIndexado:
+    """Repositório SQLite do detalhamento do DRE (por empresa/linha/mês)"""
+
+    def __init__(self, db_path: str = "./data_cache/detalhamento.sqlite3"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._criar_estrutura()
+
+    @contextmanager
+    def _conectar(self):
+        """Abre uma conexão em transação (commit ao final, rollback em caso de erro)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _criar_estrutura(self):
+        """Cria tabelas se não existirem"""
+        with self._conectar() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS versoes (
+                    empresa TEXT PRIMARY KEY,
+                    versao TEXT NOT NULL,
+                    atualizado_em TEXT
+                );
+                CREATE TABLE IF NOT EXISTS detalhamento (
+                    empresa TEXT NOT NULL,
+                    linha TEXT NOT NULL,
+                    mes TEXT NOT NULL,
+                    entradas TEXT NOT NULL,
+                    PRIMARY KEY (empresa, linha, mes)
+                ) WITHOUT ROWID;
+            """)
+
+    def gravar(self, empresa_nome: str, versao: str, detalhamento: Dict[str, Dict[str, list]]) -> int:
+        """
+        Substitui o índice de uma empresa
+
+        Args:
+            empresa_nome: Nome da empresa
+            versao: Hash do conteúdo do DRE de onde o detalhamento saiu
+            detalhamento: Linha -> mês -> entradas ([subcategoria, tipo, quantidade, valor] ou dicts)
+
+        Returns:
+            Quantidade de pares (linha, mês) gravados
+        """
+        registros = [
+            (empresa_nome, linha, mes, json.dumps(entradas, ensure_ascii=False, separators=(",", ":"), default=str))
+            for linha, meses in detalhamento.items()
+            for mes, entradas in meses.items()
+        ]
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM detalhamento WHERE empresa = ?", (empresa_nome,))
+            conn.executemany(
+                "INSERT INTO detalhamento (empresa, linha, mes, entradas) VALUES (?, ?, ?, ?)", registros
+            )
+            conn.execute("""
+                INSERT INTO versoes (empresa, versao, atualizado_em) VALUES (?, ?, ?)
+                ON CONFLICT(empresa) DO UPDATE SET versao = excluded.versao, atualizado_em = excluded.atualizado_em
+            """, (empresa_nome, versao, datetime.now().isoformat()))
+        return len(registros)
+
+    def obter(self, empresa_nome: str, versao: str, linha: str, mes: str) -> Tuple[bool, Optional[List[Dict]]]:
+        """
+        Detalhamento de uma linha do DRE num mês
+
+        Args:
+            empresa_nome: Nome da empresa
+            versao: Hash do conteúdo do DRE atual
+            linha: Linha do DRE (ex.: 'DESPESA OPERACIONAL')
+            mes: Mês 'AAAA-MM'
+
+        Returns:
+            Tupla (índice na versão pedida, entradas ou None se a linha não tiver
+            detalhamento no mês); com o índice em outra versão, (False, None)
+        """
+        with self._conectar() as conn:
+            registro = conn.execute("""
+                SELECT v.versao, d.entradas FROM versoes v
+                LEFT JOIN detalhamento d ON d.empresa = v.empresa AND d.linha = ? AND d.mes = ?
+                WHERE v.empresa = ?
+            """, (linha, mes, empresa_nome)).fetchone()
+
+        if registro is None or registro[0] != versao:
+            return False, None
+        if registro[1] is None:
+            return True, None
+        return True, _entradas(registro[1])
+
+    def obter_meses(self, empresa_nome: str, versao: str, meses: List[str]) -> Optional[Dict[str, Dict[str, List[Dict]]]]:
+        """
+        Detalhamento de todas as linhas do DRE em alguns meses (uma consulta)
+
+        Args:
+            empresa_nome: Nome da empresa
+            versao: Hash do conteúdo do DRE atual
+            meses: Meses 'AAAA-MM'
+
+        Returns:
+            Mês -> linha -> entradas (só os pares com detalhamento), ou None com o índice em outra versão
+        """
+        with self._conectar() as conn:
+            registro = conn.execute("SELECT versao FROM versoes WHERE empresa = ?", (empresa_nome,)).fetchone()
+            if registro is None or registro[0] != versao:
+                return None
+            registros = conn.execute(f"""
+                SELECT mes, linha, entradas FROM detalhamento
+                WHERE empresa = ? AND mes IN ({", ".join("?" * len(meses))})
+            """, (empresa_nome, *meses)).fetchall() if meses else []
+
+        detalhamento = {}
+        for mes, linha, entradas in registros:
+            detalhamento.setdefault(mes, {})[linha] = _entradas(entradas)
+        return detalhamento
+
+
+def _entradas(texto: str) -> List[Dict]:
+    """Entradas gravadas no índice como dicionários (subcategoria, tipo, quantidade, valor)"""
+    return [
+        dict(zip(CAMPOS_DETALHAMENTO, entrada)) if isinstance(entrada, list) else entrada
+        for entrada in json.loads(texto)
+    ]
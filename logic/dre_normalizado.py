@@ -0,0 +1,223 @@
+"""
+Layout normalizado do cache do DRE
+O JSON antigo guardava cada valor três vezes (dre_estruturado, dados e
+dados_indexados) e o detalhamento como lista de dicionários. O layout
+normalizado guarda uma matriz linhas x colunas, a lista de linhas de cada seção
+e o detalhamento como linhas [subcategoria, tipo, quantidade, valor]. Leitores
+recebem um DreNormalizado, que monta os formatos antigos (dre_estruturado,
+dados, dados_indexados, indice_linhas) só quando são acessados.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from logic.cache_leituras import DicionarioSomenteLeitura, congelar, tamanho_estimado
+
+ESTRUTURA_SECOES = "secoes_organizadas"
+ESTRUTURA_NORMALIZADA = "secoes_normalizadas"
+
+CAMPOS_DETALHAMENTO = ["subcategoria", "tipo", "quantidade", "valor"]
+
+# Campos do layout normalizado (não aparecem nas visões de compatibilidade)
+CAMPOS_NORMALIZADOS = ("colunas", "linhas", "valores", "secoes", "campos_detalhamento", "detalhamento")
+
+# Formatos antigos montados sob demanda, na ordem em que apareciam no JSON
+VISOES = ("dre_estruturado", "dados", "dados_indexados", "indice_linhas")
+
+# JSON compacto: com indentação, cada número da matriz de valores ocuparia uma linha
+OPCOES_JSON = {"indent": None, "separators": (",", ":")}
+
+
+def normalizar_dre(data: Dict) -> Dict:
+    """
+    Converte um DRE no layout antigo (secoes_organizadas) para o normalizado
+
+    Args:
+        data: Conteúdo do JSON antigo (ou o dicionário montado em salvar_dre)
+
+    Returns:
+        Conteúdo no layout normalizado
+    """
+    dados_indexados = data.get("dados_indexados", {})
+    linhas = list(dados_indexados)
+    colunas = list(dados_indexados[linhas[0]]) if linhas else []
+
+    secoes, detalhamento = {}, {}
+    for secao_key, secao_data in data.get("dre_estruturado", {}).items():
+        secoes[secao_key] = {"nome_secao": secao_data["nome_secao"], "linhas": list(secao_data["itens"])}
+        for linha, item in secao_data["itens"].items():
+            if "detalhamento" in item:
+                detalhamento[linha] = {
+                    mes: [
+                        # Entradas com outros campos ficam como estavam
+                        [entrada[c] for c in CAMPOS_DETALHAMENTO] if list(entrada) == CAMPOS_DETALHAMENTO else entrada
+                        for entrada in entradas
+                    ]
+                    for mes, entradas in item["detalhamento"].items()
+                }
+
+    normalizado = {chave: valor for chave, valor in data.items() if chave not in VISOES and chave != "formato"}
+    normalizado.update({
+        "estrutura": ESTRUTURA_NORMALIZADA,
+        "colunas": colunas,
+        "linhas": linhas,
+        "valores": [[dados_indexados[linha].get(coluna) for coluna in colunas] for linha in linhas],
+        "secoes": secoes,
+        "campos_detalhamento": CAMPOS_DETALHAMENTO,
+        "detalhamento": detalhamento,
+    })
+    return normalizado
+
+
+def _linhas_indexadas(normalizado: Dict) -> Dict[str, Dict]:
+    colunas = normalizado["colunas"]
+    return {linha: dict(zip(colunas, valores)) for linha, valores in zip(normalizado["linhas"], normalizado["valores"])}
+
+
+def _dre_estruturado(normalizado: Dict, indexados: Dict[str, Dict]) -> Dict:
+    campos = normalizado.get("campos_detalhamento", CAMPOS_DETALHAMENTO)
+    estruturado = {}
+    for secao_key, secao in normalizado["secoes"].items():
+        itens = {}
+        for linha in secao["linhas"]:
+            item = {"nome_linha": linha, "valores": indexados[linha]}
+            if linha in normalizado["detalhamento"]:
+                item["detalhamento"] = {
+                    mes: [dict(zip(campos, entrada)) if isinstance(entrada, list) else entrada for entrada in entradas]
+                    for mes, entradas in normalizado["detalhamento"][linha].items()
+                }
+            itens[linha] = item
+        estruturado[secao_key] = {"nome_secao": secao["nome_secao"], "itens": itens}
+    return estruturado
+
+
+class DreNormalizado(DicionarioSomenteLeitura):
+    """
+    DRE normalizado visto no formato antigo (somente leitura)
+
+    dre_estruturado, dados, dados_indexados e indice_linhas são montados no
+    primeiro acesso e reaproveitados por todas as cópias feitas com com_campos.
+    """
+
+    def __init__(self, normalizado: Dict, campos: Optional[Dict] = None, _visoes: Optional[Dict] = None):
+        base = {chave: valor for chave, valor in normalizado.items() if chave not in CAMPOS_NORMALIZADOS}
+        base["estrutura"] = ESTRUTURA_SECOES
+        base.update(campos or {})
+        dict.__init__(self, congelar(base))
+        self._normalizado = normalizado
+        self._visoes = {} if _visoes is None else _visoes
+
+    def com_campos(self, **campos) -> "DreNormalizado":
+        """Cópia com campos acrescentados, compartilhando as visões já montadas"""
+        return DreNormalizado(self._normalizado, dict(dict.items(self), **campos), self._visoes)
+
+    def _visao(self, chave: str):
+        if chave not in self._visoes:
+            if chave == "dados_indexados":
+                valor = _linhas_indexadas(self._normalizado)
+            elif chave == "dados":
+                valor = list(self["dados_indexados"].values())
+            elif chave == "dre_estruturado":
+                valor = _dre_estruturado(self._normalizado, self["dados_indexados"])
+            else:
+                valor = {
+                    linha: {"secao": secao_key, "nome_secao": secao["nome_secao"], "valores": item["valores"]}
+                    for secao_key, secao in self["dre_estruturado"].items()
+                    for linha, item in secao["itens"].items()
+                }
+            self._visoes[chave] = congelar(valor)
+        return self._visoes[chave]
+
+    def detalhamento(self, linha: str, mes: str) -> Optional[List[Dict]]:
+        """Detalhamento de uma linha num mês, sem montar o dre_estruturado inteiro"""
+        entradas = self._normalizado["detalhamento"].get(linha, {}).get(mes)
+        if entradas is None:
+            return None
+        campos = self._normalizado.get("campos_detalhamento", CAMPOS_DETALHAMENTO)
+        return congelar([dict(zip(campos, entrada)) if isinstance(entrada, list) else entrada for entrada in entradas])
+
+    def __getitem__(self, chave):
+        if chave in VISOES:
+            return self._visao(chave)
+        return dict.__getitem__(self, chave)
+
+    def get(self, chave, padrao=None):
+        try:
+            return self[chave]
+        except KeyError:
+            return padrao
+
+    def __contains__(self, chave):
+        return chave in VISOES or dict.__contains__(self, chave)
+
+    def keys(self):
+        ordem = list(dict.keys(self))
+        posicao = ordem.index("estrutura") + 1
+        return dict.fromkeys(ordem[:posicao] + list(VISOES) + ordem[posicao:]).keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return dict.__len__(self) + len(VISOES)
+
+    def items(self):
+        return [(chave, self[chave]) for chave in self.keys()]
+
+    def values(self):
+        return [self[chave] for chave in self.keys()]
+
+    def __eq__(self, outro):
+        return dict(self.items()) == outro
+
+    def __ne__(self, outro):
+        return not self == outro
+
+    __hash__ = None
+
+    def copy(self):
+        return dict(self.items())
+
+    __copy__ = copy
+
+    def __repr__(self):
+        return f"DreNormalizado(empresa={dict.get(self, 'empresa')!r}, linhas={len(self._normalizado['linhas'])})"
+
+    def __sizeof__(self):
+        # Visões ainda não montadas não ocupam memória; o layout normalizado sim
+        return dict.__sizeof__(self) + tamanho_estimado(self._normalizado)
+
+
+def extrair_detalhamento(data: Dict) -> Dict[str, Dict[str, list]]:
+    """Detalhamento compacto (linha -> mês -> entradas) de um DRE em qualquer dos dois layouts"""
+    if isinstance(data, DreNormalizado):
+        return data._normalizado["detalhamento"]
+    return normalizar_dre(data)["detalhamento"]
+
+
+def abrir_dre(data: Dict) -> Dict:
+    """Conteúdo de um JSON de DRE como leitores esperam (layout normalizado vira DreNormalizado)"""
+    if data.get("estrutura") == ESTRUTURA_NORMALIZADA:
+        return DreNormalizado(data)
+    return data
+
+
+def migrar_conteudo_dre(data: Dict) -> Optional[Dict]:
+    """
+    Conteúdo de um JSON de DRE do layout antigo convertido para o normalizado
+
+    A conversão só é aceita se as visões do layout normalizado reproduzirem
+    exatamente dre_estruturado, dados e dados_indexados do original.
+
+    Returns:
+        Conteúdo normalizado ou None se o DRE já estiver normalizado, não for um
+        DRE estruturado ou não puder ser convertido sem perda
+    """
+    if data.get("estrutura") != ESTRUTURA_SECOES or "dre_estruturado" not in data:
+        return None
+
+    normalizado = normalizar_dre(data)
+    visao = DreNormalizado(json.loads(json.dumps(normalizado, ensure_ascii=False, default=str)))
+    if any(visao[chave] != data.get(chave, visao[chave]) for chave in ("dre_estruturado", "dados", "dados_indexados")):
+        return None
+    return normalizado
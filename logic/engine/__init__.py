@@ -0,0 +1,13 @@
+"""
+Camada de cálculo do fluxo de caixa, DRE e parecer
+Funções sem efeitos colaterais de interface: recebem DataFrames e devolvem
+tabelas e Diagnosticos. As páginas do Streamlit apenas exibem os resultados.
+"""
+
+from logic.engine.consolidacao import RegraEliminacao, ResultadoConsolidacao, consolidar_licencas
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.dre import calcular_dre, calcular_dre_vyco, completar_fluxo_dre
+from logic.engine.estrutura_dre import ProgramaDRE, carregar_programa_dre, compilar_estrutura_dre
+from logic.engine.fluxo import ResultadoFluxo, calcular_fluxo_caixa, calcular_fluxo_caixa_vyco, montar_fluxo_vyco
+from logic.engine.fluxo_diario import MatrizFluxoDiaria, calcular_matriz_fluxo_diaria, posicao_diaria
+from logic.engine.parecer import ResultadoParecer, calcular_parecer, gerar_texto_parecer
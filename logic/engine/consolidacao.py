@@ -0,0 +1,326 @@
+"""
+Consolidação de várias licenças (grupos de empresas) no fluxo de caixa e no DRE
+Cada licença vira um cubo categoria x mês calculado em um processo separado e
+memoizado pela versão dos seus arquivos; incluir uma empresa no grupo calcula
+apenas o cubo dela. Os cubos são alinhados (união de categorias e meses) e
+somados, com eliminação opcional de categorias entre empresas do grupo.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import rotulo_mes
+from logic.Analises_DFC_DRE.memo_categorizacao import CacheCategorizacao, versao_arquivo
+from logic.Analises_DFC_DRE.motor_fluxo import PLANO_CONTAS_PATH, calcular_matriz_fluxo
+from logic.armazenamento import NAMESPACE_LICENCAS, obter_armazenamento
+from logic.data_cache_manager import cache_manager
+from logic.dependencias_cache import chave_json_licenca
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.dre import calcular_dre_vyco
+from logic.engine.fluxo import ResultadoFluxo, montar_fluxo_vyco
+from logic.manifesto_cache import TIPO_TRANSACOES
+
+MAX_PROCESSOS = max(1, min(4, os.cpu_count() or 1))
+
+
+def carregar_json_licenca(licenca_nome: str, tipo: str) -> Dict[str, float]:
+    """Dados mensais (faturamento ou estoque) da licença; {} se o arquivo não existir"""
+    return obter_armazenamento(NAMESPACE_LICENCAS).ler_json(chave_json_licenca(licenca_nome, tipo), {})
+
+
+class CuboLicenca:
+    """Matriz categoria x mês de uma licença, com faturamento e estoque (enviada entre processos)"""
+
+    def __init__(self, licenca: str, categorias: List[str], chaves_meses: np.ndarray, valores: np.ndarray,
+                 faturamento: Dict[str, float], estoque: Dict[str, float]):
+        self.licenca = licenca
+        self.categorias = categorias
+        self.chaves_meses = chaves_meses
+        self.valores = valores
+        self.faturamento = faturamento
+        self.estoque = estoque
+
+    @property
+    def vazio(self) -> bool:
+        return len(self.categorias) == 0
+
+
+def calcular_cubo_licenca(licenca: str, plano_path: str = PLANO_CONTAS_PATH) -> CuboLicenca:
+    """
+    Calcula o cubo de uma licença a partir do cache de transações (executado nos processos auxiliares)
+
+    Args:
+        licenca: Nome da licença
+        plano_path: Caminho do plano de contas
+
+    Returns:
+        CuboLicenca (vazio se a licença não tiver transações salvas)
+    """
+    faturamento = carregar_json_licenca(licenca, "faturamento")
+    estoque = carregar_json_licenca(licenca, "estoque")
+
+    df_transacoes = cache_manager.carregar_transacoes(licenca)
+    if df_transacoes is None or df_transacoes.empty:
+        return CuboLicenca(licenca, [], np.array([], dtype=np.int32), np.zeros((0, 0)), faturamento, estoque)
+
+    matriz = calcular_matriz_fluxo(df_transacoes, plano_path)
+    return CuboLicenca(licenca, matriz.categorias, matriz.chaves_meses, matriz.valores, faturamento, estoque)
+
+
+def chave_cubo_licenca(licenca: str, plano_path: str = PLANO_CONTAS_PATH) -> tuple:
+    """Chave do cubo: muda quando as transações, os JSONs da licença ou o plano mudam"""
+    chaves_json = [chave_json_licenca(licenca, tipo) for tipo in ("faturamento", "estoque")]
+    versoes_json = obter_armazenamento(NAMESPACE_LICENCAS).versoes(chaves_json)
+    return (
+        "cubo_licenca",
+        licenca,
+        cache_manager.versao_cache(licenca, TIPO_TRANSACOES),
+        *(versoes_json[chave] for chave in chaves_json),
+        versao_arquivo(plano_path),
+    )
+
+
+class RegraEliminacao:
+    """Categorias entre empresas do grupo (ex.: transferências, mútuos) retiradas do consolidado"""
+
+    def __init__(self, categorias: Iterable[str], entidades: Optional[Iterable[str]] = None, descricao: str = ""):
+        """
+        Args:
+            categorias: Categorias eliminadas
+            entidades: Licenças às quais a regra se aplica (None = todas)
+            descricao: Texto exibido nos avisos
+        """
+        self.categorias = list(categorias)
+        self.entidades = None if entidades is None else list(entidades)
+        self.descricao = descricao or ", ".join(self.categorias)
+
+    def aplica_a(self, entidade: str) -> bool:
+        return self.entidades is None or entidade in self.entidades
+
+
+class ResultadoConsolidacao:
+    """Cubo entidade x categoria x mês alinhado, com o valor eliminado de cada célula"""
+
+    def __init__(self, entidades: List[str], categorias: List[str], meses: List[str], cubo: np.ndarray,
+                 eliminado: np.ndarray, faturamento: np.ndarray, estoque: np.ndarray,
+                 diagnosticos: Optional[Diagnosticos] = None):
+        self.entidades = entidades
+        self.categorias = categorias
+        self.meses = meses
+        self.cubo = cubo
+        self.eliminado = eliminado
+        self.faturamento = faturamento
+        self.estoque = estoque
+        self.diagnosticos = diagnosticos or Diagnosticos()
+
+    @property
+    def vazio(self) -> bool:
+        return len(self.entidades) == 0 or len(self.categorias) == 0
+
+    def _tabela(self, valores: np.ndarray) -> pd.DataFrame:
+        """Matriz categoria x mês como DataFrame, sem categorias zeradas em todos os meses"""
+        df = pd.DataFrame(valores, index=pd.Index(self.categorias, name="Categoria"),
+                          columns=pd.Index(self.meses, name="Mes"))
+        return df[np.abs(valores).sum(axis=1) > 0]
+
+    def _posicao(self, entidade: str) -> int:
+        if entidade not in self.entidades:
+            raise KeyError(f"Licença '{entidade}' não faz parte da consolidação")
+        return self.entidades.index(entidade)
+
+    def consolidado(self) -> pd.DataFrame:
+        """Tabela categoria x mês do grupo, já sem os valores eliminados"""
+        return self._tabela((self.cubo - self.eliminado).sum(axis=0))
+
+    def eliminacoes(self) -> pd.DataFrame:
+        """Valores eliminados por entidade e mês"""
+        return pd.DataFrame(self.eliminado.sum(axis=1), index=pd.Index(self.entidades, name="Licença"),
+                            columns=self.meses)
+
+    def por_entidade(self, entidade: str) -> pd.DataFrame:
+        """Tabela categoria x mês de uma licença (sem eliminações)"""
+        return self._tabela(self.cubo[self._posicao(entidade)])
+
+    def contribuicao(self, categoria: str) -> pd.DataFrame:
+        """Detalhamento de uma categoria do consolidado: licença x mês"""
+        if categoria not in self.categorias:
+            return pd.DataFrame(0.0, index=pd.Index(self.entidades, name="Licença"), columns=self.meses)
+        posicao = self.categorias.index(categoria)
+        return pd.DataFrame(self.cubo[:, posicao, :] - self.eliminado[:, posicao, :],
+                            index=pd.Index(self.entidades, name="Licença"), columns=self.meses)
+
+    def dados_mensais(self, valores: np.ndarray) -> Dict[str, float]:
+        """Dicionário mês -> valor (formato dos JSONs de faturamento/estoque)"""
+        return dict(zip(self.meses, valores.tolist()))
+
+    def _entradas(self, entidade: Optional[str]):
+        """Tabela categoria x mês, faturamento e estoque do grupo ou de uma licença"""
+        if entidade is None:
+            return self.consolidado(), self.faturamento.sum(axis=0), self.estoque.sum(axis=0)
+        posicao = self._posicao(entidade)
+        return self.por_entidade(entidade), self.faturamento[posicao], self.estoque[posicao]
+
+    def fluxo(self, meses_historicos: Optional[int] = None, entidade: Optional[str] = None) -> ResultadoFluxo:
+        """
+        Fluxo de caixa do Vyco para o grupo ou para uma das licenças
+
+        Args:
+            meses_historicos: Quantidade de meses exibidos (None = todos)
+            entidade: Licença detalhada (None = consolidado)
+
+        Returns:
+            ResultadoFluxo (vazio se não houver valores)
+        """
+        df_pivot, faturamento, estoque = self._entradas(entidade)
+        resultado = ResultadoFluxo(self.diagnosticos)
+        if df_pivot.empty:
+            return resultado
+        return montar_fluxo_vyco(df_pivot, self.dados_mensais(faturamento), self.dados_mensais(estoque),
+                                 meses_historicos, resultado)
+
+    def dre(self, plano: pd.DataFrame, entidade: Optional[str] = None) -> pd.DataFrame:
+        """
+        DRE do Vyco para o grupo ou para uma das licenças
+
+        Args:
+            plano: Plano de contas
+            entidade: Licença detalhada (None = consolidado)
+
+        Returns:
+            DataFrame do DRE com colunas dos meses, TOTAL e % (vazio se não houver valores)
+        """
+        calculo = self.fluxo(entidade=entidade)
+        if calculo.vazio:
+            return pd.DataFrame()
+        _, faturamento, estoque = self._entradas(entidade)
+        return calcular_dre_vyco(calculo.df_final, plano, self.dados_mensais(faturamento),
+                                 self.dados_mensais(estoque), self.diagnosticos)
+
+
+def _calcular_cubos(licencas: List[str], plano_path: str, max_processos: int,
+                    diagnosticos: Diagnosticos) -> Dict[str, CuboLicenca]:
+    """
+    Calcula os cubos das licenças, em processos separados quando há mais de uma
+
+    O contexto 'spawn' evita copiar as threads do servidor Streamlit para os
+    processos auxiliares. Se o pool não puder ser usado, calcula em sequência.
+    """
+    cubos: Dict[str, CuboLicenca] = {}
+    if len(licencas) > 1 and max_processos > 1:
+        try:
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(max_processos, len(licencas)), mp_context=contexto) as executor:
+                futuros = {licenca: executor.submit(calcular_cubo_licenca, licenca, plano_path) for licenca in licencas}
+                for licenca, futuro in futuros.items():
+                    try:
+                        cubos[licenca] = futuro.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        diagnosticos.erro(f"❌ Erro ao calcular a licença '{licenca}': {e}")
+                        cubos[licenca] = None
+        except (OSError, RuntimeError) as e:
+            diagnosticos.aviso(f"⚠️ Processamento paralelo indisponível ({e}); calculando as licenças em sequência.")
+
+    for licenca in licencas:
+        if licenca in cubos:
+            continue
+        try:
+            cubos[licenca] = calcular_cubo_licenca(licenca, plano_path)
+        except Exception as e:
+            diagnosticos.erro(f"❌ Erro ao calcular a licença '{licenca}': {e}")
+            cubos[licenca] = None
+    return {licenca: cubo for licenca, cubo in cubos.items() if cubo is not None}
+
+
+def obter_cubos_licencas(licencas: Iterable[str], plano_path: str = PLANO_CONTAS_PATH,
+                         max_processos: int = MAX_PROCESSOS,
+                         diagnosticos: Optional[Diagnosticos] = None) -> Dict[str, CuboLicenca]:
+    """
+    Cubos das licenças, reaproveitando os memoizados e calculando apenas os que faltam
+
+    Args:
+        licencas: Nomes das licenças
+        plano_path: Caminho do plano de contas
+        max_processos: Limite de processos auxiliares (1 = tudo no processo atual)
+        diagnosticos: Destino dos erros por licença
+
+    Returns:
+        Dicionário licença -> CuboLicenca (licenças com erro ficam de fora)
+    """
+    diagnosticos = diagnosticos if diagnosticos is not None else Diagnosticos()
+    chaves = {licenca: chave_cubo_licenca(licenca, plano_path) for licenca in licencas}
+    cubos = {licenca: cache_consolidacao.obter(chave) for licenca, chave in chaves.items()}
+
+    faltantes = [licenca for licenca, cubo in cubos.items() if cubo is None]
+    for licenca, cubo in _calcular_cubos(faltantes, plano_path, max_processos, diagnosticos).items():
+        cache_consolidacao.guardar(chaves[licenca], cubo)
+        cubos[licenca] = cubo
+    return {licenca: cubo for licenca, cubo in cubos.items() if cubo is not None}
+
+
+def consolidar_licencas(licencas: Iterable[str], regras: Iterable[RegraEliminacao] = (),
+                        plano_path: str = PLANO_CONTAS_PATH,
+                        max_processos: int = MAX_PROCESSOS) -> ResultadoConsolidacao:
+    """
+    Consolida o fluxo de caixa de várias licenças
+
+    Args:
+        licencas: Nomes das licenças do grupo
+        regras: Regras de eliminação entre empresas do grupo
+        plano_path: Caminho do plano de contas
+        max_processos: Limite de processos auxiliares
+
+    Returns:
+        ResultadoConsolidacao com o cubo alinhado (união de categorias e meses)
+    """
+    diagnosticos = Diagnosticos()
+    cubos = obter_cubos_licencas(list(dict.fromkeys(licencas)), plano_path, max_processos, diagnosticos)
+    for licenca in [licenca for licenca, cubo in cubos.items() if cubo.vazio]:
+        diagnosticos.aviso(f"⚠️ Licença '{licenca}' sem transações salvas; ficou fora da consolidação.")
+    cubos = {licenca: cubo for licenca, cubo in cubos.items() if not cubo.vazio}
+
+    entidades = list(cubos)
+    categorias = pd.Index(sorted(set().union(*(cubo.categorias for cubo in cubos.values()))))
+    chaves_meses = np.unique(np.concatenate([cubo.chaves_meses for cubo in cubos.values()] or [np.array([], dtype=np.int32)]))
+    meses = rotulo_mes(chaves_meses)
+
+    cubo = np.zeros((len(entidades), len(categorias), len(meses)))
+    faturamento = np.zeros((len(entidades), len(meses)))
+    estoque = np.zeros((len(entidades), len(meses)))
+    for posicao, cubo_licenca in enumerate(cubos.values()):
+        linhas = categorias.get_indexer(cubo_licenca.categorias)
+        colunas = np.searchsorted(chaves_meses, cubo_licenca.chaves_meses)
+        cubo[posicao][np.ix_(linhas, colunas)] = cubo_licenca.valores
+        faturamento[posicao] = [float(cubo_licenca.faturamento.get(mes, 0.0) or 0.0) for mes in meses]
+        estoque[posicao] = [float(cubo_licenca.estoque.get(mes, 0.0) or 0.0) for mes in meses]
+
+    eliminado = np.zeros_like(cubo)
+    for regra in regras:
+        linhas = categorias.get_indexer([c for c in regra.categorias if c in categorias])
+        entidades_regra = [posicao for posicao, entidade in enumerate(entidades) if regra.aplica_a(entidade)]
+        if len(linhas) == 0 or not entidades_regra:
+            continue
+        selecao = np.ix_(entidades_regra, linhas)
+        eliminado[selecao] = cubo[selecao]
+
+        # Entre empresas do grupo os lançamentos se anulam: sobra indica um lado não lançado
+        residuo = eliminado[selecao].sum(axis=(0, 1))
+        meses_residuo = [mes for mes, valor in zip(meses, residuo) if abs(valor) >= 0.01]
+        if meses_residuo:
+            diagnosticos.aviso(
+                f"⚠️ Eliminação '{regra.descricao}' não se anula entre as licenças em: {', '.join(meses_residuo)}."
+            )
+
+    return ResultadoConsolidacao(entidades, list(categorias), meses, cubo, eliminado, faturamento, estoque,
+                                 diagnosticos)
+
+
+# Cubos por licença, compartilhados entre sessões (a chave já identifica a versão dos arquivos)
+cache_consolidacao = CacheCategorizacao(max_entradas=48, max_por_sessao=48)
@@ -0,0 +1,39 @@
+"""
+Diagnósticos dos cálculos do motor
+Os cálculos não chamam o Streamlit: avisos e erros são acumulados aqui e a
+página decide como exibi-los.
+"""
+
+from typing import List, Tuple
+
+
+class Diagnosticos:
+    """Lista ordenada de avisos e erros gerados durante um cálculo"""
+
+    def __init__(self):
+        self.mensagens: List[Tuple[str, str]] = []
+
+    def aviso(self, texto: str):
+        self.mensagens.append(("warning", texto))
+
+    def erro(self, texto: str):
+        self.mensagens.append(("error", texto))
+
+    @property
+    def avisos(self) -> List[str]:
+        return [texto for nivel, texto in self.mensagens if nivel == "warning"]
+
+    @property
+    def erros(self) -> List[str]:
+        return [texto for nivel, texto in self.mensagens if nivel == "error"]
+
+    @property
+    def tem_erros(self) -> bool:
+        return any(nivel == "error" for nivel, _ in self.mensagens)
+
+    def exibir(self):
+        """Exibe as mensagens no Streamlit (usado apenas pelas páginas)"""
+        import streamlit as st
+
+        for nivel, texto in self.mensagens:
+            getattr(st, nivel)(texto)
@@ -0,0 +1,113 @@
+"""
+Cálculo do DRE (sem Streamlit)
+Monta o demonstrativo a partir da tabela do fluxo de caixa e do plano de contas,
+seguindo a estrutura declarada em estrutura_dre.json. Avisos (linhas ausentes,
+arquivos inválidos) vão para Diagnosticos.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.estrutura_dre import carregar_programa_dre
+from logic.engine.fluxo import LINHA_ESTOQUE, LINHA_FATURAMENTO, carregar_linha_csv
+
+
+def completar_fluxo_dre(df_fluxo: pd.DataFrame, path_faturamento: str, path_estoque: str,
+                        diagnosticos: Optional[Diagnosticos] = None) -> pd.DataFrame:
+    """
+    Garante as linhas de Faturamento e Estoque no fluxo, lendo os CSVs se necessário
+
+    Args:
+        df_fluxo: Tabela do fluxo de caixa (categorias x meses)
+        path_faturamento: CSV de faturamento mensal
+        path_estoque: CSV de estoque final mensal
+        diagnosticos: Destino dos avisos
+
+    Returns:
+        Tabela do fluxo com as linhas acrescentadas
+    """
+    diagnosticos = diagnosticos if diagnosticos is not None else Diagnosticos()
+    meses = df_fluxo.columns.tolist()
+
+    if LINHA_FATURAMENTO not in df_fluxo.index and os.path.exists(path_faturamento):
+        linha_fat = carregar_linha_csv(path_faturamento, LINHA_FATURAMENTO, meses, diagnosticos, "faturamento")
+        df_fluxo = pd.concat([linha_fat, df_fluxo])
+
+    if LINHA_ESTOQUE not in df_fluxo.index and os.path.exists(path_estoque):
+        linha_estoque = carregar_linha_csv(path_estoque, LINHA_ESTOQUE, meses, diagnosticos, "estoque")
+        df_fluxo = pd.concat([df_fluxo, linha_estoque])
+
+    return df_fluxo
+
+
+def calcular_dre(df_fluxo: pd.DataFrame, plano: pd.DataFrame,
+                 diagnosticos: Optional[Diagnosticos] = None) -> pd.DataFrame:
+    """
+    DRE da Pré-Análise (percentuais sobre a RECEITA)
+
+    Args:
+        df_fluxo: Tabela do fluxo de caixa, com Faturamento e Estoque
+        plano: Plano de contas
+        diagnosticos: Destino dos avisos de linhas ausentes e correspondências ambíguas
+
+    Returns:
+        DataFrame do DRE com colunas dos meses, TOTAL e %
+    """
+    diagnosticos = diagnosticos if diagnosticos is not None else Diagnosticos()
+    entradas = {}
+
+    if LINHA_FATURAMENTO in df_fluxo.index:
+        entradas["faturamento"] = df_fluxo.loc[LINHA_FATURAMENTO]
+    else:
+        diagnosticos.aviso("⚠️ Linha 'Faturamento Bruto' não encontrada no fluxo de caixa. Verifique se os dados foram salvos.")
+
+    if LINHA_ESTOQUE in df_fluxo.index:
+        entradas["estoque"] = df_fluxo.loc[LINHA_ESTOQUE]
+    else:
+        diagnosticos.aviso("⚠️ Linha 'Estoque Final' não encontrada no fluxo de caixa. Verifique se os dados foram salvos.")
+
+    # SALDO fica zerado (TODO: puxar saldo dos relatórios)
+    return carregar_programa_dre().calcular(df_fluxo, plano, entradas, diagnosticos)
+
+
+def calcular_dre_vyco(df_fluxo: pd.DataFrame, plano: pd.DataFrame, dados_faturamento: Dict[str, float],
+                      dados_estoque: Dict[str, float], diagnosticos: Optional[Diagnosticos] = None) -> pd.DataFrame:
+    """
+    DRE do Vyco com faturamento e estoque vindos do JSON da licença (percentuais sobre o FATURAMENTO)
+
+    Args:
+        df_fluxo: Tabela do fluxo de caixa (categorias x meses)
+        plano: Plano de contas
+        dados_faturamento: Faturamento por mês
+        dados_estoque: Estoque final por mês
+        diagnosticos: Destino dos avisos de correspondências ambíguas
+
+    Returns:
+        DataFrame do DRE com colunas dos meses, TOTAL e %
+    """
+    entradas = {"faturamento": dados_faturamento, "estoque": dados_estoque}
+    return carregar_programa_dre("vyco").calcular(df_fluxo, plano, entradas, diagnosticos)
+
+
+def calcular_dre_de_arquivos(df_fluxo: pd.DataFrame, path_plano: str, path_faturamento: str,
+                             path_estoque: str) -> Tuple[pd.DataFrame, pd.DataFrame, Diagnosticos]:
+    """
+    Completa o fluxo com faturamento/estoque dos CSVs, lê o plano e calcula o DRE
+
+    Args:
+        df_fluxo: Tabela do fluxo de caixa
+        path_plano: CSV do plano de contas
+        path_faturamento: CSV de faturamento mensal
+        path_estoque: CSV de estoque final mensal
+
+    Returns:
+        Tupla (DRE, fluxo completado, diagnósticos)
+    """
+    diagnosticos = Diagnosticos()
+    df_fluxo = completar_fluxo_dre(df_fluxo, path_faturamento, path_estoque, diagnosticos)
+    plano = pd.read_csv(path_plano)
+    dre = calcular_dre(df_fluxo, plano, diagnosticos)
+    return dre, df_fluxo, diagnosticos
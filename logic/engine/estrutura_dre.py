@@ -0,0 +1,374 @@
+"""
+Estrutura declarativa do DRE
+A estrutura (linhas, grupos, categorias, sinais e fórmulas) é descrita uma única
+vez em estrutura_dre.json e compilada em:
+- uma matriz de pesos esparsa (formato coordenado) linha do DRE x linha do fluxo;
+- uma matriz de composição que resolve as fórmulas em ordem topológica.
+Avaliar o DRE é então um produto de matrizes sobre o cubo do fluxo de caixa,
+para qualquer número de meses, cenários ou empresas.
+
+A correspondência linha do fluxo -> linha do DRE é resolvida uma vez por
+(estrutura, plano de contas, índice do fluxo) e reaproveitada; buscas parciais
+ambíguas são relatadas em vez de somadas em mais de uma linha.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.memo_categorizacao import fingerprint_transacoes, versao_arquivo
+from logic.Analises_DFC_DRE.motor_fluxo import cache_motor_fluxo
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.fluxo import LINHAS_ESTRUTURAIS
+from logic.engine.metricas_derivadas import participacao
+
+ESTRUTURA_DRE_PATH = "./logic/CSVs/estrutura_dre.json"
+
+ORIGENS_LINHA = ("entrada", "categorias", "grupos", "formula")
+
+
+class MatrizPesosDRE:
+    """Pesos esparsos (coordenadas linha, coluna, peso) das linhas do DRE sobre o cubo"""
+
+    def __init__(self, linhas: np.ndarray, colunas: np.ndarray, pesos: np.ndarray, formato: tuple):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.pesos = pesos
+        self.formato = formato
+
+    def densa(self) -> np.ndarray:
+        """Matriz densa linhas do DRE x entradas do cubo"""
+        matriz = np.zeros(self.formato)
+        np.add.at(matriz, (self.linhas, self.colunas), self.pesos)
+        return matriz
+
+
+class ResolucaoDRE:
+    """Correspondência entre as linhas de um fluxo de caixa e as linhas do DRE"""
+
+    def __init__(self, indice: pd.Index, nomes: List[str], pesos: MatrizPesosDRE,
+                 parciais: List[Dict], ambiguidades: List[Dict]):
+        self.indice = indice
+        self.nomes = nomes
+        self.pesos = pesos
+        self.parciais = parciais
+        self.ambiguidades = ambiguidades
+
+    def mapa(self) -> Dict[str, List[str]]:
+        """Linha do fluxo -> linhas do DRE em que é somada"""
+        mapa = {}
+        for linha, coluna in zip(self.pesos.linhas.tolist(), self.pesos.colunas.tolist()):
+            if coluna < len(self.indice):
+                mapa.setdefault(self.indice[coluna], []).append(self.nomes[linha])
+        return mapa
+
+    def relatar(self, diagnosticos: Diagnosticos):
+        """Registra um aviso para cada busca parcial ambígua"""
+        for item in self.ambiguidades:
+            diagnosticos.aviso(
+                f"⚠️ '{item['linha_fluxo']}' corresponde a mais de uma linha do DRE "
+                f"({', '.join(item['linhas_dre'])}); considerada apenas em '{item['atribuida']}'."
+            )
+
+
+class ProgramaDRE:
+    """Estrutura do DRE compilada"""
+
+    def __init__(self, linhas: List[Dict], percentual_sobre: Optional[str], removidas=()):
+        self.linhas = linhas
+        self.nomes = [linha["nome"] for linha in linhas]
+        self.percentual_sobre = percentual_sobre
+        self.entradas = [linha["entrada"] for linha in linhas if "entrada" in linha]
+
+        if len(set(self.nomes)) != len(self.nomes):
+            raise ValueError("Estrutura do DRE com linhas repetidas")
+        for linha in linhas:
+            if not any(origem in linha for origem in ORIGENS_LINHA):
+                raise ValueError(f"Linha '{linha['nome']}' do DRE sem origem ({', '.join(ORIGENS_LINHA)})")
+
+        self.assinatura = json.dumps([linhas, percentual_sobre, sorted(removidas)], sort_keys=True, ensure_ascii=False)
+
+        posicao = {nome: i for i, nome in enumerate(self.nomes)}
+        self.absoluto = np.array([bool(linha.get("absoluto")) for linha in linhas], dtype=bool)
+        self.derivadas = self._ordem_topologica(posicao, set(removidas))
+        self.composicao = self._compor_formulas(posicao, set(removidas))
+
+    def _ordem_topologica(self, posicao: Dict[str, int], removidas: set) -> List[str]:
+        """Linhas calculadas em ordem de dependência (erro em ciclos ou referências desconhecidas)"""
+        formulas = {linha["nome"]: linha["formula"] for linha in self.linhas if "formula" in linha}
+        ordem, estado = [], {}
+
+        def visitar(nome, caminho):
+            if estado.get(nome) == "feito":
+                return
+            if estado.get(nome) == "visitando":
+                raise ValueError(f"Fórmula circular no DRE: {' -> '.join(caminho + [nome])}")
+            estado[nome] = "visitando"
+            for dependencia in formulas[nome]:
+                if dependencia in formulas:
+                    visitar(dependencia, caminho + [nome])
+                elif dependencia not in posicao and dependencia not in removidas:
+                    raise ValueError(f"Fórmula da linha '{nome}' usa linha inexistente: '{dependencia}'")
+            estado[nome] = "feito"
+            ordem.append(nome)
+
+        for nome in formulas:
+            visitar(nome, [])
+        return ordem
+
+    def _compor_formulas(self, posicao: Dict[str, int], removidas: set) -> np.ndarray:
+        """
+        Matriz F tal que DRE = F @ linhas_base: cada linha calculada vira uma
+        combinação linear das linhas base (linhas removidas valem zero)
+        """
+        n = len(self.nomes)
+        composicao = np.zeros((n, n))
+        formulas = {linha["nome"]: linha["formula"] for linha in self.linhas if "formula" in linha}
+        for nome in self.nomes:
+            if nome not in formulas:
+                composicao[posicao[nome], posicao[nome]] = 1.0
+        for nome in self.derivadas:
+            for dependencia, coeficiente in formulas[nome].items():
+                if dependencia in posicao:
+                    composicao[posicao[nome]] += coeficiente * composicao[posicao[dependencia]]
+        return composicao
+
+    def _resolver(self, indice: pd.Index, plano: pd.DataFrame) -> ResolucaoDRE:
+        """Monta a resolução: grupos e categorias exatas primeiro, depois a busca parcial"""
+        n = len(indice)
+        linhas, colunas, pesos = [], [], []
+        reivindicadas = {}
+        busca_parcial = []
+
+        for i, linha in enumerate(self.linhas):
+            if "formula" in linha:
+                continue
+            if "entrada" in linha:
+                posicoes = [n + self.entradas.index(linha["entrada"])]
+            else:
+                selecionadas = np.zeros(n, dtype=bool)
+                if "grupos" in linha and plano is not None:
+                    categorias_grupo = plano.loc[plano["Grupo"].isin(linha["grupos"]), "Categoria"]
+                    selecionadas |= indice.isin(categorias_grupo)
+                if "categorias" in linha:
+                    exatas = indice.isin(linha["categorias"])
+                    if exatas.any():
+                        selecionadas |= exatas
+                    else:
+                        # Nenhuma categoria exata: resolvida pela busca parcial abaixo
+                        busca_parcial.append(i)
+                posicoes = np.flatnonzero(selecionadas).tolist()
+                for posicao in posicoes:
+                    reivindicadas.setdefault(posicao, i)
+            linhas.extend([i] * len(posicoes))
+            colunas.extend(posicoes)
+            pesos.extend([float(linha.get("peso", 1.0))] * len(posicoes))
+
+        # Busca parcial (sem regex) apenas sobre categorias; cada linha do fluxo vai para uma única linha do DRE
+        texto = pd.Series(indice.astype(str))
+        candidatas = ~texto.isin(LINHAS_ESTRUTURAIS).to_numpy()
+        encontradas = {}
+        for i in busca_parcial:
+            for categoria in self.linhas[i]["categorias"]:
+                achadas = candidatas & texto.str.contains(categoria, case=False, regex=False, na=False).to_numpy()
+                for posicao in np.flatnonzero(achadas).tolist():
+                    if i not in encontradas.setdefault(posicao, []):
+                        encontradas[posicao].append(i)
+
+        parciais, ambiguidades = [], []
+        for posicao, linhas_dre in sorted(encontradas.items()):
+            dono = reivindicadas.get(posicao)
+            atribuida = dono if dono is not None else linhas_dre[0]
+            if dono is None:
+                linhas.append(atribuida)
+                colunas.append(posicao)
+                pesos.append(float(self.linhas[atribuida].get("peso", 1.0)))
+                parciais.append({"linha_fluxo": indice[posicao], "linha_dre": self.nomes[atribuida]})
+            envolvidas = ([dono] if dono is not None else []) + [i for i in linhas_dre if i != dono]
+            if len(envolvidas) > 1:
+                ambiguidades.append({
+                    "linha_fluxo": indice[posicao],
+                    "linhas_dre": [self.nomes[i] for i in envolvidas],
+                    "atribuida": self.nomes[atribuida],
+                })
+
+        pesos_dre = MatrizPesosDRE(
+            np.array(linhas, dtype=np.intp),
+            np.array(colunas, dtype=np.intp),
+            np.array(pesos, dtype=np.float64),
+            (len(self.nomes), n + len(self.entradas)),
+        )
+        return ResolucaoDRE(indice, self.nomes, pesos_dre, parciais, ambiguidades)
+
+    def resolver(self, indice, plano: pd.DataFrame) -> ResolucaoDRE:
+        """
+        Resolução linha do fluxo -> linha do DRE, calculada uma vez por (plano, índice do fluxo)
+
+        Args:
+            indice: Linhas do fluxo (categorias) na ordem do cubo
+            plano: Plano de contas (Grupo, Categoria)
+
+        Returns:
+            ResolucaoDRE com os pesos, as correspondências parciais e as ambiguidades
+        """
+        indice = pd.Index(indice)
+        versao_plano = fingerprint_transacoes(plano, ["Grupo", "Categoria"]) if plano is not None else None
+        versao_indice = fingerprint_transacoes(pd.DataFrame({"linha": indice.astype(str)}))
+        return cache_motor_fluxo.obter_ou_calcular(
+            ("resolucao_dre", self.assinatura, versao_plano, versao_indice),
+            lambda: self._resolver(indice, plano)
+        )
+
+    def matriz_pesos(self, indice, plano: pd.DataFrame) -> MatrizPesosDRE:
+        """
+        Matriz de pesos para as linhas de um fluxo de caixa
+
+        Args:
+            indice: Linhas do fluxo (categorias) na ordem do cubo
+            plano: Plano de contas (Grupo, Categoria)
+
+        Returns:
+            MatrizPesosDRE sobre as entradas do cubo (linhas do fluxo seguidas das entradas externas)
+        """
+        return self.resolver(indice, plano).pesos
+
+    def avaliar(self, cubo: np.ndarray, pesos: MatrizPesosDRE) -> np.ndarray:
+        """
+        Aplica o DRE a um cubo (entradas x meses [x cenários x empresas ...])
+
+        Args:
+            cubo: Array cuja primeira dimensão segue as colunas de pesos
+            pesos: Resultado de matriz_pesos
+
+        Returns:
+            Array linhas do DRE x demais dimensões do cubo
+        """
+        cubo = np.asarray(cubo, dtype=np.float64)
+        base = np.zeros((len(self.nomes),) + cubo.shape[1:])
+        forma_pesos = (-1,) + (1,) * (cubo.ndim - 1)
+        np.add.at(base, pesos.linhas, pesos.pesos.reshape(forma_pesos) * cubo[pesos.colunas])
+        base[self.absoluto] = np.abs(base[self.absoluto])
+        return np.tensordot(self.composicao, base, axes=1)
+
+    def _matriz_entradas(self, entradas: Dict, meses: List[str]) -> np.ndarray:
+        """Linhas externas (faturamento, estoque...) alinhadas aos meses"""
+        matriz = np.zeros((len(self.entradas), len(meses)))
+        for i, nome in enumerate(self.entradas):
+            valores = (entradas or {}).get(nome)
+            if valores is None:
+                continue
+            if isinstance(valores, dict):
+                matriz[i] = [valores.get(mes, 0.0) for mes in meses]
+            else:
+                matriz[i] = pd.to_numeric(pd.Series(valores).reindex(meses), errors="coerce").fillna(0).to_numpy()
+        return matriz
+
+    def calcular(self, df_fluxo: pd.DataFrame, plano: pd.DataFrame, entradas: Optional[Dict] = None,
+                 diagnosticos: Optional[Diagnosticos] = None) -> pd.DataFrame:
+        """
+        DRE de um fluxo de caixa (categorias x meses)
+
+        Args:
+            df_fluxo: Tabela do fluxo de caixa
+            plano: Plano de contas
+            entradas: Valores das linhas externas por nome (Series por mês ou dicionário mês -> valor)
+            diagnosticos: Destino dos avisos de correspondências ambíguas
+
+        Returns:
+            DataFrame do DRE com colunas dos meses, TOTAL e %
+        """
+        meses = df_fluxo.columns.tolist()
+        valores = df_fluxo.apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        cubo = np.vstack([valores.reshape(len(df_fluxo), len(meses)), self._matriz_entradas(entradas, meses)])
+
+        resolucao = self.resolver(df_fluxo.index, plano)
+        if diagnosticos is not None:
+            resolucao.relatar(diagnosticos)
+
+        dre = pd.DataFrame(self.avaliar(cubo, resolucao.pesos), index=self.nomes, columns=meses)
+        dre["TOTAL"] = dre[meses].sum(axis=1)
+
+        dre["%"] = participacao(dre, "TOTAL", self.percentual_sobre)
+        return dre
+
+    def recalcular_derivadas(self, df: pd.DataFrame, colunas: List[str]) -> pd.DataFrame:
+        """
+        Recalcula as linhas calculadas a partir das linhas base já presentes (ex.: meses projetados)
+
+        Args:
+            df: DRE com linhas base preenchidas nas colunas informadas
+            colunas: Colunas a recalcular
+
+        Returns:
+            DataFrame com as linhas calculadas atualizadas (criadas se ausentes)
+        """
+        faltantes = [nome for nome in self.derivadas if nome not in df.index]
+        if faltantes:
+            df = df.reindex(list(df.index) + faltantes)
+
+        base_idx = [i for i, linha in enumerate(self.linhas) if "formula" not in linha]
+        base = (
+            df.reindex([self.nomes[i] for i in base_idx])[colunas]
+            .apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        )
+        derivadas_idx = [self.nomes.index(nome) for nome in self.derivadas]
+        df.loc[self.derivadas, colunas] = self.composicao[np.ix_(derivadas_idx, base_idx)] @ base
+        return df
+
+
+def compilar_estrutura_dre(config: Dict, variante: Optional[str] = None) -> ProgramaDRE:
+    """
+    Compila a configuração do DRE (opcionalmente com os ajustes de uma variante)
+
+    Args:
+        config: Conteúdo de estrutura_dre.json
+        variante: Nome da variante (ex.: 'vyco'); None usa a estrutura padrão
+
+    Returns:
+        ProgramaDRE
+    """
+    linhas = [dict(linha) for linha in config["linhas"]]
+    percentual_sobre = config.get("percentual_sobre")
+    removidas = set()
+
+    if variante:
+        ajustes = config.get("variantes", {}).get(variante)
+        if ajustes is None:
+            raise ValueError(f"Variante de DRE desconhecida: {variante}")
+        removidas = set(ajustes.get("remover", []))
+        linhas = [linha for linha in linhas if linha["nome"] not in removidas]
+        for linha in linhas:
+            if linha["nome"] in ajustes.get("categorias", {}):
+                linha["categorias"] = ajustes["categorias"][linha["nome"]]
+        percentual_sobre = ajustes.get("percentual_sobre", percentual_sobre)
+
+    return ProgramaDRE(linhas, percentual_sobre, removidas)
+
+
+def _ler_programa_dre(path: str, variante: Optional[str]) -> ProgramaDRE:
+    with open(path, 'r', encoding='utf-8') as f:
+        return compilar_estrutura_dre(json.load(f), variante)
+
+
+def carregar_programa_dre(variante: Optional[str] = None, path: str = ESTRUTURA_DRE_PATH) -> ProgramaDRE:
+    """
+    Estrutura do DRE compilada, lida uma vez por versão do arquivo
+
+    Args:
+        variante: Nome da variante (ex.: 'vyco')
+        path: Caminho do estrutura_dre.json
+
+    Returns:
+        ProgramaDRE
+
+    Raises:
+        FileNotFoundError: Se o arquivo de estrutura não existir
+    """
+    versao = versao_arquivo(path)
+    if versao is None:
+        raise FileNotFoundError(f"Estrutura do DRE não encontrada: {path}")
+    return cache_motor_fluxo.obter_ou_calcular(
+        ("programa_dre", versao, variante), lambda: _ler_programa_dre(path, variante)
+    )
@@ -0,0 +1,294 @@
+"""
+Cálculo do fluxo de caixa (sem Streamlit)
+Monta a tabela categoria x mês com faturamento, totais, resultado e estoque a
+partir das transações categorizadas. As páginas apenas formatam e exibem o
+ResultadoFluxo devolvido.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.motor_fluxo import calcular_matriz_fluxo, obter_metadados_plano
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.formatacao import formatar_tabela
+from logic.engine.metricas_derivadas import coluna_variacao
+
+LINHA_FATURAMENTO = "💰 Faturamento Bruto"
+LINHA_ESTOQUE = "📦 Estoque Final"
+LINHA_DIV_RECEITAS = "🟦 Receitas"
+LINHA_DIV_DESPESAS = "🟥 Despesas"
+LINHA_TOTAL_RECEITAS = "🔷 Total de Receitas"
+LINHA_TOTAL_DESPESAS = "🔻 Total de Despesas"
+LINHA_RESULTADO = "🏦 Resultado do Período"
+
+LINHAS_DIVISAO = [LINHA_DIV_RECEITAS, LINHA_DIV_DESPESAS]
+# Linhas montadas pelo fluxo (não são categorias do plano de contas)
+LINHAS_ESTRUTURAIS = [
+    LINHA_FATURAMENTO, LINHA_DIV_RECEITAS, LINHA_DIV_DESPESAS, LINHA_TOTAL_RECEITAS,
+    LINHA_TOTAL_DESPESAS, LINHA_RESULTADO, LINHA_ESTOQUE,
+]
+COLUNAS_AUXILIARES = ["__ordem__", "__tipo__", "__grupo__"]
+COLUNAS_NECESSARIAS = ["Considerar", "Valor (R$)", "Data", "Categoria"]
+
+
+class ResultadoFluxo:
+    """Tabelas e séries produzidas pelo cálculo do fluxo de caixa"""
+
+    def __init__(self, diagnosticos: Optional[Diagnosticos] = None):
+        self.diagnosticos = diagnosticos or Diagnosticos()
+        self.df_final = pd.DataFrame()
+        self.df_exibicao = pd.DataFrame()
+        self.df_pivot = pd.DataFrame()
+        self.df_receitas = pd.DataFrame()
+        self.df_despesas = pd.DataFrame()
+        self.meses: List[str] = []
+        self.receitas = pd.Series(dtype=float)
+        self.despesas = pd.Series(dtype=float)
+        self.resultado = pd.Series(dtype=float)
+        self.matriz = None
+
+    @property
+    def vazio(self) -> bool:
+        return self.df_final.empty
+
+
+def calcular_variacoes(df_final: pd.DataFrame, meses: List[str]) -> Optional[pd.DataFrame]:
+    """
+    Variação percentual do último mês sobre o anterior para cada linha
+
+    Args:
+        df_final: Tabela do fluxo de caixa
+        meses: Colunas de meses, em ordem
+
+    Returns:
+        DataFrame com uma coluna 'Var. ...' ou None se houver menos de dois meses
+    """
+    return coluna_variacao(df_final, meses, ignorar=LINHAS_DIVISAO)
+
+
+def adicionar_variacoes(df_final: pd.DataFrame, meses: List[str]) -> pd.DataFrame:
+    """Anexa a coluna de variação (texto '+x,x%') à tabela do fluxo"""
+    df_variacoes = calcular_variacoes(df_final, meses)
+    if df_variacoes is None:
+        return df_final
+    df_variacoes_fmt = formatar_tabela(df_variacoes, percentual=df_variacoes.columns, sinal_percentual=True)
+    return pd.concat([df_final, df_variacoes_fmt], axis=1)
+
+
+def carregar_linha_csv(path_csv: str, nome_linha: str, meses: List[str], diagnosticos: Diagnosticos,
+                       descricao: str) -> pd.DataFrame:
+    """
+    Lê uma linha mensal (faturamento ou estoque) de um CSV com colunas Mes e valor
+
+    Args:
+        path_csv: Caminho do CSV
+        nome_linha: Rótulo da linha na tabela
+        meses: Meses do fluxo
+        diagnosticos: Destino dos avisos
+        descricao: Nome usado na mensagem de erro (ex.: 'faturamento')
+
+    Returns:
+        DataFrame de uma linha (zeros se o arquivo não existir ou for inválido)
+    """
+    if os.path.exists(path_csv):
+        try:
+            df = pd.read_csv(path_csv)
+            linha = df.set_index("Mes").T.reindex(columns=meses).fillna(0)
+            linha.index = [nome_linha]
+            return linha
+        except Exception as e:
+            diagnosticos.aviso(f"⚠️ Erro ao carregar dados de {descricao}: {e}")
+    return pd.DataFrame(0, index=[nome_linha], columns=meses)
+
+
+def linha_de_dicionario(valores: Dict[str, float], nome_linha: str, meses: List[str]) -> pd.DataFrame:
+    """Linha mensal a partir de um dicionário mês -> valor (ex.: JSON da licença)"""
+    return pd.DataFrame([[valores.get(mes, 0.0) for mes in meses]], index=[nome_linha], columns=meses)
+
+
+def _validar_transacoes(df_transacoes: pd.DataFrame, diagnosticos: Diagnosticos) -> bool:
+    """Verifica se há transações e se as colunas necessárias existem"""
+    if df_transacoes.empty:
+        diagnosticos.aviso("⚠️ Não há transações para gerar o fluxo de caixa.")
+        return False
+
+    colunas_faltantes = [col for col in COLUNAS_NECESSARIAS if col not in df_transacoes.columns]
+    if colunas_faltantes:
+        diagnosticos.erro(f"❌ Colunas necessárias ausentes: {', '.join(colunas_faltantes)}")
+        return False
+    return True
+
+
+def calcular_fluxo_caixa(df_transacoes: pd.DataFrame, path_faturamento: str = "./logic/CSVs/faturamentos.csv",
+                         path_estoque: str = "./logic/CSVs/estoques.csv") -> ResultadoFluxo:
+    """
+    Fluxo de caixa da Pré-Análise: categorias ordenadas e tipadas pelo plano de contas
+
+    Args:
+        df_transacoes: Transações categorizadas (esquema canônico)
+        path_faturamento: CSV de faturamento mensal
+        path_estoque: CSV de estoque final mensal
+
+    Returns:
+        ResultadoFluxo (df_final vazio se não houver dados)
+    """
+    resultado = ResultadoFluxo()
+    diagnosticos = resultado.diagnosticos
+    if not _validar_transacoes(df_transacoes, diagnosticos):
+        return resultado
+
+    try:
+        matriz = calcular_matriz_fluxo(df_transacoes)
+    except Exception as e:
+        diagnosticos.erro(f"❌ Erro ao criar tabela pivô: {e}")
+        return resultado
+
+    if obter_metadados_plano().empty:
+        diagnosticos.aviso("⚠️ Plano de contas não encontrado ou inválido")
+
+    # Colunas de ordenação vindas do plano de contas
+    df_pivot = matriz.para_dataframe()
+    df_pivot["__ordem__"] = matriz.metadados["Ordem"].to_numpy()
+    df_pivot["__tipo__"] = matriz.metadados["Tipo"].to_numpy()
+    df_pivot["__grupo__"] = matriz.metadados["Grupo"].to_numpy()
+    df_pivot = df_pivot.sort_values("__ordem__")
+
+    meses = [col for col in df_pivot.columns if col not in COLUNAS_AUXILIARES]
+    if not meses:
+        diagnosticos.aviso("⚠️ Não há dados suficientes para gerar o fluxo de caixa.")
+        return resultado
+
+    # Totais
+    receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"][meses].sum()
+    despesas = df_pivot[df_pivot["__tipo__"] == "Débito"][meses].sum()
+    total = receitas + despesas  # Despesas já são negativas
+
+    linha_fat = carregar_linha_csv(path_faturamento, LINHA_FATURAMENTO, meses, diagnosticos, "faturamento")
+    linha_estoque = carregar_linha_csv(path_estoque, LINHA_ESTOQUE, meses, diagnosticos, "estoque")
+
+    df_receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"].drop(columns=COLUNAS_AUXILIARES)
+    df_despesas = df_pivot[df_pivot["__tipo__"] == "Débito"].drop(columns=COLUNAS_AUXILIARES)
+
+    df_final = pd.concat([
+        linha_fat,
+        pd.DataFrame([[None] * len(meses)], index=[LINHA_DIV_RECEITAS], columns=meses),
+        df_receitas,
+        pd.DataFrame([[None] * len(meses)], index=[LINHA_DIV_DESPESAS], columns=meses),
+        df_despesas,
+        pd.DataFrame([receitas], index=[LINHA_TOTAL_RECEITAS]),
+        pd.DataFrame([despesas], index=[LINHA_TOTAL_DESPESAS]),
+        pd.DataFrame([total], index=[LINHA_RESULTADO]),
+        linha_estoque
+    ])
+
+    resultado.matriz = matriz
+    resultado.df_pivot = df_pivot
+    resultado.df_receitas = df_receitas
+    resultado.df_despesas = df_despesas
+    resultado.meses = meses
+    resultado.receitas = receitas
+    resultado.despesas = despesas
+    resultado.resultado = total
+    resultado.df_final = df_final
+    resultado.df_exibicao = adicionar_variacoes(df_final, meses)
+    return resultado
+
+
+def montar_fluxo_vyco(df_pivot: pd.DataFrame, dados_faturamento: Dict[str, float], dados_estoque: Dict[str, float],
+                      meses_historicos: Optional[int] = None,
+                      resultado: Optional[ResultadoFluxo] = None) -> ResultadoFluxo:
+    """
+    Monta o fluxo do Vyco a partir da tabela categoria x mês já agregada
+
+    Usado pelo fluxo de uma licença e pelo consolidado de várias licenças.
+
+    Args:
+        df_pivot: Valores por categoria (linhas) e mês (colunas 'AAAA-MM')
+        dados_faturamento: Faturamento por mês
+        dados_estoque: Estoque final por mês
+        meses_historicos: Quantidade de meses exibidos (None = todos)
+        resultado: ResultadoFluxo a preencher (um novo se None)
+
+    Returns:
+        ResultadoFluxo; df_final tem todos os meses, df_exibicao/meses/totais
+        respeitam meses_historicos
+    """
+    resultado = resultado if resultado is not None else ResultadoFluxo()
+    df_pivot = df_pivot.copy()
+    meses = [col for col in df_pivot.columns if col not in COLUNAS_AUXILIARES]
+
+    # Tipo (Crédito/Débito) pelo sinal do total da categoria
+    df_pivot["__tipo__"] = np.where(df_pivot[meses].to_numpy().sum(axis=1) > 0, "Crédito", "Débito")
+
+    receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"][meses].sum()
+    despesas = df_pivot[df_pivot["__tipo__"] == "Débito"][meses].sum()
+    total = receitas + despesas  # Despesas já são negativas
+
+    df_receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"].drop(columns=["__tipo__"])
+    df_despesas = df_pivot[df_pivot["__tipo__"] == "Débito"].drop(columns=["__tipo__"])
+
+    df_final = pd.concat([
+        linha_de_dicionario(dados_faturamento, LINHA_FATURAMENTO, meses),
+        pd.DataFrame([[None] * len(meses)], index=[LINHA_DIV_RECEITAS], columns=meses),
+        df_receitas,
+        pd.DataFrame([receitas], index=[LINHA_TOTAL_RECEITAS]),
+        pd.DataFrame([[None] * len(meses)], index=[LINHA_DIV_DESPESAS], columns=meses),
+        df_despesas,
+        pd.DataFrame([despesas], index=[LINHA_TOTAL_DESPESAS]),
+        pd.DataFrame([total], index=[LINHA_RESULTADO]),
+        linha_de_dicionario(dados_estoque, LINHA_ESTOQUE, meses)
+    ])
+    df_exibicao = adicionar_variacoes(df_final, meses)
+
+    # Filtro de meses históricos (apenas para exibição e gráficos)
+    if meses_historicos is not None and len(meses) > meses_historicos:
+        meses = meses[-meses_historicos:]
+        colunas_variacoes = [col for col in df_exibicao.columns if col.startswith("Var.")]
+        df_exibicao = df_exibicao[meses + colunas_variacoes]
+        receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"][meses].sum()
+        despesas = df_pivot[df_pivot["__tipo__"] == "Débito"][meses].sum()
+        total = receitas + despesas
+
+    resultado.df_pivot = df_pivot
+    resultado.df_receitas = df_receitas
+    resultado.df_despesas = df_despesas
+    resultado.meses = meses
+    resultado.receitas = receitas
+    resultado.despesas = despesas
+    resultado.resultado = total
+    resultado.df_final = df_final
+    resultado.df_exibicao = df_exibicao
+    return resultado
+
+
+def calcular_fluxo_caixa_vyco(df_transacoes: pd.DataFrame, dados_faturamento: Dict[str, float],
+                              dados_estoque: Dict[str, float], meses_historicos: Optional[int] = None) -> ResultadoFluxo:
+    """
+    Fluxo de caixa do Vyco: tipo da categoria pelo sinal do total e totais logo após cada bloco
+
+    Args:
+        df_transacoes: Transações categorizadas (esquema canônico)
+        dados_faturamento: Faturamento por mês (JSON da licença)
+        dados_estoque: Estoque final por mês (JSON da licença)
+        meses_historicos: Quantidade de meses exibidos (None = todos)
+
+    Returns:
+        ResultadoFluxo; df_final tem todos os meses, df_exibicao/meses/totais
+        respeitam meses_historicos
+    """
+    resultado = ResultadoFluxo()
+    diagnosticos = resultado.diagnosticos
+    if not _validar_transacoes(df_transacoes, diagnosticos):
+        return resultado
+
+    try:
+        matriz = calcular_matriz_fluxo(df_transacoes)
+    except Exception as e:
+        diagnosticos.erro(f"❌ Erro ao gerar tabela de fluxo de caixa: {e}")
+        return resultado
+
+    resultado.matriz = matriz
+    return montar_fluxo_vyco(matriz.para_dataframe(), dados_faturamento, dados_estoque, meses_historicos, resultado)
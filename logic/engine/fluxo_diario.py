@@ -0,0 +1,246 @@
+"""
+Fluxo de caixa diário (sem Streamlit)
+Guarda apenas os pares (categoria, dia) com lançamento, em arrays ordenados por
+dia, e calcula posição diária, somas móveis (7/30 dias) e saldo acumulado com
+somas acumuladas sobre o calendário inteiro. Semana e mês são obtidos sob
+demanda, reagrupando os mesmos pares.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_DATA,
+    COLUNA_VALOR,
+    converter_valores,
+    rotulo_mes,
+    validar_esquema_transacoes,
+)
+from logic.Analises_DFC_DRE.memo_categorizacao import fingerprint_transacoes, obter_id_sessao
+from logic.Analises_DFC_DRE.motor_fluxo import cache_motor_fluxo
+
+COLUNAS_FLUXO_DIARIO = ["Categoria", COLUNA_VALOR, COLUNA_DATA, "Considerar"]
+JANELAS_PADRAO = (7, 30)
+PERIODOS = {"D": "Dia", "W": "Semana", "M": "Mês"}
+
+
+def soma_movel(valores: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Soma dos últimos 'janela' dias (inclusive o atual) ao longo do último eixo
+
+    Os primeiros dias somam apenas o histórico disponível.
+
+    Args:
+        valores: Array diário (1D ou categorias x dias)
+        janela: Tamanho da janela em dias
+
+    Returns:
+        Array com o mesmo formato da entrada
+
+    Raises:
+        ValueError: Se a janela for menor que um dia
+    """
+    if janela < 1:
+        raise ValueError(f"Janela inválida: {janela} (mínimo 1 dia)")
+    acumulada = np.cumsum(valores, axis=-1)
+    resultado = acumulada.copy()
+    resultado[..., janela:] -= acumulada[..., :-janela]
+    return resultado
+
+
+class MatrizFluxoDiaria:
+    """Matriz esparsa categoria x dia: um valor por par (categoria, dia) com lançamento"""
+
+    def __init__(self, categorias: List[str], inicio: np.datetime64, n_dias: int,
+                 codigos_categoria: np.ndarray, dias: np.ndarray, valores: np.ndarray):
+        self.categorias = categorias
+        self.inicio = inicio
+        self.n_dias = n_dias
+        self.codigos_categoria = codigos_categoria
+        self.dias = dias
+        self.valores = valores
+
+    @property
+    def vazia(self) -> bool:
+        return self.valores.size == 0
+
+    @property
+    def datas(self) -> pd.DatetimeIndex:
+        """Calendário contínuo do primeiro ao último dia com lançamento"""
+        return pd.DatetimeIndex(self.inicio + np.arange(self.n_dias), name="Data")
+
+    def _codigos_periodo(self, periodo: str):
+        """Código do período de cada dia do calendário e os rótulos dos períodos"""
+        datas = self.inicio + np.arange(self.n_dias)
+        if periodo == "D":
+            return np.arange(self.n_dias), [str(d) for d in datas]
+        if periodo == "W":
+            # Semanas começando na segunda-feira (1970-01-01 foi uma quinta-feira)
+            segundas = datas - (datas.astype(np.int64) + 3) % 7
+            inicios, codigos = np.unique(segundas, return_inverse=True)
+            return codigos, [str(d) for d in inicios]
+        if periodo == "M":
+            meses = datas.astype("datetime64[M]").astype(np.int64) + 1970 * 12
+            chaves, codigos = np.unique(meses, return_inverse=True)
+            return codigos, rotulo_mes(chaves)
+        raise ValueError(f"Período inválido: {periodo} (use {', '.join(PERIODOS)})")
+
+    def totais(self, periodo: str = "D") -> pd.DataFrame:
+        """
+        Entradas, saídas e líquido por período
+
+        Args:
+            periodo: 'D' (dia), 'W' (semana) ou 'M' (mês)
+
+        Returns:
+            DataFrame indexado pelo rótulo do período
+        """
+        codigos, rotulos = self._codigos_periodo(periodo)
+        posicoes = codigos[self.dias]
+        entradas = np.bincount(posicoes, weights=np.maximum(self.valores, 0), minlength=len(rotulos))
+        saidas = np.bincount(posicoes, weights=np.minimum(self.valores, 0), minlength=len(rotulos))
+        return pd.DataFrame(
+            {"Entradas": entradas, "Saídas": saidas, "Líquido": entradas + saidas},
+            index=pd.Index(rotulos, name=PERIODOS[periodo]),
+        )
+
+    def para_dataframe(self, periodo: str = "D", categorias: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Tabela categoria x período (densa apenas para as categorias pedidas)
+
+        Args:
+            periodo: 'D' (dia), 'W' (semana) ou 'M' (mês)
+            categorias: Categorias incluídas (None = todas)
+
+        Returns:
+            DataFrame com uma linha por categoria e uma coluna por período
+        """
+        codigos, rotulos = self._codigos_periodo(periodo)
+        selecao = self.categorias if categorias is None else [c for c in categorias if c in self.categorias]
+        linhas = pd.Index(self.categorias).get_indexer(selecao)
+
+        destino = np.full(len(self.categorias), -1)
+        destino[linhas] = np.arange(len(linhas))
+        mascara = destino[self.codigos_categoria] >= 0
+        celulas = destino[self.codigos_categoria[mascara]] * len(rotulos) + codigos[self.dias[mascara]]
+        valores = np.bincount(celulas, weights=self.valores[mascara], minlength=len(linhas) * len(rotulos))
+        return pd.DataFrame(
+            valores.reshape(len(linhas), len(rotulos)),
+            index=pd.Index(selecao, name="Categoria"),
+            columns=pd.Index(rotulos, name=PERIODOS[periodo]),
+        )
+
+
+def _calcular_matriz_diaria(df_transacoes: pd.DataFrame, apenas_considerar: bool) -> MatrizFluxoDiaria:
+    """Executa a agregação (ver calcular_matriz_fluxo_diaria)"""
+    dias_linha = df_transacoes[COLUNA_DATA].to_numpy().astype("datetime64[D]")
+    mascara = df_transacoes["Categoria"].notna().to_numpy() & ~np.isnat(dias_linha)
+    if apenas_considerar and "Considerar" in df_transacoes.columns:
+        mascara &= (df_transacoes["Considerar"].astype(str).str.lower() == "sim").to_numpy()
+
+    linhas = np.flatnonzero(mascara)
+    if len(linhas) == 0:
+        vazio = np.array([], dtype=np.int64)
+        return MatrizFluxoDiaria([], np.datetime64("NaT", "D"), 0, vazio, vazio, np.array([], dtype=np.float64))
+
+    valores_linha = converter_valores(df_transacoes[COLUNA_VALOR].iloc[linhas])
+    codigos_categoria, categorias = pd.factorize(df_transacoes["Categoria"].iloc[linhas], sort=True)
+    dias_linha = dias_linha[linhas]
+    inicio = dias_linha.min()
+    dias = (dias_linha - inicio).astype(np.int64)
+    n_dias = int(dias.max()) + 1
+
+    # Um valor por par (dia, categoria) com lançamento, em ordem de dia
+    celulas, posicoes = np.unique(dias * len(categorias) + codigos_categoria, return_inverse=True)
+    valores = np.bincount(posicoes, weights=valores_linha, minlength=len(celulas))
+    return MatrizFluxoDiaria(
+        list(categorias), inicio, n_dias, celulas % len(categorias), celulas // len(categorias), valores
+    )
+
+
+def calcular_matriz_fluxo_diaria(df_transacoes: pd.DataFrame, apenas_considerar: bool = True) -> MatrizFluxoDiaria:
+    """
+    Agrega as transações categorizadas em uma matriz esparsa categoria x dia
+
+    Args:
+        df_transacoes: Transações no esquema canônico com Categoria, Valor (R$) e Considerar
+        apenas_considerar: Mantém apenas transações com Considerar == 'Sim'
+
+    Returns:
+        MatrizFluxoDiaria memoizada para o mesmo conteúdo
+
+    Raises:
+        ValueError: Se as transações não tiverem Data/Mes_Chave canônicos
+    """
+    validar_esquema_transacoes(df_transacoes)
+
+    colunas = [c for c in COLUNAS_FLUXO_DIARIO if c in df_transacoes.columns]
+    chave = (
+        "matriz_fluxo_diaria",
+        fingerprint_transacoes(df_transacoes, colunas),
+        len(df_transacoes),
+        apenas_considerar,
+    )
+    return cache_motor_fluxo.obter_ou_calcular(
+        chave,
+        lambda: _calcular_matriz_diaria(df_transacoes, apenas_considerar),
+        sessao=obter_id_sessao(),
+    )
+
+
+def posicao_diaria(matriz: MatrizFluxoDiaria, saldo_inicial: float = 0.0,
+                   janelas: Iterable[int] = JANELAS_PADRAO) -> pd.DataFrame:
+    """
+    Posição de caixa dia a dia: entradas, saídas, saldo acumulado e somas móveis
+
+    Args:
+        matriz: Matriz diária
+        saldo_inicial: Saldo antes do primeiro dia
+        janelas: Tamanhos das janelas móveis em dias
+
+    Returns:
+        DataFrame indexado por Data, com colunas 'Entradas Nd' e 'Saídas Nd' por janela
+    """
+    if matriz.vazia:
+        return pd.DataFrame(columns=["Entradas", "Saídas", "Líquido", "Saldo"])
+
+    entradas = np.bincount(matriz.dias, weights=np.maximum(matriz.valores, 0), minlength=matriz.n_dias)
+    saidas = np.bincount(matriz.dias, weights=np.minimum(matriz.valores, 0), minlength=matriz.n_dias)
+    colunas: Dict[str, np.ndarray] = {
+        "Entradas": entradas,
+        "Saídas": saidas,
+        "Líquido": entradas + saidas,
+        "Saldo": saldo_inicial + np.cumsum(entradas + saidas),
+    }
+    for janela in janelas:
+        colunas[f"Entradas {janela}d"] = soma_movel(entradas, janela)
+        colunas[f"Saídas {janela}d"] = soma_movel(saidas, janela)
+    return pd.DataFrame(colunas, index=matriz.datas)
+
+
+def reamostrar_posicao(posicao: pd.DataFrame, periodo: str) -> pd.DataFrame:
+    """
+    Posição diária agrupada por semana ('W') ou mês ('M')
+
+    Entradas, saídas e líquido são somados; saldo e somas móveis ficam com o
+    valor do último dia do período.
+    """
+    if periodo == "D" or posicao.empty:
+        return posicao
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período inválido: {periodo} (use {', '.join(PERIODOS)})")
+
+    datas = posicao.index.to_numpy().astype("datetime64[D]")
+    if periodo == "W":
+        inicios = datas - (datas.astype(np.int64) + 3) % 7
+        rotulos = pd.Index([str(d) for d in inicios], name=PERIODOS[periodo])
+    else:
+        rotulos = pd.Index(rotulo_mes(datas.astype("datetime64[M]").astype(np.int64) + 1970 * 12),
+                           name=PERIODOS[periodo])
+
+    somadas = ["Entradas", "Saídas", "Líquido"]
+    agrupado = posicao.groupby(rotulos, sort=False)
+    return pd.concat([agrupado[somadas].sum(), agrupado[[c for c in posicao.columns if c not in somadas]].last()],
+                     axis=1)
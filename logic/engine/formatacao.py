@@ -0,0 +1,123 @@
+"""
+Formatação de valores para exibição (pt-BR)
+Colunas inteiras são formatadas de uma vez, sem laços por célula. Usar apenas
+na hora de exibir: as tabelas de dados continuam numéricas.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+# Grupos de três dígitos ('000' a '999'), indexados pelo valor do grupo
+_GRUPOS_MILHAR = np.array([f"{i:03d}" for i in range(1000)])
+
+
+def _serie(valores) -> pd.Series:
+    """Série de entrada (escalares e listas viram Series)"""
+    if isinstance(valores, pd.Series):
+        return valores
+    return pd.Series(np.atleast_1d(np.asarray(valores, dtype=object)))
+
+
+def _numeros_br(serie: pd.Series, casas: int):
+    """
+    Texto pt-BR dos números da série ('-1.234,56'), montado com operações de array
+
+    Os grupos de milhar vêm de uma tabela de textos indexada pelo valor de cada
+    grupo; o arredondamento é o mesmo de f"{valor:,.2f}".
+
+    Returns:
+        Tupla (array de textos, números em float64, máscara dos valores finitos)
+    """
+    numeros = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    finito = np.isfinite(numeros)
+    escala = 10 ** casas
+    escalados = np.abs(np.where(finito, numeros, 0.0)) * escala
+    unidades = np.round(escalados).astype(np.int64)
+    # Empates exatos após a multiplicação: decide pelo valor binário, como o f-string
+    for posicao in np.flatnonzero(escalados % 1 == 0.5):
+        unidades[posicao] = int(f"{abs(numeros[posicao]):.{casas}f}".replace(".", ""))
+    inteiros = unidades // escala
+
+    # Todos os grupos com zeros à esquerda; os zeros iniciais saem no final
+    grupos = max(1, (len(str(int(inteiros.max(initial=0)))) + 2) // 3)
+    textos = _GRUPOS_MILHAR[(inteiros // 1000 ** (grupos - 1)) % 1000]
+    for expoente in range(grupos - 2, -1, -1):
+        grupo = _GRUPOS_MILHAR[(inteiros // 1000 ** expoente) % 1000]
+        textos = np.strings.add(np.strings.add(textos, "."), grupo)
+    textos = np.where(inteiros == 0, "0", np.strings.lstrip(textos, "0."))
+
+    if casas:
+        decimais = np.array([f"{i:0{casas}d}" for i in range(escala)])
+        textos = np.strings.add(np.strings.add(textos, ","), decimais[unidades % escala])
+    textos = np.strings.add(np.where(numeros < 0, "-", ""), textos)
+    return textos, numeros, finito
+
+
+def formatar_moeda(valores, prefixo: str = "R$ ", vazio: str = "", casas: int = 2) -> pd.Series:
+    """
+    Formata uma coluna inteira como moeda brasileira ('R$ 1.234,56')
+
+    Args:
+        valores: Series, lista ou array (textos não numéricos contam como ausentes)
+        prefixo: Texto antes do número ('' para '1.234,56')
+        vazio: Texto para valores ausentes ou não finitos
+        casas: Casas decimais
+
+    Returns:
+        Series de textos, com o mesmo índice da entrada
+    """
+    serie = _serie(valores)
+    textos, _, finito = _numeros_br(serie, casas)
+    return pd.Series(np.where(finito, np.strings.add(prefixo, textos), vazio), index=serie.index, dtype=object)
+
+
+def formatar_percentual(valores, casas: int = 1, sinal: bool = False, vazio: str = "") -> pd.Series:
+    """
+    Formata uma coluna de percentuais ('12,3%' ou, com sinal, '+12,3%')
+
+    Args:
+        valores: Percentuais já multiplicados por 100
+        casas: Casas decimais
+        sinal: Exibir '+' nos valores não negativos
+        vazio: Texto para valores ausentes ou não finitos
+
+    Returns:
+        Series de textos, com o mesmo índice da entrada
+    """
+    serie = _serie(valores)
+    textos, numeros, finito = _numeros_br(serie, casas)
+    if sinal:
+        textos = np.strings.add(np.where(numeros >= 0, "+", ""), textos)
+    return pd.Series(np.where(finito, np.strings.add(textos, "%"), vazio), index=serie.index, dtype=object)
+
+
+def formatar_brl(valor, prefixo: str = "R$ ", vazio: str = "", casas: int = 2) -> str:
+    """Formata um único valor para o formato de moeda brasileira."""
+    return formatar_moeda([valor], prefixo=prefixo, vazio=vazio, casas=casas).iloc[0]
+
+
+def formatar_tabela(df: pd.DataFrame, moeda: Iterable = (), percentual: Iterable = (),
+                    sinal_percentual: bool = False, vazio: str = "") -> pd.DataFrame:
+    """
+    Cópia da tabela para exibição, com colunas de moeda e de percentual formatadas
+
+    Args:
+        df: Tabela numérica
+        moeda: Colunas formatadas como moeda (ausentes são ignoradas)
+        percentual: Colunas formatadas como percentual
+        sinal_percentual: Exibir '+' nos percentuais não negativos
+        vazio: Texto para valores ausentes
+
+    Returns:
+        Novo DataFrame (a tabela original não é alterada)
+    """
+    exibicao = df.copy()
+    for coluna in moeda:
+        if coluna in exibicao.columns:
+            exibicao[coluna] = formatar_moeda(exibicao[coluna], vazio=vazio)
+    for coluna in percentual:
+        if coluna in exibicao.columns:
+            exibicao[coluna] = formatar_percentual(exibicao[coluna], sinal=sinal_percentual, vazio=vazio)
+    return exibicao
@@ -0,0 +1,195 @@
+"""
+Métricas derivadas das tabelas mensais (fluxo de caixa, DRE, projeções)
+Variações, participações, acumulados, comparação com o ano anterior (YoY) e
+últimos 12 meses (LTM) calculados sobre a matriz inteira, sem laços por linha.
+
+Denominadores zero ou não finitos seguem sempre a mesma regra:
+- percentuais de participação/margem: 0.0;
+- variações: +inf/-inf conforme o sinal do valor atual (0.0 se ambos forem zero);
+  base infinita ou valores ausentes resultam em NaN.
+"""
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import chave_de_rotulo
+
+
+def _matriz(valores) -> np.ndarray:
+    """Converte DataFrame/Series/lista para float64 (textos e None viram NaN)"""
+    if isinstance(valores, pd.DataFrame):
+        return valores.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    if isinstance(valores, pd.Series):
+        return pd.to_numeric(valores, errors="coerce").to_numpy(dtype=np.float64)
+    return np.asarray(valores, dtype=np.float64)
+
+
+def razao_percentual(numerador, denominador) -> np.ndarray:
+    """
+    numerador / denominador * 100, com 0.0 onde o denominador é zero ou não finito
+
+    Args:
+        numerador: Valores (escalar ou array)
+        denominador: Valores compatíveis por broadcasting
+
+    Returns:
+        Array de percentuais
+    """
+    numerador = _matriz(numerador)
+    denominador = _matriz(denominador)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resultado = numerador / denominador * 100
+    valido = np.isfinite(denominador) & (denominador != 0)
+    return np.where(valido, resultado, 0.0)
+
+
+def variacao_percentual(atual, anterior) -> np.ndarray:
+    """
+    Variação percentual (atual - anterior) / |anterior| * 100
+
+    Args:
+        atual: Valores do período atual
+        anterior: Valores do período anterior
+
+    Returns:
+        Array de variações (regras de denominador no docstring do módulo)
+    """
+    atual = _matriz(atual)
+    anterior = _matriz(anterior)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resultado = (atual - anterior) / np.abs(anterior) * 100
+    base_zero = np.where(atual > 0, np.inf, np.where(atual < 0, -np.inf, 0.0))
+    resultado = np.where(anterior == 0, base_zero, resultado)
+    ausente = np.isnan(atual) | np.isnan(anterior) | np.isinf(anterior)
+    return np.where(ausente, np.nan, resultado)
+
+
+def nome_coluna_variacao(meses: List[str]) -> str:
+    """Rótulo da coluna de variação do último mês"""
+    return f"Var. {meses[-1]}" if len(meses) == 2 else f"Var. {meses[-2]}/{meses[-1]}"
+
+
+def coluna_variacao(df: pd.DataFrame, meses: List[str], ignorar: Iterable[str] = ()) -> Optional[pd.DataFrame]:
+    """
+    Variação do último mês sobre o anterior para todas as linhas
+
+    Args:
+        df: Tabela mensal
+        meses: Colunas de meses, em ordem
+        ignorar: Linhas sem variação (ex.: divisórias)
+
+    Returns:
+        DataFrame com a coluna 'Var. ...' ou None se houver menos de dois meses
+    """
+    if len(meses) < 2:
+        return None
+    variacao = variacao_percentual(df[meses[-1]], df[meses[-2]])
+    variacao = np.where(df.index.isin(list(ignorar)), np.nan, variacao)
+    return pd.DataFrame({nome_coluna_variacao(meses): variacao}, index=df.index)
+
+
+def participacao(df: pd.DataFrame, colunas, linha_base: str) -> pd.DataFrame:
+    """
+    Participação de cada linha sobre a linha base (ex.: % do faturamento), por coluna
+
+    Args:
+        df: Tabela mensal
+        colunas: Coluna ou lista de colunas
+        linha_base: Linha usada como denominador (0.0 se ausente ou zero)
+
+    Returns:
+        DataFrame (ou Series, se 'colunas' for uma única coluna) de percentuais
+    """
+    unica = not isinstance(colunas, (list, tuple, pd.Index))
+    lista = [colunas] if unica else list(colunas)
+    valores = _matriz(df[lista])
+    if linha_base in df.index:
+        base = _matriz(df.loc[[linha_base], lista])[0]
+    else:
+        base = np.zeros(len(lista))
+    resultado = pd.DataFrame(razao_percentual(valores, base), index=df.index, columns=lista)
+    return resultado[lista[0]] if unica else resultado
+
+
+def participacao_no_total(valores: pd.Series) -> pd.Series:
+    """Participação de cada valor na soma da série (0.0 se a soma for zero)"""
+    return pd.Series(razao_percentual(valores, _matriz(valores).sum()), index=valores.index)
+
+
+def acumulado(df: pd.DataFrame, meses: List[str]) -> pd.DataFrame:
+    """Total acumulado mês a mês (valores ausentes contam como zero)"""
+    valores = np.nan_to_num(_matriz(df[meses]))
+    return pd.DataFrame(np.cumsum(valores, axis=1), index=df.index, columns=meses)
+
+
+def _grade_mensal(df: pd.DataFrame, meses: List[str]):
+    """Valores em uma grade contínua de meses (meses ausentes valem zero) e a posição de cada mês"""
+    chaves = np.array([chave_de_rotulo(mes) for mes in meses])
+    inicio = chaves.min()
+    grade = np.zeros((len(df), chaves.max() - inicio + 1))
+    grade[:, chaves - inicio] = np.nan_to_num(_matriz(df[meses]))
+    return grade, chaves - inicio
+
+
+def variacao_anual(df: pd.DataFrame, meses: List[str]) -> pd.DataFrame:
+    """
+    Variação de cada mês sobre o mesmo mês do ano anterior (YoY)
+
+    Returns:
+        DataFrame com as colunas de meses (NaN quando não há o mês do ano anterior)
+    """
+    if not meses:
+        return pd.DataFrame(index=df.index)
+    grade, posicoes = _grade_mensal(df, meses)
+    existe = np.zeros(grade.shape[1], dtype=bool)
+    existe[posicoes] = True
+
+    anteriores = posicoes - 12
+    tem_anterior = anteriores >= 0
+    tem_anterior[tem_anterior] = existe[anteriores[tem_anterior]]
+
+    atual = grade[:, posicoes]
+    anterior = np.full_like(atual, np.nan)
+    anterior[:, tem_anterior] = grade[:, anteriores[tem_anterior]]
+    return pd.DataFrame(variacao_percentual(atual, anterior), index=df.index, columns=meses)
+
+
+def ultimos_12_meses(df: pd.DataFrame, meses: List[str]) -> pd.DataFrame:
+    """
+    Soma móvel dos últimos 12 meses (LTM) terminando em cada mês
+
+    Returns:
+        DataFrame com as colunas de meses (NaN enquanto não houver 12 meses de histórico)
+    """
+    if not meses:
+        return pd.DataFrame(index=df.index)
+    grade, posicoes = _grade_mensal(df, meses)
+    acumulada = np.concatenate([np.zeros((len(df), 1)), np.cumsum(grade, axis=1)], axis=1)
+    ltm = acumulada[:, posicoes + 1] - acumulada[:, np.maximum(posicoes - 11, 0)]
+    ltm[:, posicoes < 11] = np.nan
+    return pd.DataFrame(ltm, index=df.index, columns=meses)
+
+
+def comparativos_periodo(df: pd.DataFrame, meses: List[str]) -> pd.DataFrame:
+    """
+    Acumulado no ano (YTD), últimos 12 meses (LTM) e variação anual (YoY) do último mês
+
+    Args:
+        df: Tabela mensal
+        meses: Colunas de meses ('AAAA-MM'), em ordem
+
+    Returns:
+        DataFrame com uma coluna por comparativo (vazio se não houver meses)
+    """
+    if not meses:
+        return pd.DataFrame(index=df.index)
+    ultimo = meses[-1]
+    ano = str(ultimo)[:4]
+    meses_ano = [mes for mes in meses if str(mes)[:4] == ano]
+    return pd.DataFrame({
+        f"Acumulado {ano}": acumulado(df, meses_ano)[ultimo],
+        "Últimos 12 meses": ultimos_12_meses(df, meses)[ultimo],
+        f"Var. {ultimo} x {int(ano) - 1}": variacao_anual(df, meses)[ultimo],
+    }, index=df.index)
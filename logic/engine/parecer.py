@@ -0,0 +1,329 @@
+"""
+Cálculo do parecer financeiro (sem Streamlit)
+Métricas, indicadores, insights e recomendações usados tanto pelo parecer
+interativo quanto pelo texto exportado.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.formatacao import formatar_brl
+
+BENCHMARKS_PATH = os.path.join(os.path.dirname(__file__), "../business_types/benchmarks_setores.json")
+
+
+class ResultadoParecer:
+    """Métricas, indicadores, insights e recomendações de um parecer"""
+
+    def __init__(self, metricas: Dict[str, pd.Series], indicadores: Dict[str, float], insights: Dict[str, Dict],
+                 recomendacoes: list, diagnosticos: Diagnosticos):
+        self.metricas = metricas
+        self.indicadores = indicadores
+        self.insights = insights
+        self.recomendacoes = recomendacoes
+        self.diagnosticos = diagnosticos
+
+
+def carregar_benchmarks(tipo_negocio: str = None, diagnosticos: Optional[Diagnosticos] = None) -> Dict:
+    """Carrega benchmarks específicos do setor/tipo de negócio."""
+    try:
+        with open(BENCHMARKS_PATH, 'r', encoding='utf-8') as f:
+            benchmarks_data = json.load(f)
+    except Exception as e:
+        if diagnosticos is not None:
+            diagnosticos.aviso(f"Não foi possível carregar benchmarks: {e}. Usando valores padrão.")
+        # Retornar benchmarks padrão em caso de erro
+        return {
+            "nome": "Geral",
+            "margem_media": 15,
+            "margem_bruta": 35,
+            "margem_operacional": 12,
+            "giro_estoque": 6,
+            "interpretacao": {},
+            "indicadores_complementares": []
+        }
+    
+    # Mapear tipo_negocio para chave do JSON
+    mapa_tipos = {
+        "servico": "servico",
+        "comercio": "comercio",
+        "industria": "industria",
+        "agronegocio": "agronegocio"
+    }
+    
+    # Se tipo_negocio não for especificado ou não existir, usar default
+    if not tipo_negocio or tipo_negocio not in mapa_tipos:
+        return benchmarks_data.get("default", benchmarks_data["comercio"])
+    
+    chave = mapa_tipos[tipo_negocio]
+    return benchmarks_data.get(chave, benchmarks_data["default"])
+
+
+def extrair_metricas_principais(df_fluxo: pd.DataFrame, df_dre: pd.DataFrame = None,
+                                diagnosticos: Optional[Diagnosticos] = None) -> Dict[str, pd.Series]:
+    """Extrai métricas principais do fluxo de caixa e DRE. Aceita variações nos nomes dos índices."""
+    def buscar_indice(df, nomes):
+        for nome in nomes:
+            if nome in df.index:
+                return df.loc[nome]
+        if diagnosticos is not None:
+            diagnosticos.aviso(f"Índice(s) {nomes} não encontrado(s).")
+        return pd.Series(dtype=float)
+    metricas = {
+        "total_receita": buscar_indice(df_fluxo, ["🔷 Total de Receitas", "Total de Receitas"]),
+        "total_despesa": buscar_indice(df_fluxo, ["🔻 Total de Despesas", "Total de Despesas"]),
+        "resultado": buscar_indice(df_fluxo, ["🏦 Resultado do Período", "Resultado do Período"])
+    }
+    estoque = buscar_indice(df_fluxo, ["📦 Estoque Final", "Estoque Final"])
+    if estoque.size > 0:
+        metricas["estoque"] = estoque
+    if df_dre is not None:
+        metricas["margem_contribuicao"] = buscar_indice(df_dre, ["MARGEM CONTRIBUIÇÃO", "Margem de Contribuição"])
+        metricas["lucro_operacional"] = buscar_indice(df_dre, ["LUCRO OPERACIONAL", "Lucro Operacional"])
+        metricas["lucro_liquido"] = buscar_indice(df_dre, ["LUCRO LIQUIDO", "Lucro Líquido"])
+    return metricas
+
+
+def calcular_indicadores(metricas: Dict[str, pd.Series], tipo_negocio: str = None,
+                         diagnosticos: Optional[Diagnosticos] = None) -> Dict[str, float]:
+    """
+    Calcula indicadores financeiros avançados. Compara com benchmarks do setor.
+
+    Explicação do cálculo da tendência:
+    - Para cada indicador (receita, despesa, resultado), a tendência é calculada usando uma regressão linear simples (numpy.polyfit).
+    - O valor retornado representa a inclinação da linha de tendência, ou seja, o quanto o indicador cresce ou diminui, em média, a cada mês.
+    - Exemplo: Se a tendência da receita for +1000, significa que, em média, a receita está aumentando R$ 1.000 por mês.
+    
+    Args:
+        metricas: Dicionário com as séries de métricas extraídas
+        tipo_negocio: Tipo de negócio (servico, comercio, industria, agronegocio) para benchmarks específicos
+        diagnosticos: Destino dos avisos (benchmarks indisponíveis)
+    """
+    indicadores = {}
+    meses = metricas["total_receita"].index
+
+    # Médias
+    indicadores["receita_media"] = metricas["total_receita"].mean()
+    indicadores["despesa_media"] = metricas["total_despesa"].mean()
+    indicadores["resultado_medio"] = metricas["resultado"].mean()
+
+    # Margem média (baseada no fluxo)
+    indicadores["margem_media"] = (indicadores["resultado_medio"] / indicadores["receita_media"]) * 100 if indicadores["receita_media"] != 0 else 0
+
+    # Margem bruta e operacional (se DRE disponível)
+    if "margem_contribuicao" in metricas:
+        indicadores["margem_bruta"] = (metricas["margem_contribuicao"].mean() / indicadores["receita_media"]) * 100 if indicadores["receita_media"] != 0 else 0
+        indicadores["margem_operacional"] = (metricas["lucro_operacional"].mean() / indicadores["receita_media"]) * 100 if indicadores["receita_media"] != 0 else 0
+    else:
+        indicadores["margem_bruta"] = 0
+        indicadores["margem_operacional"] = 0
+
+    # Volatilidade
+    indicadores["volatilidade_resultado"] = metricas["resultado"].std() / abs(indicadores["resultado_medio"]) if indicadores["resultado_medio"] != 0 else 0
+
+    # Tendências
+    for key, name in [("total_receita", "tendencia_receita"), ("total_despesa", "tendencia_despesa"), ("resultado", "tendencia_resultado")]:
+        try:
+            x = np.arange(len(meses))
+            y = np.array(metricas[key], dtype=np.float64)
+            # A tendência é a inclinação da reta ajustada aos dados mensais
+            # Representa o crescimento ou queda média mensal do indicador
+            if len(y) >= 2 and np.isfinite(y).all():
+                indicadores[name] = np.polyfit(x, y, 1)[0]
+            else:
+                indicadores[name] = np.nan
+        except Exception:
+            indicadores[name] = np.nan
+
+    # Giro de estoque (se disponível)
+    if "estoque" in metricas:
+        indicadores["estoque_medio"] = metricas["estoque"].mean()
+        indicadores["giro_estoque"] = metricas["total_receita"].sum() / indicadores["estoque_medio"] if indicadores["estoque_medio"] != 0 else np.nan
+
+    # Carregar benchmarks específicos do setor
+    benchmarks_setor = carregar_benchmarks(tipo_negocio, diagnosticos)
+    indicadores["benchmarks"] = {
+        "nome_setor": benchmarks_setor.get("nome", "Geral"),
+        "margem_media": benchmarks_setor.get("margem_media", 15),
+        "margem_bruta": benchmarks_setor.get("margem_bruta", 35),
+        "margem_operacional": benchmarks_setor.get("margem_operacional", 12),
+        "giro_estoque": benchmarks_setor.get("giro_estoque"),
+        "interpretacao": benchmarks_setor.get("interpretacao", {}),
+        "indicadores_complementares": benchmarks_setor.get("indicadores_complementares", [])
+    }
+    return indicadores
+
+
+def gerar_insights(metricas: Dict[str, pd.Series], indicadores: Dict[str, float]) -> Dict[str, Dict]:
+    """Gera insights estratégicos baseados em benchmarks."""
+    insights = {"positivos": {}, "negativos": {}, "neutros": {}, "operacional": {}, "financeiro": {}, "estrategico": {}}
+    
+    # Análise de resultado
+    if indicadores["resultado_medio"] > 0:
+        insights["positivos"]["resultado"] = f"✅ Resultado positivo médio de {formatar_brl(indicadores['resultado_medio'])}."
+    else:
+        insights["negativos"]["resultado"] = f"🚨 Resultado médio negativo de {formatar_brl(indicadores['resultado_medio'])}. Atenção aos custos operacionais."
+    
+    # Análise de tendência
+    if indicadores["tendencia_resultado"] > 0:
+        insights["positivos"]["tendencia"] = f"📈 Tendência de crescimento no resultado: {formatar_brl(indicadores['tendencia_resultado'])}/mês."
+    elif indicadores["tendencia_resultado"] < 0:
+        insights["negativos"]["tendencia"] = f"📉 Tendência de queda no resultado: {formatar_brl(abs(indicadores['tendencia_resultado']))}/mês."
+    
+    # Análise de receita vs despesa
+    if indicadores["tendencia_receita"] > 0 and indicadores["tendencia_despesa"] > 0:
+        if indicadores["tendencia_receita"] > indicadores["tendencia_despesa"]:
+            insights["positivos"]["crescimento"] = "📊 Receitas crescendo mais que despesas, favorecendo a margem."
+        else:
+            insights["negativos"]["crescimento"] = "⚠️ Despesas crescendo mais que receitas, comprometendo a margem futura."
+    
+    # Análise de volatilidade
+    if indicadores["volatilidade_resultado"] > 0.5:
+        insights["neutros"]["volatilidade"] = f"🔄 Alta volatilidade no resultado ({indicadores['volatilidade_resultado']:.2f}). Considere fundo de reserva."
+    
+    # Análise de estoque
+    if "estoque" in metricas:
+        ultimo_estoque = metricas["estoque"].iloc[-1]
+        if ultimo_estoque > indicadores["estoque_medio"] * 1.2:
+            insights["operacional"]["estoque"] = f"📦 Estoque atual {(ultimo_estoque/indicadores['estoque_medio']-1)*100:.1f}% acima da média. Possível excesso."
+        elif ultimo_estoque < indicadores["estoque_medio"] * 0.8:
+            insights["neutros"]["estoque"] = f"📦 Estoque atual {(1-ultimo_estoque/indicadores['estoque_medio'])*100:.1f}% abaixo da média. Verifique risco de desabastecimento."
+        
+        if indicadores["giro_estoque"] < 3:
+            insights["operacional"]["giro"] = f"🔄 Giro de estoque baixo ({indicadores['giro_estoque']:.2f}). Avalie estratégias para aumentar vendas ou reduzir estoque."
+        elif indicadores["giro_estoque"] > 10:
+            insights["positivos"]["giro"] = f"🔄 Giro de estoque excelente ({indicadores['giro_estoque']:.2f}), indicando eficiência na gestão de inventário."
+    
+    # Análise de margens (se DRE disponível)
+    if indicadores["margem_bruta"] != 0 and indicadores["margem_bruta"] < 30:
+        insights["operacional"]["margem_baixa"] = "Margem bruta abaixo de 30%. Considere otimizar custos operacionais ou revisar preços."
+    if indicadores["margem_operacional"] != 0 and indicadores["margem_operacional"] < 10:
+        insights["financeiro"]["margem_operacional"] = "Margem operacional abaixo de 10%. Avalie eficiência operacional e despesas fixas."
+
+    return insights
+
+
+def gerar_recomendacoes(insights: Dict[str, Dict], indicadores: Dict[str, float]) -> list:
+    """Gera recomendações práticas com prazos e prioridades."""
+    recomendacoes = []
+    
+    if "resultado" in insights["negativos"]:
+        recomendacoes.append({
+            "texto": "Realizar análise detalhada de despesas em 30 dias, identificando cortes viáveis sem impacto operacional.",
+            "prioridade": "Alta",
+            "prazo": "1 mês"
+        })
+    if "tendencia" in insights["negativos"]:
+        recomendacoes.append({
+            "texto": "Elaborar plano de ação em 45 dias para reverter a queda no resultado, focando em novas fontes de receita.",
+            "prioridade": "Alta",
+            "prazo": "1,5 meses"
+        })
+    if "crescimento" in insights["negativos"]:
+        recomendacoes.append({
+            "texto": "Implementar controles rigorosos de despesas em 30 dias para equilibrar o crescimento com as receitas.",
+            "prioridade": "Alta",
+            "prazo": "1 mês"
+        })
+    if "estoque" in insights["operacional"]:
+        recomendacoes.append({
+            "texto": "Reavaliar política de compras em 60 dias e considerar promoções para reduzir estoque excedente.",
+            "prioridade": "Média",
+            "prazo": "2 meses"
+        })
+    if "giro" in insights["operacional"]:
+        recomendacoes.append({
+            "texto": "Desenvolver estratégias de marketing em 60 dias para aumentar vendas e melhorar giro de estoque.",
+            "prioridade": "Média",
+            "prazo": "2 meses"
+        })
+    if "volatilidade" in insights["neutros"]:
+        recomendacoes.append({
+            "texto": "Estabelecer fundo de reserva equivalente a 3 meses de despesas médias em 90 dias.",
+            "prioridade": "Média",
+            "prazo": "3 meses"
+        })
+    if "margem_baixa" in insights["operacional"]:
+        recomendacoes.append({
+            "texto": "Revisar política de preços em 45 dias para alinhar com valor percebido pelo cliente.",
+            "prioridade": "Média",
+            "prazo": "1,5 meses"
+        })
+    if "margem_operacional" in insights["financeiro"]:
+        recomendacoes.append({
+            "texto": "Analisar despesas fixas em 30 dias para identificar oportunidades de redução e melhorar margem operacional.",
+            "prioridade": "Alta",
+            "prazo": "1 mês"
+        })
+    
+    if not recomendacoes:
+        recomendacoes.append({
+            "texto": "Continuar monitorando indicadores financeiros e manter boas práticas de gestão.",
+            "prioridade": "Baixa",
+            "prazo": "Contínuo"
+        })
+    
+    return recomendacoes
+
+
+def calcular_parecer(df_fluxo: pd.DataFrame, df_dre: pd.DataFrame = None, tipo_negocio: str = None) -> ResultadoParecer:
+    """
+    Calcula todas as partes do parecer financeiro (sempre sobre todo o período)
+
+    Args:
+        df_fluxo: DataFrame do fluxo de caixa
+        df_dre: DataFrame do DRE
+        tipo_negocio: Tipo de negócio para benchmarks específicos
+
+    Returns:
+        ResultadoParecer
+    """
+    diagnosticos = Diagnosticos()
+    metricas = extrair_metricas_principais(df_fluxo, df_dre, diagnosticos)
+    indicadores = calcular_indicadores(metricas, tipo_negocio, diagnosticos)
+    insights = gerar_insights(metricas, indicadores)
+    recomendacoes = gerar_recomendacoes(insights, indicadores)
+    return ResultadoParecer(metricas, indicadores, insights, recomendacoes, diagnosticos)
+
+
+def gerar_texto_parecer(df_fluxo, df_dre=None, tipo_negocio=None) -> str:
+    """Gera um texto em formato markdown com a análise diagnóstica para ser salvo ou exportado."""
+    if df_fluxo is None or df_fluxo.empty:
+        return "Sem dados suficientes para gerar parecer."
+        
+    parecer = calcular_parecer(df_fluxo, df_dre, tipo_negocio)
+    indicadores = parecer.indicadores
+    
+    texto = "### 📊 Indicadores Financeiros Principais\n\n"
+    texto += f"- **Receita Média:** {formatar_brl(indicadores['receita_media'])} (Tendência: {formatar_brl(indicadores['tendencia_receita'])})\n"
+    texto += f"- **Despesa Média:** {formatar_brl(indicadores['despesa_media'])} (Tendência: {formatar_brl(indicadores['tendencia_despesa'])})\n"
+    texto += f"- **Resultado Médio:** {formatar_brl(indicadores['resultado_medio'])} (Tendência: {formatar_brl(indicadores['tendencia_resultado'])})\n\n"
+    
+    texto += f"- **Margem Média:** {indicadores['margem_media']:.1f}%\n"
+    if "margem_bruta" in indicadores and indicadores["margem_bruta"] != 0:
+        texto += f"- **Margem Bruta:** {indicadores['margem_bruta']:.1f}%\n"
+        texto += f"- **Margem Operacional:** {indicadores['margem_operacional']:.1f}%\n"
+        
+    if "giro_estoque" in indicadores and pd.notna(indicadores["giro_estoque"]):
+        texto += f"- **Giro de Estoque:** {indicadores['giro_estoque']:.2f}\n"
+
+    texto += "\n### 🧠 Análise Automática\n\n"
+    insights = parecer.insights
+    for categoria in ["positivos", "negativos", "neutros", "operacional", "financeiro", "estrategico"]:
+        if insights[categoria]:
+            texto += f"**{categoria.capitalize()}**\n"
+            for key, insight in insights[categoria].items():
+                texto += f"- {insight}\n"
+            texto += "\n"
+
+    texto += "### 🎯 Recomendações Estratégicas\n\n"
+    recomendacoes = parecer.recomendacoes
+    for rec in recomendacoes:
+        texto += f"- **{rec['texto']}** (Prioridade: {rec['prioridade']}, Prazo: {rec['prazo']})\n"
+        
+    return texto
@@ -0,0 +1,172 @@
+"""
+Escrita atômica e travas por empresa dos arquivos de cache
+Cada gravação vai para um arquivo temporário no mesmo diretório e só substitui o
+arquivo final (os.replace) depois de completa: leitores, que não travam nada,
+veem sempre a versão anterior inteira ou a nova. Escritores de uma mesma empresa
+se serializam por uma trava consultiva em arquivo (uma por empresa, então
+empresas diferentes nunca disputam a mesma trava). A versão esperada de cada
+objeto (conferida pelo armazenamento, ver logic.armazenamento) impede gravar
+por cima de uma alteração feita por outra sessão depois da leitura.
+"""
+
+import json
+import os
+import re
+import stat
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DIR_TRAVAS = "./data_cache/travas"
+
+# No Windows, os.replace falha enquanto outro processo está com o destino aberto
+TENTATIVAS_SUBSTITUICAO = 10
+ESPERA_SUBSTITUICAO = 0.05
+
+# Trava de cada arquivo de trava no processo: threads da mesma sessão também se
+# serializam, e quem já tem a trava pode pedi-la de novo (salvar -> registrar)
+_travas_processo: Dict[str, threading.RLock] = {}
+_travas_abertas: Dict[str, list] = {}
+_trava_registro = threading.Lock()
+
+
+class ConflitoVersao(Exception):
+    """O arquivo foi alterado por outra sessão depois de lido"""
+
+
+
+def _substituir(origem: str, destino: str):
+    for tentativa in range(TENTATIVAS_SUBSTITUICAO):
+        try:
+            os.replace(origem, destino)
+            return
+        except PermissionError:
+            if tentativa == TENTATIVAS_SUBSTITUICAO - 1:
+                raise
+            time.sleep(ESPERA_SUBSTITUICAO)
+
+
+@contextmanager
+def arquivo_temporario(caminho: str) -> Iterator[str]:
+    """
+    Caminho temporário que substitui `caminho` quando o bloco termina sem erro
+
+    O temporário fica no mesmo diretório (os.replace atômico) e é descartado se
+    a gravação falhar, deixando o arquivo anterior intacto.
+    """
+    diretorio = os.path.dirname(caminho) or "."
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=f".{os.path.basename(caminho)}.", suffix=".tmp")
+    os.close(descritor)
+    # mkstemp cria com permissão 0600: mantém a do arquivo substituído
+    os.chmod(temporario, stat.S_IMODE(os.stat(caminho).st_mode) if os.path.exists(caminho) else 0o644)
+    try:
+        yield temporario
+        # Conteúdo no disco antes da troca: uma queda não deixa o arquivo final truncado
+        descritor = os.open(temporario, os.O_RDWR)
+        try:
+            os.fsync(descritor)
+        finally:
+            os.close(descritor)
+        _substituir(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def salvar_json_atomico(caminho: str, dados, **opcoes_json) -> str:
+    """Grava JSON atomicamente (padrão: UTF-8 legível, indentado, datas como texto)"""
+    opcoes = {"ensure_ascii": False, "indent": 2, "default": str, **opcoes_json}
+    with arquivo_temporario(caminho) as temporario:
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, **opcoes)
+    return caminho
+
+
+def salvar_texto_atomico(caminho: str, texto: str) -> str:
+    """Grava um arquivo de texto (UTF-8) atomicamente"""
+    with arquivo_temporario(caminho) as temporario:
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(texto)
+    return caminho
+
+
+def _travar_arquivo(arquivo, bloquear: bool) -> bool:
+    if fcntl is not None:
+        try:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    arquivo.seek(0)
+    while True:
+        try:
+            # LK_LOCK espera ~10s antes de desistir; sem bloquear, uma única tentativa
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK if bloquear else msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not bloquear:
+                return False
+
+
+def _destravar_arquivo(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    else:
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def trava_empresa(empresa_nome: str, diretorio: str = DIR_TRAVAS, bloquear: bool = True) -> Iterator[bool]:
+    """
+    Trava exclusiva dos arquivos de uma empresa (entre processos e threads)
+
+    Args:
+        empresa_nome: Nome da empresa
+        diretorio: Diretório dos arquivos de trava
+        bloquear: Espera a trava; False devolve False de imediato se outro escritor a tiver
+
+    Yields:
+        True se a trava foi obtida (sempre, quando bloquear=True)
+    """
+    nome = re.sub(r'[<>:"/\\|?*]', '_', empresa_nome).strip()
+    caminho = os.path.abspath(os.path.join(diretorio, f"{nome}.lock"))
+    with _trava_registro:
+        trava = _travas_processo.setdefault(caminho, threading.RLock())
+
+    if not trava.acquire(blocking=bloquear):
+        yield False
+        return
+    try:
+        # [arquivo, profundidade]: só a primeira entrada da thread abre e trava o arquivo
+        aberta = _travas_abertas.get(caminho)
+        if aberta is None:
+            os.makedirs(diretorio, exist_ok=True)
+            arquivo = open(caminho, "a+b")
+            if not _travar_arquivo(arquivo, bloquear):
+                arquivo.close()
+                yield False
+                return
+            aberta = _travas_abertas[caminho] = [arquivo, 0]
+        aberta[1] += 1
+        try:
+            yield True
+        finally:
+            aberta[1] -= 1
+            if aberta[1] == 0:
+                del _travas_abertas[caminho]
+                _destravar_arquivo(aberta[0])
+                aberta[0].close()
+    finally:
+        trava.release()
@@ -6,19 +6,7 @@ from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 import io
 
-def formatar_valor_br(valor):
-    """Formata um valor numérico para o formato brasileiro (R$)"""
-    if pd.isna(valor):
-        return ""
-    if isinstance(valor, (int, float)):
-        return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    if isinstance(valor, str):
-        try:
-            valor_num = float(valor.replace(".", "").replace(",", ".").replace("R$", "").replace("R\\$", "").strip())
-            return f"R$ {valor_num:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except:
-            return valor
-    return valor
+from logic.engine.formatacao import formatar_brl as formatar_valor_br
 
 def gerar_apresentacao_vyco(empresa_nome, dados_ppt):
     """
@@ -0,0 +1,234 @@
+"""
+Manifesto dos arquivos de cache de cada empresa
+Um JSON pequeno por empresa com, para cada arquivo de cache (DRE, fluxo,
+transações, orçamentos), timestamp, quantidade de linhas, período, tamanho,
+versão do esquema e hash do conteúdo. Telas de status e listagens leem só o
+manifesto; uma entrada vale enquanto o arquivo estiver na mesma versão do
+armazenamento (logic.armazenamento).
+"""
+
+import hashlib
+import json
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from logic.Analises_DFC_DRE.memo_categorizacao import fingerprint_transacoes
+from logic.armazenamento import NAMESPACE_CACHE, VERSAO_AUSENTE, Armazenamento, obter_armazenamento
+from logic.cache_leituras import cache_leituras
+from logic.escrita_atomica import ConflitoVersao
+
+# Incrementar sempre que os campos das entradas mudarem (entradas antigas são refeitas)
+VERSAO_MANIFESTO = 2
+
+TIPO_DRE = "dre"
+TIPO_FLUXO = "fluxo"
+TIPO_TRANSACOES = "transacoes"
+PREFIXO_ORCAMENTO = "orcamento_"
+
+# Gravações do manifesto refeitas quando outra réplica grava o mesmo manifesto no meio
+TENTATIVAS_REGISTRO = 5
+
+
+def hash_arquivo(caminho: str) -> str:
+    """SHA-256 do conteúdo do arquivo"""
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def hash_conteudo(conteudo) -> str:
+    """SHA-256 de um objeto serializável em JSON (chaves ordenadas)"""
+    texto = json.dumps(conteudo, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def periodo_meses(meses: Iterable[str]) -> str:
+    """Período 'AAAA-MM até AAAA-MM' de uma lista de meses ('N/A' se vazia)"""
+    meses = sorted(meses)
+    return f"{meses[0]} até {meses[-1]}" if meses else "N/A"
+
+
+def _meses_estruturados(dados_estruturados: Dict) -> List[str]:
+    """Meses (AAAA-MM) presentes nos valores de um DRE ou fluxo estruturado"""
+    meses = set()
+    for secao_data in (dados_estruturados or {}).values():
+        if isinstance(secao_data, dict):
+            itens = secao_data.get('itens', {}) if 'itens' in secao_data else secao_data.get('categorias', {})
+            for item_data in itens.values():
+                if isinstance(item_data, dict):
+                    valores = item_data.get('valores', {}) if 'valores' in item_data else item_data.get('valores_mensais', {})
+                    meses.update(m for m in valores if isinstance(m, str) and '-' in m and m not in ['TOTAL', '%'])
+    return list(meses)
+
+
+def resumo_dre(data: Dict) -> Dict:
+    """Campos do manifesto de um DRE salvo (conteúdo do JSON)"""
+    estruturado = data.get('dre_estruturado', {})
+    itens = [secao.get('itens', {}) for secao in estruturado.values() if isinstance(secao, dict)]
+    return {
+        'linhas': len(data.get('dados_indexados', {})),
+        'periodo': periodo_meses(_meses_estruturados(estruturado)),
+        'categorias': sum(len(i) for i in itens),
+        'tem_detalhamento': any(
+            isinstance(item, dict) and 'detalhamento' in item for i in itens for item in i.values()
+        ),
+        'resumo_dre': data.get('resumo_dre', {}),
+        # Conteúdo sem timestamp/metadata: regravar o mesmo DRE não invalida os pareceres
+        'hash_conteudo': hash_conteudo([data.get('dados_indexados', {}), estruturado]),
+    }
+
+
+def resumo_fluxo(data: Dict) -> Dict:
+    """Campos do manifesto de um fluxo de caixa salvo (conteúdo do JSON)"""
+    estruturado = data.get('fluxo_estruturado', {})
+    return {
+        'linhas': len(data.get('dados_indexados', {})),
+        'periodo': periodo_meses(_meses_estruturados(estruturado)),
+        'grupos': len(estruturado),
+        'hash_conteudo': hash_conteudo(data.get('dados_indexados', {})),
+    }
+
+
+def resumo_transacoes(df_transacoes) -> Dict:
+    """Campos do manifesto das transações (DataFrame no esquema canônico)"""
+    datas = df_transacoes['Data'].dropna() if 'Data' in df_transacoes.columns else []
+    periodo = (f"{datas.min().strftime('%m/%Y')} até {datas.max().strftime('%m/%Y')}"
+               if len(datas) else "N/A")
+    return {'linhas': len(df_transacoes), 'periodo': periodo, 'hash_conteudo': fingerprint_transacoes(df_transacoes)}
+
+
+def resumo_orcamento(data: Dict) -> Dict:
+    """Campos do manifesto de um orçamento salvo (conteúdo do JSON)"""
+    return {
+        'linhas': len(data.get('orcamento_mensal', {})),
+        'ano_orcamento': data.get('ano_orcamento', 0),
+        'ano_base': data.get('ano_base', 0),
+        'tem_realizado': bool(data.get('realizado_mensal', {})),
+    }
+
+
+class ManifestoCache:
+    """Manifestos por empresa (manifestos/<empresa>_manifesto.json no armazenamento do cache)"""
+
+    def __init__(self, armazenamento: Optional[Armazenamento] = None, pasta: str = "manifestos"):
+        """
+        Args:
+            armazenamento: Armazenamento do cache (padrão: obter_armazenamento(NAMESPACE_CACHE));
+                as entradas descrevem chaves deste mesmo armazenamento
+            pasta: Prefixo das chaves dos manifestos
+        """
+        self.armazenamento = armazenamento or obter_armazenamento(NAMESPACE_CACHE)
+        self.pasta = pasta
+
+    def _chave(self, empresa_nome: str) -> str:
+        nome = re.sub(r'[<>:"/\\|?*]', '_', empresa_nome).strip()
+        return f"{self.pasta}/{nome}_manifesto.json"
+
+    @staticmethod
+    def _ler(caminho: str) -> Dict:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _vazio(self, empresa_nome: str) -> Dict:
+        return {'empresa': empresa_nome, 'versao': VERSAO_MANIFESTO, 'arquivos': {}}
+
+    def carregar(self, empresa_nome: str) -> Dict:
+        """Manifesto da empresa ({'empresa', 'versao', 'arquivos': {tipo: entrada}}), somente leitura"""
+        try:
+            caminho = self.armazenamento.caminho_local(self._chave(empresa_nome))
+            if caminho is not None:
+                manifesto = cache_leituras.obter_ou_carregar(caminho, "manifesto", lambda: self._ler(caminho))
+                if manifesto is not None and manifesto.get('versao') == VERSAO_MANIFESTO:
+                    return manifesto
+        except (OSError, ValueError):
+            pass
+        return self._vazio(empresa_nome)
+
+    def _carregar_para_edicao(self, empresa_nome: str) -> Tuple[Dict, str]:
+        """Manifesto atual e a versão lida (para a gravação condicional)"""
+        dados, versao = self.armazenamento.ler_com_versao(self._chave(empresa_nome))
+        try:
+            manifesto = json.loads(dados.decode('utf-8')) if dados is not None else None
+        except ValueError:
+            manifesto = None
+        if manifesto is None or manifesto.get('versao') != VERSAO_MANIFESTO:
+            manifesto = self._vazio(empresa_nome)
+        return manifesto, versao
+
+    def montar_entrada(self, chave_arquivo: str, resumo: Dict, versao_esquema=None, timestamp: str = None,
+                       dependencias: Optional[Dict[str, str]] = None) -> Dict:
+        """Entrada de um arquivo de cache (sem gravar no manifesto); argumentos como em registrar"""
+        dados, versao = self.armazenamento.ler_com_versao(chave_arquivo)
+        if dados is None:
+            raise FileNotFoundError(chave_arquivo)
+        return {
+            'arquivo': chave_arquivo.rpartition('/')[2],
+            'timestamp': timestamp or datetime.now().isoformat(),
+            'tamanho_bytes': len(dados),
+            'versao': versao,
+            'hash': hashlib.sha256(dados).hexdigest(),
+            'versao_esquema': versao_esquema,
+            'dependencias': dependencias,
+            **resumo,
+        }
+
+    def registrar(self, empresa_nome: str, tipo: str, chave_arquivo: str, resumo: Dict,
+                  versao_esquema=None, timestamp: str = None, dependencias: Optional[Dict[str, str]] = None) -> Dict:
+        """
+        Registra (ou substitui) a entrada de um arquivo de cache recém-gravado
+
+        O chamador deve ter a trava da empresa (escrita_atomica.trava_empresa),
+        para que a entrada descreva o arquivo que ele gravou. Entre réplicas, a
+        gravação do manifesto é condicional e refeita se outra réplica o
+        alterou no meio.
+
+        Args:
+            empresa_nome: Nome da empresa
+            tipo: 'dre', 'fluxo', 'transacoes' ou 'orcamento_<ano>'
+            chave_arquivo: Chave (no armazenamento) do arquivo descrito pela entrada
+            resumo: Campos específicos do tipo (linhas, período, ...)
+            versao_esquema: Versão do formato do arquivo
+            timestamp: Momento da gravação (padrão: agora)
+            dependencias: Hash de cada dependência usada para gerar o arquivo (None = sem registro)
+
+        Returns:
+            Entrada gravada no manifesto
+        """
+        entrada = self.montar_entrada(chave_arquivo, resumo, versao_esquema, timestamp, dependencias)
+        for tentativa in range(TENTATIVAS_REGISTRO):
+            manifesto, versao = self._carregar_para_edicao(empresa_nome)
+            arquivos = {**manifesto['arquivos'], tipo: entrada}
+            try:
+                self.armazenamento.gravar_json(
+                    self._chave(empresa_nome),
+                    {'empresa': empresa_nome, 'versao': VERSAO_MANIFESTO, 'arquivos': arquivos},
+                    versao_esperada=versao,
+                )
+                return entrada
+            except ConflitoVersao:
+                if tentativa == TENTATIVAS_REGISTRO - 1:
+                    raise
+
+    def entrada(self, empresa_nome: str, tipo: str, chave_arquivo: str) -> Optional[Dict]:
+        """
+        Entrada de um arquivo, se ainda corresponder a ele (mesma versão no armazenamento)
+
+        Returns:
+            Entrada do manifesto ou None (arquivo ausente, sem entrada ou alterado por fora)
+        """
+        entrada = self.carregar(empresa_nome)['arquivos'].get(tipo)
+        if entrada is None:
+            return None
+        versao = self.armazenamento.versao(chave_arquivo)
+        # Entradas anteriores ao armazenamento: versão do arquivo local (mtime e tamanho)
+        registrada = entrada.get('versao') or f"{entrada.get('mtime_ns')}-{entrada.get('tamanho_bytes')}"
+        if versao == VERSAO_AUSENTE or versao != registrada:
+            return None
+        return entrada
+
+    def entrada_registrada(self, empresa_nome: str, tipo: str) -> Optional[Dict]:
+        """Entrada de um tipo como está no manifesto (sem conferir o arquivo)"""
+        return self.carregar(empresa_nome)['arquivos'].get(tipo)
@@ -3,7 +3,6 @@ Módulo para gerenciar orçamentos anuais
 Salva os dados em JSON para comparação entre anos base e projetados
 """
 
-import json
 import os
 import pandas as pd
 from datetime import datetime
@@ -11,25 +10,41 @@ from typing import Dict, List, Optional, Union
 import streamlit as st
 import copy
 
+from logic.armazenamento import NAMESPACE_CACHE, Armazenamento, obter_armazenamento
+from logic.escrita_atomica import trava_empresa
+from logic.manifesto_cache import PREFIXO_ORCAMENTO, ManifestoCache, resumo_orcamento
+
 
 class OrcamentoManager:
     """Gerenciador de orçamentos para comparação entre anos"""
     
-    def __init__(self, base_path: str = "./data_cache"):
+    def __init__(self, base_path: str = "./data_cache", armazenamento: Optional[Armazenamento] = None):
         self.base_path = base_path
-        self.orcamento_path = os.path.join(base_path, "orcamento")
         
-        # Criar diretório se não existir
-        os.makedirs(self.orcamento_path, exist_ok=True)
+        # Mesmo armazenamento do cache de DRE/fluxo (orçamentos em 'orcamento/')
+        self.armazenamento = armazenamento or obter_armazenamento(NAMESPACE_CACHE, base_path)
+        
+        # Resumo de cada orçamento salvo (listagens sem abrir os arquivos)
+        self.manifestos = ManifestoCache(self.armazenamento)
+        
+        # Mesmas travas por empresa do cache de DRE/fluxo
+        self.travas_path = os.path.join(base_path, "travas")
     
     def _sanitize_filename(self, name: str) -> str:
         """Remove caracteres especiais do nome do arquivo"""
         import re
         return re.sub(r'[<>:"/\\|?*]', '_', name).strip()
     
+    def _chave_orcamento(self, empresa_nome: str, ano_orcamento: int) -> str:
+        return f"orcamento/{self._sanitize_filename(empresa_nome)}_orcamento_{ano_orcamento}.json"
+    
+    def versao_orcamento(self, empresa_nome: str, ano_orcamento: int) -> str:
+        """Versão atual do arquivo do orçamento (guardar ao carregar para editar; ver salvar_orcamento)"""
+        return self.armazenamento.versao(self._chave_orcamento(empresa_nome, ano_orcamento))
+    
     def salvar_orcamento(self, empresa_nome: str, ano_orcamento: int, ano_base: int, 
                         dados_orcamento: Dict, dados_realizado: Dict = None, 
-                        metadata: Dict = None) -> str:
+                        metadata: Dict = None, versao_esperada: Optional[str] = None) -> str:
         """
         Salva dados do orçamento em JSON
         
@@ -40,13 +55,14 @@ class OrcamentoManager:
             dados_orcamento: Dados orçados por mês/categoria
             dados_realizado: Dados realizados (opcional)
             metadata: Informações adicionais
+            versao_esperada: Versão obtida com versao_orcamento ao carregar; se outra
+                sessão salvou depois disso, nada é gravado (None = sem verificação)
         
         Returns:
-            Caminho do arquivo salvo
+            Localização do arquivo salvo
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_orcamento_{ano_orcamento}.json"
-            filepath = os.path.join(self.orcamento_path, filename)
+            chave = self._chave_orcamento(empresa_nome, ano_orcamento)
             
             # Estruturar dados do orçamento
             data = {
@@ -63,11 +79,13 @@ class OrcamentoManager:
                 }
             }
             
-            # Salvar em JSON
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            # Salvar em JSON (substitui o anterior de uma vez só)
+            with trava_empresa(empresa_nome, self.travas_path):
+                self.armazenamento.gravar_json(chave, data, versao_esperada)
+                self.manifestos.registrar(empresa_nome, f"{PREFIXO_ORCAMENTO}{ano_orcamento}", chave,
+                                          resumo_orcamento(data), data["configuracoes"]["versao"], data["timestamp"])
             
-            return filepath
+            return self.armazenamento.localizacao(chave)
             
         except Exception as e:
             st.error(f"Erro ao salvar orçamento: {e}")
@@ -85,16 +103,7 @@ class OrcamentoManager:
             Dados do orçamento ou None se não encontrado
         """
         try:
-            filename = f"{self._sanitize_filename(empresa_nome)}_orcamento_{ano_orcamento}.json"
-            filepath = os.path.join(self.orcamento_path, filename)
-            
-            if not os.path.exists(filepath):
-                return None
-                
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            return data
+            return self.armazenamento.ler_json(self._chave_orcamento(empresa_nome, ano_orcamento))
                 
         except Exception as e:
             st.error(f"Erro ao carregar orçamento: {e}")
@@ -115,31 +124,34 @@ class OrcamentoManager:
             True se sucesso, False caso contrário
         """
         try:
-            # Carregar orçamento existente
-            dados_orcamento = self.carregar_orcamento(empresa_nome, ano_orcamento)
-            
-            if not dados_orcamento:
-                st.error("Orçamento não encontrado para atualização")
-                return False
-            
-            # Atualizar dados realizados
-            if "realizado_mensal" not in dados_orcamento:
-                dados_orcamento["realizado_mensal"] = {}
-            
-            dados_orcamento["realizado_mensal"][mes] = dados_reais
-            dados_orcamento["configuracoes"]["ultima_atualizacao"] = datetime.now().isoformat()
-            
-            # Salvar novamente
-            self.salvar_orcamento(
-                empresa_nome, 
-                ano_orcamento,
-                dados_orcamento["ano_base"],
-                dados_orcamento["orcamento_mensal"],
-                dados_orcamento["realizado_mensal"],
-                dados_orcamento["metadata"]
-            )
-            
-            return True
+            # Leitura e gravação sob a mesma trava: outra sessão não grava no meio
+            # (outra réplica é barrada pela versão lida, verificada na gravação)
+            with trava_empresa(empresa_nome, self.travas_path):
+                # Carregar orçamento existente
+                versao = self.versao_orcamento(empresa_nome, ano_orcamento)
+                dados_orcamento = self.carregar_orcamento(empresa_nome, ano_orcamento)
+                
+                if not dados_orcamento:
+                    st.error("Orçamento não encontrado para atualização")
+                    return False
+                
+                # Atualizar dados realizados
+                if "realizado_mensal" not in dados_orcamento:
+                    dados_orcamento["realizado_mensal"] = {}
+                
+                dados_orcamento["realizado_mensal"][mes] = dados_reais
+                dados_orcamento["configuracoes"]["ultima_atualizacao"] = datetime.now().isoformat()
+                
+                # Salvar novamente
+                return self.salvar_orcamento(
+                    empresa_nome, 
+                    ano_orcamento,
+                    dados_orcamento["ano_base"],
+                    dados_orcamento["orcamento_mensal"],
+                    dados_orcamento["realizado_mensal"],
+                    dados_orcamento["metadata"],
+                    versao_esperada=versao
+                ) is not None
             
         except Exception as e:
             st.error(f"Erro ao atualizar realizado: {e}")
@@ -250,32 +262,57 @@ class OrcamentoManager:
         
         return dados_resultado
     
-    def listar_orcamentos_disponiveis(self) -> List[Dict]:
+    def listar_orcamentos_disponiveis(self, empresa_nome: str = None) -> List[Dict]:
         """
-        Lista todos os orçamentos salvos
+        Lista os orçamentos salvos (a partir dos manifestos)
+        
+        Args:
+            empresa_nome: Lista apenas os orçamentos desta empresa (opcional)
         
         Returns:
             Lista de dicionários com informações dos orçamentos
         """
         orcamentos = []
+        prefixo = f"{self._sanitize_filename(empresa_nome)}_orcamento" if empresa_nome else ""
         
         try:
-            for filename in os.listdir(self.orcamento_path):
-                if filename.endswith('_orcamento.json') or '_orcamento_' in filename:
-                    filepath = os.path.join(self.orcamento_path, filename)
-                    
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    orcamentos.append({
-                        'arquivo': filename,
-                        'empresa': data.get('empresa', 'Desconhecida'),
-                        'ano_orcamento': data.get('ano_orcamento', 0),
-                        'ano_base': data.get('ano_base', 0),
-                        'timestamp': data.get('timestamp', ''),
-                        'caminho': filepath,
-                        'tem_realizado': bool(data.get('realizado_mensal', {}))
-                    })
+            for chave in self.armazenamento.listar("orcamento/"):
+                filename = chave[len("orcamento/"):]
+                if '/' in filename or not (filename.endswith('_orcamento.json') or '_orcamento_' in filename):
+                    continue
+                if prefixo and not filename.startswith(prefixo):
+                    continue
+                
+                # Entrada do manifesto: <empresa>_orcamento_<ano>.json -> 'orcamento_<ano>'
+                nome_arquivo, _, sufixo = filename[:-len('.json')].rpartition('_orcamento')
+                tipo = f"{PREFIXO_ORCAMENTO}{sufixo.lstrip('_')}"
+                entrada = self.manifestos.entrada(nome_arquivo, tipo, chave)
+                if entrada is not None:
+                    empresa = self.manifestos.carregar(nome_arquivo)['empresa']
+                else:
+                    data = self.armazenamento.ler_json(chave)
+                    if data is None:
+                        continue
+                    empresa = data.get('empresa', 'Desconhecida')
+                    entrada = {'timestamp': data.get('timestamp', ''), **resumo_orcamento(data)}
+                    if self._sanitize_filename(empresa) == nome_arquivo:
+                        # Listagem não espera escritores: com a trava ocupada, a entrada fica para depois
+                        with trava_empresa(empresa, self.travas_path, bloquear=False) as travada:
+                            if travada:
+                                self.manifestos.registrar(empresa, tipo, chave, resumo_orcamento(data),
+                                                          data.get('configuracoes', {}).get('versao'), data.get('timestamp'))
+                
+                if empresa_nome and empresa != empresa_nome:
+                    continue
+                orcamentos.append({
+                    'arquivo': filename,
+                    'empresa': empresa,
+                    'ano_orcamento': entrada.get('ano_orcamento', 0),
+                    'ano_base': entrada.get('ano_base', 0),
+                    'timestamp': entrada.get('timestamp', ''),
+                    'caminho': self.armazenamento.localizacao(chave),
+                    'tem_realizado': entrada.get('tem_realizado', False)
+                })
         
         except Exception as e:
             st.error(f"Erro ao listar orçamentos: {e}")
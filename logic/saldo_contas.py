@@ -10,6 +10,7 @@ from typing import Dict, List, Optional, Tuple
 import logging
 import os
 from dotenv import load_dotenv
+from logic.engine.formatacao import formatar_moeda
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -155,13 +156,13 @@ class SaldoContasManager:
         
         # Outras informações importantes
         if 'valorinicial' in df_debug.columns:
-            df_display['Saldo Inicial'] = df_debug['valorinicial'].apply(lambda x: f"R$ {float(x):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) else "R$ 0,00")
+            df_display['Saldo Inicial'] = formatar_moeda(df_debug['valorinicial'], vazio="R$ 0,00")
         
         if 'datainicial' in df_debug.columns:
             df_display['Data Inicial'] = pd.to_datetime(df_debug['datainicial']).dt.strftime('%d/%m/%Y')
         
         if 'saldoatual' in df_debug.columns:
-            df_display['Saldo Atual'] = df_debug['saldoatual'].apply(lambda x: f"R$ {float(x):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) else "R$ 0,00")
+            df_display['Saldo Atual'] = formatar_moeda(df_debug['saldoatual'], vazio="R$ 0,00")
         
         if 'dataencerramento' in df_debug.columns:
             df_display['Status'] = df_debug['dataencerramento'].apply(lambda x: "Encerrada" if pd.notna(x) else "Ativa")
@@ -0,0 +1,186 @@
+"""
+Formato colunar das transações em cache (.npz)
+Cada coluna é gravada com seu tipo: textos codificados por dicionário (códigos
+int32 + valores distintos), datas em datetime64[ns] e números no dtype original.
+As linhas ficam agrupadas por mês, com a posição original de cada uma, e cada
+coluna é gravada como um array por grupo: a leitura de alguns meses descomprime
+apenas os arrays desses grupos, e as colunas não solicitadas nem são lidas.
+"""
+
+import io
+import json
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_DATA,
+    COLUNA_MES,
+    chave_de_rotulo,
+    normalizar_transacoes,
+)
+
+# Incrementar sempre que o layout do arquivo mudar
+VERSAO_FORMATO = 2
+# Versões ainda lidas (1: um array por coluna, sem divisão por grupo)
+VERSOES_LIDAS = (1, 2)
+EXTENSAO = ".npz"
+
+TIPO_TEXTO = "texto"
+TIPO_DATA = "data"
+TIPO_NUMERO = "numero"
+
+
+def _tipo_coluna(serie: pd.Series) -> str:
+    """Tipo de armazenamento da coluna (textos e objetos mistos viram texto)"""
+    if pd.api.types.is_datetime64_dtype(serie.dtype):
+        return TIPO_DATA
+    if pd.api.types.is_bool_dtype(serie.dtype) or pd.api.types.is_numeric_dtype(serie.dtype):
+        return TIPO_NUMERO
+    return TIPO_TEXTO
+
+
+def _codificar_texto(serie: pd.Series):
+    """Códigos int32 (-1 = ausente) e dicionário dos valores distintos"""
+    ausentes = serie.isna()
+    textos = serie.astype(object).where(ausentes, serie.astype(str))
+    codigos, dicionario = pd.factorize(textos, use_na_sentinel=True)
+    return codigos.astype(np.int32), np.array(list(dicionario), dtype=str)
+
+
+def serializar_transacoes_colunares(df_transacoes: pd.DataFrame, cabecalho: Optional[Dict] = None) -> bytes:
+    """
+    Conteúdo do arquivo colunar (.npz) das transações
+
+    Args:
+        df_transacoes: Transações (normalizadas aqui se ainda não estiverem)
+        cabecalho: Informações gravadas junto (empresa, timestamp, metadata...)
+
+    Returns:
+        Bytes do .npz, gravados de uma vez só pelo armazenamento
+    """
+    df = normalizar_transacoes(df_transacoes).reset_index(drop=True)
+
+    # Linhas agrupadas por mês (ordem estável dentro do mês)
+    chaves = df[COLUNA_MES].to_numpy(np.int32)
+    ordem = np.argsort(chaves, kind="stable")
+    grupo_mes, inicios = np.unique(chaves[ordem], return_index=True)
+
+    arrays = {
+        "versao": np.array(VERSAO_FORMATO),
+        "cabecalho": np.array(json.dumps(cabecalho or {}, ensure_ascii=False, default=str)),
+        "colunas": np.array([str(c) for c in df.columns], dtype=str),
+        "ordem": ordem.astype(np.int32),
+        "grupo_mes": grupo_mes.astype(np.int32),
+        "grupo_inicio": np.append(inicios, len(df)).astype(np.int64),
+    }
+    limites = arrays["grupo_inicio"]
+    tipos = []
+    for indice, coluna in enumerate(df.columns):
+        serie = df[coluna].iloc[ordem]
+        tipo = _tipo_coluna(serie)
+        tipos.append(tipo)
+        if tipo == TIPO_TEXTO:
+            valores, arrays[f"c{indice}_dicionario"] = _codificar_texto(serie)
+            sufixo = "codigos"
+        elif tipo == TIPO_DATA:
+            valores, sufixo = serie.to_numpy().astype("datetime64[ns]"), "valores"
+        elif isinstance(serie.dtype, np.dtype):
+            valores, sufixo = serie.to_numpy(), "valores"
+        else:
+            # Numéricos anuláveis do pandas: ausentes viram NaN
+            valores, sufixo = serie.to_numpy(dtype=np.float64, na_value=np.nan), "valores"
+        # Um array por grupo (mês); o vazio guarda o dtype para leituras sem linhas
+        arrays[f"c{indice}_vazio"] = valores[:0]
+        for grupo in range(len(grupo_mes)):
+            arrays[f"c{indice}_g{grupo}_{sufixo}"] = valores[limites[grupo]:limites[grupo + 1]]
+    arrays["tipos"] = np.array(tipos, dtype=str)
+
+    conteudo = io.BytesIO()
+    np.savez_compressed(conteudo, **arrays)
+    return conteudo.getvalue()
+
+
+def ler_cabecalho(caminho: str) -> Optional[Dict]:
+    """Cabecalho gravado com as transações (None se o arquivo não existir ou for ilegível)"""
+    try:
+        with np.load(caminho, allow_pickle=False) as dados:
+            return {
+                **json.loads(str(dados["cabecalho"])),
+                "colunas": dados["colunas"].tolist(),
+                "total_transacoes": int(dados["grupo_inicio"][-1]),
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _grupos_dos_meses(dados, meses: Optional[Iterable[str]]) -> np.ndarray:
+    """Índices dos grupos (meses) pedidos, na ordem do arquivo"""
+    grupo_mes = dados["grupo_mes"]
+    if meses is None:
+        return np.arange(len(grupo_mes))
+    return np.flatnonzero(np.isin(grupo_mes, [chave_de_rotulo(mes) for mes in meses]))
+
+
+def _ler_coluna(dados, versao: int, indice: int, sufixo: str, grupos: np.ndarray, posicoes: np.ndarray) -> np.ndarray:
+    """
+    Valores (ou códigos) de uma coluna nos grupos pedidos, na ordem do arquivo
+
+    Na versão 2 só os arrays dos grupos pedidos são descomprimidos; a versão 1
+    tem um único array por coluna, lido inteiro e recortado pelas posições.
+    """
+    if versao == 1:
+        return dados[f"c{indice}_{sufixo}"][posicoes]
+    partes = [dados[f"c{indice}_g{grupo}_{sufixo}"] for grupo in grupos]
+    return np.concatenate(partes) if partes else dados[f"c{indice}_vazio"]
+
+
+def carregar_transacoes_colunares(caminho: str, colunas: Optional[Iterable[str]] = None,
+                                  meses: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Lê as transações do formato colunar
+
+    Args:
+        caminho: Arquivo .npz com o conteúdo de serializar_transacoes_colunares
+        colunas: Colunas lidas (None = todas); Data e Mes_Chave sempre vêm junto
+        meses: Meses 'AAAA-MM' lidos (None = todos); os arrays dos demais meses não são descomprimidos
+
+    Returns:
+        DataFrame no esquema canônico, na ordem original das transações
+
+    Raises:
+        ValueError: Se o arquivo for de outra versão do formato
+    """
+    with np.load(caminho, allow_pickle=False) as dados:
+        versao = int(dados["versao"])
+        if versao not in VERSOES_LIDAS:
+            raise ValueError(f"Formato de transações {versao} não suportado (esperado {VERSAO_FORMATO})")
+
+        nomes: List[str] = dados["colunas"].tolist()
+        tipos: List[str] = dados["tipos"].tolist()
+        if colunas is not None:
+            pedidas = set(colunas) | {COLUNA_DATA, COLUNA_MES}
+            selecionadas = [i for i, nome in enumerate(nomes) if nome in pedidas]
+        else:
+            selecionadas = list(range(len(nomes)))
+
+        # Posições no arquivo das linhas lidas e a permutação que restaura a ordem original
+        grupos = _grupos_dos_meses(dados, meses)
+        grupo_inicio = dados["grupo_inicio"]
+        posicoes = np.concatenate(
+            [np.arange(grupo_inicio[g], grupo_inicio[g + 1]) for g in grupos] or [np.array([], dtype=np.int64)]
+        )
+        restaurar = np.argsort(dados["ordem"][posicoes], kind="stable")
+
+        valores = {}
+        for indice in selecionadas:
+            if tipos[indice] == TIPO_TEXTO:
+                # Código -1 (ausente) aponta para o None acrescentado ao final do dicionário
+                dicionario = np.append(dados[f"c{indice}_dicionario"].astype(object), None)
+                codigos = _ler_coluna(dados, versao, indice, "codigos", grupos, posicoes)
+                valores[nomes[indice]] = dicionario[codigos[restaurar]]
+            else:
+                valores[nomes[indice]] = _ler_coluna(dados, versao, indice, "valores", grupos, posicoes)[restaurar]
+
+    return normalizar_transacoes(pd.DataFrame(valores))
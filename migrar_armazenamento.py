@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Script para copiar o cache, as licenças e as categorias locais para o backend configurado
+(ARMAZENAMENTO_BACKEND=sqlite ou s3), que começa vazio
+"""
+
+import sys
+import os
+
+# Adicionar o diretório do projeto ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from logic.armazenamento import NAMESPACE_CACHE, NAMESPACE_LICENCAS, RAIZES_LOCAIS, migrar_armazenamento
+
+
+def migrar():
+    """Copia data_cache, logic/CSVs/licencas e o banco local de categorias, mantendo o que já existe no destino"""
+    substituir = "--substituir" in sys.argv[1:]
+
+    for namespace in (NAMESPACE_CACHE, NAMESPACE_LICENCAS):
+        print(f"🔄 Copiando {RAIZES_LOCAIS[namespace]}...")
+        try:
+            resultado = migrar_armazenamento(namespace, substituir=substituir)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        print(f"   • {resultado['copiados']} objetos copiados, {resultado['existentes']} já existiam")
+
+    # Categorias e palavras-chave salvas no banco local passam para o banco compartilhado
+    try:
+        from logic.categoria_store import CAMINHO_BANCO_LOCAL, categoria_store
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    if os.path.exists(CAMINHO_BANCO_LOCAL):
+        print(f"🔄 Mesclando {CAMINHO_BANCO_LOCAL} em {categoria_store.db_path}...")
+        resultado = categoria_store.mesclar_banco(CAMINHO_BANCO_LOCAL)
+        print(f"   • {resultado['categorias']} categorias e {resultado['palavras_chave']} palavras-chave incluídas")
+
+    print("✅ Migração concluída")
+
+
+if __name__ == "__main__":
+    migrar()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Script para reescrever os DREs do cache no layout normalizado (cada valor gravado uma vez)
+e converter os JSONs de transações antigos para o formato colunar (os JSONs são mantidos)
+"""
+
+import sys
+import os
+
+# Adicionar o diretório do projeto ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from logic.data_cache_manager import PASTA_DRE, cache_manager
+
+
+def migrar_cache_dre():
+    """Reescreve no lugar os *_dre.json ainda no layout antigo"""
+    print(f"🔄 Normalizando DREs em {cache_manager.armazenamento.localizacao(PASTA_DRE)}...")
+
+    migrados = cache_manager.migrar_dres()
+
+    if not migrados:
+        print("⚠️ Nenhum DRE no layout antigo")
+        return
+
+    for arquivo, (antes, depois) in migrados.items():
+        print(f"   • {arquivo}: {antes / 1024:.0f} KB → {depois / 1024:.0f} KB")
+
+    total_antes = sum(antes for antes, _ in migrados.values())
+    total_depois = sum(depois for _, depois in migrados.values())
+    print(f"✅ {len(migrados)} DREs normalizados ({total_antes / 1024:.0f} KB → {total_depois / 1024:.0f} KB)")
+
+
+def migrar_transacoes_json():
+    """Gera o arquivo colunar das empresas que só têm o *_transacoes.json antigo"""
+    print("🔄 Convertendo transações para o formato colunar...")
+
+    convertidos = cache_manager.migrar_transacoes_json()
+
+    if not convertidos:
+        print("⚠️ Nenhum JSON de transações sem arquivo colunar")
+        return
+
+    for arquivo in convertidos:
+        print(f"   • {arquivo} (mantido)")
+    print(f"✅ {len(convertidos)} arquivos de transações convertidos")
+
+
+if __name__ == "__main__":
+    migrar_cache_dre()
+    migrar_transacoes_json()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Script para importar as categorizações legadas (CSV/JSON) para o banco SQLite
+"""
+
+import sys
+import os
+
+# Adicionar o diretório do projeto ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from logic.categoria_store import categoria_store
+
+
+def migrar_categorias():
+    """
+    Importa categorias_salvas.csv, CSVs por empresa, JSONs por licença e palavras-chave
+
+    Por padrão mescla com o banco (o que foi salvo pelo app é mantido); com
+    --substituir, o conteúdo do banco é trocado pelo dos arquivos após confirmação.
+    """
+    substituir = "--substituir" in sys.argv[1:]
+    if substituir:
+        print("⚠️ --substituir apaga do banco as categorias e palavras-chave salvas pelo app que não estão nos arquivos.")
+        if input("Digite SUBSTITUIR para confirmar: ").strip() != "SUBSTITUIR":
+            print("❌ Cancelado")
+            return
+
+    print(f"🔄 Importando categorizações para {categoria_store.db_path}...")
+
+    resultado = categoria_store.migrar_arquivos_legados(substituir=substituir)
+
+    if not resultado:
+        print("⚠️ Nenhum arquivo legado encontrado")
+        return
+
+    for escopo, quantidade in resultado.items():
+        print(f"   • {escopo}: {quantidade} registros")
+
+    print(f"✅ {sum(resultado.values())} registros importados em {len(resultado)} escopos")
+
+
+if __name__ == "__main__":
+    migrar_categorias()
@@ -3,6 +3,7 @@ import pandas as pd
 import io
 from datetime import datetime
 from extractors.ofx_extractor import extrair_lancamentos_ofx
+from logic.engine.formatacao import formatar_brl, formatar_moeda
 
 st.set_page_config(page_title="Análise OFX vs Excel", layout="wide")
 st.title("🔄 Reconciliação Bancária: OFX vs Excel")
@@ -93,7 +94,7 @@ if st.session_state.df_ofx is not None:
     with col2:
         if 'Valor_Float' in st.session_state.df_ofx.columns:
             total = st.session_state.df_ofx['Valor_Float'].sum()
-            st.metric("Valor Total", f"R$ {total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+            st.metric("Valor Total", formatar_brl(total))
     with col3:
         if 'Data' in st.session_state.df_ofx.columns:
             datas = st.session_state.df_ofx['Data'].dropna()
@@ -209,7 +210,7 @@ if st.session_state.df_excel is not None:
         st.metric("Total de Transações", len(st.session_state.df_excel))
     with col2:
         total = st.session_state.df_excel['Valor_Excel'].sum()
-        st.metric("Valor Total", f"R$ {total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+        st.metric("Valor Total", formatar_brl(total))
     with col3:
         datas = st.session_state.df_excel['Data_Excel'].dropna()
         if len(datas) > 0:
@@ -356,15 +357,9 @@ if st.session_state.df_ofx is not None and st.session_state.df_excel is not None
                 # Formatar valores para exibição
                 df_display = resultado['matches'].copy()
                 df_display['Data'] = pd.to_datetime(df_display['Data']).dt.strftime('%d/%m/%Y')
-                df_display['Valor_OFX'] = df_display['Valor_OFX'].apply(
-                    lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                )
-                df_display['Valor_Excel'] = df_display['Valor_Excel'].apply(
-                    lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                )
-                df_display['Diferenca'] = df_display['Diferenca'].apply(
-                    lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                )
+                df_display['Valor_OFX'] = formatar_moeda(df_display['Valor_OFX'])
+                df_display['Valor_Excel'] = formatar_moeda(df_display['Valor_Excel'])
+                df_display['Diferenca'] = formatar_moeda(df_display['Diferenca'])
                 
                 st.dataframe(df_display, use_container_width=True)
                 
@@ -394,9 +389,7 @@ if st.session_state.df_ofx is not None and st.session_state.df_excel is not None
                 if 'Data' in df_display.columns:
                     df_display['Data'] = pd.to_datetime(df_display['Data']).dt.strftime('%d/%m/%Y')
                 if 'Valor_Float' in df_display.columns:
-                    df_display['Valor (R$)'] = df_display['Valor_Float'].apply(
-                        lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    )
+                    df_display['Valor (R$)'] = formatar_moeda(df_display['Valor_Float'])
                     df_display = df_display.drop('Valor_Float', axis=1)
                 
                 st.dataframe(df_display, use_container_width=True)
@@ -434,9 +427,7 @@ if st.session_state.df_ofx is not None and st.session_state.df_excel is not None
                     df_display['Data'] = pd.to_datetime(df_display['Data_Excel']).dt.strftime('%d/%m/%Y')
                     df_display = df_display.drop('Data_Excel', axis=1)
                 if 'Valor_Excel' in df_display.columns:
-                    df_display['Valor (R$)'] = df_display['Valor_Excel'].apply(
-                        lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    )
+                    df_display['Valor (R$)'] = formatar_moeda(df_display['Valor_Excel'])
                     df_display = df_display.drop('Valor_Excel', axis=1)
                 
                 st.dataframe(df_display, use_container_width=True)
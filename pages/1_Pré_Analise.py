@@ -13,6 +13,7 @@ from extractors.pdf_extractor import extrair_lancamentos_pdf
 from extractors.txt_extractor import extrair_lancamentos_txt
 from extractors.ofx_extractor import extrair_lancamentos_ofx
 from logic.Analises_DFC_DRE.deduplicator import remover_duplicatas
+from logic.Analises_DFC_DRE.esquema_transacoes import converter_valores, normalizar_transacoes
 from logic.Analises_DFC_DRE.categorizador import categorizar_transacoes
 from logic.Analises_DFC_DRE.fluxo_caixa import exibir_fluxo_caixa
 from logic.Analises_DFC_DRE.faturamento import coletar_faturamentos
@@ -21,6 +22,8 @@ from logic.Analises_DFC_DRE.gerador_parecer import gerar_parecer_automatico
 from logic.Analises_DFC_DRE.exibir_dre import exibir_dre
 from logic.Analises_DFC_DRE.analise_gpt import analisar_dfs_com_gpt
 from logic.Analises_DFC_DRE.exibir_dre import highlight_rows
+from logic.categoria_store import categoria_store
+from logic.engine.formatacao import formatar_moeda, formatar_tabela
 
 # Importar gerenciador de tipos de negócio
 from logic.business_types.business_manager import carregar_tipos_negocio
@@ -102,21 +105,8 @@ def limpar_categoria_especifica(descricao, tipo_lancamento, empresa_nome):
     caminhos = obter_caminhos_empresa(empresa_nome)
     categorias_path = caminhos["categorias_salvas"]
     
-    if not os.path.exists(categorias_path):
-        return False
-    
     try:
-        df_categorias = pd.read_csv(categorias_path)
-        # Remove apenas a linha específica
-        df_categorias = df_categorias[
-            ~((df_categorias["Descricao"] == descricao) & 
-              (df_categorias["Tipo"] == tipo_lancamento))
-        ]
-        
-        # Garantir que o diretório existe antes de salvar
-        os.makedirs(os.path.dirname(categorias_path), exist_ok=True)
-        df_categorias.to_csv(categorias_path, index=False)
-        return True
+        return categoria_store.remover_categorias(categorias_path, tipo=tipo_lancamento, descricao=descricao) > 0
     except Exception as e:
         st.error(f"Erro ao limpar categoria: {e}")
         return False
@@ -127,30 +117,8 @@ def atualizar_categoria_especifica(descricao, tipo_lancamento, nova_categoria, e
     categorias_path = caminhos["categorias_salvas"]
     
     try:
-        # Carregar categorias existentes
-        if os.path.exists(categorias_path):
-            df_categorias = pd.read_csv(categorias_path)
-        else:
-            df_categorias = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
-        
-        # Remover entrada anterior se existir
-        df_categorias = df_categorias[
-            ~((df_categorias["Descricao"] == descricao) & 
-              (df_categorias["Tipo"] == tipo_lancamento))
-        ]
-        
-        # Adicionar nova entrada
-        nova_linha = pd.DataFrame({
-            "Descricao": [descricao],
-            "Tipo": [tipo_lancamento],
-            "Categoria": [nova_categoria]
-        })
-        
-        df_categorias = pd.concat([df_categorias, nova_linha], ignore_index=True)
-        
-        # Garantir que o diretório existe antes de salvar
-        os.makedirs(os.path.dirname(categorias_path), exist_ok=True)
-        df_categorias.to_csv(categorias_path, index=False)
+        # Upsert transacional: não regrava as demais categorias
+        categoria_store.salvar_categorias(categorias_path, {descricao: nova_categoria}, tipo=tipo_lancamento)
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar categoria: {e}")
@@ -161,25 +129,8 @@ def limpar_todas_de_categoria(categoria, tipo_lancamento, empresa_nome):
     caminhos = obter_caminhos_empresa(empresa_nome)
     categorias_path = caminhos["categorias_salvas"]
     
-    if not os.path.exists(categorias_path):
-        return 0
-    
     try:
-        df_categorias = pd.read_csv(categorias_path)
-        count_antes = len(df_categorias)
-        
-        # Remove todas as linhas da categoria específica
-        df_categorias = df_categorias[
-            ~((df_categorias["Categoria"] == categoria) & 
-              (df_categorias["Tipo"] == tipo_lancamento))
-        ]
-        
-        count_depois = len(df_categorias)
-        
-        # Garantir que o diretório existe antes de salvar
-        os.makedirs(os.path.dirname(categorias_path), exist_ok=True)
-        df_categorias.to_csv(categorias_path, index=False)
-        return count_antes - count_depois
+        return categoria_store.remover_categorias(categorias_path, tipo=tipo_lancamento, categoria=categoria)
     except Exception as e:
         st.error(f"Erro ao limpar categoria: {e}")
         return 0
@@ -223,33 +174,6 @@ def validar_arquivo(file):
     tipo = os.path.splitext(nome)[-1].lower()
     return tipo in [".pdf", ".ofx", ".xlsx", ".txt", ".xls"]
 
-def formatar_valor_br(valor):
-    """Formata um valor numérico para o formato brasileiro (R$)"""
-    from decimal import Decimal
-    
-    if pd.isna(valor):
-        return ""  # Deixa vazio ao invés de mostrar "nan"
-    if isinstance(valor, (int, float, Decimal)):
-        valor_float = float(valor)
-        return f"R$ {valor_float:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    if isinstance(valor, str):
-        try:
-            valor_num = float(valor.replace(".", "").replace(",", ".").replace("R$", "").replace("R\\$", "").strip())
-            return f"R$ {valor_num:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except:
-            return valor
-    return valor
-
-def converter_para_float(valor_str):
-    """Converte uma string de valor BR para float"""
-    if isinstance(valor_str, (int, float)):
-        return float(valor_str)
-    try:
-        # Tratar tanto R$ quanto R\$ (escapado)
-        return float(str(valor_str).replace("R$", "").replace("R\\$", "").replace(".", "").replace(",", ".").strip())
-    except:
-        return 0.0
-
 def processar_arquivo(file):
     """Processa um arquivo e retorna os dataframes extraídos"""
     nome = file.name
@@ -271,9 +195,7 @@ def processar_arquivo(file):
             df_trans = pd.DataFrame(resultado["transacoes"])
             
             if "Valor" in df_resumo.columns:
-                df_resumo["Valor"] = df_resumo["Valor"].apply(formatar_valor_br)
-            if "Valor (R$)" in df_trans.columns:
-                df_trans["Valor (R$)"] = df_trans["Valor (R$)"].apply(formatar_valor_br)
+                df_resumo["Valor"] = converter_valores(df_resumo["Valor"])
             
             return {
                 "status": "sucesso",
@@ -286,8 +208,6 @@ def processar_arquivo(file):
         elif tipo == ".txt":
             df_trans = pd.DataFrame(extrair_lancamentos_txt(file, nome))
             df_trans["Arquivo"] = nome
-            if "Valor (R$)" in df_trans.columns:
-                df_trans["Valor (R$)"] = df_trans["Valor (R$)"].apply(formatar_valor_br)
             
             return {
                 "status": "sucesso",
@@ -299,8 +219,6 @@ def processar_arquivo(file):
         elif tipo in [".xls", ".xlsx"]:
             df = pd.read_excel(file)
             df["Arquivo"] = nome
-            if "Valor (R$)" in df.columns:
-                df["Valor (R$)"] = df["Valor (R$)"].apply(formatar_valor_br)
             
             return {
                 "status": "sucesso",
@@ -320,8 +238,6 @@ def processar_arquivo(file):
                 }
                 
             df = pd.DataFrame(transacoes)
-            if "Valor (R$)" in df.columns:
-                df["Valor (R$)"] = df["Valor (R$)"].apply(formatar_valor_br)
             
             return {
                 "status": "sucesso",
@@ -368,27 +284,21 @@ def projetar_valores(df, inflacao_anual, meses_futuros, percentual_receita=0, pe
             else:
                 df_projetado.loc[idx, mes] = valor_base * inflacao_fator
     
-    for col in colunas_meses + meses_projetados:
-        if col in df_projetado.columns:
-            df_projetado[col] = df_projetado[col].apply(formatar_valor_br)
-    
     return df_projetado, meses_projetados
 
+def formatar_projecao(df):
+    """Cópia da projeção para exibição, com valores em R$ e a coluna % como percentual."""
+    colunas_moeda = [col for col in df.select_dtypes("number").columns if col != "%"]
+    return formatar_tabela(df, moeda=colunas_moeda, percentual=["%"])
+
 def resumir_por_ano(df, meses_projetados):
     """Resume os valores projetados por ano."""
     df_resumo = df.copy()
     anos = sorted(set(m[:4] for m in meses_projetados))
-    resumo_dict = {f"Ano {i+1}": [] for i in range(len(anos))}
     
-    for idx in df_resumo.index:
-        valores_por_ano = {f"Ano {i+1}": 0 for i in range(len(anos))}
-        for mes in meses_projetados:
-            ano = mes[:4]
-            ano_idx = anos.index(ano)
-            valor = converter_para_float(df_resumo.loc[idx, mes]) if mes in df_resumo.columns else 0
-            valores_por_ano[f"Ano {ano_idx + 1}"] += valor
-        for ano in valores_por_ano:
-            df_resumo.loc[idx, ano] = formatar_valor_br(valores_por_ano[ano])
+    for i, ano in enumerate(anos):
+        meses_ano = [mes for mes in meses_projetados if mes.startswith(ano) and mes in df_resumo.columns]
+        df_resumo[f"Ano {i + 1}"] = df_resumo[meses_ano].sum(axis=1)
     
     colunas_manter = [col for col in df_resumo.columns if col.startswith("Ano ") or col in ["Categoria", "__tipo__"]]
     return df_resumo[colunas_manter]
@@ -550,9 +460,7 @@ if processar and uploaded_files:
         if lista_transacoes:
             df_transacoes_total = pd.concat(lista_transacoes, ignore_index=True)
             df_transacoes_total = remover_duplicatas(df_transacoes_total)
-            
-            if "Valor (R$)" in df_transacoes_total.columns:
-                df_transacoes_total["Valor (R$)"] = df_transacoes_total["Valor (R$)"].apply(formatar_valor_br)
+            df_transacoes_total = normalizar_transacoes(df_transacoes_total)
             
             st.session_state.df_transacoes_total = df_transacoes_total
             st.session_state.processamento_concluido = True
@@ -579,7 +487,7 @@ if st.session_state.log_uploads:
 if st.session_state.df_resumo_total is not None:
     with st.expander("📋 Resumo das Contas", expanded=True):
         if "Valor" in st.session_state.df_resumo_total.columns:
-            st.dataframe(st.session_state.df_resumo_total.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+            st.dataframe(formatar_tabela(st.session_state.df_resumo_total, moeda=["Valor"]), use_container_width=True)
         else:
             st.dataframe(st.session_state.df_resumo_total, use_container_width=True)
 
@@ -607,17 +515,10 @@ if st.session_state.df_transacoes_total is not None:
             df_creditos = df_transacoes_total[df_transacoes_total["Tipo Transação"].str.lower().str.contains("crédito|credito", na=False)].copy()
             df_debitos = df_transacoes_total[df_transacoes_total["Tipo Transação"].str.lower().str.contains("débito|debito", na=False)].copy()
         else:
-            # Fallback: usar valor numérico (para outros tipos de arquivo)
-            df_valores_num = df_transacoes_total.copy()
-            if "Valor (R$)" in df_valores_num.columns:
-                df_valores_num["Valor_Num"] = df_valores_num["Valor (R$)"].apply(converter_para_float)
-                df_creditos = df_valores_num[df_valores_num["Valor_Num"] > 0].copy()
-                df_debitos = df_valores_num[df_valores_num["Valor_Num"] <= 0].copy()
-                
-                if "Valor_Num" in df_creditos.columns:
-                    df_creditos = df_creditos.drop(columns=["Valor_Num"])
-                if "Valor_Num" in df_debitos.columns:
-                    df_debitos = df_debitos.drop(columns=["Valor_Num"])
+            # Fallback: usar o sinal do valor (para outros tipos de arquivo)
+            if "Valor (R$)" in df_transacoes_total.columns:
+                df_creditos = df_transacoes_total[df_transacoes_total["Valor (R$)"] > 0].copy()
+                df_debitos = df_transacoes_total[df_transacoes_total["Valor (R$)"] <= 0].copy()
         
         # Interface de Categorização (para ambos os casos)
         st.subheader("💰 Categorizar Créditos")
@@ -632,21 +533,18 @@ if st.session_state.df_transacoes_total is not None:
             prefixo_key="credito", 
             tipo_lancamento="Crédito"
         )
-        if "Valor (R$)" in df_creditos.columns:
-            df_creditos["Valor (R$)"] = df_creditos["Valor (R$)"].apply(formatar_valor_br)
         
         if not df_creditos.empty and "Categoria" in df_creditos.columns:
             with st.expander("✅ Resumo da Categorização de Créditos", expanded=True):
                 resumo_creditos = df_creditos.groupby("Categoria").agg(
-                    Total=("Valor (R$)", lambda x: sum(converter_para_float(v) for v in x)),
+                    Total=("Valor (R$)", "sum"),
                     Quantidade=("Valor (R$)", "count")
                 ).reset_index()
-                resumo_creditos["Total"] = resumo_creditos["Total"].apply(formatar_valor_br)
-                st.dataframe(resumo_creditos.style.format({"Total": formatar_valor_br}), use_container_width=True)
+                st.dataframe(formatar_tabela(resumo_creditos, moeda=["Total"]), use_container_width=True)
                 
                 st.markdown("##### 🤖 Itens Categorizados Automaticamente")
                 if not df_desc_creditos.empty and "Total" in df_desc_creditos.columns:
-                    df_desc_creditos["Total"] = df_desc_creditos["Total"].apply(formatar_valor_br)
+                    df_desc_creditos["Total"] = formatar_moeda(df_desc_creditos["Total"])
                 
                 # Obter opções de categorias para edição
                 opcoes_categorias, mapa_categorias = obter_opcoes_categorias(st.session_state.empresa_selecionada, "Crédito")
@@ -678,15 +576,7 @@ if st.session_state.df_transacoes_total is not None:
                             caminhos = obter_caminhos_empresa(st.session_state.empresa_selecionada)
                             categorias_path = caminhos["categorias_salvas"]
                             try:
-                                if os.path.exists(categorias_path):
-                                    df_cat = pd.read_csv(categorias_path)
-                                    df_cat = df_cat[df_cat["Tipo"] != "Crédito"]
-                                else:
-                                    df_cat = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
-                                
-                                # Garantir que o diretório existe antes de salvar
-                                os.makedirs(os.path.dirname(categorias_path), exist_ok=True)
-                                df_cat.to_csv(categorias_path, index=False)
+                                categoria_store.remover_categorias(categorias_path, tipo="Crédito")
                                 st.success("✅ Todas as categorizações de crédito foram removidas!")
                                 st.rerun()
                             except Exception as e:
@@ -763,21 +653,18 @@ if st.session_state.df_transacoes_total is not None:
             prefixo_key="debito", 
             tipo_lancamento="Débito"
         )
-        if "Valor (R$)" in df_debitos.columns:
-            df_debitos["Valor (R$)"] = df_debitos["Valor (R$)"].apply(formatar_valor_br)
         
         if not df_debitos.empty and "Categoria" in df_debitos.columns:
             with st.expander("✅ Resumo da Categorização de Débitos", expanded=True):
                 resumo_debitos = df_debitos.groupby("Categoria").agg(
-                    Total=("Valor (R$)", lambda x: sum(abs(converter_para_float(v)) for v in x)),
+                    Total=("Valor (R$)", lambda x: x.abs().sum()),
                     Quantidade=("Valor (R$)", "count")
                 ).reset_index()
-                resumo_debitos["Total"] = resumo_debitos["Total"].apply(formatar_valor_br)
-                st.dataframe(resumo_debitos.style.format({"Total": formatar_valor_br}), use_container_width=True)
+                st.dataframe(formatar_tabela(resumo_debitos, moeda=["Total"]), use_container_width=True)
                 
                 st.markdown("##### 🤖 Itens Categorizados Automaticamente")
                 if not df_desc_debitos.empty and "Total" in df_desc_debitos.columns:
-                    df_desc_debitos["Total"] = df_desc_debitos["Total"].apply(formatar_valor_br)
+                    df_desc_debitos["Total"] = formatar_moeda(df_desc_debitos["Total"])
                 
                 # Obter opções de categorias para edição
                 opcoes_categorias_deb, mapa_categorias_deb = obter_opcoes_categorias(st.session_state.empresa_selecionada, "Débito")
@@ -809,15 +696,7 @@ if st.session_state.df_transacoes_total is not None:
                             caminhos = obter_caminhos_empresa(st.session_state.empresa_selecionada)
                             categorias_path = caminhos["categorias_salvas"]
                             try:
-                                if os.path.exists(categorias_path):
-                                    df_cat = pd.read_csv(categorias_path)
-                                    df_cat = df_cat[df_cat["Tipo"] != "Débito"]
-                                else:
-                                    df_cat = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
-                                
-                                # Garantir que o diretório existe antes de salvar
-                                os.makedirs(os.path.dirname(categorias_path), exist_ok=True)
-                                df_cat.to_csv(categorias_path, index=False)
+                                categoria_store.remover_categorias(categorias_path, tipo="Débito")
                                 st.success("✅ Todas as categorizações de débito foram removidas!")
                                 st.rerun()
                             except Exception as e:
@@ -887,8 +766,6 @@ if st.session_state.df_transacoes_total is not None:
                     st.info("Nenhum item foi categorizado automaticamente.")
         
         df_transacoes_total = pd.concat([df_creditos, df_debitos], ignore_index=True)
-        if "Valor (R$)" in df_transacoes_total.columns:
-            df_transacoes_total["Valor (R$)"] = df_transacoes_total["Valor (R$)"].apply(formatar_valor_br)
         
         if "Considerar" not in df_transacoes_total.columns:
             df_transacoes_total["Considerar"] = "Sim"
@@ -914,19 +791,13 @@ if st.session_state.df_transacoes_total is not None:
         with col3:
             filtro_texto = st.text_input("Buscar na descrição:", "")
         
-        df_filtrado = df_transacoes_total.copy()
-        if "Valor (R$)" in df_filtrado.columns:
-            df_filtrado["Valor (R$)"] = df_filtrado["Valor (R$)"].apply(formatar_valor_br)
+        df_filtrado = df_transacoes_total
         
         if filtro_tipo and len(filtro_tipo) < 2:
             if "Crédito" in filtro_tipo:
-                df_filtrado = df_filtrado[df_filtrado["Valor (R$)"].apply(
-                    lambda x: converter_para_float(x) > 0 if pd.notna(x) else False
-                )]
+                df_filtrado = df_filtrado[df_filtrado["Valor (R$)"] > 0]
             elif "Débito" in filtro_tipo:
-                df_filtrado = df_filtrado[df_filtrado["Valor (R$)"].apply(
-                    lambda x: converter_para_float(x) <= 0 if pd.notna(x) else False
-                )]
+                df_filtrado = df_filtrado[df_filtrado["Valor (R$)"] <= 0]
         
         if filtro_categoria:
             df_filtrado = df_filtrado[df_filtrado["Categoria"].isin(filtro_categoria)]
@@ -935,16 +806,13 @@ if st.session_state.df_transacoes_total is not None:
             df_filtrado = df_filtrado[df_filtrado["Descrição"].str.contains(filtro_texto, case=False, na=False)]
         
         # Mostrar o DataFrame sempre, independente dos filtros
-        st.dataframe(df_filtrado.style.format({"Valor (R$)": formatar_valor_br}), use_container_width=True)
+        st.dataframe(formatar_tabela(df_filtrado, moeda=["Valor (R$)"]), use_container_width=True)
         
         st.info(f"Exibindo {len(df_filtrado)} de {len(df_transacoes_total)} transações.")
         
         # Botão de download sempre disponível
         output = io.BytesIO()
-        df_download = df_transacoes_total.copy()
-        if "Valor (R$)" in df_download.columns:
-            df_download["Valor (R$)"] = df_download["Valor (R$)"].apply(converter_para_float)
-        df_download.to_excel(output, index=False)
+        df_transacoes_total.to_excel(output, index=False)
         output.seek(0)
         
         st.download_button(
@@ -962,8 +830,7 @@ if st.session_state.df_transacoes_total is not None:
         
         df_faturamento = coletar_faturamentos(df_transacoes_total, path_csv=caminhos_empresa["faturamentos"])
         if df_faturamento is not None and "Valor" in df_faturamento.columns:
-            df_faturamento["Valor"] = df_faturamento["Valor"].apply(formatar_valor_br)
-            st.dataframe(df_faturamento.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+            st.dataframe(formatar_tabela(df_faturamento, moeda=["Valor"]), use_container_width=True)
         
         coletar_estoques(df_transacoes_total, path_csv=caminhos_empresa["estoques"])
 
@@ -1004,28 +871,24 @@ if st.session_state.df_transacoes_total is not None:
                         dre_atual, _ = projetar_valores(resultado_dre, inflacao_anual, meses_futuros)
 
                         with st.expander("Fluxo de Caixa Projetado (Mensal)"):
-                            st.dataframe(fluxo_atual.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+                            st.dataframe(formatar_projecao(fluxo_atual), use_container_width=True)
                             st.markdown("#### DRE Projetado (Mensal)")
-                            dre_atual_formatado = dre_atual.reset_index()
+                            dre_atual_formatado = formatar_projecao(dre_atual).reset_index()
                             dre_atual_formatado.columns.values[0] = "Descrição"
                             st.dataframe(
-                                dre_atual_formatado.style.apply(highlight_rows, axis=1).format(
-                                    formatter={col: formatar_valor_br for col in dre_atual_formatado.columns if col not in ["Descrição", "__tipo__"]}
-                                ),
+                                dre_atual_formatado.style.apply(highlight_rows, axis=1),
                                 use_container_width=True, hide_index=True, height=650
                             )
 
                         with st.expander("Fluxo de Caixa Projetado (Anual)"):
                             fluxo_anual = resumir_por_ano(fluxo_atual, meses_projetados)
-                            st.dataframe(fluxo_anual.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+                            st.dataframe(formatar_projecao(fluxo_anual), use_container_width=True)
                             st.markdown("#### DRE Projetado (Anual)")
                             dre_anual = resumir_por_ano(dre_atual, meses_projetados)
-                            dre_anual_formatado = dre_anual.reset_index()
+                            dre_anual_formatado = formatar_projecao(dre_anual).reset_index()
                             dre_anual_formatado.columns.values[0] = "Descrição"
                             st.dataframe(
-                                dre_anual_formatado.style.apply(highlight_rows, axis=1).format(
-                                    formatter={col: formatar_valor_br for col in dre_anual_formatado.columns if col not in ["Descrição", "__tipo__"]}
-                                ),
+                                dre_anual_formatado.style.apply(highlight_rows, axis=1),
                                 use_container_width=True, hide_index=True, height=650
                             )
 
@@ -1036,28 +899,24 @@ if st.session_state.df_transacoes_total is not None:
                         dre_pess, _ = projetar_valores(resultado_dre, inflacao_anual, meses_futuros, pess_receita, pess_despesa)
 
                         with st.expander("Fluxo de Caixa Projetado (Mensal)"):
-                            st.dataframe(fluxo_pess.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+                            st.dataframe(formatar_projecao(fluxo_pess), use_container_width=True)
                             st.markdown("#### DRE Projetado (Mensal)")
-                            dre_pess_formatado = dre_pess.reset_index()
+                            dre_pess_formatado = formatar_projecao(dre_pess).reset_index()
                             dre_pess_formatado.columns.values[0] = "Descrição"
                             st.dataframe(
-                                dre_pess_formatado.style.apply(highlight_rows, axis=1).format(
-                                    formatter={col: formatar_valor_br for col in dre_pess_formatado.columns if col not in ["Descrição", "__tipo__"]}
-                                ),
+                                dre_pess_formatado.style.apply(highlight_rows, axis=1),
                                 use_container_width=True, hide_index=True, height=650
                             )
 
                         with st.expander("Fluxo de Caixa Projetado (Anual)"):
                             fluxo_anual = resumir_por_ano(fluxo_pess, meses_projetados)
-                            st.dataframe(fluxo_anual.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+                            st.dataframe(formatar_projecao(fluxo_anual), use_container_width=True)
                             st.markdown("#### DRE Projetado (Anual)")
                             dre_anual = resumir_por_ano(dre_pess, meses_projetados)
-                            dre_anual_formatado = dre_anual.reset_index()
+                            dre_anual_formatado = formatar_projecao(dre_anual).reset_index()
                             dre_anual_formatado.columns.values[0] = "Descrição"
                             st.dataframe(
-                                dre_anual_formatado.style.apply(highlight_rows, axis=1).format(
-                                    formatter={col: formatar_valor_br for col in dre_anual_formatado.columns if col not in ["Descrição", "__tipo__"]}
-                                ),
+                                dre_anual_formatado.style.apply(highlight_rows, axis=1),
                                 use_container_width=True, hide_index=True, height=650
                             )
 
@@ -1068,28 +927,24 @@ if st.session_state.df_transacoes_total is not None:
                         dre_otim, _ = projetar_valores(resultado_dre, inflacao_anual, meses_futuros, otim_receita, otim_despesa)
 
                         with st.expander("Fluxo de Caixa Projetado (Mensal)"):
-                            st.dataframe(fluxo_otim.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+                            st.dataframe(formatar_projecao(fluxo_otim), use_container_width=True)
                             st.markdown("#### DRE Projetado (Mensal)")
-                            dre_otim_formatado = dre_otim.reset_index()
+                            dre_otim_formatado = formatar_projecao(dre_otim).reset_index()
                             dre_otim_formatado.columns.values[0] = "Descrição"
                             st.dataframe(
-                                dre_otim_formatado.style.apply(highlight_rows, axis=1).format(
-                                    formatter={col: formatar_valor_br for col in dre_otim_formatado.columns if col not in ["Descrição", "__tipo__"]}
-                                ),
+                                dre_otim_formatado.style.apply(highlight_rows, axis=1),
                                 use_container_width=True, hide_index=True, height=650
                             )
 
                         with st.expander("Fluxo de Caixa Projetado (Anual)"):
                             fluxo_anual = resumir_por_ano(fluxo_otim, meses_projetados)
-                            st.dataframe(fluxo_anual.style.format({"Valor": formatar_valor_br}), use_container_width=True)
+                            st.dataframe(formatar_projecao(fluxo_anual), use_container_width=True)
                             st.markdown("#### DRE Projetado (Anual)")
                             dre_anual = resumir_por_ano(dre_otim, meses_projetados)
-                            dre_anual_formatado = dre_anual.reset_index()
+                            dre_anual_formatado = formatar_projecao(dre_anual).reset_index()
                             dre_anual_formatado.columns.values[0] = "Descrição"
                             st.dataframe(
-                                dre_anual_formatado.style.apply(highlight_rows, axis=1).format(
-                                    formatter={col: formatar_valor_br for col in dre_anual_formatado.columns if col not in ["Descrição", "__tipo__"]}
-                                ),
+                                dre_anual_formatado.style.apply(highlight_rows, axis=1),
                                 use_container_width=True, hide_index=True, height=650
                             )
 
@@ -1128,14 +983,7 @@ if st.session_state.df_transacoes_total is not None:
                 resultado_fluxo = st.session_state.get("resultado_fluxo", exibir_fluxo_caixa(df_transacoes_total, path_faturamento=caminhos_empresa["faturamentos"], path_estoque=caminhos_empresa["estoques"]))
                 resultado_dre = st.session_state.get("resultado_dre", exibir_dre(df_fluxo=resultado_fluxo, path_faturamento=caminhos_empresa["faturamentos"], path_estoque=caminhos_empresa["estoques"]))
                 if resultado_dre is not None and any(col in resultado_dre.columns for col in ["Receita", "Despesas", "Lucro"]):
-                    for col in ["Receita", "Despesas", "Lucro"]:
-                        if col in resultado_dre.columns:
-                            resultado_dre[col] = resultado_dre[col].apply(formatar_valor_br)
-                    st.dataframe(resultado_dre.style.format({
-                        "Receita": formatar_valor_br,
-                        "Despesas": formatar_valor_br,
-                        "Lucro": formatar_valor_br
-                    }), use_container_width=True)
+                    st.dataframe(formatar_tabela(resultado_dre, moeda=["Receita", "Despesas", "Lucro"]), use_container_width=True)
                 gerar_parecer_automatico(resultado_fluxo, tipo_negocio=st.session_state.get('tipo_negocio_pre_analise'))
     
     with tab5:
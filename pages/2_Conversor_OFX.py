@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import io
 from extractors.ofx_extractor import extrair_lancamentos_ofx
+from logic.engine.formatacao import formatar_moeda
 
 st.set_page_config(page_title="Conversor OFX", layout="wide")
 st.title("💸 Leitor de Arquivos OFX")
@@ -41,8 +42,7 @@ if uploaded_files:
     df = pd.DataFrame(todas_transacoes)
 
     if not df.empty:
-        # Formata valor para BR
-        df["Valor (R$)"] = df["Valor (R$)"].map(lambda x: f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+        # Valores continuam numéricos (Excel exportado com números); formatados só na exibição
         st.session_state.df_ofx = df
 
 # Exibe mensagens
@@ -53,7 +53,9 @@ if st.session_state.mensagens:
 # Exibe resultados
 if st.session_state.df_ofx is not None:
     st.success(f"{len(st.session_state.df_ofx)} transações carregadas.")
-    st.dataframe(st.session_state.df_ofx, use_container_width=True)
+    df_exibicao = st.session_state.df_ofx.copy()
+    df_exibicao["Valor (R$)"] = formatar_moeda(df_exibicao["Valor (R$)"], prefixo="")
+    st.dataframe(df_exibicao, use_container_width=True)
 
     output = io.BytesIO()
     st.session_state.df_ofx.to_excel(output, index=False)
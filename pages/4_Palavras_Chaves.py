@@ -2,10 +2,11 @@ import streamlit as st
 import pandas as pd
 import os
 
+from logic.categoria_store import categoria_store
+
 def exibir_pagina():
     st.title("🔑 Palavras-Chave para Categorização Automática")
 
-    caminho_palavras = "./logic/CSVs/palavras_chave.csv"
     caminho_plano = "./logic/CSVs/plano_de_contas.csv"
 
     # Carrega o plano de contas
@@ -19,11 +20,8 @@ def exibir_pagina():
         st.warning("⚠️ Arquivo plano_de_contas.csv não encontrado.")
         plano = pd.DataFrame(columns=["Grupo", "Categoria", "Tipo"])
 
-    # Carrega o CSV de palavras-chave
-    if os.path.exists(caminho_palavras):
-        df = pd.read_csv(caminho_palavras)
-    else:
-        df = pd.DataFrame(columns=["PalavraChave", "Tipo", "Categoria"])
+    # Carrega as palavras-chave (banco SQLite; o CSV legado é importado no primeiro acesso)
+    df = categoria_store.carregar_palavras_chave()
 
     st.dataframe(df, use_container_width=True)
 
@@ -44,13 +42,7 @@ def exibir_pagina():
     if st.button("➕ Adicionar Palavra-Chave"):
         if palavra and categoria_opcao:
             categoria_limpa = plano_filtrado.set_index("Opcao").loc[categoria_opcao, "Categoria"]
-            nova_linha = pd.DataFrame([{
-                "PalavraChave": palavra,
-                "Tipo": tipo,
-                "Categoria": categoria_limpa
-            }])
-            df = pd.concat([df, nova_linha], ignore_index=True)
-            df.to_csv(caminho_palavras, index=False)
+            categoria_store.adicionar_palavra_chave(palavra, tipo, categoria_limpa)
             st.success("Palavra-chave adicionada com sucesso!")
         else:
             st.error("⚠️ Preencha todos os campos.")
@@ -60,8 +52,7 @@ def exibir_pagina():
         palavra_excluir = st.selectbox("Escolha a palavra para excluir", df["PalavraChave"].unique())
 
         if st.button("❌ Excluir Palavra-Chave"):
-            df = df[df["PalavraChave"] != palavra_excluir]
-            df.to_csv(caminho_palavras, index=False)
+            categoria_store.remover_palavra_chave(palavra_excluir)
             st.success("Palavra-chave excluída com sucesso!")
 
-exibir_pagina()
\ No newline at end of file
+exibir_pagina()
\ No newline at end of file
@@ -38,13 +38,51 @@ except ImportError as e:
 # Módulos do projeto
 from logic.Analises_DFC_DRE.deduplicator import remover_duplicatas
 from logic.Analises_DFC_DRE.categorizador import categorizar_transacoes
+from logic.Analises_DFC_DRE.busca_descricoes import IndiceTrigramas
+from logic.Analises_DFC_DRE.canonicalizador import (
+    VERSAO_CANONICALIZACAO,
+    mapa_canonico,
+    resolver_mapa_canonico,
+)
+from logic.Analises_DFC_DRE.memo_categorizacao import (
+    IndicePalavrasChave,
+    cache_categorizacao,
+    carregar_plano_contas,
+    diferenca_mapa,
+    extrair_regras_palavras,
+    fingerprint_transacoes,
+    versao_arquivo,
+)
+from logic.categoria_store import categoria_store
 from logic.Analises_DFC_DRE.fluxo_caixa import exibir_fluxo_caixa  # Função original para compatibilidade
+from logic.Analises_DFC_DRE.esquema_transacoes import (
+    COLUNA_MES,
+    chave_de_rotulo,
+    converter_valores,
+    meses_disponiveis,
+    normalizar_transacoes,
+    validar_esquema_transacoes,
+)
+from logic.Analises_DFC_DRE.motor_fluxo import PLANO_CONTAS_PATH
+from logic.engine.consolidacao import RegraEliminacao, consolidar_licencas
+from logic.engine.diagnosticos import Diagnosticos
+from logic.engine.dre import calcular_dre_vyco
+from logic.engine.estrutura_dre import carregar_programa_dre
+from logic.engine.fluxo import calcular_fluxo_caixa_vyco
+from logic.engine.fluxo_diario import (
+    JANELAS_PADRAO,
+    PERIODOS,
+    calcular_matriz_fluxo_diaria,
+    posicao_diaria,
+    reamostrar_posicao,
+)
+from logic.engine.metricas_derivadas import comparativos_periodo, participacao
 from logic.Analises_DFC_DRE.faturamento import coletar_faturamentos
 from logic.Analises_DFC_DRE.estoque import coletar_estoques
 from logic.Analises_DFC_DRE.gerador_parecer import gerar_parecer_automatico
 from logic.Analises_DFC_DRE.exibir_dre import exibir_dre
 from logic.Analises_DFC_DRE.analise_gpt import analisar_dfs_com_gpt
-from logic.Analises_DFC_DRE.exibir_dre import highlight_rows
+from logic.Analises_DFC_DRE.exibir_dre import formatar_dre, highlight_rows
 from logic.Analises_DFC_DRE.analise_antigravity import analisar_antigravity_gpt, calcular_indicadores_avancados, formatar_brl
 
 # Novos módulos para tipos de negócio
@@ -58,13 +96,18 @@ from logic.business_types.business_manager import (
 )
 
 # Importar gerenciador de cache
-from logic.data_cache_manager import cache_manager
+from logic.armazenamento import NAMESPACE_LICENCAS, obter_armazenamento
+from logic.cache_leituras import cache_leituras
+from logic.data_cache_manager import PASTA_PARECERES_GPT, cache_manager
+from logic.dependencias_cache import PARECER_DIAGNOSTICO, PARECER_GPT, caminho_categorias_licenca, chave_json_licenca
+from logic.cubo_agregados import DIMENSAO_SINAL, SINAL_ENTRADA, SINAL_SAIDA, obter_cubo_transacoes
 
 # Importar gerenciador de licenças
 from logic.licenca_manager import licenca_manager
 
 # Importar gerador de PPT
 from logic.gerador_ppt import gerar_apresentacao_vyco
+from logic.engine.formatacao import formatar_brl as formatar_valor_br, formatar_moeda, formatar_tabela
 
 # Configuração da página removida daqui (movida para o topo)
 
@@ -73,20 +116,6 @@ logging.basicConfig(level=logging.INFO)
 
 # Funções auxiliares
 
-def formatar_valor_br(valor):
-    """Formata um valor numérico para o formato brasileiro (R$)"""
-    if pd.isna(valor):
-        return ""  # Deixa vazio ao invés de mostrar "nan"
-    if isinstance(valor, (int, float)):
-        return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    if isinstance(valor, str):
-        try:
-            valor_num = float(valor.replace(".", "").replace(",", ".").replace("R$", "").replace("R\\$", "").strip())
-            return f"R$ {valor_num:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        except:
-            return valor
-    return valor
-
 def converter_para_float(valor_str):
     """Converte uma string de valor BR para float"""
     if isinstance(valor_str, (int, float)):
@@ -101,7 +130,7 @@ def converter_para_float(valor_str):
 
 def verificar_status_cache(empresa_nome: str) -> dict:
     """
-    Verifica status de todos os arquivos de cache de uma empresa
+    Verifica status de todos os arquivos de cache de uma empresa (lê apenas os manifestos)
     
     Returns:
         Dict com status de cada tipo de arquivo (dre, fluxo, transacoes, orcamento)
@@ -116,43 +145,46 @@ def verificar_status_cache(empresa_nome: str) -> dict:
     }
     
     # Verificar DRE
-    dados_dre = cache_manager.carregar_dre(empresa_nome)
-    if dados_dre:
+    entrada_dre = cache_manager.obter_manifesto(empresa_nome, 'dre')
+    if entrada_dre:
         status['dre'] = {
             'existe': True,
-            'timestamp': dados_dre.get('timestamp', 'Desconhecido'),
-            'periodo': extrair_periodo_dados(dados_dre.get('dre_estruturado', {})),
-            'categorias': contar_categorias_dre(dados_dre.get('dre_estruturado', {})),
-            'tem_detalhamento': verificar_tem_detalhamento(dados_dre.get('dre_estruturado', {})),
-            'tamanho': obter_tamanho_arquivo(f"{empresa_nome}_dre.json", 'dre')
+            'timestamp': entrada_dre.get('timestamp') or 'Desconhecido',
+            'periodo': entrada_dre.get('periodo', 'N/A'),
+            'categorias': entrada_dre.get('categorias', 0),
+            'tem_detalhamento': entrada_dre.get('tem_detalhamento', False),
+            'tamanho': formatar_tamanho(entrada_dre.get('tamanho_bytes'))
         }
     
     # Verificar Fluxo
-    dados_fluxo = cache_manager.carregar_fluxo_caixa(empresa_nome)
-    if dados_fluxo:
+    entrada_fluxo = cache_manager.obter_manifesto(empresa_nome, 'fluxo')
+    if entrada_fluxo:
         status['fluxo'] = {
             'existe': True,
-            'timestamp': dados_fluxo.get('timestamp', 'Desconhecido'),
-            'periodo': extrair_periodo_dados(dados_fluxo.get('fluxo_estruturado', {})),
-            'grupos': contar_grupos_fluxo(dados_fluxo.get('fluxo_estruturado', {})),
-            'tamanho': obter_tamanho_arquivo(f"{empresa_nome}_fluxo.json", 'fluxo_caixa')
+            'timestamp': entrada_fluxo.get('timestamp') or 'Desconhecido',
+            'periodo': entrada_fluxo.get('periodo', 'N/A'),
+            'grupos': entrada_fluxo.get('grupos', 0),
+            'tamanho': formatar_tamanho(entrada_fluxo.get('tamanho_bytes'))
         }
     
     # Verificar Transações
-    dados_transacoes = cache_manager.carregar_transacoes(empresa_nome)
-    if dados_transacoes is not None and not dados_transacoes.empty:
-        periodo_trans = extrair_periodo_transacoes(dados_transacoes)
+    entrada_transacoes = cache_manager.obter_manifesto(empresa_nome, 'transacoes')
+    if entrada_transacoes and entrada_transacoes.get('linhas'):
         status['transacoes'] = {
             'existe': True,
-            'timestamp': datetime.now().isoformat(),  # Pegar do JSON depois
-            'total': len(dados_transacoes),
-            'periodo': periodo_trans,
-            'tamanho': obter_tamanho_arquivo(f"{empresa_nome}_transacoes.json", 'dre')
+            'timestamp': entrada_transacoes.get('timestamp') or 'Desconhecido',
+            'total': entrada_transacoes['linhas'],
+            'periodo': entrada_transacoes.get('periodo', 'N/A'),
+            'tamanho': formatar_tamanho(entrada_transacoes.get('tamanho_bytes'))
         }
     
+    # Motivos de desatualização no grafo de dependências
+    for tipo, motivos in cache_manager.verificar_dependencias(empresa_nome).items():
+        if tipo in status and status[tipo]['existe']:
+            status[tipo]['desatualizado'] = motivos
+    
     # Verificar Orçamento
-    orcamentos = orcamento_manager.listar_orcamentos_disponiveis()
-    orcamento_empresa = [orc for orc in orcamentos if orc['empresa'] == empresa_nome]
+    orcamento_empresa = orcamento_manager.listar_orcamentos_disponiveis(empresa_nome)
     if orcamento_empresa:
         orc = orcamento_empresa[0]
         status['orcamento'] = {
@@ -165,82 +197,27 @@ def verificar_status_cache(empresa_nome: str) -> dict:
     
     return status
 
-def extrair_periodo_dados(dados_estruturados: dict) -> str:
-    """Extrai período dos dados estruturados (formato YYYY-MM)"""
-    if not dados_estruturados:
-        return "N/A"
-    
-    meses = set()
-    for secao_data in dados_estruturados.values():
-        if isinstance(secao_data, dict):
-            itens = secao_data.get('itens', {}) if 'itens' in secao_data else secao_data.get('categorias', {})
-            for item_data in itens.values():
-                if isinstance(item_data, dict):
-                    valores = item_data.get('valores', {}) if 'valores' in item_data else item_data.get('valores_mensais', {})
-                    for mes in valores.keys():
-                        if isinstance(mes, str) and '-' in mes and mes not in ['TOTAL', '%']:
-                            meses.add(mes)
-    
-    if meses:
-        meses_sorted = sorted(list(meses))
-        return f"{meses_sorted[0]} até {meses_sorted[-1]}"
-    return "N/A"
-
-def extrair_periodo_transacoes(df: pd.DataFrame) -> str:
-    """Extrai período das transações"""
-    if 'Data' not in df.columns or df.empty:
-        return "N/A"
-    
-    df['Data'] = pd.to_datetime(df['Data'])
-    data_min = df['Data'].min().strftime('%m/%Y')
-    data_max = df['Data'].max().strftime('%m/%Y')
-    return f"{data_min} até {data_max}"
-
-def contar_categorias_dre(dre_estruturado: dict) -> int:
-    """Conta total de categorias no DRE"""
-    total = 0
-    for secao_data in dre_estruturado.values():
-        if isinstance(secao_data, dict) and 'itens' in secao_data:
-            total += len(secao_data['itens'])
-    return total
-
-def contar_grupos_fluxo(fluxo_estruturado: dict) -> int:
-    """Conta total de grupos no Fluxo"""
-    return len(fluxo_estruturado)
-
-def verificar_tem_detalhamento(dre_estruturado: dict) -> bool:
-    """Verifica se DRE tem detalhamento salvo"""
-    for secao_data in dre_estruturado.values():
-        if isinstance(secao_data, dict) and 'itens' in secao_data:
-            for item_data in secao_data['itens'].values():
-                if isinstance(item_data, dict) and 'detalhamento' in item_data:
-                    return True
-    return False
-
-def obter_tamanho_arquivo(filename: str, tipo: str) -> str:
-    """Obtém tamanho do arquivo em formato legível"""
-    try:
-        if tipo == 'dre' or tipo == 'transacoes':
-            filepath = os.path.join("./data_cache/dre", filename)
-        else:
-            filepath = os.path.join("./data_cache/fluxo_caixa", filename)
-        
-        if os.path.exists(filepath):
-            tamanho_bytes = os.path.getsize(filepath)
-            if tamanho_bytes < 1024:
-                return f"{tamanho_bytes} B"
-            elif tamanho_bytes < 1024 * 1024:
-                return f"{tamanho_bytes / 1024:.1f} KB"
-            else:
-                return f"{tamanho_bytes / (1024 * 1024):.1f} MB"
-        return "N/A"
-    except:
+def formatar_tamanho(tamanho_bytes) -> str:
+    """Tamanho de arquivo em formato legível"""
+    if tamanho_bytes is None:
         return "N/A"
+    if tamanho_bytes < 1024:
+        return f"{tamanho_bytes} B"
+    elif tamanho_bytes < 1024 * 1024:
+        return f"{tamanho_bytes / 1024:.1f} KB"
+    else:
+        return f"{tamanho_bytes / (1024 * 1024):.1f} MB"
 
 def exibir_card_status(tipo: str, info: dict):
     """Exibe card visual do status de um arquivo de cache"""
-    if info['existe']:
+    if info['existe'] and info.get('desatualizado'):
+        st.warning(f"⚠️ **{tipo}** (desatualizado)")
+        for motivo in info['desatualizado']:
+            st.caption(f"🔗 {motivo}")
+    elif info['existe']:
         st.success(f"✅ **{tipo}**")
+    
+    if info['existe']:
         
         # Formatar timestamp
         try:
@@ -281,78 +258,128 @@ def exibir_card_status(tipo: str, info: dict):
         st.error(f"❌ **{tipo}**")
         st.caption("Não encontrado")
 
+def salvar_cache_vyco(empresa_nome: str, df_transacoes: pd.DataFrame, metadata: dict,
+                      resultado_fluxo: pd.DataFrame = None, resultado_dre: pd.DataFrame = None) -> list:
+    """
+    Salva as transações e regrava apenas o fluxo e o DRE desatualizados
+    
+    As transações vão primeiro: fluxo e DRE registram o hash delas como dependência.
+    Artefatos ausentes ou desatualizados usam o resultado recebido ou são calculados
+    a partir das transações; os atualizados não são regravados.
+    
+    Args:
+        empresa_nome: Nome da empresa (licença)
+        df_transacoes: Transações categorizadas
+        metadata: Metadados gravados junto com os arquivos
+        resultado_fluxo: Fluxo já calculado (df_final), se houver
+        resultado_dre: DRE já calculado a partir de resultado_fluxo, se houver
+    
+    Returns:
+        Lista dos artefatos gravados ('transacoes', 'fluxo', 'dre')
+    """
+    gravados = []
+    if df_transacoes is None or df_transacoes.empty:
+        return gravados
+    
+    antes = cache_manager.obter_manifesto(empresa_nome, 'transacoes')
+    if not cache_manager.salvar_transacoes(df_transacoes, empresa_nome, metadata):
+        return gravados
+    if cache_manager.obter_manifesto(empresa_nome, 'transacoes') != antes:
+        gravados.append('transacoes')
+    
+    def precisa_gravar(tipo):
+        return (cache_manager.obter_manifesto(empresa_nome, tipo) is None
+                or bool(cache_manager.motivos_desatualizacao(empresa_nome, tipo)))
+    
+    if not (precisa_gravar('fluxo') or precisa_gravar('dre')):
+        return gravados
+    
+    if resultado_fluxo is None:
+        resultado_fluxo = calcular_fluxo_caixa_vyco(
+            df_transacoes,
+            carregar_faturamento_json(empresa_nome),
+            carregar_estoque_json(empresa_nome)
+        ).df_final
+        resultado_dre = None
+    if resultado_fluxo is None or resultado_fluxo.empty:
+        return gravados
+    
+    if precisa_gravar('fluxo') and cache_manager.salvar_fluxo_caixa(
+        resultado_fluxo, empresa_nome, metadata, df_transacoes=df_transacoes
+    ):
+        gravados.append('fluxo')
+    
+    if precisa_gravar('dre'):
+        if resultado_dre is None:
+            resultado_dre = criar_dre_vyco(resultado_fluxo, pd.read_csv(PLANO_CONTAS_PATH), empresa_nome)
+        if resultado_dre is not None and cache_manager.salvar_dre(
+            resultado_dre, empresa_nome, metadata, df_transacoes=df_transacoes
+        ):
+            gravados.append('dre')
+    
+    return gravados
+
+def informar_cache_salvo(gravados: list):
+    """Mensagem dos artefatos gravados por salvar_cache_vyco"""
+    if gravados:
+        st.info(f"💾 Cache atualizado: {', '.join(gravados)}")
+    else:
+        st.info("💾 Cache já estava atualizado (nenhum arquivo regravado)")
+
 def atualizar_cache_completo(empresa_nome: str):
     """
-    Atualiza todos os arquivos de cache usando dados da session_state
-    Nota: Esta função requer que os dados já tenham sido processados nas outras abas
+    Recalcula apenas os arquivos de cache desatualizados no grafo de dependências
+    
+    Usa as transações carregadas na sessão (se forem desta empresa) ou as salvas no cache.
+    O Parecer Diagnóstico é refeito; pareceres GPT e Antigravity desatualizados são
+    apenas sinalizados (dependem de nova chamada à IA).
     """
-    if 'df_transacoes_total_vyco' not in st.session_state or st.session_state.df_transacoes_total_vyco.empty:
-        st.error("❌ Nenhuma transação carregada. Carregue os dados do Vyco primeiro na aba 'Categorização'.")
-        st.info("💡 **Como atualizar o cache:**\n1. Vá na aba 'Categorização'\n2. Categorize as transações\n3. Volte aqui e clique novamente")
-        return
+    df_transacoes = None
+    if (st.session_state.get('licenca_atual') == empresa_nome
+            and not st.session_state.get('df_transacoes_total_vyco', pd.DataFrame()).empty):
+        df_transacoes = st.session_state.df_transacoes_total_vyco
+    else:
+        df_transacoes = cache_manager.carregar_transacoes(empresa_nome)
     
-    # Verificar se já tem DRE/Fluxo processados
-    if 'ultimo_dre_vyco' not in st.session_state or 'ultimo_fluxo_vyco' not in st.session_state:
-        st.warning("⚠️ DRE/Fluxo não foram gerados ainda.")
-        st.info("💡 **Como atualizar o cache:**\n1. Vá em 'Projeções' ou 'Parecer Diagnóstico'\n2. Gere os relatórios\n3. Os dados serão salvos automaticamente no cache")
+    if df_transacoes is None or df_transacoes.empty:
+        st.error("❌ Nenhuma transação disponível. Carregue os dados do Vyco primeiro na aba 'Categorização'.")
+        st.info("💡 **Como atualizar o cache:**\n1. Vá na aba 'Categorização'\n2. Categorize as transações\n3. Volte aqui e clique novamente")
         return
     
-    with st.spinner("Atualizando cache completo..."):
+    with st.spinner("Atualizando arquivos desatualizados..."):
         try:
-            # Usar dados já processados da session_state
-            resultado_fluxo = st.session_state.get('ultimo_fluxo_vyco')
-            resultado_dre = st.session_state.get('ultimo_dre_vyco')
-            df_transacoes = st.session_state.df_transacoes_total_vyco
-            
-            # Preparar metadata
             metadata = {
                 'licenca': empresa_nome,
                 'total_transacoes': len(df_transacoes),
                 'gerado_em': datetime.now().isoformat(),
                 'origem': 'cache_manual_update'
             }
+            gravados = salvar_cache_vyco(empresa_nome, df_transacoes, metadata)
             
-            # Salvar tudo
-            sucesso = True
-            
-            # Fluxo
-            if resultado_fluxo is not None and not resultado_fluxo.empty:
-                arquivo_fluxo = cache_manager.salvar_fluxo_caixa(resultado_fluxo, empresa_nome, metadata)
-                if arquivo_fluxo:
-                    st.success(f"✅ Fluxo de caixa atualizado")
-                else:
-                    sucesso = False
-            
-            # DRE
-            if resultado_dre is not None:
-                arquivo_dre = cache_manager.salvar_dre(
-                    resultado_dre,
-                    empresa_nome,
-                    metadata,
-                    df_transacoes=df_transacoes
-                )
-                if arquivo_dre:
-                    st.success(f"✅ DRE atualizado")
-                else:
-                    sucesso = False
-            
-            # Transações
-            if not df_transacoes.empty:
-                arquivo_transacoes = cache_manager.salvar_transacoes(
+            # Parecer Diagnóstico: texto determinístico a partir do fluxo e do DRE
+            if cache_manager.motivos_desatualizacao(empresa_nome, PARECER_DIAGNOSTICO):
+                dados_fluxo = calcular_fluxo_caixa_vyco(
                     df_transacoes,
-                    empresa_nome,
-                    metadata
-                )
-                if arquivo_transacoes:
-                    st.success(f"✅ Transações salvas")
-                else:
-                    sucesso = False
-            
-            if sucesso:
-                st.balloons()
-                st.success("🎉 Cache atualizado com sucesso!")
+                    carregar_faturamento_json(empresa_nome),
+                    carregar_estoque_json(empresa_nome)
+                ).df_final
+                dados_dre = criar_dre_vyco(dados_fluxo, pd.read_csv(PLANO_CONTAS_PATH), empresa_nome)
+                from logic.Analises_DFC_DRE.gerador_parecer import gerar_texto_parecer
+                texto_md = gerar_texto_parecer(dados_fluxo, dados_dre, st.session_state.get('tipo_negocio_selecionado', None))
+                if texto_md and texto_md != "Sem dados suficientes para gerar parecer.":
+                    if cache_manager.salvar_parecer_diagnostico(empresa_nome, texto_md):
+                        gravados.append(PARECER_DIAGNOSTICO)
+            
+            for tipo in gravados:
+                st.success(f"✅ {tipo} atualizado")
+            if not gravados:
+                st.success("✅ Todos os arquivos já estavam atualizados")
+            
+            pendentes = cache_manager.artefatos_desatualizados(empresa_nome)
+            if pendentes:
+                st.warning(f"⚠️ Ainda desatualizados (gere novamente nas abas de análise): {', '.join(pendentes)}")
             else:
-                st.warning("⚠️ Alguns arquivos não foram salvos corretamente")
+                st.success("🎉 Cache atualizado com sucesso!")
                 
         except Exception as e:
             st.error(f"❌ Erro ao atualizar cache: {e}")
@@ -366,37 +393,27 @@ def obter_arquivo_categorias_licenca(licenca_nome, tipo_lancamento=""):
     if not os.path.exists(dir_licencas):
         os.makedirs(dir_licencas)
     
-    # Nome do arquivo baseado na licença, limpo para sistema de arquivos
-    nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
-    nome_limpo = nome_limpo.replace(' ', '_').lower()
-    
-    arquivo_json = f"{dir_licencas}/categorias_{nome_limpo}.json"
-    return arquivo_json
+    # Mesmo caminho usado pelo grafo de dependências do cache
+    return caminho_categorias_licenca(licenca_nome)
 
 def carregar_categorias_licenca(arquivo_json):
     """
-    Carrega as categorias salvas do arquivo JSON da licença como dicionário
+    Carrega as categorias salvas da licença como dicionário
+    (banco SQLite; o JSON legado é importado no primeiro acesso)
     """
-    if os.path.exists(arquivo_json):
-        try:
-            with open(arquivo_json, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-                # Retornar dicionário diretamente
-                return dados if dados else {}
-        except Exception as e:
-            st.warning(f"⚠️ Erro ao carregar categorias da licença: {e}")
-            return {}
-    else:
+    try:
+        return categoria_store.carregar_mapa(arquivo_json)
+    except Exception as e:
+        st.warning(f"⚠️ Erro ao carregar categorias da licença: {e}")
         return {}
 
 def salvar_categorias_licenca(arquivo_json, categorias_dict):
     """
-    Salva as categorias no arquivo JSON da licença
+    Salva (insere ou atualiza) as categorias da licença em uma única transação
+    (chaves com categoria vazia são removidas)
     """
     try:
-        with open(arquivo_json, 'w', encoding='utf-8') as f:
-            # Salvar dicionário diretamente
-            json.dump(categorias_dict, f, ensure_ascii=False, indent=2)
+        categoria_store.salvar_categorias(arquivo_json, categorias_dict)
         return True
     except Exception as e:
         st.error(f"❌ Erro ao salvar categorias da licença: {e}")
@@ -407,20 +424,14 @@ def salvar_faturamento_json(licenca_nome, dados_faturamento):
     Salva os dados de faturamento em arquivo JSON específico da licença
     """
     try:
-        # Criar diretório para dados de licenças se não existir
-        dir_licencas = "./logic/CSVs/licencas"
-        if not os.path.exists(dir_licencas):
-            os.makedirs(dir_licencas)
+        armazenamento = obter_armazenamento(NAMESPACE_LICENCAS)
+        chave = chave_json_licenca(licenca_nome, "faturamento")
         
-        # Nome do arquivo baseado na licença
-        nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        nome_limpo = nome_limpo.replace(' ', '_').lower()
-        arquivo_json = f"{dir_licencas}/{nome_limpo}_faturamento.json"
+        # Gravação atômica sob a trava da licença (outra sessão pode estar salvando)
+        with cache_manager.trava(licenca_nome):
+            armazenamento.gravar_json(chave, dados_faturamento, default=None)
         
-        with open(arquivo_json, 'w', encoding='utf-8') as f:
-            json.dump(dados_faturamento, f, ensure_ascii=False, indent=2)
-        
-        st.success(f"✅ Faturamento salvo em: {arquivo_json}")
+        st.success(f"✅ Faturamento salvo em: {armazenamento.localizacao(chave)}")
         return True
     except Exception as e:
         st.error(f"❌ Erro ao salvar faturamento: {e}")
@@ -431,15 +442,7 @@ def carregar_faturamento_json(licenca_nome):
     Carrega os dados de faturamento do arquivo JSON da licença
     """
     try:
-        dir_licencas = "./logic/CSVs/licencas"
-        nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        nome_limpo = nome_limpo.replace(' ', '_').lower()
-        arquivo_json = f"{dir_licencas}/{nome_limpo}_faturamento.json"
-        
-        if os.path.exists(arquivo_json):
-            with open(arquivo_json, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        return obter_armazenamento(NAMESPACE_LICENCAS).ler_json(chave_json_licenca(licenca_nome, "faturamento"), {})
     except Exception as e:
         st.error(f"❌ Erro ao carregar faturamento: {e}")
         return {}
@@ -449,20 +452,14 @@ def salvar_estoque_json(licenca_nome, dados_estoque):
     Salva os dados de estoque em arquivo JSON específico da licença
     """
     try:
-        # Criar diretório para dados de licenças se não existir
-        dir_licencas = "./logic/CSVs/licencas"
-        if not os.path.exists(dir_licencas):
-            os.makedirs(dir_licencas)
-        
-        # Nome do arquivo baseado na licença
-        nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        nome_limpo = nome_limpo.replace(' ', '_').lower()
-        arquivo_json = f"{dir_licencas}/{nome_limpo}_estoque.json"
+        armazenamento = obter_armazenamento(NAMESPACE_LICENCAS)
+        chave = chave_json_licenca(licenca_nome, "estoque")
         
-        with open(arquivo_json, 'w', encoding='utf-8') as f:
-            json.dump(dados_estoque, f, ensure_ascii=False, indent=2)
+        # Gravação atômica sob a trava da licença (outra sessão pode estar salvando)
+        with cache_manager.trava(licenca_nome):
+            armazenamento.gravar_json(chave, dados_estoque, default=None)
         
-        st.success(f"✅ Estoque salvo em: {arquivo_json}")
+        st.success(f"✅ Estoque salvo em: {armazenamento.localizacao(chave)}")
         return True
     except Exception as e:
         st.error(f"❌ Erro ao salvar estoque: {e}")
@@ -473,15 +470,7 @@ def carregar_estoque_json(licenca_nome):
     Carrega os dados de estoque do arquivo JSON da licença
     """
     try:
-        dir_licencas = "./logic/CSVs/licencas"
-        nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        nome_limpo = nome_limpo.replace(' ', '_').lower()
-        arquivo_json = f"{dir_licencas}/{nome_limpo}_estoque.json"
-        
-        if os.path.exists(arquivo_json):
-            with open(arquivo_json, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        return obter_armazenamento(NAMESPACE_LICENCAS).ler_json(chave_json_licenca(licenca_nome, "estoque"), {})
     except Exception as e:
         st.error(f"❌ Erro ao carregar estoque: {e}")
         return {}
@@ -499,13 +488,9 @@ def salvar_parecer_gpt(licenca_nome, parecer_texto, descricao_empresa, periodo_a
         periodo_analise: Período analisado (ex: "2024-01 a 2024-12")
     
     Returns:
-        str: Caminho do arquivo salvo ou None se houver erro
+        str: Localização do arquivo salvo ou None se houver erro
     """
     try:
-        # Criar pasta se não existir
-        pasta_pareceres = "./data_cache/pareceres_gpt"
-        os.makedirs(pasta_pareceres, exist_ok=True)
-        
         # Limpar nome da licença para usar no arquivo
         nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
         nome_limpo = nome_limpo.replace(' ', '_').lower()
@@ -514,7 +499,7 @@ def salvar_parecer_gpt(licenca_nome, parecer_texto, descricao_empresa, periodo_a
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Nome do arquivo: Empresa_YYYYMMDD_HHMMSS.json
-        arquivo_json = os.path.join(pasta_pareceres, f"{nome_limpo}_{timestamp}.json")
+        chave = f"{PASTA_PARECERES_GPT}/{nome_limpo}_{timestamp}.json"
         
         # Preparar dados
         dados_parecer = {
@@ -530,10 +515,12 @@ def salvar_parecer_gpt(licenca_nome, parecer_texto, descricao_empresa, periodo_a
         }
         
         # Salvar arquivo
-        with open(arquivo_json, 'w', encoding='utf-8') as f:
-            json.dump(dados_parecer, f, indent=2, ensure_ascii=False)
+        cache_manager.armazenamento.gravar_json(chave, dados_parecer, default=None)
         
-        return arquivo_json
+        # Registra o fluxo e o DRE usados (o parecer fica desatualizado quando eles mudam)
+        cache_manager.registrar_artefato(licenca_nome, PARECER_GPT, chave)
+        
+        return cache_manager.armazenamento.localizacao(chave)
     
     except Exception as e:
         st.error(f"Erro ao salvar parecer GPT: {e}")
@@ -550,29 +537,18 @@ def carregar_ultimo_parecer_gpt(licenca_nome):
         dict: Dados do parecer ou None se não encontrado
     """
     try:
-        pasta_pareceres = "./data_cache/pareceres_gpt"
-        
-        if not os.path.exists(pasta_pareceres):
-            return None
-        
         # Limpar nome da licença
         nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
         nome_limpo = nome_limpo.replace(' ', '_').lower()
         
         # Listar arquivos da licença
-        arquivos = [f for f in os.listdir(pasta_pareceres) if f.startswith(nome_limpo) and f.endswith('.json')]
+        chaves = [c for c in cache_manager.armazenamento.listar(f"{PASTA_PARECERES_GPT}/{nome_limpo}") if c.endswith('.json')]
         
-        if not arquivos:
+        if not chaves:
             return None
         
-        # Ordenar por data (mais recente primeiro)
-        arquivos.sort(reverse=True)
-        
-        # Carregar o mais recente
-        arquivo_json = os.path.join(pasta_pareceres, arquivos[0])
-        
-        with open(arquivo_json, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        # Carregar o mais recente (nomes terminam no timestamp)
+        return cache_manager.armazenamento.ler_json(max(chaves))
     
     except Exception as e:
         st.error(f"Erro ao carregar último parecer: {e}")
@@ -589,40 +565,35 @@ def listar_pareceres_gpt(licenca_nome):
         list: Lista de dicionários com informações dos pareceres
     """
     try:
-        pasta_pareceres = "./data_cache/pareceres_gpt"
-        
-        if not os.path.exists(pasta_pareceres):
-            return []
-        
         # Limpar nome da licença
         nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
         nome_limpo = nome_limpo.replace(' ', '_').lower()
         
-        # Listar arquivos da licença
-        arquivos = [f for f in os.listdir(pasta_pareceres) if f.startswith(nome_limpo) and f.endswith('.json')]
+        # Pareceres da licença lidos de uma vez (um lote só em backends remotos)
+        chaves = [c for c in cache_manager.armazenamento.listar(f"{PASTA_PARECERES_GPT}/{nome_limpo}") if c.endswith('.json')]
+        conteudos = cache_manager.armazenamento.ler_varios(chaves)
         
         pareceres = []
-        for arquivo in arquivos:
+        for chave in chaves:
             try:
-                arquivo_path = os.path.join(pasta_pareceres, arquivo)
-                with open(arquivo_path, 'r', encoding='utf-8') as f:
-                    dados = json.load(f)
-                    
-                    # Extrair data do timestamp
-                    data_geracao = dados.get('data_geracao', '')
-                    try:
-                        data_obj = datetime.fromisoformat(data_geracao)
-                        data_formatada = data_obj.strftime("%d/%m/%Y %H:%M")
-                    except:
-                        data_formatada = data_geracao
-                    
-                    pareceres.append({
-                        'arquivo': arquivo,
-                        'data_geracao': data_geracao,
-                        'data_formatada': data_formatada,
-                        'periodo': dados.get('metadata', {}).get('periodo_analise', 'N/A'),
-                        'caracteres': dados.get('metadata', {}).get('total_caracteres', 0)
-                    })
+                arquivo = chave.rpartition('/')[2]
+                dados = json.loads(conteudos[chave].decode('utf-8'))
+                
+                # Extrair data do timestamp
+                data_geracao = dados.get('data_geracao', '')
+                try:
+                    data_obj = datetime.fromisoformat(data_geracao)
+                    data_formatada = data_obj.strftime("%d/%m/%Y %H:%M")
+                except:
+                    data_formatada = data_geracao
+                
+                pareceres.append({
+                    'arquivo': arquivo,
+                    'data_geracao': data_geracao,
+                    'data_formatada': data_formatada,
+                    'periodo': dados.get('metadata', {}).get('periodo_analise', 'N/A'),
+                    'caracteres': dados.get('metadata', {}).get('total_caracteres', 0)
+                })
             except:
                 continue
         
@@ -647,18 +618,240 @@ def carregar_parecer_especifico(licenca_nome, arquivo_nome):
         dict: Dados do parecer ou None se não encontrado
     """
     try:
-        pasta_pareceres = "./data_cache/pareceres_gpt"
-        arquivo_path = os.path.join(pasta_pareceres, arquivo_nome)
-        
-        if os.path.exists(arquivo_path):
-            with open(arquivo_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
+        return cache_manager.armazenamento.ler_json(f"{PASTA_PARECERES_GPT}/{arquivo_nome}")
     
     except Exception as e:
         st.error(f"Erro ao carregar parecer: {e}")
         return None
 
+def _sugerir_categorias_vyco(chaves, contexto):
+    """
+    Calcula a categoria sugerida para os grupos informados
+    (categoria salva, depois plano de contas no modo Vyco ou palavras-chave no modo tradicional)
+    """
+    sugestoes = {}
+    mapa_salvas = contexto["mapa_salvas"]
+    df_plano_filtrado = contexto["df_plano_filtrado"]
+    categorias_plano = df_plano_filtrado["Categoria"].astype(str)
+    
+    for chave in chaves:
+        if mapa_salvas.get(chave):
+            sugestoes[chave] = mapa_salvas[chave]
+        elif contexto["usar_categoria_vyco"]:
+            # Tentar mapear categoria do Vyco para o plano de contas
+            if not chave:
+                continue
+            categoria_match = df_plano_filtrado[categorias_plano.str.contains(re.escape(chave), case=False, na=False)]
+            if not categoria_match.empty:
+                sugestoes[chave] = categoria_match.iloc[0]["Opcao"]
+        elif chave in contexto["indice_palavras"].sugestoes:
+            # Usar palavras-chave
+            sugestoes[chave] = contexto["indice_palavras"].sugestoes[chave]
+    return sugestoes
+
+def _mapa_categorias_vyco(df_categorias, tipo_lancamento, canonicos=None):
+    """Normaliza as categorias salvas (JSON da licença ou CSV) em um dicionário chave -> categoria"""
+    mapa = {}
+    if isinstance(df_categorias, dict):
+        mapa = dict(df_categorias)
+    elif isinstance(df_categorias, pd.DataFrame) and not df_categorias.empty:
+        salvas = df_categorias[df_categorias["Tipo"] == tipo_lancamento].drop_duplicates(subset=["Descricao"], keep="first")
+        mapa = dict(zip(salvas["Descricao"], salvas["Categoria"]))
+    return resolver_mapa_canonico(mapa, canonicos) if canonicos else mapa
+
+def _aplicar_mapa_categorias(df, chaves_linha, mapa, categoria_original=None, chaves=None):
+    """
+    Aplica o mapa chave -> categoria na coluna Categoria do DataFrame
+    
+    Args:
+        df: DataFrame a atualizar (alterado no próprio objeto)
+        chaves_linha: Série com a chave de agrupamento de cada linha
+                      (Categoria_Vyco ou descrição canônica)
+        mapa: Dicionário chave -> categoria
+        categoria_original: Categorias antes do mapa, restauradas para chaves removidas
+        chaves: Restringe a atualização a estas chaves (padrão: todas)
+    """
+    mascara = chaves_linha.isin(chaves) if chaves is not None else pd.Series(True, index=df.index)
+    if not mascara.any():
+        return
+    
+    categorias_mapa = chaves_linha.loc[mascara].map(mapa)
+    if categoria_original is not None:
+        base = categoria_original.loc[mascara]
+    elif "Categoria" in df.columns:
+        base = df.loc[mascara, "Categoria"]
+    else:
+        base = pd.Series(np.nan, index=categorias_mapa.index)
+    
+    if "Categoria" not in df.columns and not categorias_mapa.notna().any():
+        return
+    df.loc[mascara, "Categoria"] = categorias_mapa.where(categorias_mapa.notna(), base)
+
+def preparar_categorizacao_vyco(df_transacoes, df_categorias, df_plano_filtrado, df_palavras, tipo_lancamento, licenca_nome,
+                                canonizar_descricoes=True):
+    """
+    Calcula a parte pesada da categorização Vyco (resultado memoizado entre reruns)
+    
+    Args:
+        df_transacoes: DataFrame de transações (já com template aplicado)
+        df_categorias: Dicionário da licença ou DataFrame do CSV de categorias salvas
+        df_plano_filtrado: Plano de contas filtrado pelo tipo, com coluna Opcao
+        df_palavras: DataFrame de palavras-chave
+        tipo_lancamento: Tipo de lançamento (Crédito/Débito)
+        licenca_nome: Nome da licença
+        canonizar_descricoes: No modo tradicional, agrupar pela descrição canônica
+    
+    Returns:
+        dict: df_desc pré-categorizado, modo de agrupamento, sugestões por chave,
+              texto dos valores por chave, df_resultado com o JSON da licença aplicado
+              e o contexto usado nas atualizações incrementais
+    """
+    usa_licenca = bool(licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict))
+    usar_categoria_vyco = 'Categoria_Vyco' in df_transacoes.columns and not df_transacoes['Categoria_Vyco'].isna().all()
+    erro_agrupamento = None
+    
+    df_desc = None
+    if usar_categoria_vyco:
+        # Usar "Categoria nome" do Vyco como parâmetro de categorização
+        try:
+            df_desc = (
+                df_transacoes
+                .groupby("Categoria_Vyco", as_index=False)
+                .agg(Quantidade=("Valor (R$)", "count"), Total=("Valor (R$)", "sum"))
+            )
+        except Exception as e:
+            # Fallback para modo tradicional
+            erro_agrupamento = str(e)
+            usar_categoria_vyco = False
+    
+    canonicos = {}
+    if df_desc is None:
+        # Usar apenas a descrição (método tradicional), agrupando variações da mesma descrição
+        if canonizar_descricoes:
+            canonicos = mapa_canonico(df_transacoes["Descrição"])
+            chaves_linha = df_transacoes["Descrição"].map(canonicos)
+        else:
+            chaves_linha = df_transacoes["Descrição"]
+        df_desc = (
+            df_transacoes
+            .assign(**{"Descrição": chaves_linha})
+            .groupby("Descrição", as_index=False)
+            .agg(Quantidade=("Valor (R$)", "count"), Total=("Valor (R$)", "sum"))
+        )
+    else:
+        chaves_linha = df_transacoes["Categoria_Vyco"]
+    
+    coluna_chave = "Categoria_Vyco" if usar_categoria_vyco else "Descrição"
+    chaves = df_desc[coluna_chave].tolist()
+    mapa_json = _mapa_categorias_vyco(df_categorias, tipo_lancamento, canonicos) if usa_licenca else {}
+    
+    contexto = {
+        "usar_categoria_vyco": usar_categoria_vyco,
+        "mapa_salvas": _mapa_categorias_vyco(df_categorias, tipo_lancamento, canonicos),
+        "df_plano_filtrado": df_plano_filtrado,
+        "indice_palavras": IndicePalavrasChave(
+            [] if usar_categoria_vyco else chaves,
+            extrair_regras_palavras(df_palavras, tipo_lancamento),
+            originais=canonicos
+        ),
+    }
+    
+    # Pré-categorizar com base no JSON se disponível
+    df_desc["Categoria"] = ""
+    _aplicar_mapa_categorias(df_desc, df_desc[coluna_chave], mapa_json)
+    df_desc["Categoria"] = df_desc["Categoria"].fillna("")
+    
+    # Sugestões para os grupos ainda sem categoria
+    pendentes = df_desc.loc[df_desc["Categoria"] == "", coluna_chave].tolist()
+    sugestoes = _sugerir_categorias_vyco(pendentes, contexto)
+    
+    # Texto dos valores (primeiros 5) por grupo, para o rótulo dos seletores
+    valores_rotulo = formatar_moeda(np.abs(converter_valores(df_transacoes["Valor (R$)"])), prefixo="R\\$ ")
+    grupos = pd.Series(chaves_linha.to_numpy())
+    posicao = grupos.groupby(grupos, sort=False).cumcount().to_numpy()
+    valores_texto = valores_rotulo[posicao < 5].groupby(grupos[posicao < 5].to_numpy(), sort=False).agg(" - ".join)
+    excedentes = grupos[posicao == 5].unique()
+    valores_texto.loc[excedentes] = valores_texto.loc[excedentes] + "..."
+    valores_texto = valores_texto.to_dict()
+    
+    # Aplicar automaticamente as categorias do JSON ao DataFrame original
+    df_resultado = df_transacoes.copy()
+    if "Categoria" in df_transacoes.columns:
+        categoria_original = df_transacoes["Categoria"].copy()
+    else:
+        categoria_original = pd.Series(np.nan, index=df_transacoes.index, dtype=object)
+    _aplicar_mapa_categorias(df_resultado, chaves_linha, mapa_json)
+    
+    return {
+        "df_desc": df_desc,
+        "usar_categoria_vyco": usar_categoria_vyco,
+        "erro_agrupamento": erro_agrupamento,
+        "sugestoes": sugestoes,
+        "valores_texto": valores_texto,
+        "df_resultado": df_resultado,
+        "mapa_json": mapa_json,
+        "canonicos": canonicos,
+        "chaves_linha": chaves_linha,
+        "categoria_original": categoria_original,
+        "contexto": contexto,
+    }
+
+def atualizar_categorizacao_vyco(anterior, df_categorias, df_palavras, tipo_lancamento, licenca_nome):
+    """
+    Atualiza um resultado anterior (mesmas transações) após mudança nas regras,
+    reavaliando apenas os grupos cujas regras (JSON da licença, categorias salvas
+    ou palavras-chave) mudaram e corrigindo os DataFrames em cache
+    
+    Args:
+        anterior: Resultado de preparar_categorizacao_vyco para as mesmas transações
+        df_categorias: Dicionário da licença ou DataFrame do CSV atualizado
+        df_palavras: DataFrame de palavras-chave atualizado
+        tipo_lancamento: Tipo de lançamento (Crédito/Débito)
+        licenca_nome: Nome da licença
+    
+    Returns:
+        dict: Novo resultado no mesmo formato de preparar_categorizacao_vyco
+    """
+    usa_licenca = bool(licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict))
+    contexto_anterior = anterior["contexto"]
+    coluna_chave = "Categoria_Vyco" if anterior["usar_categoria_vyco"] else "Descrição"
+    
+    canonicos = anterior["canonicos"]
+    mapa_json = _mapa_categorias_vyco(df_categorias, tipo_lancamento, canonicos) if usa_licenca else {}
+    mapa_salvas = _mapa_categorias_vyco(df_categorias, tipo_lancamento, canonicos)
+    indice_palavras, afetadas = contexto_anterior["indice_palavras"].atualizar(
+        extrair_regras_palavras(df_palavras, tipo_lancamento)
+    )
+    chaves_json = diferenca_mapa(anterior["mapa_json"], mapa_json)
+    afetadas = afetadas | chaves_json | diferenca_mapa(contexto_anterior["mapa_salvas"], mapa_salvas)
+    
+    contexto = {**contexto_anterior, "mapa_salvas": mapa_salvas, "indice_palavras": indice_palavras}
+    
+    # Corrigir a pré-categorização apenas nos grupos cujo JSON mudou
+    df_desc = anterior["df_desc"]
+    df_resultado = anterior["df_resultado"]
+    if chaves_json:
+        df_desc = df_desc.copy()
+        mascara = df_desc[coluna_chave].isin(chaves_json)
+        df_desc.loc[mascara, "Categoria"] = df_desc.loc[mascara, coluna_chave].map(mapa_json).fillna("")
+        
+        df_resultado = df_resultado.copy()
+        _aplicar_mapa_categorias(df_resultado, anterior["chaves_linha"], mapa_json, anterior["categoria_original"], chaves_json)
+    
+    # Reavaliar sugestões dos grupos afetados que seguem sem categoria
+    pendentes = set(df_desc.loc[df_desc["Categoria"] == "", coluna_chave])
+    sugestoes = {k: v for k, v in anterior["sugestoes"].items() if k not in afetadas and k in pendentes}
+    sugestoes.update(_sugerir_categorias_vyco([k for k in afetadas if k in pendentes], contexto))
+    
+    return {
+        **anterior,
+        "df_desc": df_desc,
+        "sugestoes": sugestoes,
+        "df_resultado": df_resultado,
+        "mapa_json": mapa_json,
+        "contexto": contexto,
+    }
+
 def categorizar_transacoes_vyco(
     df_transacoes,
     plano_path="./logic/CSVs/plano_de_contas.csv",
@@ -689,69 +882,19 @@ def categorizar_transacoes_vyco(
     if licenca_nome and licenca_nome.strip():
         arquivo_licenca = obter_arquivo_categorias_licenca(licenca_nome, tipo_lancamento)
         df_categorias = carregar_categorias_licenca(arquivo_licenca)
+        versao_categorias = categoria_store.versao(arquivo_licenca)
     else:
-        # Fallback para arquivo CSV tradicional
-        if os.path.exists(categorias_salvas_path):
-            df_categorias = pd.read_csv(categorias_salvas_path)
-        else:
-            df_categorias = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
-
-    # Verificar se temos dados de categoria do Vyco
-    usar_categoria_vyco = 'Categoria_Vyco' in df_transacoes.columns and not df_transacoes['Categoria_Vyco'].isna().all()
-    
-
-    
-    if usar_categoria_vyco:
-        # Usar "Categoria nome" do Vyco como parâmetro de categorização
+        # Fallback para as categorias salvas tradicionais
         try:
-            df_desc = (
-                df_transacoes
-                .groupby("Categoria_Vyco", as_index=False)
-                .agg(Quantidade=("Valor (R$)", "count"), Total=("Valor (R$)", "sum"))
-            )
-            # Pré-categorizar com base no JSON se disponível
-            df_desc["Categoria"] = ""
-            if licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict):
-                for idx, row in df_desc.iterrows():
-                    categoria_vyco = row["Categoria_Vyco"]
-                    if categoria_vyco in df_categorias:
-                        df_desc.at[idx, "Categoria"] = df_categorias[categoria_vyco]
-
-            st.success("✅ Agrupamento por Categoria Vyco realizado com sucesso!")
+            df_categorias = categoria_store.carregar_categorias(categorias_salvas_path)
         except Exception as e:
-            st.error(f"❌ Erro no agrupamento Vyco: {e}")
-            # Fallback para modo tradicional
-            df_desc = (
-                df_transacoes
-                .groupby("Descrição", as_index=False)
-                .agg(Quantidade=("Valor (R$)", "count"), Total=("Valor (R$)", "sum"))
-            )
-            # Pré-categorizar com base no JSON se disponível (modo fallback)
-            df_desc["Categoria"] = ""
-            if licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict):
-                for idx, row in df_desc.iterrows():
-                    descricao = row["Descrição"]
-                    if descricao in df_categorias:
-                        df_desc.at[idx, "Categoria"] = df_categorias[descricao]
-            usar_categoria_vyco = False
-    else:
-        # Usar apenas a descrição (método tradicional)
-        df_desc = (
-            df_transacoes
-            .groupby("Descrição", as_index=False)
-            .agg(Quantidade=("Valor (R$)", "count"), Total=("Valor (R$)", "sum"))
-        )
-        # Pré-categorizar com base no JSON se disponível (modo tradicional)
-        df_desc["Categoria"] = ""
-        if licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict):
-            for idx, row in df_desc.iterrows():
-                descricao = row["Descrição"]
-                if descricao in df_categorias:
-                    df_desc.at[idx, "Categoria"] = df_categorias[descricao]
+            st.warning(f"⚠️ Erro ao carregar categorias salvas: {e}")
+            df_categorias = pd.DataFrame(columns=["Descricao", "Tipo", "Categoria"])
+        versao_categorias = categoria_store.versao(categorias_salvas_path)
 
-    # Verificar se o plano de contas existe
+    # Verificar se o plano de contas existe (lido uma vez por versão do arquivo)
     try:
-        df_plano = pd.read_csv(plano_path)
+        df_plano = carregar_plano_contas(plano_path)
         if df_plano.empty:
             st.error("⚠️ Arquivo plano_de_contas.csv está vazio.")
             return df_transacoes, pd.DataFrame()
@@ -778,11 +921,6 @@ def categorizar_transacoes_vyco(
     else:
         df_plano_filtrado = df_plano.copy()
 
-    # Verificar se há categorias após a filtragem
-    if df_plano_filtrado.empty:
-        st.error("⚠️ Plano de contas vazio após filtragem.")
-        return df_transacoes, df_desc
-
     # Criar opções de categorias
     df_plano_filtrado["Opcao"] = df_plano_filtrado["Grupo"] + " :: " + df_plano_filtrado["Categoria"]
     opcoes_categorias = df_plano_filtrado["Opcao"].tolist()
@@ -790,10 +928,49 @@ def categorizar_transacoes_vyco(
 
     # Carregar palavras-chave
     try:
-        df_palavras = pd.read_csv("./logic/CSVs/palavras_chave.csv")
+        df_palavras = categoria_store.carregar_palavras_chave()
     except:
         df_palavras = pd.DataFrame(columns=["PalavraChave", "Tipo", "Categoria"])
 
+    # Agrupamento, pré-categorização e sugestões memoizados por versão dos dados e das regras
+    # Quando só o JSON da licença ou as palavras-chave mudam, reavalia apenas os grupos afetados
+    familia_memo = (
+        "vyco",
+        fingerprint_transacoes(df_transacoes),
+        versao_arquivo(plano_path),
+        tipo_lancamento,
+        licenca_nome,
+        VERSAO_CANONICALIZACAO,
+    )
+    chave_memo = familia_memo + (
+        versao_categorias,
+        categoria_store.versao_palavras_chave(),
+    )
+    preparado = cache_categorizacao.obter_ou_calcular(
+        chave_memo,
+        lambda: preparar_categorizacao_vyco(
+            df_transacoes, df_categorias, df_plano_filtrado, df_palavras, tipo_lancamento, licenca_nome
+        ),
+        familia=familia_memo,
+        atualizador=lambda anterior: atualizar_categorizacao_vyco(
+            anterior, df_categorias, df_palavras, tipo_lancamento, licenca_nome
+        )
+    )
+    df_desc = preparado["df_desc"].copy()
+    usar_categoria_vyco = preparado["usar_categoria_vyco"]
+    sugestoes = preparado["sugestoes"]
+    valores_texto_por_chave = preparado["valores_texto"]
+
+    # Verificar se há categorias após a filtragem (descrições agrupadas voltam sem alteração)
+    if df_plano_filtrado.empty:
+        st.error("⚠️ Plano de contas vazio após filtragem.")
+        return df_transacoes, df_desc
+
+    if preparado["erro_agrupamento"]:
+        st.error(f"❌ Erro no agrupamento Vyco: {preparado['erro_agrupamento']}")
+    elif usar_categoria_vyco:
+        st.success("✅ Agrupamento por Categoria Vyco realizado com sucesso!")
+
     if usar_categoria_vyco:
         st.markdown("### 🧠 Categorize as Descrições (baseado em Categoria Vyco)")
         st.info("🔄 **Modo Vyco:** As categorias do sistema Vyco são usadas como base, mas você pode ajustá-las conforme o plano de contas.")
@@ -809,38 +986,50 @@ def categorizar_transacoes_vyco(
             vyco_cats = df_transacoes[df_transacoes['Categoria_Vyco'].notna()]['Categoria_Vyco'].value_counts()
             st.dataframe(vyco_cats.reset_index(), use_container_width=True)
 
+    coluna_chave = "Categoria_Vyco" if usar_categoria_vyco else "Descrição"
+
     # MOVIDO PARA CIMA: Categorização em Lote
     st.markdown("### 🧩 Categorização em Lote")
     coluna1, coluna2 = st.columns([3, 2])
     with coluna1:
-        palavras_chave = st.text_input("🔍 Procurar categorias por palavra:", key=f"busca_palavra_{prefixo_key}")
+        palavras_chave = st.text_input(
+            "🔍 Procurar categorias por palavra:",
+            key=f"busca_palavra_{prefixo_key}",
+            help="Vários termos: todos precisam aparecer. Use ^termo para buscar pelo início."
+        )
         if usar_categoria_vyco:
             # Para modo Vyco, usar apenas Categoria_Vyco
-            categorias_disponiveis = df_desc[df_desc["Categoria"].isnull() | (df_desc["Categoria"] == "")]["Categoria_Vyco"].tolist()
-            categorias_texto = [f"Vyco: {cat}" for cat in categorias_disponiveis]
+            categorias_texto = df_desc[df_desc["Categoria"].isnull() | (df_desc["Categoria"] == "")]["Categoria_Vyco"].tolist()
         else:
             # Para modo tradicional, usar Descrição
             descricoes_disponiveis = df_desc[df_desc["Categoria"].isnull() | (df_desc["Categoria"] == "")]["Descrição"].tolist()
             categorias_texto = descricoes_disponiveis
             
         if palavras_chave:
-            categorias_filtradas = [d for d in categorias_texto if palavras_chave.lower() in d.lower()]
+            # Índice de trigramas montado uma vez por conjunto de dados (chaves sem o rótulo "Vyco:")
+            indice_busca = cache_categorizacao.obter_ou_calcular(
+                ("indice_busca",) + familia_memo,
+                lambda: IndiceTrigramas(preparado["df_desc"][coluna_chave].tolist())
+            )
+            encontradas = set(indice_busca.buscar(palavras_chave))
+            categorias_filtradas = [d for d in categorias_texto if d in encontradas]
         else:
             categorias_filtradas = categorias_texto
 
-        selecionadas = st.multiselect("✅ Categorias para categorizar:", categorias_filtradas, key=f"multi_{prefixo_key}")
+        selecionadas = st.multiselect(
+            "✅ Categorias para categorizar:",
+            categorias_filtradas,
+            format_func=(lambda cat: f"Vyco: {cat}") if usar_categoria_vyco else str,
+            key=f"multi_{prefixo_key}"
+        )
 
     with coluna2:
         opcao_lote = st.selectbox("📂 Categoria para aplicar:", [""] + opcoes_categorias, key=f"lote_{prefixo_key}")
         if st.button("📌 Aplicar Categoria em Lote", key=f"btn_lote_{prefixo_key}"):
             if opcao_lote and selecionadas:
                 categoria_escolhida = mapa_opcao_categoria.get(opcao_lote, "")
-                if usar_categoria_vyco:
-                    # Extrair categorias Vyco (remover "Vyco: ")
-                    vyco_selecionadas = [s.replace("Vyco: ", "") for s in selecionadas]
-                    df_desc.loc[df_desc["Categoria_Vyco"].isin(vyco_selecionadas), "Categoria"] = categoria_escolhida
-                else:
-                    df_desc.loc[df_desc["Descrição"].isin(selecionadas), "Categoria"] = categoria_escolhida
+                # O rótulo "Vyco:" é só de exibição: as opções selecionadas já são as chaves
+                df_desc.loc[df_desc[coluna_chave].isin(selecionadas), "Categoria"] = categoria_escolhida
                 st.success(f"✅ Categoria '{categoria_escolhida}' aplicada em {len(selecionadas)} itens.")
 
     # Preparar registros para categorização manual individual
@@ -849,6 +1038,7 @@ def categorizar_transacoes_vyco(
     if usar_categoria_vyco:
         st.info("💡 **Dica:** As transações abaixo mostram a categoria original do Vyco. Você pode mantê-la ou escolher uma categoria do plano de contas.")
     
+    escolhas = {}
     for idx, row in df_desc.iterrows():
         if usar_categoria_vyco:
             # No modo Vyco, agrupamos por categoria
@@ -863,58 +1053,11 @@ def categorizar_transacoes_vyco(
         if pd.notnull(row["Categoria"]) and row["Categoria"] != "":
             continue
 
-        # Buscar categoria salva (usar categoria Vyco como chave se disponível)
-        chave_busca = categoria_vyco if usar_categoria_vyco else desc
-        categoria_padrao = ""
-        
-        # Se usando sistema de licenças (dados JSON), buscar diretamente no dicionário
-        if licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict):
-            categoria_padrao = df_categorias.get(chave_busca, "")
-        elif isinstance(df_categorias, pd.DataFrame):
-            # Fallback para sistema CSV tradicional
-            categoria_salva = df_categorias[
-                (df_categorias["Descricao"] == chave_busca) &
-                (df_categorias["Tipo"] == tipo_lancamento)
-            ]["Categoria"].values
-            
-            if len(categoria_salva) > 0:
-                categoria_padrao = categoria_salva[0]
-        else:
-            categoria_padrao = ""
-        
-        # Se não encontrou categoria salva, tentar outras estratégias
-        if not categoria_padrao:
-            if usar_categoria_vyco and categoria_vyco:
-                # Tentar mapear categoria do Vyco para o plano de contas
-                categoria_vyco_escaped = re.escape(categoria_vyco)
-                categoria_match = df_plano_filtrado[df_plano_filtrado["Categoria"].str.contains(categoria_vyco_escaped, case=False, na=False)]
-                if not categoria_match.empty:
-                    categoria_padrao = categoria_match.iloc[0]["Opcao"]
-            else:
-                # Usar palavras-chave
-                for _, row_palavra in df_palavras.iterrows():
-                    if row_palavra["Tipo"] == tipo_lancamento and row_palavra["PalavraChave"].lower() in desc.lower():
-                        categoria_padrao = row_palavra["Categoria"]
-                        break
+        # Sugestão pré-calculada (categoria salva, plano de contas ou palavras-chave)
+        chave_grupo = row[coluna_chave]
+        categoria_padrao = sugestoes.get(chave_grupo, "")
+        valores_texto = valores_texto_por_chave.get(chave_grupo, "")
 
-        # Buscar valores baseado no agrupamento
-        if usar_categoria_vyco:
-            valores = df_transacoes[df_transacoes["Categoria_Vyco"] == categoria_vyco]["Valor (R$)"].tolist()
-        else:
-            valores = df_transacoes[df_transacoes["Descrição"] == desc]["Valor (R$)"].tolist()
-        
-        # Formatar valores para exibição
-        valores_formatados = []
-        for v in valores:
-            if isinstance(v, (int, float)):
-                valores_formatados.append(f"R\\$ {abs(v):.2f}".replace(".", ","))
-            else:
-                valores_formatados.append(str(v))
-        
-        valores_texto = " - ".join(valores_formatados[:5])  # Mostrar apenas os primeiros 5 valores
-        if len(valores) > 5:
-            valores_texto += "..."
-        
         if usar_categoria_vyco and categoria_vyco:
             total_formatado = formatar_valor_br(row['Total'])
             # Determinar se é entrada ou saída baseado no total
@@ -934,107 +1077,83 @@ def categorizar_transacoes_vyco(
         )
 
         if categoria_escolhida:
-            categoria_final = mapa_opcao_categoria.get(categoria_escolhida, categoria_escolhida)
-            # Aplicar categoria ao df_desc
-            if usar_categoria_vyco:
-                df_desc.loc[df_desc["Categoria_Vyco"] == categoria_vyco, "Categoria"] = categoria_final
-            else:
-                df_desc.loc[df_desc["Descrição"] == desc, "Categoria"] = categoria_final
+            escolhas[chave_grupo] = mapa_opcao_categoria.get(categoria_escolhida, categoria_escolhida)
 
-    # Aplicar categorização de volta ao DataFrame original
-    df_resultado = df_transacoes.copy()
-    
-    # Aplicar automaticamente as categorias do JSON ao DataFrame original
-    if licenca_nome and licenca_nome.strip() and isinstance(df_categorias, dict):
-        for chave_json, categoria_json in df_categorias.items():
-            if usar_categoria_vyco:
-                # Aplicar baseado na categoria Vyco
-                mascara = df_resultado["Categoria_Vyco"] == chave_json
-            else:
-                # Aplicar baseado na descrição
-                mascara = df_resultado["Descrição"] == chave_json
-            
-            if mascara.sum() > 0:
-                df_resultado.loc[mascara, "Categoria"] = categoria_json
-        
+    # Aplicar as escolhas individuais ao df_desc de uma só vez
+    if escolhas:
+        novas_categorias = df_desc[coluna_chave].map(escolhas)
+        df_desc["Categoria"] = novas_categorias.where(novas_categorias.notna(), df_desc["Categoria"])
 
-    
-    for idx, row in df_desc.iterrows():
-        if row["Categoria"]:
-            if usar_categoria_vyco:
-                # Aplicar categoria baseada na categoria Vyco
-                mascara = df_resultado["Categoria_Vyco"] == row["Categoria_Vyco"]
-            else:
-                # Aplicar categoria baseada na descrição (modo tradicional)
-                if "Descrição" in row:
-                    mascara = df_resultado["Descrição"] == row["Descrição"]
-                else:
-                    # Fallback caso não tenha Descrição
-                    continue
-            df_resultado.loc[mascara, "Categoria"] = row["Categoria"]
+    # Aplicar categorização de volta ao DataFrame original
+    # (as categorias do JSON da licença já vêm aplicadas na base memoizada)
+    df_resultado = preparado["df_resultado"].copy()
+
+    categorias_definidas = df_desc[df_desc["Categoria"].astype(bool)]
+    if not categorias_definidas.empty:
+        mapa_final = dict(zip(categorias_definidas[coluna_chave], categorias_definidas["Categoria"]))
+        categorias_mapeadas = preparado["chaves_linha"].map(mapa_final)
+        if "Categoria" in df_resultado.columns:
+            df_resultado["Categoria"] = categorias_mapeadas.where(categorias_mapeadas.notna(), df_resultado["Categoria"])
+        else:
+            df_resultado["Categoria"] = categorias_mapeadas
 
     # Salvar categorias
     if st.button(f"💾 Salvar Categorias {tipo_lancamento}", key=f"salvar_{prefixo_key}"):
         # Se uma licença foi informada, salvar no arquivo JSON específico
         if licenca_nome and licenca_nome.strip():
-            # Carregar categorias existentes do arquivo da licença
             arquivo_licenca = obter_arquivo_categorias_licenca(licenca_nome, tipo_lancamento)
-            categorias_existentes = carregar_categorias_licenca(arquivo_licenca)
             
-            # Converter DataFrame de categorias para dicionário (apenas categorias não vazias)
+            # Converter DataFrame de categorias para dicionário (categoria vazia = limpa pelo usuário)
             novas_categorias = {}
             categorias_validas = 0
             
             for idx, row in df_desc.iterrows():
-                # Verificar se a categoria está definida e não está vazia
-                if row["Categoria"] and str(row["Categoria"]).strip():
-                    # Usar categoria Vyco como chave se disponível, senão usar descrição
-                    if usar_categoria_vyco and "Categoria_Vyco" in row:
-                        chave_salvar = row["Categoria_Vyco"]
-                    else:
-                        chave_salvar = row.get("Descrição", "")
-                    
-                    # Só salvar se a chave também não estiver vazia
-                    if chave_salvar and str(chave_salvar).strip():
-                        novas_categorias[chave_salvar] = str(row["Categoria"]).strip()
+                # Usar categoria Vyco como chave se disponível, senão usar descrição
+                if usar_categoria_vyco and "Categoria_Vyco" in row:
+                    chave_salvar = row["Categoria_Vyco"]
+                else:
+                    chave_salvar = row.get("Descrição", "")
+                
+                # Só salvar se a chave não estiver vazia
+                if chave_salvar and str(chave_salvar).strip():
+                    categoria = str(row["Categoria"]).strip() if pd.notna(row["Categoria"]) else ""
+                    novas_categorias[chave_salvar] = categoria
+                    if categoria:
                         categorias_validas += 1
             
             # Verificar se há categorias válidas para salvar
             if categorias_validas > 0:
-                # Mesclar com categorias existentes
-                categorias_existentes.update(novas_categorias)
-                
-                # Salvar no arquivo JSON da licença
-                salvar_categorias_licenca(arquivo_licenca, categorias_existentes)
+                # Gravar apenas as categorias exibidas (upsert; as limpas são removidas),
+                # preservando as de outras sessões
+                salvar_categorias_licenca(arquivo_licenca, novas_categorias)
                 st.success(f"✅ {categorias_validas} categorias {tipo_lancamento.lower()} salvas para licença {licenca_nome}!")
             else:
                 st.warning("⚠️ Nenhuma categoria válida encontrada para salvar. Defina as categorias antes de salvar.")
         else:
-            # Fallback para salvamento em CSV tradicional
+            # Fallback para as categorias salvas tradicionais
             categorias_validas_csv = 0
+            novas_linhas = []
             
             for idx, row in df_desc.iterrows():
-                # Verificar se a categoria está definida e não está vazia
-                if row["Categoria"] and str(row["Categoria"]).strip():
-                    # Usar categoria Vyco como chave se disponível, senão usar descrição
-                    if usar_categoria_vyco and "Categoria_Vyco" in row:
-                        chave_salvar = row["Categoria_Vyco"]
-                    else:
-                        chave_salvar = row.get("Descrição", "")
-                    
-                    # Só salvar se a chave também não estiver vazia
-                    if chave_salvar and str(chave_salvar).strip():
-                        nova_linha = pd.DataFrame({
-                            "Descricao": [str(chave_salvar).strip()],
-                            "Tipo": [tipo_lancamento],
-                            "Categoria": [str(row["Categoria"]).strip()]
-                        })
-                        df_categorias = pd.concat([df_categorias, nova_linha], ignore_index=True)
+                # Usar categoria Vyco como chave se disponível, senão usar descrição
+                if usar_categoria_vyco and "Categoria_Vyco" in row:
+                    chave_salvar = row["Categoria_Vyco"]
+                else:
+                    chave_salvar = row.get("Descrição", "")
+                
+                # Só salvar se a chave não estiver vazia (categoria vazia = limpa pelo usuário)
+                if chave_salvar and str(chave_salvar).strip():
+                    categoria = str(row["Categoria"]).strip() if pd.notna(row["Categoria"]) else ""
+                    novas_linhas.append({
+                        "Descricao": str(chave_salvar).strip(),
+                        "Tipo": tipo_lancamento,
+                        "Categoria": categoria
+                    })
+                    if categoria:
                         categorias_validas_csv += 1
             
             if categorias_validas_csv > 0:
-                df_categorias = df_categorias.drop_duplicates(subset=["Descricao", "Tipo"])
-                df_categorias.to_csv(categorias_salvas_path, index=False)
+                categoria_store.salvar_categorias(categorias_salvas_path, pd.DataFrame(novas_linhas))
                 st.success(f"✅ {categorias_validas_csv} categorias {tipo_lancamento.lower()} salvas!")
             else:
                 st.warning("⚠️ Nenhuma categoria válida encontrada para salvar. Defina as categorias antes de salvar.")
@@ -1301,7 +1420,8 @@ def processar_dados_vyco(df_raw):
         df_processado['Categoria'] = ''
         df_processado['Considerar'] = 'Sim'
         
-        return df_processado
+        # Data em datetime64[ns] e chave do mês calculadas uma única vez
+        return normalizar_transacoes(df_processado)
         
     except Exception as e:
         st.error(f"❌ Erro ao processar dados do Vyco: {str(e)}")
@@ -1329,114 +1449,15 @@ def criar_dre_vyco(df_fluxo, plano, licenca_nome):
     """
     Cria o DataFrame do DRE incluindo dados JSON de faturamento e estoque
     """
-    # Carregar dados JSON salvos
-    dados_faturamento = carregar_faturamento_json(licenca_nome)
-    dados_estoque = carregar_estoque_json(licenca_nome)
-    
-    meses = df_fluxo.columns.tolist()
-    
-    # Função auxiliar para criar linhas
-    def linha(nome, serie):
-        return pd.DataFrame([serie], index=[nome])
-    
-    # Função para somar por grupo
-    def soma_por_grupo_local(df_fluxo, plano, grupo):
-        cats = plano[plano["Grupo"] == grupo]["Categoria"].tolist()
-        valores = df_fluxo.loc[df_fluxo.index.isin(cats)].sum()
-        # Se for despesa, inverter o sinal para positivo
-        grupos_despesas = ["Despesas", "Investimentos", "Retiradas", "Extra Operacional"]
-        if any(desp in grupo for desp in grupos_despesas):
-            valores = valores.abs()
-        return valores
-    
-    # Função para somar por categoria
-    def soma_por_categoria_local(df_fluxo, *categorias):
-        """Soma valores por categorias específicas com busca robusta"""
-        # Busca exata primeiro
-        categorias_encontradas = [cat for cat in categorias if cat in df_fluxo.index]
-        
-        # Se não encontrou nenhuma categoria exata, tentar busca parcial
-        if not categorias_encontradas:
-            for categoria in categorias:
-                linhas_parciais = df_fluxo.index[df_fluxo.index.str.contains(categoria, case=False, na=False)]
-                if len(linhas_parciais) > 0:
-                    categorias_encontradas.extend(linhas_parciais.tolist())
-        
-        if categorias_encontradas:
-            return df_fluxo.loc[df_fluxo.index.isin(categorias_encontradas)].sum()
-        else:
-            # Retornar série zerada com as colunas do df_fluxo
-            return pd.Series(0, index=df_fluxo.columns)
-    
-    # Construção do DRE por etapas
-    dre = pd.DataFrame()
-    
-    # Criar linha de faturamento com dados JSON
-    faturamento_serie = pd.Series(index=meses, dtype=float)
-    for mes in meses:
-        faturamento_serie[mes] = dados_faturamento.get(mes, 0.0)
-    
-    # Bloco 1: Faturamento e Margem de Contribuição
-    dre = pd.concat([
-        linha("FATURAMENTO", faturamento_serie),
-        linha("RECEITA", soma_por_categoria_local(df_fluxo, "Receita de Vendas", "Receita de Serviços")),
-        linha("IMPOSTOS", soma_por_grupo_local(df_fluxo, plano, "Despesas Impostos")),
-        linha("DESPESA OPERACIONAL", soma_por_grupo_local(df_fluxo, plano, "Despesas Operacionais")),
-    ])
-    
-    dre.loc["MARGEM CONTRIBUIÇÃO"] = dre.loc["RECEITA"] - dre.loc["IMPOSTOS"] - dre.loc["DESPESA OPERACIONAL"]
-    
-    # Bloco 2: Lucro Operacional
-    dre = pd.concat([
-        dre,
-        linha("DESPESAS COM PESSOAL", soma_por_grupo_local(df_fluxo, plano, "Despesas RH")),
-        linha("DESPESA ADMINISTRATIVA", soma_por_grupo_local(df_fluxo, plano, "Despesas Administrativas")),
-    ])
-    
-    dre.loc["LUCRO OPERACIONAL"] = dre.loc["MARGEM CONTRIBUIÇÃO"] - dre.loc["DESPESAS COM PESSOAL"] - dre.loc["DESPESA ADMINISTRATIVA"]
-    
-    # Bloco 3: Lucro Líquido
-    dre = pd.concat([
-        dre,
-        linha("INVESTIMENTOS", soma_por_grupo_local(df_fluxo, plano, "Investimentos / Aplicações")),
-        linha("DESPESA EXTRA OPERACIONAL", soma_por_grupo_local(df_fluxo, plano, "Extra Operacional")),
-    ])
-    
-    dre.loc["LUCRO LIQUIDO"] = dre.loc["LUCRO OPERACIONAL"] - dre.loc["INVESTIMENTOS"] - dre.loc["DESPESA EXTRA OPERACIONAL"]
-    
-    # Bloco 4: Resultado Final
-    dre = pd.concat([
-        dre,
-        linha("RETIRADAS SÓCIOS", soma_por_grupo_local(df_fluxo, plano, "Retiradas")),
-        linha("RECEITA EXTRA OPERACIONAL", soma_por_categoria_local(df_fluxo, "Receita Extra Operacional", "Outros Recebimentos")),
-    ])
-    
-    dre.loc["RESULTADO"] = dre.loc["LUCRO LIQUIDO"] - dre.loc["RETIRADAS SÓCIOS"] + dre.loc["RECEITA EXTRA OPERACIONAL"]
-    
-    # Criar linha de estoque com dados JSON
-    estoque_serie = pd.Series(index=meses, dtype=float)
-    for mes in meses:
-        estoque_serie[mes] = dados_estoque.get(mes, 0.0)
-    
-    # Bloco 5: Estoque e Resultado Final
-    dre = pd.concat([
-        dre,
-        linha("ESTOQUE", estoque_serie),
-    ])
-    
-    # RESULTADO GERENCIAL = RESULTADO + ESTOQUE
-    dre.loc["RESULTADO GERENCIAL"] = dre.loc["RESULTADO"] + dre.loc["ESTOQUE"]
-    
-    # Adicionar coluna TOTAL (soma de todos os meses)
-    dre["TOTAL"] = dre[meses].sum(axis=1)
-    
-    # Adicionar coluna % (percentual em relação ao faturamento)
-    dre["%"] = pd.Series([0.0] * len(dre), index=dre.index)
-    faturamento_total = dre.loc["FATURAMENTO", "TOTAL"]
-    if faturamento_total != 0:
-        for idx in dre.index:
-            dre.loc[idx, "%"] = (dre.loc[idx, "TOTAL"] / faturamento_total) * 100
-    
+    diagnosticos = Diagnosticos()
+    dre = calcular_dre_vyco(
+        df_fluxo,
+        plano,
+        carregar_faturamento_json(licenca_nome),
+        carregar_estoque_json(licenca_nome),
+        diagnosticos
+    )
+    diagnosticos.exibir()
     return dre
 
 def exibir_dre_vyco(df_fluxo, licenca_nome, path_plano="./logic/CSVs/plano_de_contas.csv"):
@@ -1461,131 +1482,25 @@ def exibir_fluxo_caixa_vyco(df_transacoes, licenca_nome, meses_historicos=None):
     """
     st.markdown("## 📊 Fluxo de Caixa (por Categoria e Mês) - Vyco")
 
-    # Verificar se o DataFrame está vazio
-    if df_transacoes.empty:
-        st.warning("⚠️ Não há transações para gerar o fluxo de caixa.")
-        return pd.DataFrame()
-
-    # Verificar se as colunas necessárias existem
-    colunas_necessarias = ["Considerar", "Valor (R$)", "Data", "Categoria"]
-    colunas_faltantes = [col for col in colunas_necessarias if col not in df_transacoes.columns]
-
-    if colunas_faltantes:
-        st.error(f"❌ Colunas necessárias ausentes: {', '.join(colunas_faltantes)}")
+    calculo = calcular_fluxo_caixa_vyco(
+        df_transacoes,
+        carregar_faturamento_json(licenca_nome),
+        carregar_estoque_json(licenca_nome),
+        meses_historicos
+    )
+    calculo.diagnosticos.exibir()
+    if calculo.vazio:
         return pd.DataFrame()
 
-    # Criar cópia para não modificar o original
-    df_filtrado = df_transacoes.copy()
-
-    # Filtrar apenas transações a considerar
-    if "Considerar" in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado["Considerar"].astype(str).str.lower() == "sim"].copy()
-
-    # Converter valores para numérico
-    df_filtrado["Valor (R$)"] = pd.to_numeric(df_filtrado["Valor (R$)"], errors="coerce").fillna(0)
-
-    # Converter Data para datetime
-    df_filtrado["Data"] = pd.to_datetime(df_filtrado["Data"], errors="coerce")
-    df_filtrado = df_filtrado.dropna(subset=["Data"])
-
-    # Criar coluna Mês-Ano
-    df_filtrado["Mes"] = df_filtrado["Data"].dt.to_period("M").astype(str)
-
-    # Criar pivot table
-    df_pivot = df_filtrado.groupby(["Categoria", "Mes"])["Valor (R$)"].sum().unstack(fill_value=0)
-
-    # Obter todos os meses únicos
-    meses = sorted(df_pivot.columns)
-
-    # Adicionar informações de tipo (Crédito/Débito)
-    df_pivot["__tipo__"] = df_pivot.apply(lambda row: "Crédito" if row.sum() > 0 else "Débito", axis=1)
-
-    # Calcular totais básicos
-    receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"][meses].sum()
-    despesas = df_pivot[df_pivot["__tipo__"] == "Débito"][meses].sum()
-    resultado = receitas + despesas  # Despesas já são negativas
-
-    # Carregar dados JSON de faturamento e estoque
-    dados_faturamento = carregar_faturamento_json(licenca_nome)
-    dados_estoque = carregar_estoque_json(licenca_nome)
-
-    # Criar linha de faturamento com dados JSON
-    faturamento_valores = []
-    for mes in meses:
-        faturamento_valores.append(dados_faturamento.get(mes, 0.0))
-    linha_fat = pd.DataFrame([faturamento_valores], index=["💰 Faturamento Bruto"], columns=meses)
-
-    # Criar linha de estoque com dados JSON
-    estoque_valores = []
-    for mes in meses:
-        estoque_valores.append(dados_estoque.get(mes, 0.0))
-    linha_estoque = pd.DataFrame([estoque_valores], index=["📦 Estoque Final"], columns=meses)
-
-    # Separar receitas e despesas
-    df_receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"].drop(columns=["__tipo__"])
-    df_despesas = df_pivot[df_pivot["__tipo__"] == "Débito"].drop(columns=["__tipo__"])
-
-    # Criar linhas de divisão
-    linha_div_receitas = pd.DataFrame([[None]*len(meses)], index=["🟦 Receitas"], columns=meses)
-    linha_div_despesas = pd.DataFrame([[None]*len(meses)], index=["🟥 Despesas"], columns=meses)
-
-    # Criar linhas de totais
-    linha_total_receitas = pd.DataFrame([receitas], index=["🔷 Total de Receitas"])
-    linha_total_despesas = pd.DataFrame([despesas], index=["🔻 Total de Despesas"])
-    linha_resultado = pd.DataFrame([resultado], index=["🏦 Resultado do Período"])
-
-    # Concatenar tudo na ordem
-    df_final = pd.concat([
-        linha_fat,
-        linha_div_receitas,
-        df_receitas,
-        linha_total_receitas,
-        linha_div_despesas,
-        df_despesas,
-        linha_total_despesas,
-        linha_resultado,
-        linha_estoque
-    ])
-
-    # Calcular variações percentuais mês a mês
-    if len(meses) > 1:
-        df_variacoes = pd.DataFrame(index=df_final.index, columns=[f"Var. {meses[-1]}" if len(meses) == 2 
-                                                                  else f"Var. {meses[-2]}/{meses[-1]}"])
-        for idx in df_final.index:
-            if idx in ["🟦 Receitas", "🟥 Despesas"] or pd.isna(df_final.loc[idx, meses[-1]]) or pd.isna(df_final.loc[idx, meses[-2]]):
-                df_variacoes.loc[idx] = None
-            else:
-                def calcular_variacao_percentual_local(valor_atual, valor_anterior):
-                    if valor_anterior == 0:
-                        return float('inf') if valor_atual > 0 else float('-inf') if valor_atual < 0 else 0
-                    return ((valor_atual - valor_anterior) / abs(valor_anterior)) * 100
-                
-                variacao = calcular_variacao_percentual_local(df_final.loc[idx, meses[-1]], df_final.loc[idx, meses[-2]])
-                df_variacoes.loc[idx] = variacao
-        df_variacoes_fmt = df_variacoes.map(lambda x: f"{x:+.1f}%" if pd.notnull(x) else "")
-        df_final_com_var = pd.concat([df_final, df_variacoes_fmt], axis=1)
-    else:
-        df_final_com_var = df_final
-
-    # Aplicar filtro de meses históricos se especificado
-    if meses_historicos is not None and len(meses) > meses_historicos:
-        meses_filtrados = meses[-meses_historicos:]
-        # Manter apenas as colunas dos meses filtrados
-        colunas_manter = meses_filtrados
-        # Adicionar colunas de variação se existirem
-        colunas_variacoes = [col for col in df_final_com_var.columns if col.startswith("Var.")]
-        df_final_com_var = df_final_com_var[colunas_manter + colunas_variacoes]
-        meses = meses_filtrados  # Atualizar lista de meses para os gráficos
-        
-        # Recalcular totais baseados nos meses filtrados
-        receitas = df_pivot[df_pivot["__tipo__"] == "Crédito"][meses].sum()
-        despesas = df_pivot[df_pivot["__tipo__"] == "Débito"][meses].sum()
-        resultado = receitas + despesas
+    meses = calculo.meses
+    receitas = calculo.receitas
+    despesas = calculo.despesas
+    resultado = calculo.resultado
+    df_final = calculo.df_final
+    df_final_com_var = calculo.df_exibicao
 
     # Formatar valores para exibição
-    df_formatado = df_final_com_var.copy()
-    for col in meses:
-        df_formatado[col] = df_formatado[col].apply(lambda x: f"R$ {float(x):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notnull(x) and isinstance(x, (int, float)) else "")
+    df_formatado = formatar_tabela(df_final_com_var, moeda=meses)
 
     # Exibir tabela formatada
     st.markdown("### 📋 Tabela de Fluxo de Caixa")
@@ -1595,7 +1510,8 @@ def exibir_fluxo_caixa_vyco(df_transacoes, licenca_nome, meses_historicos=None):
     st.markdown("### 📈 Visualização Gráfica")
     abas = st.tabs([
         "Resultado Mensal",
-        "Receitas vs Despesas"
+        "Receitas vs Despesas",
+        "Posição Diária"
     ])
 
     # 1. Resultado Mensal
@@ -1627,7 +1543,7 @@ def exibir_fluxo_caixa_vyco(df_transacoes, licenca_nome, meses_historicos=None):
             fig.add_annotation(
                 x=meses[i],
                 y=valor,
-                text=f"R$ {float(valor):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                text=formatar_valor_br(valor),
                 showarrow=False,
                 yshift=10 if valor >= 0 else -20
             )
@@ -1658,8 +1574,135 @@ def exibir_fluxo_caixa_vyco(df_transacoes, licenca_nome, meses_historicos=None):
         )
         st.plotly_chart(fig, use_container_width=True)
 
+    # 3. Posição diária (janelas móveis e saldo acumulado)
+    with abas[2]:
+        exibir_posicao_diaria_vyco(df_transacoes)
+
     return df_final
 
+def exibir_posicao_diaria_vyco(df_transacoes):
+    """
+    Posição de caixa diária com entradas/saídas móveis e saldo acumulado
+
+    Parâmetros:
+    - df_transacoes: DataFrame com as transações categorizadas
+    """
+    import plotly.graph_objects as go
+
+    try:
+        matriz = calcular_matriz_fluxo_diaria(df_transacoes)
+    except Exception as e:
+        st.error(f"❌ Erro ao gerar fluxo diário: {e}")
+        return
+    if matriz.vazia:
+        st.info("Não há transações consideradas para a posição diária.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        periodo = st.radio("Agrupar por:", list(PERIODOS), format_func=PERIODOS.get, horizontal=True,
+                           key="fluxo_diario_periodo")
+    with col2:
+        janela = st.selectbox("Janela móvel (dias):", list(JANELAS_PADRAO), key="fluxo_diario_janela")
+    with col3:
+        saldo_inicial = st.number_input("Saldo inicial (R$):", value=0.0, step=1000.0, key="fluxo_diario_saldo")
+
+    posicao = reamostrar_posicao(posicao_diaria(matriz, saldo_inicial, JANELAS_PADRAO), periodo)
+    eixo = posicao.index.astype(str)
+
+    # Scattergl mantém a interação fluida com vários anos de dias
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=eixo, y=posicao["Saldo"], name="Saldo Acumulado", line=dict(color="navy")))
+    fig.add_trace(go.Scattergl(x=eixo, y=posicao[f"Entradas {janela}d"], name=f"Entradas {janela}d",
+                               line=dict(color="green")))
+    fig.add_trace(go.Scattergl(x=eixo, y=posicao[f"Saídas {janela}d"], name=f"Saídas {janela}d",
+                               line=dict(color="red")))
+    fig.update_layout(
+        title=f"Posição de Caixa por {PERIODOS[periodo]}",
+        xaxis_title=PERIODOS[periodo],
+        yaxis_title="Valor (R$)",
+        template="plotly_white",
+        height=500,
+        hovermode="x unified"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    colunas = ["Entradas", "Saídas", "Líquido", "Saldo", f"Entradas {janela}d", f"Saídas {janela}d"]
+    st.dataframe(formatar_tabela(posicao[colunas].iloc[::-1], moeda=colunas), use_container_width=True, height=400)
+
+def exibir_consolidacao_vyco(licencas_disponiveis, path_plano="./logic/CSVs/plano_de_contas.csv"):
+    """
+    Fluxo de caixa e DRE consolidados de um grupo de licenças, com detalhamento por empresa
+
+    Usa as transações salvas no cache de cada licença; os cubos já calculados
+    são reaproveitados e apenas as licenças novas ou alteradas são recalculadas.
+    """
+    licencas_grupo = st.multiselect(
+        "Licenças do grupo:",
+        licencas_disponiveis,
+        key="consolidacao_licencas",
+        help="Usa as transações salvas no cache de cada licença (aba 💾 Cache de Dados)"
+    )
+    if len(licencas_grupo) < 2:
+        st.info("Selecione ao menos duas licenças para consolidar.")
+        return None
+
+    resultado = consolidar_licencas(licencas_grupo)
+    categorias_eliminar = st.multiselect(
+        "Categorias entre empresas do grupo (eliminadas do consolidado):",
+        resultado.categorias,
+        key="consolidacao_eliminacoes",
+        help="Ex.: transferências e mútuos entre as licenças selecionadas"
+    )
+    if categorias_eliminar:
+        resultado = consolidar_licencas(licencas_grupo, [RegraEliminacao(categorias_eliminar)])
+
+    resultado.diagnosticos.exibir()
+    if resultado.vazio:
+        st.warning("⚠️ Nenhuma das licenças selecionadas possui transações salvas no cache.")
+        return None
+
+    calculo = resultado.fluxo()
+    aba_fluxo, aba_dre, aba_detalhe = st.tabs(["📊 Fluxo Consolidado", "📈 DRE Consolidado", "🔎 Por Licença"])
+
+    with aba_fluxo:
+        st.caption(f"{len(resultado.entidades)} licenças: {', '.join(resultado.entidades)}")
+        st.dataframe(formatar_tabela(calculo.df_exibicao, moeda=calculo.meses), use_container_width=True)
+        if categorias_eliminar:
+            st.markdown("#### ✂️ Valores Eliminados")
+            st.dataframe(formatar_tabela(resultado.eliminacoes(), moeda=resultado.meses), use_container_width=True)
+
+    with aba_dre:
+        try:
+            dre = resultado.dre(pd.read_csv(path_plano))
+            meses_dre = [col for col in dre.columns if col in resultado.meses]
+            st.dataframe(
+                formatar_dre(dre, meses_dre).style.apply(highlight_rows, axis=1).hide(axis="index"),
+                use_container_width=True,
+                hide_index=True
+            )
+        except Exception as e:
+            st.error(f"Erro ao criar DRE consolidado: {e}")
+
+    with aba_detalhe:
+        categoria = st.selectbox(
+            "Categoria:",
+            [""] + calculo.df_pivot.index.tolist(),
+            key="consolidacao_categoria"
+        )
+        if categoria:
+            st.markdown(f"#### {categoria} por licença")
+            st.dataframe(formatar_tabela(resultado.contribuicao(categoria), moeda=resultado.meses),
+                         use_container_width=True)
+
+        entidade = st.selectbox("Licença:", resultado.entidades, key="consolidacao_entidade")
+        calculo_entidade = resultado.fluxo(entidade=entidade)
+        if not calculo_entidade.vazio:
+            st.dataframe(formatar_tabela(calculo_entidade.df_exibicao, moeda=calculo_entidade.meses),
+                         use_container_width=True)
+
+    return resultado
+
 def coletar_faturamentos_vyco(df_transacoes, licenca_nome):
     """
     Coleta faturamentos com salvamento em JSON por licença
@@ -1670,14 +1713,12 @@ def coletar_faturamentos_vyco(df_transacoes, licenca_nome):
     # Exibir qual arquivo está sendo usado
     nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
     nome_limpo = nome_limpo.replace(' ', '_').lower()
-    arquivo_json = f"./logic/CSVs/licencas/{nome_limpo}_faturamento.json"
+    arquivo_json = obter_armazenamento(NAMESPACE_LICENCAS).localizacao(f"{nome_limpo}_faturamento.json")
     st.caption(f"📁 Arquivo: `{arquivo_json}`")
 
-    # Garante que a data está em datetime
-    df_transacoes["Data"] = pd.to_datetime(df_transacoes["Data"], format="%d/%m/%Y", errors="coerce")
-    df_transacoes = df_transacoes.dropna(subset=["Data"])
-
-    meses = sorted(df_transacoes["Data"].dt.to_period("M").astype(str).unique())
+    # Meses a partir da chave de mês calculada na entrada dos dados
+    validar_esquema_transacoes(df_transacoes)
+    meses = meses_disponiveis(df_transacoes)
 
     # Carregar dados existentes do JSON
     dados_salvos = carregar_faturamento_json(licenca_nome)
@@ -1735,13 +1776,12 @@ def coletar_estoques_vyco(df_transacoes, licenca_nome):
     # Exibir qual arquivo está sendo usado
     nome_limpo = "".join(c for c in licenca_nome if c.isalnum() or c in (' ', '-', '_')).rstrip()
     nome_limpo = nome_limpo.replace(' ', '_').lower()
-    arquivo_json = f"./logic/CSVs/licencas/{nome_limpo}_estoque.json"
+    arquivo_json = obter_armazenamento(NAMESPACE_LICENCAS).localizacao(f"{nome_limpo}_estoque.json")
     st.caption(f"📁 Arquivo: `{arquivo_json}`")
 
-    # Garante que datas estejam OK
-    df_transacoes["Data"] = pd.to_datetime(df_transacoes["Data"], format="%d/%m/%Y", errors="coerce")
-    df_transacoes = df_transacoes.dropna(subset=["Data"])
-    meses = sorted(df_transacoes["Data"].dt.to_period("M").astype(str).unique())
+    # Meses a partir da chave de mês calculada na entrada dos dados
+    validar_esquema_transacoes(df_transacoes)
+    meses = meses_disponiveis(df_transacoes)
 
     # Carregar dados existentes do JSON
     dados_salvos = carregar_estoque_json(licenca_nome)
@@ -2071,8 +2111,6 @@ if 'df_vyco_processado' in st.session_state:
             if "Valor (R$)" in df_transacoes_total.columns:
                 # Converter para numérico se necessário
                 df_transacoes_total["Valor (R$)"] = pd.to_numeric(df_transacoes_total["Valor (R$)"], errors='coerce')
-                # Criar uma cópia formatada apenas para exibição
-                df_transacoes_total["Valor_Formatado"] = df_transacoes_total["Valor (R$)"].apply(formatar_valor_br)
             
             if "Considerar" not in df_transacoes_total.columns:
                 df_transacoes_total["Considerar"] = "Sim"
@@ -2107,7 +2145,7 @@ if 'df_vyco_processado' in st.session_state:
                 filtro_texto = st.text_input("Buscar na descrição:", "", key="filtro_texto_vyco")
             
             # Aplicar filtros
-            df_filtrado = df_transacoes_total.copy()
+            df_filtrado = df_transacoes_total
             
             if filtro_tipo and len(filtro_tipo) < 2:
                 if "Crédito" in filtro_tipo:
@@ -2121,24 +2159,13 @@ if 'df_vyco_processado' in st.session_state:
             if filtro_texto:
                 df_filtrado = df_filtrado[df_filtrado["Descrição"].str.contains(filtro_texto, case=False, na=False)]
             
-            # Preparar dados para exibição (com valores formatados)
-            df_exibicao = df_filtrado.copy()
-            if "Valor_Formatado" in df_exibicao.columns:
-                # Trocar a coluna de valor pela formatada para exibição
-                df_exibicao["Valor (R$)"] = df_exibicao["Valor_Formatado"]
-                df_exibicao = df_exibicao.drop("Valor_Formatado", axis=1)
-            
-            # Exibir dados filtrados
-            st.dataframe(df_exibicao, use_container_width=True)
+            # Exibir dados filtrados (valores formatados só na cópia de exibição)
+            st.dataframe(formatar_tabela(df_filtrado, moeda=["Valor (R$)"]), use_container_width=True)
             st.info(f"Exibindo {len(df_filtrado)} de {len(df_transacoes_total)} transações.")
             
             # Download
             output = io.BytesIO() 
-            df_download = df_transacoes_total.copy()
-            # Remover coluna de formatação para o Excel (manter apenas valores numéricos)
-            if "Valor_Formatado" in df_download.columns:
-                df_download = df_download.drop("Valor_Formatado", axis=1)
-            df_download.to_excel(output, index=False)
+            df_transacoes_total.to_excel(output, index=False)
             output.seek(0)
             
             st.download_button(
@@ -2158,7 +2185,7 @@ if 'df_vyco_processado' in st.session_state:
             # Mostrar arquivos sendo usados
             nome_limpo = "".join(c for c in st.session_state.licenca_atual if c.isalnum() or c in (' ', '-', '_')).rstrip()
             nome_limpo = nome_limpo.replace(' ', '_').lower()
-            st.caption(f"📂 Dados salvos em: `./logic/CSVs/licencas/{nome_limpo}_[faturamento|estoque].json`")
+            st.caption(f"📂 Dados salvos em: `{obter_armazenamento(NAMESPACE_LICENCAS).localizacao(nome_limpo)}_[faturamento|estoque].json`")
             
             # Verificar se existem dados salvos
             dados_faturamento = carregar_faturamento_json(st.session_state.licenca_atual)
@@ -2283,32 +2310,14 @@ if 'df_vyco_processado' in st.session_state:
                         'origem': 'vyco_integração'
                     }
                     
-                    # Salvar fluxo de caixa
-                    if not resultado_fluxo.empty:
-                        arquivo_fluxo = cache_manager.salvar_fluxo_caixa(resultado_fluxo, empresa_nome, metadata)
-                        if arquivo_fluxo:
-                            st.info(f"💾 Fluxo de caixa atualizado: {empresa_nome}_fluxo.json")
-                    
-                    # Salvar DRE com detalhamento
-                    if resultado_dre is not None:
-                        arquivo_dre = cache_manager.salvar_dre(
-                            resultado_dre, 
-                            empresa_nome, 
-                            metadata,
-                            df_transacoes=st.session_state.df_transacoes_total_vyco
-                        )
-                        if arquivo_dre:
-                            st.info(f"💾 DRE atualizado: {empresa_nome}_dre.json")
-                    
-                    # Salvar transações categorizadas para detalhamento
-                    if not st.session_state.df_transacoes_total_vyco.empty:
-                        arquivo_transacoes = cache_manager.salvar_transacoes(
-                            st.session_state.df_transacoes_total_vyco,
-                            empresa_nome,
-                            metadata
-                        )
-                        if arquivo_transacoes:
-                            st.info(f"💾 Transações salvas: {empresa_nome}_transacoes.json")
+                    # Transações primeiro; fluxo e DRE só são regravados se estiverem desatualizados
+                    informar_cache_salvo(salvar_cache_vyco(
+                        empresa_nome,
+                        st.session_state.df_transacoes_total_vyco,
+                        metadata,
+                        resultado_fluxo=resultado_fluxo,
+                        resultado_dre=resultado_dre
+                    ))
 
                 if resultado_dre is not None:
                     st.success("✅ Projeções geradas com sucesso!")
@@ -2348,14 +2357,10 @@ if 'df_vyco_processado' in st.session_state:
                         meses_projetados = [m.strftime("%Y-%m") for m in meses_projetados]
 
                         # Identificar linhas calculadas (que não devem ser projetadas, mas recalculadas)
-                        linhas_calculadas = [
-                            "MARGEM CONTRIBUIÇÃO",
-                            "MARGEM CONTRIBUICAO",
-                            "LUCRO OPERACIONAL",
-                            "LUCRO LIQUIDO",
-                            "LUCRO LÍQUIDO",
-                            "RESULTADO",
-                            "RESULTADO GERENCIAL"
+                        programa_dre = carregar_programa_dre()
+                        linhas_calculadas = programa_dre.derivadas + [
+                            "MARGEM CONTRIBUICAO",  # grafias alternativas
+                            "LUCRO LÍQUIDO"
                         ]
 
                         for mes in meses_projetados:
@@ -2419,43 +2424,9 @@ if 'df_vyco_processado' in st.session_state:
                                     df_projetado.loc[idx, mes] = valor_base * inflacao_fator
                         
                         # RECALCULAR linhas derivadas após projetar todas as linhas base
-                        for mes in meses_projetados:
-                            # Helper para pegar valor com segurança
-                            def get_val(nome_linha):
-                                if nome_linha in df_projetado.index:
-                                    val = df_projetado.loc[nome_linha, mes]
-                                    return val if pd.notna(val) else 0
-                                return 0
-                            
-                            # MARGEM CONTRIBUIÇÃO = RECEITA - IMPOSTOS - DESPESA OPERACIONAL
-                            receita = get_val("RECEITA")
-                            impostos = get_val("IMPOSTOS")
-                            desp_oper = get_val("DESPESA OPERACIONAL")
-                            df_projetado.loc["MARGEM CONTRIBUIÇÃO", mes] = receita - impostos - desp_oper
-                            
-                            # LUCRO OPERACIONAL = MARGEM CONTRIBUIÇÃO - DESPESAS COM PESSOAL - DESPESA ADMINISTRATIVA
-                            margem = get_val("MARGEM CONTRIBUIÇÃO")
-                            desp_pessoal = get_val("DESPESAS COM PESSOAL")
-                            desp_admin = get_val("DESPESA ADMINISTRATIVA")
-                            df_projetado.loc["LUCRO OPERACIONAL", mes] = margem - desp_pessoal - desp_admin
-                            
-                            # LUCRO LIQUIDO = LUCRO OPERACIONAL - INVESTIMENTOS - DESPESA EXTRA OPERACIONAL
-                            lucro_oper = get_val("LUCRO OPERACIONAL")
-                            investimentos = get_val("INVESTIMENTOS")
-                            desp_extra = get_val("DESPESA EXTRA OPERACIONAL")
-                            df_projetado.loc["LUCRO LIQUIDO", mes] = lucro_oper - investimentos - desp_extra
-                            
-                            # RESULTADO = LUCRO LIQUIDO - RETIRADAS SÓCIOS + RECEITA EXTRA OPERACIONAL
-                            lucro_liq = get_val("LUCRO LIQUIDO")
-                            retiradas = get_val("RETIRADAS SÓCIOS")
-                            receita_extra = get_val("RECEITA EXTRA OPERACIONAL")
-                            df_projetado.loc["RESULTADO", mes] = lucro_liq - retiradas + receita_extra
-                            
-                            # RESULTADO GERENCIAL = RESULTADO + SALDO + ESTOQUE
-                            resultado = get_val("RESULTADO")
-                            saldo = get_val("SALDO")
-                            estoque = get_val("ESTOQUE")
-                            df_projetado.loc["RESULTADO GERENCIAL", mes] = resultado + saldo + estoque
+                        # (fórmulas da estrutura do DRE, todos os meses projetados de uma vez)
+                        if meses_projetados:
+                            df_projetado = programa_dre.recalcular_derivadas(df_projetado, meses_projetados)
 
                         # Recalcular totais separados
                         if "TOTAL" in df_projetado.columns:
@@ -2486,15 +2457,8 @@ if 'df_vyco_processado' in st.session_state:
                         if "%" in df_projetado.columns:
                             # Encontrar a linha de faturamento para calcular percentuais
                             faturamento_rows = df_projetado.index[df_projetado.index.str.contains("FATURAMENTO", case=False, na=False)]
-                            if len(faturamento_rows) > 0:
-                                faturamento_total = df_projetado.loc[faturamento_rows[0], "TOTAL REALIZADO"]
-                                if faturamento_total != 0:
-                                    for idx in df_projetado.index:
-                                        df_projetado.loc[idx, "%"] = (df_projetado.loc[idx, "TOTAL REALIZADO"] / faturamento_total) * 100
-                                else:
-                                    df_projetado["%"] = 0.0
-                            else:
-                                df_projetado["%"] = 0.0
+                            linha_base = faturamento_rows[0] if len(faturamento_rows) > 0 else None
+                            df_projetado["%"] = participacao(df_projetado, "TOTAL REALIZADO", linha_base)
 
                         return df_projetado, meses_projetados
 
@@ -2572,32 +2536,14 @@ if 'df_vyco_processado' in st.session_state:
                         'origem': 'vyco_parecer_diagnostico'
                     }
                     
-                    # Salvar fluxo de caixa
-                    if not resultado_fluxo.empty:
-                        arquivo_fluxo = cache_manager.salvar_fluxo_caixa(resultado_fluxo, empresa_nome, metadata)
-                        if arquivo_fluxo:
-                            st.info(f"💾 Fluxo de caixa atualizado: {empresa_nome}_fluxo.json")
-                    
-                    # Salvar DRE com detalhamento
-                    if resultado_dre is not None:
-                        arquivo_dre = cache_manager.salvar_dre(
-                            resultado_dre, 
-                            empresa_nome, 
-                            metadata,
-                            df_transacoes=st.session_state.df_transacoes_total_vyco
-                        )
-                        if arquivo_dre:
-                            st.info(f"💾 DRE atualizado: {empresa_nome}_dre.json")
-                    
-                    # Salvar transações categorizadas para detalhamento
-                    if not st.session_state.df_transacoes_total_vyco.empty:
-                        arquivo_transacoes = cache_manager.salvar_transacoes(
-                            st.session_state.df_transacoes_total_vyco,
-                            empresa_nome,
-                            metadata
-                        )
-                        if arquivo_transacoes:
-                            st.info(f"💾 Transações salvas: {empresa_nome}_transacoes.json")
+                    # Transações primeiro; fluxo e DRE só são regravados se estiverem desatualizados
+                    informar_cache_salvo(salvar_cache_vyco(
+                        empresa_nome,
+                        st.session_state.df_transacoes_total_vyco,
+                        metadata,
+                        resultado_fluxo=resultado_fluxo,
+                        resultado_dre=resultado_dre
+                    ))
                     
                     # Exibir DRE formatado
                     if resultado_dre is not None:
@@ -2655,32 +2601,14 @@ if 'df_vyco_processado' in st.session_state:
                         'descricao_empresa': descricao_empresa
                     }
                     
-                    # Salvar fluxo de caixa
-                    if not resultado_fluxo.empty:
-                        arquivo_fluxo = cache_manager.salvar_fluxo_caixa(resultado_fluxo, empresa_nome, metadata)
-                        if arquivo_fluxo:
-                            st.info(f"💾 Fluxo de caixa atualizado: {empresa_nome}_fluxo.json")
-                    
-                    # Salvar DRE com detalhamento
-                    if resultado_dre is not None:
-                        arquivo_dre = cache_manager.salvar_dre(
-                            resultado_dre, 
-                            empresa_nome, 
-                            metadata,
-                            df_transacoes=st.session_state.df_transacoes_total_vyco
-                        )
-                        if arquivo_dre:
-                            st.info(f"💾 DRE atualizado: {empresa_nome}_dre.json")
-                    
-                    # Salvar transações categorizadas para detalhamento
-                    if not st.session_state.df_transacoes_total_vyco.empty:
-                        arquivo_transacoes = cache_manager.salvar_transacoes(
-                            st.session_state.df_transacoes_total_vyco,
-                            empresa_nome,
-                            metadata
-                        )
-                        if arquivo_transacoes:
-                            st.info(f"💾 Transações salvas: {empresa_nome}_transacoes.json")
+                    # Transações primeiro; fluxo e DRE só são regravados se estiverem desatualizados
+                    informar_cache_salvo(salvar_cache_vyco(
+                        empresa_nome,
+                        st.session_state.df_transacoes_total_vyco,
+                        metadata,
+                        resultado_fluxo=resultado_fluxo,
+                        resultado_dre=resultado_dre
+                    ))
                     
                     # Exibir DRE formatado
                     if resultado_dre is not None:
@@ -2759,6 +2687,9 @@ if 'df_vyco_processado' in st.session_state:
                         # Carregar dados brutos do cache
                         dados_fluxo_cache = cache_manager.carregar_fluxo_caixa(licenca)
                         dados_dre_cache = cache_manager.carregar_dre(licenca)
+                        for nome_cache, dados_cache in (("Fluxo", dados_fluxo_cache), ("DRE", dados_dre_cache)):
+                            if dados_cache and dados_cache.get('desatualizado'):
+                                st.warning(f"⚠️ {nome_cache} em cache desatualizado: {', '.join(dados_cache['desatualizado'])}")
                         
                         # Converter para DataFrame
                         if dados_fluxo_cache and 'dados_indexados' in dados_fluxo_cache:
@@ -2944,6 +2875,13 @@ if 'df_vyco_processado' in st.session_state:
             if st.button("📊 Estatísticas", use_container_width=True):
                 total_arquivos = sum(1 for s in status.values() if s['existe'])
                 st.info(f"📁 {total_arquivos} arquivos salvos no cache")
+                leituras = cache_leituras.estatisticas()
+                st.caption(
+                    f"🧠 Leituras em memória: {leituras['entradas']} arquivos "
+                    f"({formatar_tamanho(leituras['bytes'])} de {formatar_tamanho(leituras['max_bytes'])}) · "
+                    f"{leituras['acertos']} acertos / {leituras['faltas']} leituras do disco · "
+                    f"{leituras['descartes']} descartes"
+                )
         
         with col_btn4:
             if st.button("🗑️ Limpar Cache", use_container_width=True):
@@ -2975,7 +2913,7 @@ if 'df_vyco_processado' in st.session_state:
                             valores = item_data.get('valores', {})
                             if 'TOTAL' in valores:
                                 total = valores['TOTAL']
-                                st.caption(f"   Total: R$ {total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                                st.caption(f"   Total: {formatar_valor_br(total)}")
                     
                     # Botão de download
                     json_str = json.dumps(dados_dre, indent=2, ensure_ascii=False, default=str)
@@ -3024,20 +2962,22 @@ if 'df_vyco_processado' in st.session_state:
                     
                     st.caption("📝 Mostrando primeiras 100 transações")
                     
-                    # Estatísticas rápidas
+                    # Estatísticas rápidas (do cubo de agregados salvo)
                     col_stat1, col_stat2, col_stat3 = st.columns(3)
+                    cubo = cache_manager.carregar_cubo(empresa_cache)
+                    por_sinal = cubo.agregar([DIMENSAO_SINAL], medidas=["soma"])["soma"] if cubo is not None else pd.Series(dtype=float)
                     
                     with col_stat1:
-                        receitas = df_transacoes[df_transacoes['Valor (R$)'] > 0]['Valor (R$)'].sum()
-                        st.metric("💚 Receitas", f"R$ {receitas:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                        receitas = por_sinal.get(SINAL_ENTRADA, 0.0)
+                        st.metric("💚 Receitas", formatar_valor_br(receitas))
                     
                     with col_stat2:
-                        despesas = df_transacoes[df_transacoes['Valor (R$)'] < 0]['Valor (R$)'].sum()
-                        st.metric("💸 Despesas", f"R$ {abs(despesas):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                        despesas = por_sinal.get(SINAL_SAIDA, 0.0)
+                        st.metric("💸 Despesas", formatar_valor_br(abs(despesas)))
                     
                     with col_stat3:
                         saldo = receitas + despesas
-                        st.metric("💰 Saldo", f"R$ {saldo:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                        st.metric("💰 Saldo", formatar_valor_br(saldo))
                     
                     # Botão de download
                     csv = df_transacoes.to_csv(index=False).encode('utf-8')
@@ -3118,14 +3058,14 @@ if 'df_vyco_processado' in st.session_state:
             # Obter meses disponíveis das transações
             df_transacoes = st.session_state.df_transacoes_total_vyco
             if 'Data' in df_transacoes.columns:
-                df_transacoes['Data'] = pd.to_datetime(df_transacoes['Data'], errors='coerce')
-                meses_disponiveis = sorted(df_transacoes['Data'].dropna().dt.to_period('M').astype(str).unique())
-                anos_disponiveis = sorted(set([m[:4] for m in meses_disponiveis]))
+                validar_esquema_transacoes(df_transacoes)
+                meses_relatorio = meses_disponiveis(df_transacoes)
+                anos_disponiveis = sorted(set([m[:4] for m in meses_relatorio]))
             else:
-                meses_disponiveis = []
+                meses_relatorio = []
                 anos_disponiveis = []
             
-            if meses_disponiveis:
+            if meses_relatorio:
                 tipo_filtro = st.radio(
                     "Tipo de filtro:",
                     ["📅 Últimos N meses", "📆 Ano completo", "🗓️ Meses específicos"],
@@ -3139,11 +3079,11 @@ if 'df_vyco_processado' in st.session_state:
                     num_meses = st.slider(
                         "Quantidade de meses:",
                         min_value=1,
-                        max_value=len(meses_disponiveis),
-                        value=min(6, len(meses_disponiveis)),
+                        max_value=len(meses_relatorio),
+                        value=min(6, len(meses_relatorio)),
                         key="slider_meses_relatorio"
                     )
-                    meses_selecionados = meses_disponiveis[-num_meses:]
+                    meses_selecionados = meses_relatorio[-num_meses:]
                     st.caption(f"📊 Período: {meses_selecionados[0]} a {meses_selecionados[-1]}")
                 
                 elif tipo_filtro == "📆 Ano completo":
@@ -3153,14 +3093,14 @@ if 'df_vyco_processado' in st.session_state:
                         index=len(anos_disponiveis)-1 if anos_disponiveis else 0,
                         key="select_ano_relatorio"
                     )
-                    meses_selecionados = [m for m in meses_disponiveis if m.startswith(ano_selecionado)]
+                    meses_selecionados = [m for m in meses_relatorio if m.startswith(ano_selecionado)]
                     st.caption(f"📊 {len(meses_selecionados)} meses em {ano_selecionado}")
                 
                 else:  # Meses específicos
                     meses_selecionados = st.multiselect(
                         "Selecione os meses:",
-                        meses_disponiveis,
-                        default=meses_disponiveis[-6:] if len(meses_disponiveis) >= 6 else meses_disponiveis,
+                        meses_relatorio,
+                        default=meses_relatorio[-6:] if len(meses_relatorio) >= 6 else meses_relatorio,
                         key="multiselect_meses_relatorio"
                     )
                     if meses_selecionados:
@@ -3236,10 +3176,8 @@ if 'df_vyco_processado' in st.session_state:
                     df_transacoes_filtrado = st.session_state.df_transacoes_total_vyco.copy()
                     
                     if meses_filtro:
-                        df_transacoes_filtrado['Data'] = pd.to_datetime(df_transacoes_filtrado['Data'], errors='coerce')
-                        df_transacoes_filtrado['Mes_Periodo'] = df_transacoes_filtrado['Data'].dt.to_period('M').astype(str)
-                        df_transacoes_filtrado = df_transacoes_filtrado[df_transacoes_filtrado['Mes_Periodo'].isin(meses_filtro)]
-                        df_transacoes_filtrado = df_transacoes_filtrado.drop('Mes_Periodo', axis=1)
+                        chaves_filtro = [chave_de_rotulo(m) for m in meses_filtro]
+                        df_transacoes_filtrado = df_transacoes_filtrado[df_transacoes_filtrado[COLUNA_MES].isin(chaves_filtro)]
                     
                     # Gerar dados com período filtrado
                     resultado_fluxo = exibir_fluxo_caixa_vyco(
@@ -3313,16 +3251,38 @@ if 'df_vyco_processado' in st.session_state:
                     
                     metricas_todos_meses.append({
                         'Mês': mes,
-                        'Faturamento': f"R$ {abs(faturamento):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                        'EBITDA': f"R$ {lucro_operacional-impostos:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                        'Margem EBITDA': f"{margem_ebitda:.1f}%",
-                        'Lucro Líquido': f"R$ {lucro_liquido:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
-                        'Margem Líquida': f"{margem_liquida:.1f}%",
-                        'Estoque': f"R$ {abs(estoque):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                        'Faturamento': abs(faturamento),
+                        'EBITDA': lucro_operacional - impostos,
+                        'Margem EBITDA': margem_ebitda,
+                        'Lucro Líquido': lucro_liquido,
+                        'Margem Líquida': margem_liquida,
+                        'Estoque': abs(estoque)
                     })
                 
                 df_metricas = pd.DataFrame(metricas_todos_meses)
-                st.dataframe(df_metricas, use_container_width=True, hide_index=True)
+                st.dataframe(
+                    formatar_tabela(
+                        df_metricas,
+                        moeda=['Faturamento', 'EBITDA', 'Lucro Líquido', 'Estoque'],
+                        percentual=['Margem EBITDA', 'Margem Líquida']
+                    ),
+                    use_container_width=True, hide_index=True
+                )
+                
+                # Acumulado no ano, últimos 12 meses e mesmo mês do ano anterior, por linha do DRE
+                st.markdown("#### 📆 Acumulado no Ano, Últimos 12 Meses e Variação Anual")
+                comparativos = comparativos_periodo(resultado_dre, colunas_meses)
+                st.dataframe(
+                    formatar_tabela(
+                        comparativos,
+                        moeda=comparativos.columns[:2],
+                        percentual=comparativos.columns[2:],
+                        sinal_percentual=True,
+                        vazio="—"
+                    ),
+                    use_container_width=True
+                )
+                st.caption("Últimos 12 meses e variação anual exigem histórico suficiente no período selecionado (— quando não há).")
                 
                 st.markdown("---")
                 
@@ -3348,7 +3308,7 @@ if 'df_vyco_processado' in st.session_state:
                 with col1:
                     st.metric(
                         "💰 Faturamento",
-                        f"R$ {abs(faturamento):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                        formatar_valor_br(abs(faturamento)),
                         delta=None,
                         help="Faturamento bruto do período"
                     )
@@ -3357,7 +3317,7 @@ if 'df_vyco_processado' in st.session_state:
                     delta_color = "normal" if lucro_liquido >= 0 else "inverse"
                     st.metric(
                         "💎 Lucro Líquido",
-                        f"R$ {lucro_liquido:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                        formatar_valor_br(lucro_liquido),
                         delta=f"{margem_liquida:.1f}% margem",
                         delta_color=delta_color,
                         help="Lucro líquido após todas as deduções"
@@ -3367,7 +3327,7 @@ if 'df_vyco_processado' in st.session_state:
                     delta_color = "normal" if ebitda >= 0 else "inverse"
                     st.metric(
                         "📈 EBITDA",
-                        f"R$ {ebitda:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                        formatar_valor_br(ebitda),
                         delta=f"{margem_ebitda:.1f}% margem",
                         delta_color=delta_color,
                         help="Lucro antes de juros, impostos, depreciação e amortização"
@@ -3376,7 +3336,7 @@ if 'df_vyco_processado' in st.session_state:
                 with col4:
                     st.metric(
                         "📦 Estoque",
-                        f"R$ {abs(estoque):,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
+                        formatar_valor_br(abs(estoque)),
                         delta=None,
                         help="Valor do estoque no fim do período"
                     )
@@ -3408,7 +3368,7 @@ if 'df_vyco_processado' in st.session_state:
                         y=faturamentos_meses,
                         name='Faturamento',
                         marker=dict(color='#1f77b4'),
-                        text=[f"R$ {v:,.0f}" for v in faturamentos_meses],
+                        text=formatar_moeda(faturamentos_meses, casas=0).tolist(),
                         textposition='outside'
                     ))
                     
@@ -3441,7 +3401,7 @@ if 'df_vyco_processado' in st.session_state:
                         marker=dict(
                             color=['#e74c3c' if v < 0 else '#2ca02c' for v in lucros_meses]
                         ),
-                        text=[f"R$ {v:,.0f}" for v in lucros_meses],
+                        text=formatar_moeda(lucros_meses, casas=0).tolist(),
                         textposition='outside'
                     ))
                     
@@ -3465,10 +3425,12 @@ if 'df_vyco_processado' in st.session_state:
                 with col_comp1:
                     st.markdown("### 💚 Composição de Receitas")
                     
-                    # Extrair receitas por categoria
-                    df_receitas = df_transacoes[df_transacoes['Valor (R$)'] > 0].copy()
-                    if not df_receitas.empty and 'Categoria' in df_receitas.columns:
-                        receitas_cat = df_receitas.groupby('Categoria')['Valor (R$)'].sum().sort_values(ascending=False).head(5)
+                    # Receitas por categoria (cubo de agregados das transações)
+                    cubo_relatorio = obter_cubo_transacoes(df_transacoes)
+                    receitas_cat = cubo_relatorio.agregar(["Categoria"], {DIMENSAO_SINAL: SINAL_ENTRADA}, ["soma"])["soma"]
+                    receitas_cat = receitas_cat[receitas_cat.index.notna()]
+                    if not receitas_cat.empty:
+                        receitas_cat = receitas_cat.sort_values(ascending=False).head(5)
                         
                         fig_rec = go.Figure(data=[go.Pie(
                             labels=receitas_cat.index,
@@ -3490,11 +3452,11 @@ if 'df_vyco_processado' in st.session_state:
                 with col_comp2:
                     st.markdown("### 💸 Composição de Despesas")
                     
-                    # Extrair despesas por categoria
-                    df_despesas = df_transacoes[df_transacoes['Valor (R$)'] < 0].copy()
-                    if not df_despesas.empty and 'Categoria' in df_despesas.columns:
-                        df_despesas['Valor_Abs'] = df_despesas['Valor (R$)'].abs()
-                        despesas_cat = df_despesas.groupby('Categoria')['Valor_Abs'].sum().sort_values(ascending=False).head(5)
+                    # Despesas por categoria (valor absoluto)
+                    despesas_cat = -cubo_relatorio.agregar(["Categoria"], {DIMENSAO_SINAL: SINAL_SAIDA}, ["soma"])["soma"]
+                    despesas_cat = despesas_cat[despesas_cat.index.notna()]
+                    if not despesas_cat.empty:
+                        despesas_cat = despesas_cat.sort_values(ascending=False).head(5)
                         
                         fig_desp = go.Figure(data=[go.Pie(
                             labels=despesas_cat.index,
@@ -3550,8 +3512,8 @@ if 'df_vyco_processado' in st.session_state:
                     indice_liquidez = (total_receitas / total_despesas) if total_despesas != 0 else 0
                     
                     st.metric("Índice de Liquidez", f"{indice_liquidez:.2f}x")
-                    st.metric("Total Receitas", f"R$ {total_receitas:,.0f}".replace(",", "X").replace(".", ",").replace("X", "."))
-                    st.metric("Total Despesas", f"R$ {total_despesas:,.0f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                    st.metric("Total Receitas", formatar_valor_br(total_receitas, casas=0))
+                    st.metric("Total Despesas", formatar_valor_br(total_despesas, casas=0))
                 
                 with col_ind3:
                     st.markdown("#### 📈 Crescimento")
@@ -3579,7 +3541,7 @@ if 'df_vyco_processado' in st.session_state:
                     num_transacoes = len(df_transacoes[df_transacoes['Valor (R$)'] > 0])
                     ticket_medio = (total_receitas / num_transacoes) if num_transacoes > 0 else 0
                     
-                    st.metric("Ticket Médio", f"R$ {ticket_medio:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+                    st.metric("Ticket Médio", formatar_valor_br(ticket_medio))
                     st.metric("Transações", f"{num_transacoes:,}".replace(",", "."))
                 
                 st.markdown("---")
@@ -3661,11 +3623,9 @@ if 'df_vyco_processado' in st.session_state:
                 with st.expander("📄 Ver Fluxo de Caixa Completo", expanded=False):
                     if not resultado_fluxo.empty:
                         # Formatar os números para o padrão brasileiro
-                        resultado_fluxo_formatado = resultado_fluxo.copy()
-                        for col in resultado_fluxo_formatado.select_dtypes(include=['float', 'int']).columns:
-                            resultado_fluxo_formatado[col] = resultado_fluxo_formatado[col].apply(
-                                lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) else ""
-                            )
+                        resultado_fluxo_formatado = formatar_tabela(
+                            resultado_fluxo, moeda=resultado_fluxo.select_dtypes(include=['float', 'int']).columns
+                        )
 
                         # Aplicar estilo para alinhar os números à direita
                         resultado_fluxo_styled = resultado_fluxo_formatado.style.set_properties(
@@ -3891,6 +3851,8 @@ if 'df_vyco_processado' in st.session_state:
                             # 2. Projeções (Pegar o que está no cache de DRE/Fluxo)
                             dados_dre = cache_manager.carregar_dre(licenca_atual)
                             df_dre_global = pd.DataFrame()
+                            if dados_dre and dados_dre.get('desatualizado'):
+                                st.warning(f"⚠️ DRE em cache desatualizado ({', '.join(dados_dre['desatualizado'])}). Use 'Atualizar Cache Completo' antes de exportar.")
                             
                             if dados_dre:
                                 if dados_dre.get("formato") == "estruturado":
@@ -3927,7 +3889,9 @@ if 'df_vyco_processado' in st.session_state:
                                 
                             # 4. Análise GPT
                             ultimo_parecer = carregar_ultimo_parecer_gpt(licenca_atual)
-                            if ultimo_parecer and "parecer_texto" in ultimo_parecer:
+                            if cache_manager.motivos_desatualizacao(licenca_atual, PARECER_GPT):
+                                st.warning("⚠️ Último parecer GPT gerado com fluxo/DRE anteriores; não incluído. Gere um novo parecer.")
+                            elif ultimo_parecer and "parecer_texto" in ultimo_parecer:
                                 dados_ppt["analise_gpt"] = ultimo_parecer["parecer_texto"]
                                 
                             # 5. Parecer Antigravity 
@@ -3998,6 +3962,11 @@ else:
         st.markdown(f"- **{nome}**")
     
 
+# Consolidação de grupos (independe da licença carregada)
+st.markdown("---")
+with st.expander("🏢 Consolidação de Grupo (várias licenças)", expanded=False):
+    exibir_consolidacao_vyco(licencas_ativas)
+
 # Rodapé
 st.markdown("---")
 st.caption("© 2025 Sistema de Análise Financeira - Integração Vyco | Versão 1.0")
@@ -18,6 +18,10 @@ import plotly.graph_objects as go
 # Módulos do projeto
 from logic.orcamento_manager import orcamento_manager
 from logic.data_cache_manager import cache_manager
+from logic.Analises_DFC_DRE.esquema_transacoes import validar_esquema_transacoes
+from logic.cubo_detalhamento import MAPEAMENTO_LINHAS_DRE, obter_cubo_detalhamento
+from logic.engine.formatacao import formatar_brl, formatar_moeda, formatar_percentual
+from logic.engine.metricas_derivadas import participacao_no_total
 from logic.licenca_manager import licenca_manager
 from logic.saldo_contas import saldo_manager, SaldoContasManager
 
@@ -43,11 +47,7 @@ st.markdown("""
 # Funções auxiliares
 def formatar_valor_br(valor):
     """Formata um valor numérico para o formato brasileiro (R$)"""
-    if pd.isna(valor) or valor == 0:
-        return "R$ 0,00"
-    if isinstance(valor, (int, float)):
-        return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return str(valor)
+    return formatar_brl(valor, vazio="R$ 0,00")
 
 def converter_para_float(valor_str):
     """Converte uma string de valor BR para float"""
@@ -126,6 +126,9 @@ def processar_detalhamento_local(df_transacoes: pd.DataFrame, categoria: str, me
     Processa detalhamento de uma categoria/mês usando DF de transações do cache
     SEM importar módulo Vyco - totalmente independente
     
+    O agrupamento por (linha do DRE, mês, descrição) é feito uma vez e memoizado;
+    trocar de mês ou de categoria apenas fatia o cubo.
+    
     Args:
         df_transacoes: DataFrame completo de transações categorizadas (do cache)
         categoria: Categoria do DRE (ex: 'DESPESA OPERACIONAL')
@@ -138,87 +141,17 @@ def processar_detalhamento_local(df_transacoes: pd.DataFrame, categoria: str, me
         if df_transacoes is None or df_transacoes.empty:
             return pd.DataFrame()
         
-        # Verificar qual coluna de descrição está presente (encoding pode variar)
-        col_descricao = None
-        for possivel_col in ['Descrição', 'DescriÃ§Ã£o', 'Descricao', 'descrição']:
-            if possivel_col in df_transacoes.columns:
-                col_descricao = possivel_col
-                break
-        
-        if not col_descricao:
-            # Debug: mostrar colunas disponíveis
-            colunas_disponiveis = ', '.join(df_transacoes.columns.tolist())
-            st.warning(f"⚠️ Coluna de descrição não encontrada no cache. Colunas disponíveis: {colunas_disponiveis}")
-            return pd.DataFrame()
-        
-        # Debug inicial
-        st.write(f"🔍 **Debug:** Procurando categoria '{categoria}' no mês '{mes}'")
-        st.write(f"📊 Total de transações no cache: {len(df_transacoes)}")
-        
-        # Filtrar por categoria
-        df_filtrado = df_transacoes[
-            df_transacoes['Categoria_Vyco'].str.contains(categoria, case=False, na=False)
-        ].copy()
-        
-        st.write(f"📊 Transações após filtro de categoria: {len(df_filtrado)}")
-        
-        if df_filtrado.empty:
-            st.warning(f"❌ Nenhuma transação encontrada para categoria '{categoria}'")
-            return pd.DataFrame()
-        
-        # Converter Data para datetime se necessário
-        if 'Data' in df_filtrado.columns:
-            df_filtrado['Data'] = pd.to_datetime(df_filtrado['Data'], errors='coerce')
-            
-            # Debug: mostrar range de datas
-            data_min = df_filtrado['Data'].min()
-            data_max = df_filtrado['Data'].max()
-            st.write(f"📅 Range de datas: {data_min} até {data_max}")
-            
-            # Criar coluna de ano-mês para debug
-            df_filtrado['Ano_Mes'] = df_filtrado['Data'].dt.strftime('%Y-%m')
-            st.write(f"📅 Meses disponíveis: {df_filtrado['Ano_Mes'].unique()[:10]}")
-            
-            # Filtrar por mês
-            df_filtrado = df_filtrado[df_filtrado['Ano_Mes'] == mes]
-            st.write(f"📊 Transações após filtro de mês '{mes}': {len(df_filtrado)}")
+        linhas_dre = list(dict.fromkeys([*MAPEAMENTO_LINHAS_DRE, categoria]))
+        resultado = obter_cubo_detalhamento(df_transacoes, linhas_dre).fatia(categoria, mes)
         
-        if df_filtrado.empty:
+        if resultado.empty:
             st.warning(f"❌ Nenhuma transação encontrada para '{categoria}' em '{mes}'")
             return pd.DataFrame()
         
-        # Agrupar por Descrição (subcategoria) usando a coluna correta
-        resultado = df_filtrado.groupby(col_descricao).agg({
-            'Valor (R$)': 'sum',
-            'Tipo': lambda x: x.mode().iloc[0] if not x.empty else 'Misto',
-            'Data': 'count'  # Contar transações
-        }).reset_index()
-        
-        # Renomear colunas
-        resultado.columns = ['Subcategoria', 'Valor', 'Tipo', 'Qtd']
-        
-        # Reordenar colunas
-        resultado = resultado[['Subcategoria', 'Tipo', 'Qtd', 'Valor']]
-        
-        # Limitar tamanho da descrição
-        resultado['Subcategoria'] = resultado['Subcategoria'].apply(
-            lambda x: str(x)[:80] + "..." if len(str(x)) > 80 else str(x)
-        )
-        
-        # Filtrar valores significativos
-        resultado = resultado[resultado['Valor'].abs() > 0.01]
-        
         # Calcular percentuais
-        total = resultado['Valor'].sum()
-        if total != 0:
-            resultado['% Categoria'] = (resultado['Valor'] / total * 100).round(2)
-        else:
-            resultado['% Categoria'] = 0.0
-        
-        # Ordenar por valor absoluto (maior → menor)
-        resultado = resultado.sort_values(by='Valor', key=abs, ascending=False)
+        resultado['% Categoria'] = participacao_no_total(resultado['Valor']).round(2)
         
-        return resultado.reset_index(drop=True)
+        return resultado
         
     except Exception as e:
         st.error(f"Erro ao processar detalhamento: {e}")
@@ -383,9 +316,7 @@ def formatar_df_detalhamento(df):
     # Formatar colunas de valores para o padrão brasileiro
     for coluna in ['Base (2025)', 'Orçamento (2026)']:
         if coluna in df_formatado.columns:
-            df_formatado[coluna] = df_formatado[coluna].apply(
-                lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) and x != 0 else "R$ 0,00"
-            )
+            df_formatado[coluna] = formatar_moeda(df_formatado[coluna], vazio="R$ 0,00")
     
     return df_formatado
 
@@ -459,7 +390,7 @@ def formatar_df_detalhamento(df):
         
         # Filtrar por ano se houver coluna Data
         if 'Data' in df_categoria.columns:
-            df_categoria['Data'] = pd.to_datetime(df_categoria['Data'])
+            validar_esquema_transacoes(df_categoria)
             df_categoria = df_categoria[df_categoria['Data'].dt.year == ano_base]
         
         if df_categoria.empty:
@@ -574,9 +505,7 @@ def formatar_df_detalhamento(df):
     # Formatar colunas de valores para o padrão brasileiro
     for coluna in ['Base (2025)', 'Orçamento (2026)']:
         if coluna in df_formatado.columns:
-            df_formatado[coluna] = df_formatado[coluna].apply(
-                lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") if pd.notna(x) and x != 0 else "R$ 0,00"
-            )
+            df_formatado[coluna] = formatar_moeda(df_formatado[coluna], vazio="R$ 0,00")
     
     return df_formatado
 
@@ -667,6 +596,11 @@ if dados_empresa:
 
 # Verificar se existe orçamento salvo
 orcamento_existente = orcamento_manager.carregar_orcamento(empresa_selecionada, ano_orcamento)
+
+# Versão do arquivo quando a edição começou: salvar por cima de outra sessão é recusado
+chave_versao_orcamento = f"versao_orcamento_{empresa_selecionada}_{ano_orcamento}"
+if chave_versao_orcamento not in st.session_state:
+    st.session_state[chave_versao_orcamento] = orcamento_manager.versao_orcamento(empresa_selecionada, ano_orcamento)
 if orcamento_existente:
     st.sidebar.success("💾 Orçamento salvo encontrado")
     ultima_atualizacao = orcamento_existente.get('configuracoes', {}).get('ultima_atualizacao', 'Desconhecida')
@@ -722,11 +656,11 @@ with tab1:
                     st.dataframe(df_contas, use_container_width=True, hide_index=True)
                     
                     # Mostrar total consolidado
-                    saldo_formatado = f"R$ {saldo_atual:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                    saldo_formatado = formatar_brl(saldo_atual)
                     st.markdown(f"💰 Saldo Total Atual: {saldo_formatado}")
                 else:
                     st.info("📊 Dados detalhados das contas não disponíveis")
-                    saldo_formatado = f"R$ {saldo_atual:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                    saldo_formatado = formatar_brl(saldo_atual)
                     st.markdown(f"💰 Saldo Total Atual: {saldo_formatado}")
             else:
                 st.warning("⚠️ Não foi possível obter dados das contas bancárias")
@@ -883,10 +817,8 @@ with tab1:
                         })
                     
                     # Calcular totais e percentuais
-                    if 'Valor' in df_exibir.columns:
-                        total = df_exibir['Valor'].sum()
-                        if total != 0 and '% Categoria' not in df_exibir.columns:
-                            df_exibir['% Categoria'] = (df_exibir['Valor'] / total * 100).round(2)
+                    if 'Valor' in df_exibir.columns and '% Categoria' not in df_exibir.columns:
+                        df_exibir['% Categoria'] = participacao_no_total(df_exibir['Valor']).round(2)
                     
                     # Ordenar por valor
                     if 'Valor' in df_exibir.columns:
@@ -894,13 +826,16 @@ with tab1:
                     
                     # Exibir título
                     st.markdown(f"#### 📊 Composição: {categoria_detalhamento} - {nome_mes_pt(mes_detalhamento)}")
+                    if detalhamento_lista.desatualizado:
+                        st.warning(f"⚠️ DRE desatualizado ({', '.join(detalhamento_lista.desatualizado)}); "
+                                   "o detalhamento pode não refletir as alterações mais recentes.")
                     
                     # Formatar valores para exibição
                     df_display = df_exibir.copy()
                     if 'Valor' in df_display.columns:
-                        df_display['Valor'] = df_display['Valor'].apply(formatar_valor_br)
+                        df_display['Valor'] = formatar_moeda(df_display['Valor'], vazio="R$ 0,00")
                     if '% Categoria' in df_display.columns:
-                        df_display['% Categoria'] = df_display['% Categoria'].apply(lambda x: f"{x:.2f}%")
+                        df_display['% Categoria'] = formatar_percentual(df_display['% Categoria'], casas=2)
                     
                     # Exibir tabela
                     st.dataframe(
@@ -1044,12 +979,19 @@ with tab3:
                         'tipo_dados': tipo_cache,
                         'criado_por': 'usuario',
                         'observacoes': 'Orçamento criado via interface web'
-                    }
+                    },
+                    versao_esperada=st.session_state.get(chave_versao_orcamento)
                 )
                 
                 if resultado:
+                    st.session_state[chave_versao_orcamento] = orcamento_manager.versao_orcamento(empresa_selecionada, ano_orcamento)
                     st.success("✅ Orçamento salvo com sucesso!")
                     st.rerun()
+                elif orcamento_manager.versao_orcamento(empresa_selecionada, ano_orcamento) != st.session_state.get(chave_versao_orcamento):
+                    # A próxima tentativa parte da versão atual (sobrescreve conscientemente)
+                    del st.session_state[chave_versao_orcamento]
+                    st.warning("⚠️ Outra sessão salvou este orçamento depois que você o abriu. "
+                               "Revise os valores e clique em salvar novamente para sobrescrever.")
                 else:
                     st.error("❌ Erro ao salvar orçamento")
     